@@ -0,0 +1,206 @@
+import os
+import csv
+import time
+import atexit
+import threading
+from datetime import datetime
+
+# ================= CONFIG =================
+ENABLED = False                 # PoliteSession requests wait for a slot of their host's adaptive limit (opt-in)
+INITIAL_LIMIT = 2               # Requests in flight per host before any feedback
+MIN_LIMIT = 1
+DEFAULT_CEILING = 8             # Hard cap for hosts not listed below; keep <= transport.POOL_MAXSIZE
+WINDOW = 20                     # Completed requests per decision (at least the current limit)
+BACKOFF = 0.5                   # Limit multiplier on a timeout, connection error, 429 or 5xx
+LATENCY_TOLERANCE = 3.0         # Grow only while window p95 <= this x the host's best median latency
+ERROR_BUDGET = 0.02             # Grow only while the window's error rate is at most this
+LOG_FILE = os.path.join("crawl_logs", "concurrency_log.csv")    # One row per limit change, appended across runs
+
+# Hard ceilings per portal domain. Subdomains inherit their parent's ceiling but get their own limit.
+# None is above transport.POOL_MAXSIZE: connections past the pool size are not kept alive.
+HOST_CEILINGS = {
+    "vinhphuc.gov.vn": 8,       # JSON API, cheap 50-row windows
+    "hatinh.gov.vn": 8,
+    "congan.hanoi.gov.vn": 8,
+    "dienbien.gov.vn": 4,       # SharePoint pages take seconds each
+    "khanhhoa.gov.vn": 4,
+    "thainguyen.gov.vn": 4,
+    "tuyengiaodanvan.vn": 4,
+}
+
+LOG_FIELDS = ["time", "host", "limit", "previous", "reason", "inflight", "samples", "p95_ms", "error_rate"]
+
+
+def ceiling_for(host, ceilings=HOST_CEILINGS):
+    """Looks up a host's hard ceiling, walking up its parent domains like rate_limiter.limits_for."""
+    host = host.split(":")[0]
+    if host.startswith("www."):
+        host = host[4:]
+    parts = host.split(".")
+    for i in range(len(parts) - 1):
+        candidate = ".".join(parts[i:])
+        if candidate in ceilings:
+            return ceilings[candidate]
+    return DEFAULT_CEILING
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+class AdaptiveLimit:
+    """
+    AIMD limit on one host's requests in flight. Every window of completed
+    requests, the limit grows by one if the window used it fully, its p95
+    latency stayed within LATENCY_TOLERANCE of the best median seen and its
+    error rate within ERROR_BUDGET; it shrinks by one if latency degraded.
+    A timeout, connection error, 429 or 5xx cuts it by BACKOFF at once. Only
+    requests started after the last cut can cut again, so one overload burst
+    costs one cut, not one per request that was already in flight.
+    """
+
+    def __init__(self, host, ceiling, initial=INITIAL_LIMIT):
+        self.host = host
+        self.ceiling = ceiling
+        self.limit = max(MIN_LIMIT, min(initial, ceiling))
+        self.inflight = 0
+        self.peak = 0           # Most requests in flight during the current window
+        self.latencies = []
+        self.errors = 0
+        self.baseline = None    # Lowest window median latency seen
+        self.cuts = 0
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        """Blocks until the host has a free slot. Returns a ticket for release()."""
+        with self.cond:
+            while self.inflight >= self.limit:
+                self.cond.wait()
+            self.inflight += 1
+            self.peak = max(self.peak, self.inflight)
+            return self.cuts
+
+    def release(self, ticket, latency=None, failed=False):
+        """
+        Frees the slot and feeds back the outcome: latency in seconds of a
+        request that got an answer, or failed=True for an overload signal.
+        Neither (the request raised for another reason) only frees the slot.
+        Returns the change as a log row (without time and host), or None.
+        """
+        with self.cond:
+            self.inflight -= 1
+            change = self._feedback(ticket, latency, failed)
+            self.cond.notify_all()
+            return change
+
+    def _feedback(self, ticket, latency, failed):
+        if failed:
+            self.errors += 1
+            if ticket != self.cuts:
+                return None     # Started before the last cut, which already answered this overload
+            return self._set(max(MIN_LIMIT, int(self.limit * BACKOFF)), "overload", restart=True)
+        if latency is None:
+            return None
+        self.latencies.append(latency)
+        if len(self.latencies) < max(WINDOW, self.limit):
+            return None
+
+        p95 = percentile(self.latencies, 0.95)
+        median = percentile(self.latencies, 0.5)
+        self.baseline = median if self.baseline is None else min(self.baseline, median)
+        error_rate = self.errors / (len(self.latencies) + self.errors)
+        if p95 > self.baseline * LATENCY_TOLERANCE:
+            return self._set(max(MIN_LIMIT, self.limit - 1), "latency")
+        if error_rate <= ERROR_BUDGET and self.peak >= self.limit and self.limit < self.ceiling:
+            return self._set(self.limit + 1, "healthy")
+        return self._set(self.limit, None)
+
+    def _set(self, limit, reason, restart=False):
+        """Ends the window with a new limit; returns the change (None if the limit stayed)."""
+        previous, self.limit = self.limit, limit
+        latencies, errors = self.latencies, self.errors
+        self.latencies, self.errors, self.peak = [], 0, self.inflight
+        if restart:
+            self.cuts += 1
+        if limit == previous:
+            return None
+        return {
+            "limit": limit,
+            "previous": previous,
+            "reason": reason,
+            "inflight": self.inflight,
+            "samples": len(latencies) + errors,
+            "p95_ms": round(percentile(latencies, 0.95) * 1000) if latencies else "",
+            "error_rate": round(errors / (len(latencies) + errors), 3),
+        }
+
+
+class ConcurrencyController:
+    """
+    Adaptive limits for every host a process talks to, plus the log of how
+    each one moved, so a slow portal can be read back as "cut to 2 after 503s
+    at 10:42" instead of guessed at.
+    """
+
+    def __init__(self, ceilings=None, log_file=LOG_FILE):
+        self.ceilings = dict(HOST_CEILINGS if ceilings is None else ceilings)
+        self.log_file = log_file
+        self.limits = {}
+        self.history = {}       # host -> [(time, limit, reason)]
+        self.lock = threading.Lock()
+        self._log = None
+        self._writer = None
+
+    def ceiling(self, host):
+        return ceiling_for(host, self.ceilings)
+
+    def get(self, host):
+        with self.lock:
+            if host not in self.limits:
+                self.limits[host] = AdaptiveLimit(host, self.ceiling(host))
+                self.history[host] = [(time.time(), self.limits[host].limit, "start")]
+            return self.limits[host]
+
+    def acquire(self, host):
+        """Blocks until `host` has a free slot. Returns the ticket to hand back to release()."""
+        return self.get(host).acquire()
+
+    def release(self, host, ticket, latency=None, failed=False):
+        change = self.get(host).release(ticket, latency, failed)
+        if change is not None:
+            self.record(host, change)
+
+    def record(self, host, change):
+        row = {"time": datetime.now().isoformat(timespec="seconds"), "host": host, **change}
+        with self.lock:
+            self.history[host].append((time.time(), change["limit"], change["reason"]))
+            if self.log_file:
+                if self._log is None:
+                    os.makedirs(os.path.dirname(self.log_file) or ".", exist_ok=True)
+                    new = not os.path.exists(self.log_file)
+                    self._log = open(self.log_file, "a", encoding="utf-8", newline="")
+                    self._writer = csv.DictWriter(self._log, fieldnames=LOG_FIELDS)
+                    if new:
+                        self._writer.writeheader()
+                self._writer.writerow(row)
+                self._log.flush()
+
+    def report(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        moved = {h: steps for h, steps in self.history.items() if len(steps) > 1}
+        if not moved:
+            return
+        print(f"\nAdaptive concurrency (changes logged to {self.log_file}):")
+        for host, steps in sorted(moved.items()):
+            limits = [limit for _, limit, _ in steps]
+            cuts = sum(1 for _, _, reason in steps if reason == "overload")
+            print(f"  {host:<28} final {limits[-1]:>3}  range {min(limits)}-{max(limits)}  "
+                  f"ceiling {self.limits[host].ceiling:>3}  changes {len(steps) - 1:>4}  cuts {cuts:>3}")
+
+
+# Shared by every session in the process, like rate_limiter.limiter
+controller = ConcurrencyController()
+atexit.register(controller.report)
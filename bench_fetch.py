@@ -0,0 +1,96 @@
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import html_archive
+import http_cache
+
+# Mock pages must not land in the real archive or cache: off before the crawler module builds its session
+html_archive.ENABLED = False
+http_cache.ENABLED = False
+
+import crawl_danang
+from fetch_engine import FetchEngine
+from rate_limiter import limiter
+
+# ================= CONFIG =================
+NUM_ARTICLES = 40
+LATENCY = 0.2       # Simulated server response time per page (seconds)
+LEGACY_SLEEP = 0.5  # The per-article sleep the serial loop used to pay
+CONCURRENCY = 8
+MOCK_RATE = 10.0    # Politeness budget for the mock host (requests/s)
+MOCK_BURST = 10
+
+ARTICLE_HTML = """<html><head>
+<title>Bài viết {n} - Cổng thông tin điện tử</title>
+<meta name="description" content="Tóm tắt bài viết số {n} trên cổng thông tin mô phỏng.">
+<meta name="keywords" content="đà nẵng, mô phỏng, bài {n}">
+</head><body>
+<h1 class="title-art">Bài viết mô phỏng số {n}</h1>
+<div class="meta-info"><span class="publish-date">12/03/2025 08:30</span></div>
+<div class="journal-content-article">
+{paragraphs}
+</div>
+</body></html>"""
+
+
+class MockPortalHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(LATENCY)
+        n = self.path.rstrip("/").split("-")[-1]
+        paragraphs = "\n".join(
+            f"<p>Đoạn văn {i} của bài {n} với nội dung đủ dài để được giữ lại.</p>" for i in range(20)
+        )
+        body = ARTICLE_HTML.format(n=n, paragraphs=paragraphs).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serial_loop(urls):
+    """The per-article loop the crawl_*.py scripts ran before the fetch engine."""
+    rows = []
+    for url in urls:
+        rows.append(crawl_danang.parse_article(url, "Benchmark"))
+        time.sleep(LEGACY_SLEEP)
+    return rows
+
+
+def engine_loop(urls):
+    with FetchEngine(per_host=CONCURRENCY) as engine:
+        return engine.map(crawl_danang.parse_article, urls, "Benchmark")
+
+
+def report(name, rows, elapsed):
+    ok = sum(1 for r in rows if r and r["title"] and r["content"])
+    print(f"{name:<8} {ok:>4} articles in {elapsed:6.2f}s -> {ok / elapsed:6.2f} articles/s")
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockPortalHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base}/web/dng/-/bai-viet-{n}" for n in range(NUM_ARTICLES)]
+    limiter.configure("127.0.0.1", MOCK_RATE, MOCK_BURST)
+
+    print(f"Mock portal: {NUM_ARTICLES} articles, {LATENCY}s latency, LEGACY_SLEEP={LEGACY_SLEEP}, "
+          f"CONCURRENCY={CONCURRENCY}, budget={MOCK_RATE}/s burst {MOCK_BURST}")
+    try:
+        start = time.perf_counter()
+        rows = serial_loop(urls)
+        report("serial", rows, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        rows = engine_loop(urls)
+        report("engine", rows, time.perf_counter() - start)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import io
+import csv
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs
+
+import html_archive
+import http_cache
+
+# Mock pages must not land in the real archive or cache: off before the crawler module builds its session
+html_archive.ENABLED = False
+http_cache.ENABLED = False
+
+import hanoi_ajax_crawler as crawler
+from rate_limiter import limiter
+
+# ================= CONFIG =================
+NUM_PAGES = 120
+PAGE_SIZE = 10
+LATENCY = 0.02          # Simulated NewsZone response time per request (seconds)
+EXCLUDE_COST = 0.0002   # Server time per DataIds[] entry it has to exclude
+ARTICLE_LATENCY = 0.005
+MOCK_RATE = 1000.0      # Politeness budget for the mock host (requests/s)
+MOCK_BURST = 100
+
+ARTICLE_HTML = """<html><head>
+<title>Bài viết {n}</title>
+<meta property="og:description" content="Tóm tắt bài viết số {n}.">
+</head><body>
+<div class="news-info"><span class="time">12/03/2025 08:30</span></div>
+<div class="detail-content afcbc-body clearfix">{paragraphs}</div>
+</body></html>"""
+
+
+ARTICLE_IDS = [f"bai-viet-{n}" for n in range(NUM_PAGES * PAGE_SIZE)]   # Newest first, as the zone lists them
+
+
+class SeenUrls(set):
+    """In-memory stand-in for the crawler's UrlIndex: nothing is written next to a real CSV."""
+    record = set.add
+
+
+class MockNewsZoneHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in for /api/NewsZone/NewsZone. Like the real endpoint it removes the
+    DataIds[] articles from the zone's list first and then takes page PageIndex
+    of what is left, so a wrong exclusion window shows up as repeated or
+    skipped articles.
+    """
+    ids_received = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        form = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8"))
+        excluded = set(form.get("DataIds[]", []))
+        with self.lock:
+            MockNewsZoneHandler.ids_received += len(excluded)
+        time.sleep(LATENCY + EXCLUDE_COST * len(excluded))
+        page = int(form["PageIndex"][0])
+        remaining = [i for i in ARTICLE_IDS if i not in excluded]
+        links = [f'<a href="/tin-tuc/{i}.htm">Bài {i}</a>' for i in remaining[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]]
+        self.reply("\n".join(links))
+
+    def do_GET(self):
+        time.sleep(ARTICLE_LATENCY)
+        n = self.path.rsplit("-", 1)[-1].replace(".htm", "")
+        paragraphs = "".join(f"<p>Đoạn {i} của bài {n}.</p>" for i in range(5))
+        self.reply(ARTICLE_HTML.format(n=n, paragraphs=paragraphs))
+
+    def reply(self, text):
+        body = text.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(name, mode, prefetch):
+    """Crawls the mock zone; returns the article IDs written, in order."""
+    MockNewsZoneHandler.ids_received = 0
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=["topic", "title", "summary", "url", "keywords", "public_time", "content"])
+    cfg = crawler.CATEGORIES["Tin nổi bật"]
+    start = time.perf_counter()
+    pages, saved, posted = crawler.crawl_topic("Benchmark", cfg, writer, SeenUrls(), mode=mode, prefetch=prefetch)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<18} {pages:>4} pages {saved:>5} articles {posted / 1024:8.1f} KB DataIds[] "
+          f"{MockNewsZoneHandler.ids_received:>7} IDs excluded by server {elapsed:7.2f}s")
+    out.seek(0)
+    return [crawler.article_id(row[3]) for row in csv.reader(out)]
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockNewsZoneHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    crawler.DOMAIN = base
+    crawler.API_ENDPOINT = f"{base}/api/NewsZone/NewsZone"
+    crawler.MAX_PAGES = NUM_PAGES + 1
+    limiter.configure("127.0.0.1", MOCK_RATE, MOCK_BURST)
+
+    print(f"Mock NewsZone: {NUM_PAGES} pages x {PAGE_SIZE}, {LATENCY}s + {EXCLUDE_COST * 1000:.1f}ms per excluded ID")
+    try:
+        full = run("full (old)", "full", False)
+        window = run("window", "window", False)
+        prefetched = run("window + prefetch", "window", True)
+    finally:
+        server.shutdown()
+    # Every mode must see the whole zone once, in the server's order: no repeats, no skipped pages
+    assert full == ARTICLE_IDS, "full mode repeated or skipped articles"
+    assert window == full, "window mode returned a different article sequence than full mode"
+    assert prefetched == full, "prefetching changed the article sequence"
+    print(f"All modes returned the same {len(full)} articles in order.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import time
+
+import crawl_danang
+from parse_pool import ParsePool, PARSE_PROCESSES
+
+# ================= CONFIG =================
+NUM_PAGES = 200
+PARAGRAPHS = 60     # Body paragraphs per article
+MENU_ITEMS = 150    # Portal menus/sidebars make up most of a real danang.gov.vn page
+
+PAGE_HTML = """<html><head>
+<title>Bài viết {n} - Cổng thông tin điện tử thành phố Đà Nẵng</title>
+<meta name="description" content="Tóm tắt bài viết số {n} trên cổng thông tin mô phỏng.">
+<meta name="keywords" content="đà nẵng, mô phỏng, bài {n}">
+</head><body>
+<div class="portlet-navigation"><ul>{menu}</ul></div>
+<div class="sidebar">{sidebar}</div>
+<h1 class="title-art">Bài viết mô phỏng số {n}</h1>
+<div class="article-info">Cập nhật 12/03/2025 08:30 | Lượt xem: 1024</div>
+<div class="journal-content-article">
+{paragraphs}
+</div>
+<div class="footer"><p>Bản quyền thuộc Cổng thông tin điện tử thành phố Đà Nẵng - 01/01/2010</p></div>
+</body></html>"""
+
+
+def build_page(n):
+    menu = "".join(f'<li class="item-{i}"><a href="/muc-{i}">Chuyên mục {i}</a></li>' for i in range(MENU_ITEMS))
+    sidebar = "".join(f'<div class="box"><span>Tin liên quan {i}</span></div>' for i in range(MENU_ITEMS // 3))
+    paragraphs = "\n".join(
+        f"<p>Đoạn văn {i} của bài {n} với nội dung đủ dài để được giữ lại trong cột nội dung.</p>"
+        for i in range(PARAGRAPHS)
+    )
+    html = PAGE_HTML.format(n=n, menu=menu, sidebar=sidebar, paragraphs=paragraphs)
+    return html.encode("utf-8"), "utf-8", f"https://danang.gov.vn/web/dng/-/bai-viet-{n}", "Benchmark"
+
+
+def inline_parse(pages):
+    """What parse_article does today: decode and parse on the fetching thread."""
+    return [crawl_danang.extract_article(str(c, enc), url, topic) for c, enc, url, topic in pages]
+
+
+def report(name, n, elapsed):
+    print(f"{name:<12} {n:>4} pages in {elapsed:6.2f}s -> {n / elapsed:7.2f} pages/s")
+
+
+def main():
+    pages = [build_page(n) for n in range(NUM_PAGES)]
+    print(f"{NUM_PAGES} synthetic danang pages, {len(pages[0][0]) // 1024} KB each, {PARSE_PROCESSES} processes")
+
+    start = time.perf_counter()
+    expected = inline_parse(pages)
+    report("inline", len(expected), time.perf_counter() - start)
+
+    with ParsePool(crawl_danang.extract_article, PARSE_PROCESSES) as pool:
+        # Let the workers start and warm up before timing
+        pool.map(pages[:PARSE_PROCESSES])
+        start = time.perf_counter()
+        rows = pool.map(pages)
+        report("process pool", len(rows), time.perf_counter() - start)
+
+    print("rows identical:", rows == expected)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import os
+import sys
+import time
+import importlib
+
+import html_archive
+import html_backend
+from html_backend import FALLBACK_PARSER
+from rate_limiter import PoliteSession
+from reextract import PORTALS, archive_files, load_topics, latest_records
+
+# ================= CONFIG =================
+FIXTURES_DIR = "fixtures"   # fixtures/<portal>/<n>.html: `record <portal> <url>...` or `archive <portal> [n]`
+ARCHIVE_PAGES = 200         # Article pages `archive` copies per portal
+ROUNDS = 3
+FAST_PARSER = "lxml"
+
+# Only portals with a pure extract_article(html, url, topic) (reextract.PORTALS) can be
+# checked: parity means the crawler's real rows, not a stand-in parse, come out the same.
+
+
+def load_fixtures(portal, mode):
+    folder = os.path.join(FIXTURES_DIR, portal)
+    pages = []
+    if not os.path.isdir(folder):
+        return pages  # compare() reports the portal as having no recorded pages
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(".html"):
+            with open(os.path.join(folder, name), "rb") as f:
+                body = f.read()
+            pages.append((name, body if mode == "bytes" else body.decode("utf-8", errors="replace")))
+    return pages
+
+
+def run(extract, pages, parser):
+    html_backend.FORCE_PARSER = parser
+    best, rows = None, None
+    try:
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            rows = [extract(body, name, "Benchmark") for name, body in pages]
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        html_backend.FORCE_PARSER = None
+    return rows, best
+
+
+def compare(portals):
+    """Runs each portal's extract_article under both parsers. Returns the portals whose rows all matched."""
+    if not html_backend.HAVE_LXML:
+        print("lxml is not installed: nothing to compare. pip install lxml and run again.")
+        return []
+
+    passed = []
+    for portal in portals:
+        if portal not in PORTALS:
+            print(f"{portal:<14} skipped: no pure extract_article, parity cannot be checked (stays on html.parser)")
+            continue
+        module_name, _, mode = PORTALS[portal]
+        pages = load_fixtures(portal, mode)
+        if not pages:
+            print(f"{portal:<14} skipped: no recorded pages in {FIXTURES_DIR}/{portal}/")
+            continue
+        extract = importlib.import_module(module_name).extract_article
+        expected, base_time = run(extract, pages, FALLBACK_PARSER)
+        rows, fast_time = run(extract, pages, FAST_PARSER)
+
+        diffs = [name for (name, _), a, b in zip(pages, expected, rows) if a != b]
+        print(f"{portal:<14} {len(pages):>4} pages  html.parser {base_time * 1000 / len(pages):7.2f} ms/page  "
+              f"{FAST_PARSER} {fast_time * 1000 / len(pages):7.2f} ms/page  "
+              f"x{base_time / fast_time:4.2f}  {'identical' if not diffs else f'{len(diffs)} DIFFERENT'}")
+        for name in diffs:
+            print(f"    differs: {portal}/{name}")
+        if not diffs:
+            passed.append(portal)
+
+    print(f"Fallbacks to html.parser: {html_backend.stats['fallback']}")
+    if passed:
+        print(f"Identical rows, safe to pass parser=\"lxml\" to make_soup in: {', '.join(passed)}")
+    return passed
+
+
+def from_archive(portal, limit=ARCHIVE_PAGES):
+    """Copies the newest archived capture of up to `limit` saved articles into fixtures/<portal>/, no network."""
+    module_name, domain, mode = PORTALS[portal]
+    crawler = importlib.import_module(module_name)
+    topics = load_topics(portal, crawler.OUTPUT_FILE)
+    folder = os.path.join(FIXTURES_DIR, portal)
+    os.makedirs(folder, exist_ok=True)
+    count = 0
+    for header, body in latest_records(archive_files(domain), topics):
+        if count >= limit:
+            break
+        if mode != "bytes":
+            # Stored as utf-8, decoded the way resp.text was during the crawl
+            body = body.decode(header.get("encoding") or "utf-8", errors="replace").encode("utf-8")
+        with open(os.path.join(folder, f"a{count:04d}.html"), "wb") as f:
+            f.write(body)
+        count += 1
+    print(f"  {count} pages from {html_archive.ARCHIVE_DIR}/ -> {folder}/")
+
+
+def record(portal, urls):
+    mode = PORTALS[portal][2] if portal in PORTALS else "text"
+    folder = os.path.join(FIXTURES_DIR, portal)
+    os.makedirs(folder, exist_ok=True)
+    session = PoliteSession()
+    start = len(os.listdir(folder))
+    for i, url in enumerate(urls, start):
+        resp = session.get(url, timeout=30)
+        resp.encoding = resp.encoding or resp.apparent_encoding
+        with open(os.path.join(folder, f"{i:04d}.html"), "wb") as f:
+            f.write(resp.content if mode == "bytes" else resp.text.encode("utf-8"))
+        print(f"  Saved {portal}/{i:04d}.html <- {url}")
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == "record":
+        record(args[1], args[2:])
+        return
+    if args and args[0] == "archive":
+        from_archive(args[1], int(args[2]) if len(args) > 2 else ARCHIVE_PAGES)
+        return
+    if not os.path.isdir(FIXTURES_DIR):
+        print(f"No {FIXTURES_DIR}/ directory. Record pages first: python bench_parser.py record danang <url>...")
+        return
+    portals = args or sorted(os.listdir(FIXTURES_DIR))
+    sys.exit(0 if len(compare(portals)) == len(portals) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import io
+import csv
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import crawl_tuyengiao
+from browser_pool import DriverPool
+from fetch_engine import FetchEngine
+from rate_limiter import limiter
+
+# ================= CONFIG =================
+NUM_TOPICS = 2
+PAGES_PER_TOPIC = 3
+ARTICLES_PER_PAGE = 10
+LATENCY = 0.1       # Simulated server response time per request (seconds)
+MOCK_RATE = 20.0    # Politeness budget for the mock host (requests/s)
+MOCK_BURST = 10
+
+LIST_HTML = """<html><head><title>Danh mục</title></head><body>
+<h1>Danh mục {topic}</h1>
+{links}
+</body></html>"""
+
+ARTICLE_HTML = """<html><head>
+<title>Bài viết {slug}</title>
+<meta name="keywords" content="tuyên giáo, mô phỏng">
+</head><body>
+<h1>Bài viết mô phỏng {slug}</h1>
+<p>Thứ Hai, 12/03/2025</p>
+<p><i>Tóm tắt bài viết {slug} với nội dung đủ dài để được chọn làm tóm tắt.</i></p>
+{paragraphs}
+</body></html>"""
+
+
+class MockPortalHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(LATENCY)
+        parts = urlparse(self.path)
+        if parts.path.startswith("/blogs/category/"):
+            query = parse_qs(parts.query)
+            topic, page = query["categoryId"][0], int(query.get("page", ["1"])[0])
+            links = ""
+            if page <= PAGES_PER_TOPIC:
+                links = "\n".join(
+                    f'<a class="link_link__x" href="/blogs/{topic}-{page}-{i}">Bài {i}</a>'
+                    for i in range(ARTICLES_PER_PAGE)
+                )
+            body = LIST_HTML.format(topic=topic, links=links)
+        else:
+            slug = parts.path.rsplit("/", 1)[-1]
+            paragraphs = "\n".join(
+                f"<p>Đoạn văn {i} của bài {slug} với nội dung đủ dài để được giữ lại.</p>" for i in range(15)
+            )
+            body = ARTICLE_HTML.format(slug=slug, paragraphs=paragraphs)
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def legacy_topic(driver, topic_url, writer):
+    """The crawl() loop before DETAIL_MODE: each article in the list driver, then a list reload."""
+    seen, saved = set(), 0
+    for page in range(1, crawl_tuyengiao.MAX_PAGES_PER_TOPIC + 1):
+        page_url = crawl_tuyengiao.build_page_url(topic_url, page)
+        links = crawl_tuyengiao.browser_page_links(driver, page_url) or []
+        page_urls = [h for h in links if h and h not in seen and "/category/" not in h]
+        seen.update(page_urls)
+        if not page_urls:
+            break
+        for url in page_urls:
+            title, summary, time_str, content, keywords = crawl_tuyengiao.process_detail(driver, url)
+            time.sleep(1)  # The fixed wait process_detail used to have
+            if title and content:
+                writer.writerow([topic_url, title, summary, url, keywords, time_str, content])
+                saved += 1
+            driver.get(page_url)
+            time.sleep(1)  # Quick wait
+    return saved
+
+
+def report(name, topic, saved, navigations, elapsed):
+    print(f"{name:<8} {topic:<10} {saved:>4} articles {navigations:>5} navigations {elapsed:7.2f}s")
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockPortalHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    topics = {f"topic{n}": f"{base}/blogs/category/type/bench?&categoryId=topic{n}" for n in range(NUM_TOPICS)}
+    limiter.configure("127.0.0.1", MOCK_RATE, MOCK_BURST)
+    writer = csv.writer(io.StringIO())
+    out = io.StringIO()
+
+    print(f"Mock portal: {NUM_TOPICS} topics x {PAGES_PER_TOPIC} pages x {ARTICLES_PER_PAGE} articles, "
+          f"{LATENCY}s latency, DETAIL_WORKERS={crawl_tuyengiao.DETAIL_WORKERS}")
+    try:
+        driver = crawl_tuyengiao.init_driver()
+        try:
+            for name, url in topics.items():
+                start, pages = time.perf_counter(), driver.pages
+                saved = legacy_topic(driver, url, writer)
+                report("reload", name, saved, driver.pages - pages, time.perf_counter() - start)
+        finally:
+            driver.quit()
+
+        for mode in ("browser", "http"):
+            crawl_tuyengiao.DETAIL_MODE = mode
+            lists = DriverPool(size=1, factory=crawl_tuyengiao.init_driver)
+            tabs = DriverPool(size=crawl_tuyengiao.DETAIL_WORKERS, factory=crawl_tuyengiao.init_driver)
+            with FetchEngine(per_host=crawl_tuyengiao.DETAIL_WORKERS) as engine:
+                try:
+                    for name, url in topics.items():
+                        start, navigations = time.perf_counter(), lists.navigations + tabs.navigations
+                        saved = crawl_tuyengiao.crawl_topic(name, url, writer, out, None, engine, lists, tabs)
+                        report(mode, name, saved, lists.navigations + tabs.navigations - navigations,
+                               time.perf_counter() - start)
+                finally:
+                    lists.close()
+                    tabs.close()
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
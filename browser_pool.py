@@ -0,0 +1,194 @@
+import queue
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+# ================= CONFIG =================
+POOL_SIZE = 3               # Headless Chromes rendering list pages at once
+RECYCLE_AFTER = 200         # Page loads/clicks before a driver is replaced (Chrome grows with every AJAX page)
+PAGE_LOAD_TIMEOUT = 60
+WAIT_TIMEOUT = 15           # Condition waits that replace the fixed time.sleep(3..5)
+BLOCK_CSS = False           # Stylesheets are small and some pagers check visibility; enable per portal if safe
+
+# Network.setBlockedURLs patterns. The crawlers only read the DOM, so none of this is needed.
+BLOCKED_RESOURCES = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3", "*.m4a", "*.avi", "*.flv",
+]
+BLOCKED_THIRD_PARTY = [
+    "*google-analytics.com*", "*googletagmanager.com*", "*googlesyndication.com*", "*doubleclick.net*",
+    "*facebook.net*", "*facebook.com/plugins*", "*connect.facebook*", "*platform.twitter.com*",
+    "*youtube.com/embed*", "*ytimg.com*", "*addthis.com*", "*sharethis.com*", "*sp.zalo.me*",
+    "*histats.com*", "*statcounter.com*", "*hotjar.com*",
+]
+
+
+def chrome_options(headless=True):
+    options = Options()
+    if headless:
+        options.add_argument("--headless")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option("useAutomationExtension", False)
+    # Images are also refused at the content-settings level, before any request is made
+    options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    return options
+
+
+class PooledChrome(webdriver.Chrome):
+    """Chrome that counts its page loads, so the pool knows when to recycle it."""
+
+    pages = 0
+    broken = False  # Set by work that caught its own error, so the pool still replaces the driver
+
+    def get(self, url):
+        self.pages += 1
+        return super().get(url)
+
+
+def block_resources(driver):
+    patterns = BLOCKED_RESOURCES + BLOCKED_THIRD_PARTY + (["*.css"] if BLOCK_CSS else [])
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    except Exception as e:
+        # Only Chromium drivers speak CDP; image blocking via prefs still applies
+        print(f"  Resource blocking unavailable: {e}")
+
+
+def new_driver(headless=True, block=True):
+    driver = PooledChrome(options=chrome_options(headless))
+    driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+    if block:
+        block_resources(driver)
+    return driver
+
+
+# ---------- Condition waits ----------
+def wait_for(driver, css, timeout=WAIT_TIMEOUT):
+    """Waits until `css` matches an element. Returns False on timeout instead of raising."""
+    try:
+        WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.CSS_SELECTOR, css)))
+        return True
+    except TimeoutException:
+        return False
+
+
+def wait_ready(driver, timeout=WAIT_TIMEOUT):
+    try:
+        WebDriverWait(driver, timeout).until(lambda d: d.execute_script("return document.readyState") == "complete")
+        return True
+    except TimeoutException:
+        return False
+
+
+def click_and_wait(driver, element, watch=None, timeout=WAIT_TIMEOUT):
+    """
+    Clicks a pager link and waits until `watch` (an element of the current list,
+    usually its first article link; defaults to the clicked link) is detached,
+    which is when an AJAX or postback pager has rendered the next page.
+    Returns False if the page did not change within `timeout`.
+    """
+    watch = watch if watch is not None else element
+    driver.execute_script("arguments[0].click();", element)
+    driver.pages += 1
+    try:
+        WebDriverWait(driver, timeout).until(EC.staleness_of(watch))
+    except TimeoutException:
+        return False
+    return wait_ready(driver, timeout)
+
+
+class DriverPool:
+    """
+    N headless Chromes shared by a crawler's threads. lease() hands out a driver
+    for one unit of work (a category's list walk, one article) and takes it back;
+    a driver is quit and replaced once it has loaded RECYCLE_AFTER pages, or when
+    the work raised or set driver.broken, so a crashed tab never poisons the next lease.
+
+        with DriverPool() as pool:
+            links = pool.map(collect_category_links, CATEGORIES.values())
+    """
+
+    def __init__(self, size=POOL_SIZE, recycle_after=RECYCLE_AFTER, headless=True, factory=None):
+        self.size = size
+        self.recycle_after = recycle_after
+        self.headless = headless
+        self.factory = factory  # Crawler's own driver setup (must return a PooledChrome); default new_driver
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+        self.started = 0
+        self.recycled = 0
+        self.navigations = 0  # Page loads and pager clicks across all leases
+        for _ in range(size):
+            self.idle.put(None)  # Drivers start lazily on first lease
+
+    def _start(self):
+        with self.lock:
+            self.started += 1
+        return self.factory() if self.factory else new_driver(self.headless)
+
+    def _retire(self, driver):
+        with self.lock:
+            self.recycled += 1
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @contextmanager
+    def lease(self):
+        driver = self.idle.get()
+        ok = False
+        pages = 0
+        try:
+            if driver is None:
+                driver = self._start()
+            pages = driver.pages
+            yield driver
+            ok = True
+        finally:
+            if driver is not None:
+                with self.lock:
+                    self.navigations += driver.pages - pages
+            if driver is not None and (not ok or driver.broken or driver.pages >= self.recycle_after):
+                self._retire(driver)
+                driver = None
+            self.idle.put(driver)
+
+    def map(self, func, items, *args):
+        """Calls func(driver, item, *args) for every item on up to `size` drivers; results in input order."""
+        def run(item):
+            with self.lease() as driver:
+                return func(driver, item, *args)
+
+        with ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="browser") as executor:
+            return list(executor.map(run, items))
+
+    def close(self):
+        while not self.idle.empty():
+            driver = self.idle.get_nowait()
+            if driver is not None:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+        print(f"Browser pool: {self.started} drivers started, {self.recycled} recycled, {self.navigations} navigations.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
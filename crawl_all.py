@@ -0,0 +1,130 @@
+import os
+import csv
+import sys
+import time
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# ================= CONFIG =================
+# Portal -> (crawler script, CSV it appends to). Every portal is a different host, so their
+# politeness budgets (rate_limiter.PORTAL_LIMITS) are independent and they can all run at once.
+PORTALS = {
+    "danang": ("crawl_danang.py", "danang_data_final.csv"),
+    "sonla": ("crawl_sonla.py", "sonla_data_final.csv"),
+    "cantho": ("crawl_cantho.py", "cantho_data_final.csv"),
+    "gialai": ("crawl_gialai.py", "gialai_data_final.csv"),
+    "hatinh": ("crawl_hatinh.py", "hatinh_data_final.csv"),
+    "hungyen": ("crawl_hungyen.py", "hungyen_data_final.csv"),
+    "ninhbinh": ("crawl_ninhbinh.py", "ninhbinh_data_final.csv"),
+    "vinhphuc": ("crawl_vinhphuc.py", "vinhphuc_data_final.csv"),
+    "bacninh": ("crawl_bacninh.py", "bacninh_data_final.csv"),
+    "bacgiang": ("crawl_bacgiang.py", "bacgiang_data_final_v2.csv"),
+    "khanhhoa": ("crawl_khanhhoa.py", "khanhhoa_data_final.csv"),
+    "dienbien": ("crawl_dienbien.py", "dienbien_data_final.csv"),
+    "caobang": ("crawl_caobang.py", "caobang_data_final.csv"),
+    "thainguyen": ("crawl_thainguyen.py", "thainguyen_data_final.csv"),
+    "congan_hanoi": ("crawl_congan_hanoi.py", "congan_hanoi_data.csv"),
+    "hanoi": ("hanoi_ajax_crawler.py", "hanoi_data_final.csv"),
+    "thanhhoa": ("crawl_thanhhoa_final.py", "thanhhoa_data_final.csv"),
+    "tuyengiao": ("crawl_tuyengiao.py", "tuyengiao_data.csv"),
+}
+FRESH_OUTPUT = {"caobang", "dienbien"}     # Crawlers that start a new CSV every run: report the rows they wrote, not the change
+BROWSER_PORTALS = {"thanhhoa", "tuyengiao"}     # Start headless Chrome; each one costs a few hundred MB
+BROWSER_SLOTS = 2           # Browser portals running at once
+GLOBAL_CONNECTIONS = 96     # Requests in flight across every portal process (rate_limiter.MAX_CONNECTIONS shares)
+CPU_BUDGET = os.cpu_count() or 2    # Cores the whole run may use, parsing included (pinning only applies below the machine's core count)
+LOG_DIR = "crawl_logs"      # One log per portal; their prints would interleave on one console
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+csv.field_size_limit(10 * 1024 * 1024)     # Article bodies exceed the 128 KB default
+
+
+def count_rows(path):
+    """Data rows in an output CSV, header excluded. Only reads the file (streamed, quoted newlines included)."""
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return max(sum(1 for _ in csv.reader(f)) - 1, 0)
+
+
+def pin_cpus(budget=CPU_BUDGET):
+    """
+    Restricts this process, and so every portal it starts, to `budget` cores (Linux only).
+    With the default budget (every core) there is nothing to restrict and None is returned.
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        return None
+    available = sorted(os.sched_getaffinity(0))
+    if budget >= len(available):
+        return None
+    cores = available[:max(budget, 1)]
+    os.sched_setaffinity(0, cores)
+    return cores
+
+
+def portal_env(share, parse_processes):
+    env = dict(os.environ)
+    env["CRAWL_MAX_CONNECTIONS"] = str(share)
+    env["CRAWL_PARSE_PROCESSES"] = str(parse_processes)
+    env["PYTHONUNBUFFERED"] = "1"
+    env["PYTHONIOENCODING"] = "utf-8"
+    return env
+
+
+def run_portal(name, env, browser_slots):
+    script, output_file = PORTALS[name]
+    before = count_rows(output_file)
+    log_path = os.path.join(LOG_DIR, f"{name}.log")
+    slot = browser_slots if name in BROWSER_PORTALS else None
+    if slot is not None:
+        slot.acquire()
+    start = time.monotonic()
+    try:
+        with open(log_path, "w", encoding="utf-8") as log:
+            code = subprocess.call([sys.executable, os.path.join(HERE, script)],
+                                   stdout=log, stderr=subprocess.STDOUT, env=env)
+    finally:
+        if slot is not None:
+            slot.release()
+    elapsed = time.monotonic() - start
+    after = count_rows(output_file)
+    added = after if name in FRESH_OUTPUT else after - before
+    print(f"  {name:<14} {'ok' if code == 0 else f'exit {code}':<8} {added:>7} rows {elapsed:9.1f}s  {log_path}")
+    return name, code, added, elapsed
+
+
+def crawl_all(names, connections=GLOBAL_CONNECTIONS, cpu_budget=CPU_BUDGET):
+    """Runs the portals' crawlers at once, each in its own process. Returns [(name, exit code, rows added, seconds)]."""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    cores = pin_cpus(cpu_budget)
+    share = max(connections // len(names), 1)
+    parse_processes = max(cpu_budget // len(names), 1)
+    env = portal_env(share, parse_processes)
+    browser_slots = threading.BoundedSemaphore(BROWSER_SLOTS)
+
+    print(f"Crawling {len(names)} portals: {share} connections each "
+          f"({connections} total), {len(cores) if cores else cpu_budget} cores, logs in {LOG_DIR}/")
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="portal") as executor:
+        results = list(executor.map(lambda name: run_portal(name, env, browser_slots), names))
+    wall = time.monotonic() - start
+
+    slowest = max(results, key=lambda r: r[3])
+    print(f"\nDone in {wall:.1f}s wall (slowest portal: {slowest[0]}, {slowest[3]:.1f}s; "
+          f"one after another: {sum(r[3] for r in results):.1f}s). "
+          f"{sum(r[2] for r in results)} rows added, {sum(1 for r in results if r[1] != 0)} portals failed.")
+    return results
+
+
+if __name__ == "__main__":
+    # python crawl_all.py                 every portal
+    # python crawl_all.py danang sonla    only these
+    # python crawl_all.py -hanoi          all but these
+    args = sys.argv[1:]
+    skip = {a[1:] for a in args if a.startswith("-")}
+    names = [a for a in args if not a.startswith("-")] or list(PORTALS)
+    unknown = [n for n in set(names) | skip if n not in PORTALS]
+    if unknown:
+        sys.exit(f"Unknown portal(s): {', '.join(unknown)}. Known: {', '.join(PORTALS)}")
+    crawl_all([n for n in names if n not in skip])
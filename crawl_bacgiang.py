@@ -1,12 +1,12 @@
-import requests
 import csv
 import re
-import time
 import html
 import urllib3
-from bs4 import BeautifulSoup
-import ssl
+from html_backend import make_soup
 from urllib.parse import urljoin
+from transport import make_session
+from pipeline import run_pipeline
+from url_index import UrlIndex
 
 # Tắt cảnh báo SSL
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -15,7 +15,7 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 BASE_URL = "https://bacgiang.gov.vn"
 OUTPUT_FILE = "bacgiang_data_final_v2.csv"
 MAX_PAGES_PER_TOPIC = 50 
-SLEEP = 0.5 
+CONCURRENCY = 8 # Số luồng tải chi tiết
 
 CATEGORIES = {
     "Chính trị": "https://bacgiang.gov.vn/chinh-tri",
@@ -29,18 +29,7 @@ CATEGORIES = {
     "Tin quốc tế": "https://bacgiang.gov.vn/tin-tuc-quoc-te"
 }
 
-class CustomHttpAdapter(requests.adapters.HTTPAdapter):
-    def init_poolmanager(self, connections, maxsize, block=False):
-        ctx = ssl.create_default_context()
-        ctx.set_ciphers('DEFAULT@SECLEVEL=1')
-        ctx.check_hostname = False
-        self.poolmanager = urllib3.poolmanager.PoolManager(
-            num_pools=connections, maxsize=maxsize, block=block,
-            ssl_version=ssl.PROTOCOL_TLSv1_2, ssl_context=ctx
-        )
-
-session = requests.Session()
-session.mount('https://', CustomHttpAdapter())
+session = make_session(legacy_tls=True)
 session.headers.update({
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 })
@@ -62,7 +51,7 @@ def parse_article(url, topic):
     try:
         resp = session.get(url, timeout=25, verify=False)
         if resp.status_code != 200: return None
-        soup = BeautifulSoup(resp.text, "html.parser")
+        soup = make_soup(resp.text)
         
         # 1. Title (Lấy từ h1 bên trong div.title-news hoặc h1 không có class rác)
         title_tag = soup.select_one(".title-news h1, .title-detail h1")
@@ -145,44 +134,57 @@ def extract_article_links(soup, seen_urls):
                 links.append(full_url)
     return list(dict.fromkeys(links))
 
+def discover_articles(seen_urls):
+    """Follows each category's pagination and yields (article_url, topic) for every new article."""
+    for topic, start_url in CATEGORIES.items():
+        print(f"\n[MỤC]: {topic}")
+        current_page = 1
+        target_url = start_url
+        while current_page <= MAX_PAGES_PER_TOPIC:
+            print(f"  > Quét Trang {current_page}...", end="\r")
+            try:
+                resp = session.get(target_url, timeout=30, verify=False)
+                soup = make_soup(resp.text)
+                links = extract_article_links(soup, seen_urls)
+                next_url = None
+                pagination = soup.select_one(".pagination, .pager, .lfr-pagination-buttons")
+                if pagination:
+                    next_a = pagination.find("a", string=re.compile(r"Sau|Tiếp|Next|>", re.I))
+                    if next_a: next_url = next_a.get("href")
+            except Exception: break
+            if not links: break
+            for link in links:
+                seen_urls.add(link)
+                yield link, topic
+            if next_url and "javascript" not in next_url:
+                target_url = normalize_url(next_url)
+                current_page += 1
+            else: break
+
 def main():
-    seen_urls = set()
+    # Bài đã ghi ở các lần chạy trước được giữ lại và bỏ qua
+    seen_urls = UrlIndex(OUTPUT_FILE)
     print("--- ĐANG CÀO BẮC GIANG: ĐÃ FIX TITLE & LÀM SẠCH NỘI DUNG ---")
+    print(f"Đã có {len(seen_urls)} bài.")
 
-    with open(OUTPUT_FILE, "w", newline="", encoding="utf-8-sig") as f:
+    with open(OUTPUT_FILE, "a", newline="", encoding="utf-8-sig") as f:
         writer = csv.DictWriter(f, fieldnames=["topic", "title", "summary", "url", "keywords", "public_time", "content"])
-        writer.writeheader()
-
-        for topic, start_url in CATEGORIES.items():
-            print(f"\n[MỤC]: {topic}")
-            current_page = 1
-            target_url = start_url
-            while current_page <= MAX_PAGES_PER_TOPIC:
-                print(f"  > Quét Trang {current_page}...", end="\r")
-                try:
-                    resp = session.get(target_url, timeout=30, verify=False)
-                    soup = BeautifulSoup(resp.text, "html.parser")
-                    links = extract_article_links(soup, seen_urls)
-                    if not links: break
-                    for link in links:
-                        seen_urls.add(link)
-                        data = parse_article(link, topic)
-                        if data and data["title"] and len(data["content"]) > 30:
-                            writer.writerow(data)
-                        time.sleep(SLEEP)
-                    f.flush()
-                    next_url = None
-                    pagination = soup.select_one(".pagination, .pager, .lfr-pagination-buttons")
-                    if pagination:
-                        next_a = pagination.find("a", string=re.compile(r"Sau|Tiếp|Next|>", re.I))
-                        if next_a: next_url = next_a.get("href")
-                    if next_url and "javascript" not in next_url:
-                        target_url = normalize_url(next_url)
-                        current_page += 1
-                    else: break
-                except Exception: break
+        if f.tell() == 0:
+            writer.writeheader()
+
+        def save(data):
+            if data["title"] and len(data["content"]) > 30:
+                writer.writerow(data)
+                f.flush()
+                seen_urls.record(data["url"])
+                return True
+            return False
+
+        # Quét danh sách, tải chi tiết và ghi file chạy song song theo từng tầng
+        run_pipeline(discover_articles(seen_urls), parse_article, save, workers=CONCURRENCY)
 
+    seen_urls.close()
     print(f"\n--- XONG! Kiểm tra file: {OUTPUT_FILE} ---")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,19 +1,12 @@
-import requests
+import os
 import urllib3
-import ssl
 import csv
-import time
 import re
 import html
-from bs4 import BeautifulSoup
-import logging
-
-# Check for lxml, fallback to html.parser if not present
-try:
-    import lxml
-    PARSER = 'lxml'
-except ImportError:
-    PARSER = 'html.parser'
+from html_backend import make_soup
+from paginators import OffsetPaginator
+from transport import make_session
+from url_index import UrlIndex
 
 urllib3.disable_warnings()
 
@@ -21,6 +14,7 @@ urllib3.disable_warnings()
 OUTPUT_FILE = "bacninh_data_final.csv"
 PAGE_SIZE = 50 
 MAX_ITEMS_PER_TOPIC = 2000
+WINDOW_WORKERS = 4  # loadPage pages in flight per topic
 
 # Topics and their URLs
 TOPICS = {
@@ -37,21 +31,10 @@ TOPICS = {
     "Cơ sở hạ tầng": "https://bacninh.gov.vn/co-so-ha-tang"
 }
 
-# Custom Adapter for Legacy SSL
-class CustomHttpAdapter(requests.adapters.HTTPAdapter):
-    def init_poolmanager(self, connections, maxsize, block=False):
-        ctx = ssl.create_default_context()
-        ctx.set_ciphers('DEFAULT@SECLEVEL=1')
-        ctx.check_hostname = False
-        self.poolmanager = urllib3.poolmanager.PoolManager(
-            num_pools=connections, maxsize=maxsize, block=block,
-            ssl_version=ssl.PROTOCOL_TLSv1_2, ssl_context=ctx
-        )
-
 def clean_html(raw_html):
     if not raw_html: return ""
     text = html.unescape(raw_html)
-    soup = BeautifulSoup(text, PARSER)
+    soup = make_soup(text, parser="lxml")
     
     caption_keywords = ["Ảnh minh họa", "nguồn Internet", "Ảnh:", "Nguồn:", "(Ảnh:"]
     for tag in soup.find_all(['span', 'i', 'em', 'figcaption', 'p']):
@@ -76,17 +59,11 @@ def extract_api_url(session, page_url):
     except: return None
 
 def main():
-    session = requests.Session()
-    session.mount('https://', CustomHttpAdapter())
+    session = make_session(legacy_tls=True)
     
-    seen_ids = set()
-    try:
-        with open(OUTPUT_FILE, "r", encoding="utf-8-sig") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if "url" in row: seen_ids.add(row["url"])
-        print(f"Loaded {len(seen_ids)} existing articles.")
-    except: pass
+    # Sidecar URL index; only re-reads the CSV when the index is out of date
+    seen_ids = UrlIndex(OUTPUT_FILE)
+    print(f"Loaded {len(seen_ids)} existing articles.")
 
     exists = os.path.exists(OUTPUT_FILE)
     mode = 'a' if exists else 'w'
@@ -101,71 +78,68 @@ def main():
             api_url = extract_api_url(session, topic_url)
             if not api_url: continue
                 
-            page = 1
+            def fetch_window(index, api_url=api_url):
+                params = {'pageNum': index + 1, 'recordPerPage': PAGE_SIZE, 'keyword': ''}
+                resp = session.get(api_url, params=params, verify=False, timeout=30)
+                resp.raise_for_status()
+                return resp.json()
+
+            # totalPageNum from page 1, then the remaining pages WINDOW_WORKERS at a time, in order
+            pager = OffsetPaginator(fetch_window, lambda data: data.get('items', []), PAGE_SIZE, workers=WINDOW_WORKERS)
             total_fetched_topic = 0
-            while total_fetched_topic < MAX_ITEMS_PER_TOPIC:
-                params = {'pageNum': page, 'recordPerPage': PAGE_SIZE, 'keyword': ''}
-                try:
-                    resp = session.get(api_url, params=params, verify=False, timeout=30)
-                    if resp.status_code != 200: break
-                    data = resp.json()
-                    items = data.get('items', [])
-                    total_pages = data.get('totalPageNum', 0)
-                    if not items: break
+            for index, items in pager:
+                count_new = 0
+                for item in items:
+                    url_detail = item.get('urlDetail', '')
+                    if not url_detail:
+                        item_id = item.get('id')
+                        if item_id:
+                            url_detail = f"{topic_url}?p_p_id=newsbycategory_WAR_bacninhportlet&p_p_lifecycle=0&_newsbycategory_WAR_bacninhportlet_articleId={item_id}"
+                        else: continue
+                    
+                    if url_detail in seen_ids: continue
                         
-                    count_new = 0
-                    for item in items:
-                        url_detail = item.get('urlDetail', '')
-                        if not url_detail:
-                            item_id = item.get('id')
-                            if item_id:
-                                url_detail = f"{topic_url}?p_p_id=newsbycategory_WAR_bacninhportlet&p_p_lifecycle=0&_newsbycategory_WAR_bacninhportlet_articleId={item_id}"
-                            else: continue
-                        
-                        if url_detail in seen_ids: continue
+                    # Fetch full content from detail page to avoid truncation
+                    print(f"    - Fetching: {url_detail}")
+                    try:
+                        resp_d = session.get(url_detail, verify=False, timeout=20)
+                        if resp_d.status_code == 200:
+                            s_d = make_soup(resp_d.text, parser="lxml")
+                            t_tag = s_d.select_one('h1#contentDetailTitleId')
+                            s_tag = s_d.select_one('div#sapoDetailId')
+                            c_tag = s_d.select_one('div#contentDetail')
                             
-                        # Fetch full content from detail page to avoid truncation
-                        print(f"    - Fetching: {url_detail}")
-                        try:
-                            resp_d = session.get(url_detail, verify=False, timeout=20)
-                            if resp_d.status_code == 200:
-                                s_d = BeautifulSoup(resp_d.text, PARSER)
-                                t_tag = s_d.select_one('h1#contentDetailTitleId')
-                                s_tag = s_d.select_one('div#sapoDetailId')
-                                c_tag = s_d.select_one('div#contentDetail')
-                                
-                                # Fallbacks
-                                if not t_tag: t_tag = s_d.select_one('.title-detail, .news-title, h1')
-                                if not s_tag: s_tag = s_d.select_one('.summary, .lead, .sapo')
-                                if not c_tag: c_tag = s_d.select_one('.content-detail, .news-content, .detail-content')
+                            # Fallbacks
+                            if not t_tag: t_tag = s_d.select_one('.title-detail, .news-title, h1')
+                            if not s_tag: s_tag = s_d.select_one('.summary, .lead, .sapo')
+                            if not c_tag: c_tag = s_d.select_one('.content-detail, .news-content, .detail-content')
 
-                                title = t_tag.get_text(strip=True) if t_tag else item.get('title', '').strip()
-                                # Prevent "Thực đơn" as title
-                                if title == "Thực đơn" and item.get('title'):
-                                    title = item.get('title').strip()
+                            title = t_tag.get_text(strip=True) if t_tag else item.get('title', '').strip()
+                            # Prevent "Thực đơn" as title
+                            if title == "Thực đơn" and item.get('title'):
+                                title = item.get('title').strip()
 
-                                summary = clean_html(str(s_tag)) if s_tag else clean_html(item.get('summary', ''))
-                                content = clean_html(str(c_tag)) if c_tag else clean_html(item.get('content', ''))
-                                
-                                writer.writerow({
-                                    "topic": topic_name,
-                                    "title": title,
-                                    "summary": summary,
-                                    "url": url_detail,
-                                    "keywords": "",
-                                    "public_time": item.get('createdDate', ''),
-                                    "content": content
-                                })
-                                seen_ids.add(url_detail)
-                                count_new += 1
-                        except: continue
-                        
-                    f.flush()
-                    total_fetched_topic += count_new
-                    if page >= total_pages: break
-                    page += 1
-                    time.sleep(0.5)
-                except: break
+                            summary = clean_html(str(s_tag)) if s_tag else clean_html(item.get('summary', ''))
+                            content = clean_html(str(c_tag)) if c_tag else clean_html(item.get('content', ''))
+                            
+                            writer.writerow({
+                                "topic": topic_name,
+                                "title": title,
+                                "summary": summary,
+                                "url": url_detail,
+                                "keywords": "",
+                                "public_time": item.get('createdDate', ''),
+                                "content": content
+                            })
+                            seen_ids.record(url_detail)
+                            count_new += 1
+                    except: continue
+                    
+                f.flush()
+                total_fetched_topic += count_new
+                if total_fetched_topic >= MAX_ITEMS_PER_TOPIC: break
+            print(f"  {total_fetched_topic} new articles, {pager.requests} list requests ({pager.failed} failed)")
+    seen_ids.close()
     print("\nCrawl Complete.")
 
 if __name__ == "__main__":
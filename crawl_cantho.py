@@ -1,11 +1,15 @@
-import requests
 import csv
 import re
-import time
 import html
-from bs4 import BeautifulSoup
+from html_backend import make_soup
 from urllib.parse import urljoin
 import sys
+from fetch_engine import FetchEngine
+from transport import make_session
+from url_index import UrlIndex
+from frontier import Frontier
+from paginators import PageUrlPaginator, ProbeError
+import sitemap_discovery
 
 # Force output to UTF-8
 sys.stdout.reconfigure(encoding='utf-8')
@@ -14,7 +18,14 @@ sys.stdout.reconfigure(encoding='utf-8')
 BASE_URL = "https://www.cantho.gov.vn"
 OUTPUT_FILE = "cantho_data_final.csv"
 MAX_PAGES_PER_TOPIC = 50 # Adjust as needed
-SLEEP = 0.5
+CONCURRENCY = 8 # Detail pages in flight at once (pacing comes from rate_limiter.PORTAL_LIMITS)
+LIST_WORKERS = 4 # List pages in flight at once once the last page is known
+INCREMENTAL = True # After a topic has been walked once, stop at the previous run's newest article
+DISCOVERY = "list" # "sitemap": take article URLs from sitemap.xml/RSS; topics they miss still walk ?page=N
+# Topic -> RSS feed URL. Sitemap entries only reach a topic when their path starts with its category
+# path; articles published outside it need a feed here, otherwise the topic walks ?page=N
+FEEDS = {}
+SITEMAP_SINCE = None # e.g. "2024-01-01": ignore sitemap entries with an older lastmod
 
 CATEGORIES = {
     "Hoạt động Lãnh đạo thành phố": "https://www.cantho.gov.vn/hoat-dong-lanh-dao-thanh-pho",
@@ -27,7 +38,7 @@ CATEGORIES = {
     "Thông tin cần biết": "https://www.cantho.gov.vn/thong-tin-can-biet"
 }
 
-session = requests.Session()
+session = make_session()
 session.headers.update({
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 })
@@ -48,8 +59,61 @@ def normalize_url(url):
     if url.startswith("http"): return url
     return urljoin(BASE_URL, url)
 
+def is_article_url(url):
+    if BASE_URL not in url:
+        return False
+    # Filter out noise
+    return not any(x in url for x in ["/so-do-cong", "javascript:", "#", "mailto:", "signin", "login"])
+
+def fetch_list(page_url):
+    resp = session.get(page_url, timeout=30)
+    if resp.status_code == 404:
+        return None  # Past the last page
+    resp.raise_for_status()
+    return make_soup(resp.text)
+
+def list_links(soup):
+    """Article links on a list page, in page order (already-crawled ones included)."""
+    links = []
+    # Extract links using specific selectors we found earlier
+    # .ArticleHeader a, .PostTitle a, h2 a
+    articles = soup.select(".ArticleHeader a, .PostTitle a, h2 a, .title-news a, .news-title a")
+    
+    if not articles:
+         # Fallback to finding 'a' tags in main content if using class names failed
+         main_col = soup.find(class_="col-main") or soup.find(id="main")
+         if main_col:
+             articles = main_col.find_all("a", href=True)
+
+    for item in articles:
+        # If the item is already an 'a' tag (from select)
+        if item.name == "a":
+            a_tag = item
+        else:
+            a_tag = item.find("a")
+            
+        if a_tag and a_tag.get("href"):
+            full_url = normalize_url(a_tag["href"])
+            if full_url and is_article_url(full_url):
+                links.append(full_url)
+    
+    # Deduplicate list while preserving order
+    return list(dict.fromkeys(links))
+
 # ================= PARSE ARTICLE =================
 def parse_article(url, topic):
+    try:
+        resp = session.get(url, timeout=20)
+        if resp.status_code != 200:
+            return None
+        return extract_article(resp.text, url, topic)
+
+    except Exception as e:
+        print(f"Error parsing {url}: {e}")
+        return None
+
+def extract_article(html_text, url, topic):
+    """Builds the CSV row from an article page's HTML. No network access (reextract.py replays the archive through it)."""
     result = {
         "topic": topic,
         "title": "",
@@ -61,11 +125,7 @@ def parse_article(url, topic):
     }
     
     try:
-        resp = session.get(url, timeout=20)
-        if resp.status_code != 200:
-            return None
-        
-        soup = BeautifulSoup(resp.text, "html.parser")
+        soup = make_soup(html_text)
         
         # TITLE
         title_tag = soup.find(class_="ArticleHeader") or \
@@ -148,20 +208,13 @@ def parse_article(url, topic):
 
 # ================= MAIN =================
 def main():
-    seen_urls = set()
-    
-    # Load existing URLs
-    try:
-        with open(OUTPUT_FILE, "r", encoding="utf-8-sig") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row.get("url"):
-                    seen_urls.add(row["url"])
-        print(f"Loaded {len(seen_urls)} existing URLs.")
-    except FileNotFoundError:
-        pass
-
-    with open(OUTPUT_FILE, "a", newline="", encoding="utf-8-sig") as f:
+    # Load existing URLs (sidecar index, rebuilt from the CSV only when out of date)
+    seen_urls = UrlIndex(OUTPUT_FILE)
+    print(f"Loaded {len(seen_urls)} existing URLs.")
+    frontier = Frontier("cantho")
+
+    with open(OUTPUT_FILE, "a", newline="", encoding="utf-8-sig") as f, \
+         FetchEngine(per_host=CONCURRENCY) as engine:
         writer = csv.DictWriter(
             f,
             fieldnames=["topic", "title", "summary", "url", "keywords", "public_time", "content"]
@@ -169,87 +222,101 @@ def main():
         if len(seen_urls) == 0:
             writer.writeheader()
 
-        for topic, start_url in CATEGORIES.items():
+        def save(links, topic, watermark):
+            saved_rows = []
+            seen_urls.update(links)
+            for data in engine.map(parse_article, links, topic):
+                if data and data["title"] and data["content"]:
+                    writer.writerow(data)
+                    seen_urls.record(data["url"])
+                    watermark.see(data["url"], data["public_time"])
+                    saved_rows.append(data)
+                    # print(f"      Saved: {data['title'][:40]}...")
+            return saved_rows
+
+        if DISCOVERY == "sitemap":
+            topics = sitemap_discovery.discover(
+                BASE_URL, CATEGORIES, session, since=SITEMAP_SINCE, feeds=FEEDS, url_filter=is_article_url
+            )
+        else:
+            topics = ((topic, None) for topic in CATEGORIES)
+
+        for topic, entries in topics:
+            start_url = CATEGORIES[topic]
             print(f"\n=== Processing Topic: {topic} ===")
             
-            for page in range(1, MAX_PAGES_PER_TOPIC + 1):
-                page_url = f"{start_url}?page={page}"
-                print(f"  -> Crawling Page {page}: {page_url}")
-                
+            # Incremental mode needs one complete walk of the topic first
+            _, _, walked = frontier.resume(topic)
+            watermark = frontier.watermark(topic)
+            incremental = INCREMENTAL and walked
+            completed = False
+            page_errors = 0
+
+            if entries:
+                links = sitemap_discovery.unseen(entries, seen_urls, watermark if incremental else None)
+                print(f"  Sitemap lists {len(entries)} articles, {len(links)} new.")
+                saved_rows = save(links, topic, watermark)
+                print(f"    Saved {len(saved_rows)} articles.")
+                # A sitemap cut by SITEMAP_SINCE is not a full walk of the topic
+                if SITEMAP_SINCE is None:
+                    frontier.topic_done(topic, watermark)
+                continue
+            
+            # First walk: last page found by probing, then list pages LIST_WORKERS at a time, in page order.
+            # Incremental runs stop near page 1, so they walk page by page without probing.
+            pager = PageUrlPaginator(f"{start_url}?page={{page}}", fetch_list, list_links,
+                                     max_pages=MAX_PAGES_PER_TOPIC, workers=LIST_WORKERS, probe=not incremental)
+            if pager.probe:
                 try:
-                    resp = session.get(page_url, timeout=30)
-                    if resp.status_code != 200:
-                        print(f"    Failed to load page {page}")
-                        continue
-                        
-                    soup = BeautifulSoup(resp.text, "html.parser")
-                    
-                    # Extract links
-                    # Can Tho structure often lists articles in .news-item or similar blocks
-                    # We look for links within specific containers or generally in the main column
-                    
-                    links = []
-                    # Extract links using specific selectors we found earlier
-                    # .ArticleHeader a, .PostTitle a, h2 a
-                    articles = soup.select(".ArticleHeader a, .PostTitle a, h2 a, .title-news a, .news-title a")
-                    
-                    if not articles:
-                         # Fallback to finding 'a' tags in main content if using class names failed
-                         main_col = soup.find(class_="col-main") or soup.find(id="main")
-                         if main_col:
-                             articles = main_col.find_all("a", href=True)
-
-                    for item in articles:
-                        # If the item is already an 'a' tag (from select)
-                        if item.name == "a":
-                            a_tag = item
-                        else:
-                            a_tag = item.find("a")
-                            
-                        if a_tag and a_tag.get("href"):
-                            full_url = normalize_url(a_tag["href"])
-                            if full_url and full_url not in seen_urls and BASE_URL in full_url:
-                                # Filter out noise
-                                if any(x in full_url for x in ["/so-do-cong", "javascript:", "#", "mailto:", "signin", "login"]):
-                                    continue
-                                # Filter out likely category/pagination links (often short)
-                                # But be careful, some articles have short slugs.
-                                
-                                links.append(full_url)
-                    
-                    # Deduplicate list while preserving order
-                    links = list(dict.fromkeys(links))
+                    print(f"  {pager.last_page()} list pages ({pager.requests} requests to find the end)")
+                except ProbeError as e:
+                    print(f"  Skipping topic, will retry next run: {e}")
+                    continue
+            for page, links in pager:
+                print(f"  -> Crawling Page {page}")
+                if links is None:
+                    print(f"    Failed to load page {page}")
+                    page_errors += 1
+                    continue
+
+                try:
+                    links = [link for link in links if link not in seen_urls]
                     print(f"    Found {len(links)} potential links.")
                     
                     if not links:
                         print("    No links found. Stopping topic or checking next page.")
                         # If page 1 has no links, it's weird. If page 10 has no links, maybe end of pagination.
                         if page > 1:
+                            completed = True
                             break
                     
-                    count_saved = 0
-                    for link in links:
-                        if link in seen_urls:
-                            continue
-                            
-                        seen_urls.add(link)
-                        data = parse_article(link, topic)
-                        
-                        if data and data["title"] and data["content"]:
-                            writer.writerow(data)
-                            count_saved += 1
-                            # print(f"      Saved: {data['title'][:40]}...")
-                        time.sleep(SLEEP)
+                    saved_rows = save(links, topic, watermark)
+                    count_saved = len(saved_rows)
                     
                     print(f"    Saved {count_saved} articles.")
                     
                     if count_saved == 0 and len(links) == 0:
+                        completed = True
+                        break
+                    
+                    # List pages carry no dates, so the check uses the articles just parsed
+                    if incremental and watermark.is_below((r["url"], r["public_time"]) for r in saved_rows):
+                        print("    All new articles on this page are older than the watermark. Topic up to date.")
+                        completed = True
                         break
                         
                 except Exception as e:
                     print(f"    Error on page {page}: {e}")
-                    
-                time.sleep(1)
+                    page_errors += 1
+            else:
+                completed = True  # Last page (or page limit) reached
+            
+            # A skipped page may hold articles older than the new watermark, so only clean walks count
+            if completed and not page_errors:
+                frontier.topic_done(topic, watermark)
+
+    seen_urls.close()
+    frontier.close()
 
 if __name__ == "__main__":
     main()
@@ -1,10 +1,9 @@
-import requests
 import csv
 import re
-import time
 import html
 import os
-from bs4 import BeautifulSoup
+from html_backend import make_soup
+from transport import make_session
 
 # --- Configuration ---
 BASE_URL = "https://caobang.gov.vn"
@@ -20,6 +19,7 @@ MAX_PAGES_PER_CATEGORY = 100
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 }
+session = make_session(headers=HEADERS)
 
 def clean_text(s):
     if not s:
@@ -30,9 +30,9 @@ def clean_text(s):
 
 def get_soup(url):
     try:
-        response = requests.get(url, headers=HEADERS, timeout=10)
+        response = session.get(url, timeout=10)
         if response.status_code == 200:
-            return BeautifulSoup(response.text, "html.parser")
+            return make_soup(response.text)
         return None
     except Exception as e:
         print(f"Error accessing {url}: {e}")
@@ -151,7 +151,6 @@ def crawl_category(category_name, category_url, writer):
                 if details and details["title"] and details["content"]:
                     writer.writerow(details)
                     print(f"      Saved: {details['title'][:50]}...")
-                # time.sleep(0.5) # Polite delay
             except Exception as e:
                 print(f"      Error: {e}")
 
@@ -3,13 +3,11 @@ import time
 import os
 import html
 import re
-import requests
-from bs4 import BeautifulSoup
-from selenium import webdriver
+from transport import make_session
+from html_backend import make_soup
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from browser_pool import DriverPool, wait_for, click_and_wait
+from url_index import UrlIndex
 
 # --- Configuration ---
 BASE_URL = "https://caobang.gov.vn"
@@ -35,87 +33,67 @@ def clean_text(s):
     s = re.sub(r"[\x00-\x1f\x7f]", "", s)
     return re.sub(r"\s+", " ", s).strip()
 
-def init_driver():
-    chrome_options = Options()
-    chrome_options.add_argument("--headless") 
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    driver = webdriver.Chrome(options=chrome_options)
-    driver.set_page_load_timeout(60) # Set page load timeout
-    return driver
-
 def load_seen_urls(filepath):
-    seen = set()
-    if os.path.exists(filepath):
-        try:
-            with open(filepath, mode="r", encoding="utf-8-sig") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if "url" in row:
-                        seen.add(row["url"])
-        except Exception as e:
-            print(f"Error reading existing data: {e}")
-    return seen
+    # Sidecar URL index; only re-reads the CSV when the index is out of date
+    return UrlIndex(filepath)
 
-def extract_article_content(url, topic, retries=1):
-    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"}
-    for i in range(retries + 1):
-        try:
-            resp = requests.get(url, headers=headers, timeout=20)
-            if resp.status_code != 200:
-                print(f"  Failed: {url} (Status: {resp.status_code})")
-                continue
-                
-            soup = BeautifulSoup(resp.text, "html.parser")
+# Detail pages are plain HTML: one pooled keep-alive session, with retries and backoff from PoliteSession
+session = make_session(headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"})
+
+def extract_article_content(url, topic):
+    try:
+        resp = session.get(url, timeout=20)
+        if resp.status_code != 200:
+            print(f"  Failed: {url} (Status: {resp.status_code})")
+            return None
             
-            title = ""
-            title_tag = soup.select_one(".ArticleHeader") or soup.select_one(".title-detail") or soup.find("h1")
-            if title_tag:
-                title = clean_text(title_tag.get_text())
-
-            public_time = ""
-            date_tag = soup.select_one(".PostDate") or soup.select_one(".date-detail") or soup.select_one(".date")
-            if date_tag:
-                public_time = clean_text(date_tag.get_text())
-                
-            content = ""
-            content_div = soup.select_one(".ArticleContent") or soup.select_one(".newsbody") or soup.select_one(".content-detail")
-            if content_div:
-                for tag in content_div(["script", "style", "iframe", "form", "div"]):
-                     if tag.name != "div" or (tag.name == "div" and not tag.find("p")):
-                         tag.decompose()
-                paragraphs = [clean_text(p.get_text()) for p in content_div.find_all("p")]
-                content = " ".join([p for p in paragraphs if p])
-
-            summary = ""
-            meta_desc = soup.find("meta", attrs={"name": "description"})
-            if meta_desc:
-                summary = clean_text(meta_desc.get("content"))
-            if not summary and content:
-                 summary = content.split(".")[0] + "."
-
-            keywords = ""
-            meta_kw = soup.find("meta", attrs={"name": "keywords"})
-            if meta_kw:
-                 keywords = clean_text(meta_kw.get("content"))
-                 
-            return {
-                "topic": topic, "title": title, "summary": summary,
-                "url": url, "keywords": keywords, "public_time": public_time, "content": content
-            }
-        except Exception as e:
-            print(f"  Error extracting {url} (attempt {i+1}): {e}")
-            if i < retries: time.sleep(2)
-            else: return None
+        soup = make_soup(resp.text)
+        
+        title = ""
+        title_tag = soup.select_one(".ArticleHeader") or soup.select_one(".title-detail") or soup.find("h1")
+        if title_tag:
+            title = clean_text(title_tag.get_text())
+
+        public_time = ""
+        date_tag = soup.select_one(".PostDate") or soup.select_one(".date-detail") or soup.select_one(".date")
+        if date_tag:
+            public_time = clean_text(date_tag.get_text())
+            
+        content = ""
+        content_div = soup.select_one(".ArticleContent") or soup.select_one(".newsbody") or soup.select_one(".content-detail")
+        if content_div:
+            for tag in content_div(["script", "style", "iframe", "form", "div"]):
+                 if tag.name != "div" or (tag.name == "div" and not tag.find("p")):
+                     tag.decompose()
+            paragraphs = [clean_text(p.get_text()) for p in content_div.find_all("p")]
+            content = " ".join([p for p in paragraphs if p])
+
+        summary = ""
+        meta_desc = soup.find("meta", attrs={"name": "description"})
+        if meta_desc:
+            summary = clean_text(meta_desc.get("content"))
+        if not summary and content:
+             summary = content.split(".")[0] + "."
+
+        keywords = ""
+        meta_kw = soup.find("meta", attrs={"name": "keywords"})
+        if meta_kw:
+             keywords = clean_text(meta_kw.get("content"))
+             
+        return {
+            "topic": topic, "title": title, "summary": summary,
+            "url": url, "keywords": keywords, "public_time": public_time, "content": content
+        }
+    except Exception as e:
+        print(f"  Error extracting {url}: {e}")
+        return None
 
 def collect_category_links(driver, category_url, global_seen_urls):
     links_to_crawl = []
     print(f"  Collecting links from: {category_url}")
     try:
         driver.get(category_url)
-        time.sleep(5)
+        wait_for(driver, "a[href]")
     except Exception as e:
         print(f"    Error loading list page: {e}")
         return links_to_crawl
@@ -125,10 +103,12 @@ def collect_category_links(driver, category_url, global_seen_urls):
         try:
             all_a = driver.find_elements(By.TAG_NAME, "a")
             page_links = []
+            first_article = None
             for a in all_a:
                 try:
                     href = a.get_attribute("href")
                     if href and re.search(r'-\d+$', href) and "page/" not in href and "javascript" not in href:
+                        first_article = first_article or a
                         u = href.split("#")[0].split("?")[0]
                         if u not in global_seen_urls and u not in links_to_crawl:
                             page_links.append(u)
@@ -149,8 +129,9 @@ def collect_category_links(driver, category_url, global_seen_urls):
                     next_btn = driver.find_elements(By.XPATH, f"//a[normalize-space(text())='{next_page_num}']")
                 
                 if next_btn:
-                    driver.execute_script("arguments[0].click();", next_btn[0])
-                    time.sleep(5)
+                    if not click_and_wait(driver, next_btn[0], first_article):
+                        print("      Page did not change after clicking next. Stopping.")
+                        break
                 else: break
         except Exception as e:
             print(f"    Error during pagination: {e}")
@@ -162,17 +143,13 @@ def main():
     global_seen_urls = load_seen_urls(OUTPUT_FILE)
     print(f"Loaded {len(global_seen_urls)} existing URLs.")
     
-    for category_name, category_url in CATEGORIES.items():
+    # 1. Collect links: list pages of all categories render in parallel on the browser pool
+    with DriverPool() as pool:
+        collected = pool.map(collect_category_links, list(CATEGORIES.values()), global_seen_urls)
+
+    for (category_name, category_url), new_urls in zip(CATEGORIES.items(), collected):
         print(f"\nProcessing Category: {category_name}")
         
-        # 1. Collect links
-        driver = init_driver()
-        new_urls = []
-        try:
-            new_urls = collect_category_links(driver, category_url, global_seen_urls)
-        finally:
-            driver.quit()
-        
         if not new_urls:
             print(f"  No new links for {category_name}.")
             continue
@@ -188,16 +165,18 @@ def main():
                      writer.writeheader()
                 
                 for i, url in enumerate(new_urls):
+                    if url in global_seen_urls: continue # Listed in an earlier category too
                     details = extract_article_content(url, category_name)
                     if details and details["title"]:
                         writer.writerow(details)
                         print(f"    [{i+1}/{len(new_urls)}] Saved: {details['title'][:50]}...")
-                        global_seen_urls.add(url)
+                        global_seen_urls.record(url)
                     
                     time.sleep(0.5) # Polite delay
         except Exception as e:
             print(f"  Error during extraction loop: {e}")
 
+    global_seen_urls.close()
     print("\nCrawler finished successfully.")
 
 if __name__ == "__main__":
@@ -1,12 +1,17 @@
+import os
 import requests
-import json
 import csv
 import re
-import time
 import html
+import threading
 from bs4 import BeautifulSoup
+from html_backend import make_soup
 from datetime import datetime
 from urllib3.exceptions import InsecureRequestWarning
+from transport import make_session
+from url_index import UrlIndex
+from frontier import Frontier
+from fetch_engine import FetchEngine
 
 # Suppress SSL warnings
 requests.packages.urllib3.disable_warnings(category=InsecureRequestWarning)
@@ -18,6 +23,8 @@ API_DETAIL_ENDPOINT = f"{BASE_URL}/DesktopModules/cmsview/api/NewsContent/getbyi
 OUTPUT_FILE = "congan_hanoi_data.csv"
 MAX_PAGES_PER_TOPIC = 1000 # Increased to get all pages
 PAGE_SIZE = 20 
+INCREMENTAL = True # After a topic has been walked once, stop at the previous run's newest article
+DETAIL_WORKERS = 8 # getbyid calls in flight for one list page
 
 # Topics to Crawl
 TOPIC_CONFIG = {
@@ -74,7 +81,7 @@ HEADERS = {
     "Origin": BASE_URL
 }
 
-session = requests.Session()
+session = make_session()
 session.headers.update(HEADERS)
 
 def get_module_id(url):
@@ -166,23 +173,74 @@ def parse_date(date_str):
     except:
         return ""
 
+def article_url(art):
+    slug = art.get("Url", "bai-viet")
+    return f"{BASE_URL}/tin-tuc/{slug}-{art.get('Id')}"
+
+# Requests made, by kind, for the per-article report
+request_counts = {"list": 0, "detail": 0, "html": 0}
+counts_lock = threading.Lock()
+
+def count_request(kind):
+    with counts_lock:
+        request_counts[kind] += 1
+
+def api_keywords(*records):
+    """Keyword fields of the list item or getbyid record, in that order."""
+    for rec in records:
+        keywords = rec.get("MetaKeywords") or rec.get("Keyword") or rec.get("Keywords") or rec.get("Tags") or ""
+        if isinstance(keywords, list):
+            keywords = ", ".join(str(k) for k in keywords if k)
+        if keywords and keywords.strip():
+            return keywords.strip()
+    return ""
+
+def page_keywords(full_url):
+    """<meta name="keywords"> of the public article page (the heaviest response, so only a fallback)."""
+    count_request("html")
+    try:
+        html_resp = session.get(full_url, verify=False, timeout=10)
+        if html_resp.status_code == 200:
+            html_soup = make_soup(html_resp.text)
+            meta_keywords = html_soup.find("meta", attrs={"name": "keywords"}) or html_soup.find("meta", attrs={"id": "MetaKeywords"})
+            if meta_keywords:
+                return meta_keywords.get("content", "")
+    except Exception as e:
+        print(f"      Error fetching HTML for keywords: {e}")
+    return ""
+
+def fetch_detail(full_url, art):
+    """(content, keywords, raw content) from getbyid; the HTML page is only fetched when the API has no keywords."""
+    count_request("detail")
+    det_resp = session.get(API_DETAIL_ENDPOINT, params={"id": art.get("Id")}, verify=False, timeout=8)
+    det_data = det_resp.json()
+    if isinstance(det_data, list) and det_data:
+        det_data = det_data[0]
+        
+    # Updated to use FullContent
+    raw_content = det_data.get("FullContent") or det_data.get("Body") or det_data.get("Content") or ""
+    keywords = api_keywords(art, det_data) or page_keywords(full_url)
+    return clean_content(raw_content), keywords, raw_content
+
+def report_requests(saved, before):
+    used = {kind: request_counts[kind] - before.get(kind, 0) for kind in request_counts}
+    total = sum(used.values())
+    per_article = f"{total / saved:.2f} per saved article" if saved else "nothing saved"
+    print(f"  Requests: {used['list']} listnew + {used['detail']} getbyid + {used['html']} HTML = {total} "
+          f"for {saved} articles ({per_article})")
+
 def main():
-    seen_urls = set()
-    write_header = True
+    frontier = Frontier("congan_hanoi")
+    engine = FetchEngine(per_host=DETAIL_WORKERS)
+    total_saved = 0
     
-    # Resume Logic
-    try:
-        with open(OUTPUT_FILE, 'r', encoding='utf-8-sig') as f:
-            reader = csv.reader(f)
-            header = next(reader, None)
-            if header:
-                write_header = False
-                for row in reader:
-                    if len(row) > 3:
-                        seen_urls.add(row[3]) # url is index 3
-        print(f"Resuming... Found {len(seen_urls)} existing articles.")
-    except FileNotFoundError:
+    # Resume Logic (sidecar index, rebuilt from the CSV only when out of date)
+    write_header = not os.path.exists(OUTPUT_FILE) or os.path.getsize(OUTPUT_FILE) == 0
+    seen_urls = UrlIndex(OUTPUT_FILE)
+    if write_header:
         print("Starting new crawl...")
+    else:
+        print(f"Resuming... Found {len(seen_urls)} existing articles.")
     
     with open(OUTPUT_FILE, 'a', encoding='utf-8-sig', newline='') as f:
         writer = csv.writer(f)
@@ -193,12 +251,22 @@ def main():
             print(f"Processing Topic: {topic_name}")
             
             module_id = config["module_id"]
-            topic_url = config["url"]
                 
             print(f"  > ModuleId: {module_id}")
             
+            # Incremental mode needs one complete walk of the topic first
+            _, _, walked = frontier.resume(topic_name)
+            watermark = frontier.watermark(topic_name)
+            incremental = INCREMENTAL and walked
+            if incremental:
+                print(f"  > Incremental: newest known article {watermark.published}")
+            completed = False
+            page_errors = 0
+            
             consecutive_seen = 0
             consecutive_empty_pages = 0  # Track pages with no new articles
+            saved = 0
+            before = dict(request_counts)
             
             for page in range(1, min(MAX_PAGES_PER_TOPIC + 1, 51)):  # Limit to 50 pages max per topic
                 print(f"    Fetching page {page} for '{topic_name}'...", end="\r")
@@ -212,6 +280,7 @@ def main():
                         "txtKeyword": ""
                     }
                     
+                    count_request("list")
                     resp = session.get(API_LIST_ENDPOINT, params=params, verify=False, timeout=10)
                     if resp.status_code != 200:
                         print(f"    Page {page} failed with status {resp.status_code}")
@@ -228,23 +297,37 @@ def main():
                     
                     if not all_articles:
                         print(f"    No articles on page {page}. Stopping topic.")
+                        completed = True
+                        break
+                    
+                    entries = [(article_url(art), art.get("PublishTime") or art.get("CreatedTime")) for art in all_articles]
+                    if incremental and watermark.is_below(entries, seen_urls):
+                        print(f"    Page {page} is entirely below the watermark. Topic up to date.")
+                        completed = True
                         break
                     
                     # Track new articles on this page
-                    new_articles_this_page = 0
-                        
+                    new_articles = {}
                     for art in all_articles:
-                        art_id = art.get("Id")
-                        slug = art.get("Url", "bai-viet")
-                        full_url = f"{BASE_URL}/tin-tuc/{slug}-{art_id}"
-                        
-                        if full_url in seen_urls:
+                        full_url = article_url(art)
+                        if full_url in seen_urls or full_url in new_articles:
                             consecutive_seen += 1
                             continue
-                        
                         # Found a new article
-                        new_articles_this_page += 1
-                            
+                        new_articles[full_url] = art
+                        consecutive_seen = 0
+                    new_articles_this_page = len(new_articles)
+                    
+                    # Details of the whole page (ListData + ListMoreData) at once
+                    details = engine.map(lambda url: fetch_detail(url, new_articles[url]), list(new_articles))
+                        
+                    for (full_url, art), detail in zip(new_articles.items(), details):
+                        if detail is None:
+                            # getbyid failed (logged by the engine): leave the URL unseen so the next run retries it,
+                            # and keep the topic open so the watermark does not pass over it
+                            page_errors += 1
+                            continue
+                        
                         # Extract info
                         title = clean_text(art.get("Name", ""))
                         summary = clean_text(art.get("Description", ""))
@@ -253,46 +336,10 @@ def main():
                         pub_date_raw = art.get("PublishTime") or art.get("CreatedTime")
                         public_time = parse_date(pub_date_raw)
                         
-                        keywords = "" 
-                        
-                        # Content
-                        detail_content = ""
-                        try:
-                            # Fetch detail
-                            detail_params = {"id": art_id}
-                            det_resp = session.get(API_DETAIL_ENDPOINT, params=detail_params, verify=False, timeout=8)
-                            det_data = det_resp.json()
-                            if isinstance(det_data, list) and det_data:
-                                det_data = det_data[0]
-                                
-                            # Updated to use FullContent
-                            raw_content = det_data.get("FullContent") or det_data.get("Body") or det_data.get("Content") or ""
-                            detail_content = clean_content(raw_content)
-                            
-                            # Extract Keywords
-                            # Priority 1: From HTML Meta Tag (User Requested)
-                            try:
-                                html_resp = session.get(full_url, verify=False, timeout=10)
-                                if html_resp.status_code == 200:
-                                    html_soup = BeautifulSoup(html_resp.text, "html.parser")
-                                    meta_keywords = html_soup.find("meta", attrs={"name": "keywords"}) or html_soup.find("meta", attrs={"id": "MetaKeywords"})
-                                    if meta_keywords:
-                                        keywords = meta_keywords.get("content", "")
-                            except Exception as e:
-                                print(f"      Error fetching HTML for keywords: {e}")
-
-                            # Priority 2: From API if HTML failed or empty
-                            if not keywords:
-                                keywords = det_data.get("MetaKeywords") or det_data.get("Keyword") or det_data.get("Keywords") or det_data.get("Tags") or ""
-                                if isinstance(keywords, list):
-                                    keywords = ", ".join(keywords)
-                            
-                            if not summary:
-                                soup = BeautifulSoup(raw_content, "html.parser")
-                                summary = clean_text(soup.get_text()[:300] + "...")
-                        except Exception as e:
-                            print(f"      Error fetching detail for {art_id}: {e}")
-                            # Don't skip, just save what we have
+                        detail_content, keywords, raw_content = detail
+                        if not summary and raw_content:
+                            soup = BeautifulSoup(raw_content, "html.parser")
+                            summary = clean_text(soup.get_text()[:300] + "...")
                         
                         writer.writerow([
                             topic_name,
@@ -304,28 +351,44 @@ def main():
                             detail_content
                         ])
                         f.flush() # Flush immediately
-                        seen_urls.add(full_url)
-                        consecutive_seen = 0
+                        seen_urls.record(full_url)
+                        watermark.see(full_url, pub_date_raw)
+                        saved += 1
                     
                     # Check if this page had any new articles
                     if new_articles_this_page == 0:
                         consecutive_empty_pages += 1
                         print(f"    Page {page} had 0 new articles (consecutive empty: {consecutive_empty_pages})")
                         if consecutive_empty_pages >= 3:
-                            print(f"    No new articles for 3 consecutive pages. Moving to next topic.")
+                            print("    No new articles for 3 consecutive pages. Moving to next topic.")
+                            completed = True
                             break
                     else:
                         consecutive_empty_pages = 0  # Reset counter when we find new articles
                         
                     if consecutive_seen > 100: # Stop if we've seen many duplicates in a row (handling overlap)
                          print(f"    Encountered {consecutive_seen} duplicates. Stopping topic assuming overlap/caught up.")
+                         completed = True
                          break
                         
                 except Exception as e:
                     print(f"    Error on page {page}: {e}")
-                    time.sleep(2)
+                    page_errors += 1
+            else:
+                completed = True  # Page limit reached
             
+            # A skipped page may hold articles older than the new watermark, so only clean walks count
+            if completed and not page_errors:
+                frontier.topic_done(topic_name, watermark)
             print(f"  Finished {topic_name}. Total collected: {len(seen_urls)}")
-            
+            report_requests(saved, before)
+            total_saved += saved
+
+    print("All topics:")
+    report_requests(total_saved, {})
+    engine.close()
+    seen_urls.close()
+    frontier.close()
+
 if __name__ == "__main__":
     main()
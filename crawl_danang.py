@@ -1,16 +1,22 @@
-import requests
+import os
 import csv
 import re
-import time
 import html
-from bs4 import BeautifulSoup
+from html_backend import make_soup
 from urllib.parse import urljoin, urlparse, parse_qs
+from fetch_engine import FetchEngine
+from frontier import Frontier
+from parse_pool import ParsePool, response_encoding
+from transport import make_session
 
 # ================= CONFIG =================
 BASE_URL = "https://danang.gov.vn"
 OUTPUT_FILE = "danang_data_final.csv"
 MAX_PAGES_PER_TOPIC = 100 # Adjust as needed
-SLEEP = 0.5
+CONCURRENCY = 8 # Detail pages in flight at once (pacing comes from rate_limiter.PORTAL_LIMITS)
+PARSE_PROCESSES = int(os.environ.get("CRAWL_PARSE_PROCESSES", 0)) # > 0 moves BeautifulSoup parsing to that many worker processes (crawl_all.py sets each portal's share)
+RESUME = True # Continue each topic after its last completed page (False re-walks from page 1, done URLs are still skipped)
+INCREMENTAL = True # Re-walk finished topics from page 1, stopping at the previous run's newest article
 
 CATEGORIES = {
     "Lễ hội & Sự kiện": "https://danang.gov.vn/le-hoi-su-kien",
@@ -23,11 +29,14 @@ CATEGORIES = {
     "Du khách": "https://danang.gov.vn/vi/du-khach"
 }
 
-session = requests.Session()
+session = make_session()
 session.headers.update({
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 })
 
+# Set by main() when PARSE_PROCESSES > 0
+parse_pool = None
+
 def clean_text(s: str) -> str:
     if not s:
         return ""
@@ -45,7 +54,8 @@ def normalize_url(url):
     return urljoin(BASE_URL, url)
 
 # ================= PARSE ARTICLE =================
-def parse_article(url, topic):
+def extract_article(html_text, url, topic):
+    """Builds the CSV row from an article page's HTML. No network access, so it can run in a ParsePool worker."""
     result = {
         "topic": topic,
         "title": "",
@@ -56,123 +66,128 @@ def parse_article(url, topic):
         "content": ""
     }
     
-    try:
-        resp = session.get(url, timeout=20)
-        if resp.status_code != 200:
-            return None
-        
-        soup = BeautifulSoup(resp.text, "html.parser")
-        
-        # TITLE REFINEMENT
-        title_candidates = [
-            soup.find(class_="title-detail"),
-            soup.find("h1", class_="title-art"),
-            soup.find("h1"),
-            soup.find(class_="news-title")
-        ]
-        
-        for t in title_candidates:
-            if t:
-                txt = clean_text(t.get_text())
-                if len(txt) > 5 and "thực đơn" not in txt.lower():
-                    result["title"] = txt
-                    break
-        
-        if not result["title"] and soup.title:
-            t_text = clean_text(soup.title.string)
-            # Remove common suffixes
-            t_text = re.sub(r"\s*-\s*Cổng thông tin.*$", "", t_text, flags=re.IGNORECASE)
-            if "thực đơn" not in t_text.lower():
-                 result["title"] = t_text
+    soup = make_soup(html_text)
+    
+    # TITLE REFINEMENT
+    title_candidates = [
+        soup.find(class_="title-detail"),
+        soup.find("h1", class_="title-art"),
+        soup.find("h1"),
+        soup.find(class_="news-title")
+    ]
+    
+    for t in title_candidates:
+        if t:
+            txt = clean_text(t.get_text())
+            if len(txt) > 5 and "thực đơn" not in txt.lower():
+                result["title"] = txt
+                break
+    
+    if not result["title"] and soup.title:
+        t_text = clean_text(soup.title.string)
+        # Remove common suffixes
+        t_text = re.sub(r"\s*-\s*Cổng thông tin.*$", "", t_text, flags=re.IGNORECASE)
+        if "thực đơn" not in t_text.lower():
+             result["title"] = t_text
 
-        # PUBLIC TIME
-        result["public_time"] = ""
-        # 1. Try common classes
-        time_tag = soup.find(class_=re.compile("date|time|ngay-dang|publish-date|created-date|ngay_xb"))
-        if time_tag:
-            result["public_time"] = clean_text(time_tag.get_text())
+    # PUBLIC TIME
+    result["public_time"] = ""
+    # 1. Try common classes
+    time_tag = soup.find(class_=re.compile("date|time|ngay-dang|publish-date|created-date|ngay_xb"))
+    if time_tag:
+        result["public_time"] = clean_text(time_tag.get_text())
+    
+    # 2. Regex fallback if empty
+    if not result["public_time"]:
+        # Look for dd/mm/yyyy hh:mm or similar
+        date_pattern = re.compile(r"\d{1,2}[/-]\d{1,2}[/-]\d{4}(?:\s*[,|-]?\s*\d{1,2}:\d{1,2})?")
+        # Search in likely containers first to avoid false positives (like footer)
+        for container in soup.find_all(["div", "span", "p"], class_=re.compile("meta|info|detail")):
+            match = date_pattern.search(container.get_text())
+            if match:
+                result["public_time"] = match.group(0).strip()
+                break
         
-        # 2. Regex fallback if empty
+        # 3. Last resort: Search anywhere in body, but be careful (skip menus)
         if not result["public_time"]:
-            # Look for dd/mm/yyyy hh:mm or similar
-            date_pattern = re.compile(r"\d{1,2}[/-]\d{1,2}[/-]\d{4}(?:\s*[,|-]?\s*\d{1,2}:\d{1,2})?")
-            # Search in likely containers first to avoid false positives (like footer)
-            for container in soup.find_all(["div", "span", "p"], class_=re.compile("meta|info|detail")):
-                match = date_pattern.search(container.get_text())
-                if match:
-                    result["public_time"] = match.group(0).strip()
-                    break
-            
-            # 3. Last resort: Search anywhere in body, but be careful (skip menus)
-            if not result["public_time"]:
-                # Exclude scripts and styles
-                text_content = soup.get_text(" ", strip=True)
-                match = date_pattern.search(text_content)
-                if match:
-                     result["public_time"] = match.group(0).strip()
+            # Exclude scripts and styles
+            text_content = soup.get_text(" ", strip=True)
+            match = date_pattern.search(text_content)
+            if match:
+                 result["public_time"] = match.group(0).strip()
 
 
-        # SUMMARY
-        meta_desc = soup.find("meta", attrs={"name": "description"})
-        if meta_desc:
-            result["summary"] = clean_text(meta_desc.get("content"))
-        
-        if not result["summary"]:
-            summary_div = soup.find(class_=re.compile("sapo|summary"))
-            if summary_div:
-                result["summary"] = clean_text(summary_div.get_text())
+    # SUMMARY
+    meta_desc = soup.find("meta", attrs={"name": "description"})
+    if meta_desc:
+        result["summary"] = clean_text(meta_desc.get("content"))
+    
+    if not result["summary"]:
+        summary_div = soup.find(class_=re.compile("sapo|summary"))
+        if summary_div:
+            result["summary"] = clean_text(summary_div.get_text())
 
-        # CONTENT
-        content_div = soup.find(class_="journal-content-article") or \
-                      soup.find(class_="content-detail") or \
-                      soup.find(class_="view-content") or \
-                      soup.find(id="main-content")
+    # CONTENT
+    content_div = soup.find(class_="journal-content-article") or \
+                  soup.find(class_="content-detail") or \
+                  soup.find(class_="view-content") or \
+                  soup.find(id="main-content")
+        
+    if content_div:
+        # Deep Cleanup
+        for tag in content_div.find_all([
+            "script", "style", "iframe", "form", "nav", "header", "footer", 
+            "div", "section"
+        ], class_=re.compile("portlet|metadata|tag-lib|social|rating|comment|related")):
+            tag.decompose()
             
-        if content_div:
-            # Deep Cleanup
-            for tag in content_div.find_all([
-                "script", "style", "iframe", "form", "nav", "header", "footer", 
-                "div", "section"
-            ], class_=re.compile("portlet|metadata|tag-lib|social|rating|comment|related")):
-                tag.decompose()
+        paragraphs = []
+        # We look for p tags or spans that contain significant text
+        for p in content_div.find_all(["p", "div", "span"]):
+            # Avoid nested duplicates
+            if p.name in ["div", "span"] and p.find("p"):
+                continue
                 
-            paragraphs = []
-            # We look for p tags or spans that contain significant text
-            for p in content_div.find_all(["p", "div", "span"]):
-                # Avoid nested duplicates
-                if p.name in ["div", "span"] and p.find("p"):
-                    continue
-                    
-                txt = clean_text(p.get_text())
-                
-                # Stop if we hit footer-like indicators in the text
-                if "đánh giá bài viết" in txt.lower() or "ý kiến của bạn" in txt.lower():
-                    break
-                
-                if len(txt) > 20: # Higher threshold for better quality
-                    paragraphs.append(txt)
+            txt = clean_text(p.get_text())
             
-            # Additional cleanup of the tail
-            final_paragraphs = []
-            for p in paragraphs:
-                if any(x in p.lower() for x in ["cổng ttđt tp", "thông tin cần biết", "liên kết website"]):
-                    continue
-                final_paragraphs.append(p)
+            # Stop if we hit footer-like indicators in the text
+            if "đánh giá bài viết" in txt.lower() or "ý kiến của bạn" in txt.lower():
+                break
             
-            if final_paragraphs:
-                result["content"] = " ".join(final_paragraphs)
-            else:
-                 result["content"] = clean_text(content_div.get_text())
-                 # Final attempt to trim the text if it's too long and contains boilerplate
-                 if "Đánh giá bài viết" in result["content"]:
-                     result["content"] = result["content"].split("Đánh giá bài viết")[0].strip()
+            if len(txt) > 20: # Higher threshold for better quality
+                paragraphs.append(txt)
+        
+        # Additional cleanup of the tail
+        final_paragraphs = []
+        for p in paragraphs:
+            if any(x in p.lower() for x in ["cổng ttđt tp", "thông tin cần biết", "liên kết website"]):
+                continue
+            final_paragraphs.append(p)
+        
+        if final_paragraphs:
+            result["content"] = " ".join(final_paragraphs)
+        else:
+             result["content"] = clean_text(content_div.get_text())
+             # Final attempt to trim the text if it's too long and contains boilerplate
+             if "Đánh giá bài viết" in result["content"]:
+                 result["content"] = result["content"].split("Đánh giá bài viết")[0].strip()
+
+    # KEYWORDS
+    meta_kw = soup.find("meta", attrs={"name": "keywords"})
+    if meta_kw:
+        result["keywords"] = clean_text(meta_kw.get("content"))
 
-        # KEYWORDS
-        meta_kw = soup.find("meta", attrs={"name": "keywords"})
-        if meta_kw:
-            result["keywords"] = clean_text(meta_kw.get("content"))
+    return result
 
-        return result
+def parse_article(url, topic):
+    try:
+        resp = session.get(url, timeout=20)
+        if resp.status_code != 200:
+            return None
+        
+        if parse_pool:
+            return parse_pool.parse(resp.content, response_encoding(resp), url, topic)
+        return extract_article(resp.text, url, topic)
 
     except Exception as e:
         print(f"Error parsing {url}: {e}")
@@ -226,72 +241,126 @@ def extract_article_links(soup, seen_urls):
 
 # ================= MAIN =================
 def main():
-    seen_urls = set()
+    global parse_pool
+    frontier = Frontier("danang")
+    seen_urls = frontier.known_urls()
+    if PARSE_PROCESSES > 0:
+        parse_pool = ParsePool(extract_article, PARSE_PROCESSES)
     
-    # Load existing URLs
-    try:
-        with open(OUTPUT_FILE, "r", encoding="utf-8-sig") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row.get("url"):
-                    seen_urls.add(row["url"])
-        print(f"Loaded {len(seen_urls)} existing URLs.")
-    except FileNotFoundError:
-        pass
+    # Load existing URLs (first run with the frontier: adopt what the CSV already has)
+    if not seen_urls:
+        try:
+            with open(OUTPUT_FILE, "r", encoding="utf-8-sig") as f:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    if row.get("url"):
+                        seen_urls.add(row["url"])
+            frontier.seed(seen_urls)
+        except FileNotFoundError:
+            pass
+    print(f"Loaded {len(seen_urls)} existing URLs.")
+    if not RESUME:
+        frontier.reset_topics()
+
+    write_header = not os.path.exists(OUTPUT_FILE)
 
     # Open file in append mode
-    with open(OUTPUT_FILE, "a", newline="", encoding="utf-8-sig") as f:
+    with open(OUTPUT_FILE, "a", newline="", encoding="utf-8-sig") as f, \
+         FetchEngine(per_host=CONCURRENCY) as engine:
         writer = csv.DictWriter(
             f,
             fieldnames=["topic", "title", "summary", "url", "keywords", "public_time", "content"]
         )
-        if len(seen_urls) == 0:
+        if write_header:
             writer.writeheader()
 
+        def crawl_links(links, topic, watermark):
+            # Rows are flushed before the frontier marks their URLs done
+            frontier.start(links)
+            results = engine.map(parse_article, links, topic)
+            saved_rows, written = [], []
+            for data in results:
+                keep = bool(data and data["title"] and data["content"])
+                if keep:
+                    writer.writerow(data)
+                    watermark.see(data["url"], data["public_time"])
+                    saved_rows.append(data)
+                written.append(keep)
+            f.flush()
+            frontier.finish(links, written)  # Dropped rows count as failed and are retried
+            return saved_rows
+
+        def below(watermark, rows):
+            # List pages carry no dates, so the check uses the articles just parsed
+            return watermark.is_below((r["url"], r["public_time"]) for r in rows)
+
         for topic, start_url in CATEGORIES.items():
             print(f"\n=== Processing Topic: {topic} ===")
+            last_page, cursor, finished = frontier.resume(topic)
+            watermark = frontier.watermark(topic)
+            incremental = INCREMENTAL and finished
+            if finished and not incremental:
+                print("  Finished in a previous run. Skipping.")
+                continue
+            if incremental:
+                # Newest articles are on page 1; walk down until the watermark
+                print(f"  Incremental: newest known article {watermark.published}")
+                last_page, cursor = 0, None
             
-            # Initial Request to get structure and first page links
-            current_url = start_url
-            params = {}
-            
-            # We need to detect the pagination params from the first page
-            # to iterate correctly.
+            # Articles found before a crash but never written
+            leftover = frontier.unfinished(topic)
+            if leftover:
+                print(f"  Resuming {len(leftover)} unfinished articles.")
+                print(f"    Saved {len(crawl_links(leftover, topic, watermark))} articles.")
             
             try:
-                resp = session.get(current_url, timeout=30)
-                soup = BeautifulSoup(resp.text, "html.parser")
-                
-                # Get initial links
-                new_links = extract_article_links(soup, seen_urls)
-                for link in new_links:
-                    seen_urls.add(link)
-                    data = parse_article(link, topic)
-                    if data and data["title"] and data["content"]:
-                        writer.writerow(data)
-                        print(f"  [Use First Page] Saved: {data['title'][:50]}...")
-                    time.sleep(SLEEP)
+                if cursor:
+                    base_page_url, base_params, cur_key = cursor["base"], cursor["params"], cursor["cur_key"]
+                    print(f"  Resuming after page {last_page}. Base: {base_page_url}")
+                else:
+                    # Initial Request to get structure and first page links
+                    # We need to detect the pagination params from the first page
+                    # to iterate correctly.
+                    current_url = start_url
+                    resp = session.get(current_url, timeout=30)
+                    soup = make_soup(resp.text)
                     
-                # Setup pagination
-                base_page_url, base_params = get_pagination_params(soup, current_url)
-                
-                if not base_page_url or not base_params:
-                    print(f"  Could not find pagination for {topic}. Checking only first page.")
-                    continue
-                
-                # Identify the 'cur' parameter (usually ..._cur)
-                cur_key = next((k for k in base_params.keys() if k.endswith("_cur")), None)
-                if not cur_key:
-                    print(f"  Could not identify 'cur' parameter for {topic}.")
-                    continue
-                
-                print(f"  Pagination detected. Base: {base_page_url}, Cur Param: {cur_key}")
+                    # Get initial links
+                    new_links = extract_article_links(soup, seen_urls)
+                    seen_urls.update(new_links)
+                    frontier.add(new_links, topic)
+                    saved_rows = crawl_links(new_links, topic, watermark)
+                    print(f"  [Use First Page] Saved {len(saved_rows)} articles.")
+                    if incremental and (not new_links or below(watermark, saved_rows)):
+                        print("  First page is below the watermark. Topic up to date.")
+                        frontier.topic_done(topic, watermark)
+                        continue
+                        
+                    # Setup pagination
+                    base_page_url, base_params = get_pagination_params(soup, current_url)
+                    
+                    if not base_page_url or not base_params:
+                        print(f"  Could not find pagination for {topic}. Checking only first page.")
+                        frontier.page_done(topic, 1)
+                        frontier.topic_done(topic, watermark)
+                        continue
+                    
+                    # Identify the 'cur' parameter (usually ..._cur)
+                    cur_key = next((k for k in base_params.keys() if k.endswith("_cur")), None)
+                    if not cur_key:
+                        print(f"  Could not identify 'cur' parameter for {topic}.")
+                        continue
+                    
+                    print(f"  Pagination detected. Base: {base_page_url}, Cur Param: {cur_key}")
+                    last_page = 1
+                    frontier.page_done(topic, 1, {"base": base_page_url, "params": base_params, "cur_key": cur_key})
                 
-                # Iterate pages starting from 2
+                # Iterate pages after the last completed one
                 # Note: The 'Next' link on page 1 usually points to page 2.
                 # We will construct params for page 2, 3, etc.
-                
-                for page in range(2, MAX_PAGES_PER_TOPIC + 1):
+                first_page = last_page + 1
+                completed = True
+                for page in range(first_page, MAX_PAGES_PER_TOPIC + 1):
                     print(f"  -> Crawling Page {page} of {topic}...")
                     
                     # Update the current page param
@@ -299,34 +368,45 @@ def main():
                     
                     try:
                         p_resp = session.get(base_page_url, params=base_params, timeout=30)
-                        p_soup = BeautifulSoup(p_resp.text, "html.parser")
+                        p_soup = make_soup(p_resp.text)
                         
                         page_links = extract_article_links(p_soup, seen_urls)
                         
                         if not page_links:
+                            # The page interrupted by a crash only holds the leftover articles
+                            if leftover and page == first_page:
+                                frontier.page_done(topic, page, {"base": base_page_url, "params": base_params, "cur_key": cur_key})
+                                continue
                             print("    No new links found. Stopping topic.")
                             break
                             
                         print(f"    Found {len(page_links)} new articles.")
                         
-                        count_saved = 0
-                        for link in page_links:
-                            seen_urls.add(link)
-                            data = parse_article(link, topic)
-                            if data and data["title"] and data["content"]:
-                                writer.writerow(data)
-                                count_saved += 1
-                                # Minimal logs to keep it clean
-                            time.sleep(SLEEP)
-                        print(f"    Saved {count_saved} articles.")
+                        seen_urls.update(page_links)
+                        frontier.add(page_links, topic)
+                        saved_rows = crawl_links(page_links, topic, watermark)
+                        print(f"    Saved {len(saved_rows)} articles.")
+                        # Past a failed page, resuming must go back to that page
+                        if completed:
+                            frontier.page_done(topic, page, {"base": base_page_url, "params": base_params, "cur_key": cur_key})
+                        if incremental and below(watermark, saved_rows):
+                            print("    All new articles on this page are older than the watermark. Topic up to date.")
+                            break
                             
                     except Exception as e:
                         print(f"    Error on page {page}: {e}")
-                        
-                    time.sleep(1)
+                        completed = False
+                
+                if completed:
+                    frontier.topic_done(topic, watermark)
                     
             except Exception as e:
                 print(f"Error initializing topic {topic}: {e}")
 
+    print(f"Frontier: {frontier.counts()}")
+    frontier.close()
+    if parse_pool:
+        parse_pool.close()
+
 if __name__ == "__main__":
     main()
@@ -1,11 +1,12 @@
-import requests
 import csv
 import re
-import time
 import html
 import urllib3
-from bs4 import BeautifulSoup
+from html_backend import make_soup
 from urllib.parse import urljoin
+from transport import make_session
+from paginators import PageUrlPaginator, ProbeError
+from webforms import WebFormsPager, pager_links
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -13,7 +14,7 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 BASE_URL = "https://www.dienbien.gov.vn"
 OUTPUT_FILE = "dienbien_data_final.csv"
 MAX_PAGES = 500 
-SLEEP = 0.5
+LIST_WORKERS = 4 # Số trang ?PageIndex= tải song song khi đã biết trang cuối
 
 CATEGORIES = {
     "Hoạt động lãnh đạo UBND": "https://www.dienbien.gov.vn/portal/Pages/Hoat-dong-lanh-dao-UBND-tinh.aspx",
@@ -24,7 +25,7 @@ CATEGORIES = {
     "Thông tin vụ án tham nhũng": "https://dienbien.gov.vn/portal/Pages/Thong-tin-vu-an-vu-viec-tham-nhung.aspx"
 }
 
-session = requests.Session()
+session = make_session()
 session.headers.update({
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 })
@@ -38,7 +39,7 @@ def clean_text(s):
 def parse_article(url, topic):
     try:
         resp = session.get(url, timeout=25, verify=False)
-        soup = BeautifulSoup(resp.text, "html.parser")
+        soup = make_soup(resp.text)
         
         # 1. Title
         title = ""
@@ -107,6 +108,42 @@ def parse_article(url, topic):
         # print(f"Error parsing {url}: {e}")
         return None
 
+def list_links(soup, start_url, seen_urls):
+    links = []
+    for a in soup.find_all("a", href=True):
+        href = a['href']
+        if "/portal/Pages/" in href and ".aspx" in href:
+            # Filter unwanted paths
+            lower_href = href.lower()
+            if any(x in lower_href for x in ["default.aspx", "login.aspx", "/home-new/", "lich-tiep-cong-dan"]): 
+                continue
+            
+            full_url = urljoin(BASE_URL, href)
+            # Không cào lại trang gốc và link đã thấy
+            if full_url not in seen_urls and full_url != start_url and full_url not in links:
+                links.append(full_url)
+    return links
+
+def fetch_list(page_url):
+    resp = session.get(page_url, timeout=30, verify=False)
+    return make_soup(resp.text) if resp.status_code == 200 else None
+
+def list_pages(start_url):
+    """
+    (page, links) của từng trang danh sách: postback của SharePoint nếu có pager,
+    không thì ?PageIndex= (tìm trang cuối trước, rồi tải LIST_WORKERS trang một lúc).
+    """
+    pager = WebFormsPager(session, start_url, timeout=30)
+    soup = pager.open()
+    if pager_links(soup):
+        for page, soup in pager.walk(soup, MAX_PAGES):
+            yield page, list_links(soup, start_url, ())
+        return
+    pages = PageUrlPaginator(f"{start_url}?PageIndex={{page}}", fetch_list,
+                             lambda soup: list_links(soup, start_url, ()), max_pages=MAX_PAGES, workers=LIST_WORKERS)
+    pages.found[1] = list_links(soup, start_url, ())  # Trang 1 đã tải ở trên
+    yield from pages
+
 def main():
     seen_urls = set()
     print("--- BẮT ĐẦU CÀO ĐIỆN BIÊN: ĐÚNG CHỦ ĐỀ YÊU CẦU ---")
@@ -125,29 +162,11 @@ def main():
                 writer.writerow(root_data)
                 f.flush()
 
-            for page in range(1, MAX_PAGES + 1):
-                # Sử dụng PageIndex để phân trang cho SharePoint
-                target_url = start_url if page == 1 else f"{start_url}?PageIndex={page}"
-                print(f"  > Trang {page}/{MAX_PAGES}...", end="\r")
-                
-                try:
-                    resp = session.get(target_url, timeout=30, verify=False)
-                    soup = BeautifulSoup(resp.text, "html.parser")
-                    
-                    links = []
-                    for a in soup.find_all("a", href=True):
-                        href = a['href']
-                        if "/portal/Pages/" in href and ".aspx" in href:
-                            # Filter unwanted paths
-                            lower_href = href.lower()
-                            if any(x in lower_href for x in ["default.aspx", "login.aspx", "/home-new/", "lich-tiep-cong-dan"]): 
-                                continue
-                            
-                            full_url = urljoin(BASE_URL, href)
-                            # Không cào lại trang gốc và link đã thấy
-                            if full_url not in seen_urls and full_url != start_url and full_url not in links:
-                                links.append(full_url)
-                    
+            page = None
+            try:
+                for page, links in list_pages(start_url):
+                    print(f"  > Trang {page}/{MAX_PAGES}...", end="\r")
+                    links = [link for link in links or [] if link not in seen_urls]
                     if not links and page > 1: break
                     
                     for link in links:
@@ -157,10 +176,14 @@ def main():
                         if data and data["title"]:
                             writer.writerow(data)
                             f.flush()
-                        time.sleep(SLEEP)
                     
-                except Exception:
-                    break
+            except ProbeError as e:
+                # Không tìm được trang cuối: bỏ qua mục này, lần chạy sau thử lại
+                print(f"\n  Bỏ qua mục {topic}: {e}")
+            except Exception as e:
+                # page là trang cuối cùng đã nhận được: lỗi xảy ra ở trang đó hoặc khi tải trang kế tiếp
+                where = f"dừng ở trang {page}" if page is not None else "chưa tải được trang nào"
+                print(f"\n  Lỗi ở mục {topic} ({where}): {type(e).__name__}: {e}. Phần còn lại của mục bị bỏ qua.")
 
     print(f"\n--- XONG! Kiểm tra file: {OUTPUT_FILE} ---")
 
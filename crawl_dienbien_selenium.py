@@ -1,17 +1,14 @@
 
 import csv
-import time
 import os
 import html
 import re
-import requests
 import urllib3
-from bs4 import BeautifulSoup
-from selenium import webdriver
+from transport import make_session
+from html_backend import make_soup
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from browser_pool import DriverPool, wait_for, click_and_wait
+from url_index import UrlIndex
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -35,6 +32,7 @@ CATEGORIES = {
 
 OUTPUT_FILE = "dienbien_data_final.csv"
 MAX_PAGES_PER_CATEGORY = 500
+LIST_LINKS = ".channel-news-title a, .tandan-p-article-news-title a, .title-news a"
 
 def clean_text(s):
     if s is None: return ""
@@ -43,30 +41,9 @@ def clean_text(s):
     s = re.sub(r"[\x00-\x1f\x7f]", "", s)
     return re.sub(r"\s+", " ", s).strip()
 
-def init_driver():
-    chrome_options = Options()
-    # chrome_options.add_argument("--headless") # Headless
-    chrome_options.add_argument("--headless") 
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    driver = webdriver.Chrome(options=chrome_options)
-    driver.set_page_load_timeout(60)
-    return driver
-
 def load_seen_urls(filepath):
-    seen = set()
-    if os.path.exists(filepath):
-        try:
-            with open(filepath, mode="r", encoding="utf-8-sig") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if "url" in row:
-                        seen.add(row["url"])
-        except Exception:
-            pass
-    return seen
+    # Sidecar URL index; only re-reads the CSV when the index is out of date
+    return UrlIndex(filepath)
 
 def parse_html_content(soup, url, topic):
     # TITLE
@@ -130,13 +107,15 @@ def parse_html_content(soup, url, topic):
         "url": url, "keywords": keywords, "public_time": public_time, "content": content
     }
 
+# Keep-alive session for the requests path, so articles do not pay a TCP+TLS handshake each
+session = make_session(headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"})
+
 def extract_article_hybrid(driver, url, topic, retries=1):
     # 1. Try Requests (Fast)
-    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"}
     try:
-        resp = requests.get(url, headers=headers, timeout=15, verify=False)
+        resp = session.get(url, timeout=15, verify=False)
         if resp.status_code == 200:
-            soup = BeautifulSoup(resp.text, "html.parser")
+            soup = make_soup(resp.text)
             data = parse_html_content(soup, url, topic)
             if data and data["title"] and data["content"]:
                 return data
@@ -149,13 +128,9 @@ def extract_article_hybrid(driver, url, topic, retries=1):
     try:
         driver.get(url)
         # Wait for title
-        try:
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, ".tandan-title-view, .title-news, h1"))
-            )
-        except: pass
+        wait_for(driver, ".tandan-title-view, .title-news, h1", timeout=10)
         
-        soup = BeautifulSoup(driver.page_source, "html.parser")
+        soup = make_soup(driver.page_source)
         data = parse_html_content(soup, url, topic)
         
         # Last ditch: Title from <title> tag if H1 missing
@@ -178,7 +153,7 @@ def collect_category_links(driver, category_url, global_seen_urls):
     print(f"  Collecting links from: {category_url}")
     try:
         driver.get(category_url)
-        time.sleep(5)
+        wait_for(driver, LIST_LINKS)
     except Exception as e:
         print(f"    Error loading list page: {e}")
         return links_to_crawl
@@ -188,7 +163,7 @@ def collect_category_links(driver, category_url, global_seen_urls):
         
         try:
             # Scraping Links
-            elements = driver.find_elements(By.CSS_SELECTOR, ".channel-news-title a, .tandan-p-article-news-title a, .title-news a")
+            elements = driver.find_elements(By.CSS_SELECTOR, LIST_LINKS)
             
             page_current_urls = []
             for el in elements:
@@ -220,8 +195,9 @@ def collect_category_links(driver, category_url, global_seen_urls):
             
             if next_btn:
                 try:
-                    driver.execute_script("arguments[0].click();", next_btn)
-                    time.sleep(5)
+                    if not click_and_wait(driver, next_btn, elements[0] if elements else None):
+                        print(f"\n    Page {next_page} did not load. Stopping.")
+                        break
                 except Exception as e:
                     print(f"\n    Failed to click Next: {e}")
                     break
@@ -240,21 +216,13 @@ def main():
     global_seen_urls = load_seen_urls(OUTPUT_FILE)
     print(f"Loaded {len(global_seen_urls)} existing URLs.")
     
+    pool = DriverPool()
     try:
-        driver = init_driver()
-        print("Driver initialized successfully.")
-    except Exception as e:
-        print(f"CRITICAL ERROR: Selenium driver init failed: {e}")
-        return
+        # List pages of all categories render in parallel on the pool's drivers
+        collected = pool.map(collect_category_links, list(CATEGORIES.values()), global_seen_urls)
 
-    try:
-        for category_name, category_url in CATEGORIES.items():
+        for category_name, new_urls in zip(CATEGORIES, collected):
             print(f"\n[Category]: {category_name}")
-            
-            new_urls = collect_category_links(driver, category_url, global_seen_urls)
-            
-            if not new_urls: move_on = True # Just to show logic flow
-            
             print(f"  Extracting details for {len(new_urls)} articles...")
             
             mode = "a"
@@ -269,19 +237,21 @@ def main():
                 for i, url in enumerate(new_urls):
                     if url in global_seen_urls: continue
                     
-                    # Use Hybrid Extraction
-                    data = extract_article_hybrid(driver, url, category_name)
+                    # Use Hybrid Extraction (driver from the pool for the Selenium fallback)
+                    with pool.lease() as driver:
+                        data = extract_article_hybrid(driver, url, category_name)
                     
                     if data:
                         writer.writerow(data)
                         f.flush()
                         print(f"    [{i+1}/{len(new_urls)}] Saved: {data['title'][:50]}...")
-                        global_seen_urls.add(url)
+                        global_seen_urls.record(url)
                     else:
                         print(f"    [{i+1}/{len(new_urls)}] Skipped (No Data): {url}")
             
     finally:
-        driver.quit()
+        pool.close()
+        global_seen_urls.close()
         print("\n--- Crawler Completed ---")
 
 if __name__ == "__main__":
@@ -1,11 +1,12 @@
-import requests
 import csv
 import re
-import time
 import html
 import sys
-from bs4 import BeautifulSoup
+from html_backend import make_soup
 from urllib.parse import urljoin, urlparse, parse_qs
+from transport import make_session
+from pipeline import run_pipeline
+from url_index import UrlIndex
 
 # Force output to UTF-8
 if sys.stdout.encoding.lower() != 'utf-8':
@@ -15,7 +16,7 @@ if sys.stdout.encoding.lower() != 'utf-8':
 BASE_URL = "https://gialai.gov.vn"
 OUTPUT_FILE = "gialai_data_final.csv"
 MAX_PAGES_PER_TOPIC = 50 
-SLEEP = 0.5
+CONCURRENCY = 8 # Detail workers
 
 CATEGORIES = {
     "Chỉ đạo điều hành": "https://gialai.gov.vn/tin-tuc/thong-tin-chi-dao-dieu-hanh",
@@ -28,7 +29,7 @@ CATEGORIES = {
     "Địa phương": "https://gialai.gov.vn/tin-tuc/tin-tu-thi-xa-huyen-thanh-pho"
 }
 
-session = requests.Session()
+session = make_session()
 session.headers.update({
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 })
@@ -75,7 +76,7 @@ def parse_article(url, topic):
         if resp.status_code != 200:
             return None
         
-        soup = BeautifulSoup(resp.text, "html.parser")
+        soup = make_soup(resp.text)
         
         # TITLE
         title_tag = soup.find("h1", class_="title-detail")
@@ -181,20 +182,48 @@ def get_next_page_url(soup, current_page):
             
     return None
 
+# ================= DISCOVERY =================
+def discover_articles(seen_urls):
+    """Follows each category's pagination and yields (article_url, topic) for every new article."""
+    for topic_name, start_url in CATEGORIES.items():
+        print(f"\n=== Processing Topic: {topic_name} ===")
+        
+        current_url = start_url
+        for page in range(1, MAX_PAGES_PER_TOPIC + 1):
+            print(f"  -> Crawling Page {page}: {current_url}")
+            
+            try:
+                resp = session.get(current_url, timeout=30)
+                if resp.status_code != 200:
+                    print(f"    Failed to load page {page}")
+                    break
+                    
+                soup = make_soup(resp.text)
+                links = extract_article_links(soup, seen_urls)
+                next_url = get_next_page_url(soup, page)
+            except Exception as e:
+                print(f"    Error on page {page}: {e}")
+                break
+            
+            if not links:
+                print("    No new links found.")
+            else:
+                print(f"    Found {len(links)} new articles.")
+            
+            for link in links:
+                seen_urls.add(link)
+                yield link, topic_name
+            
+            if not next_url:
+                print("    No more pages.")
+                break
+            current_url = next_url
+
 # ================= MAIN =================
 def main():
-    seen_urls = set()
-    
-    # Load existing URLs
-    try:
-        with open(OUTPUT_FILE, "r", encoding="utf-8-sig") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row.get("url"):
-                    seen_urls.add(row["url"])
-        print(f"Loaded {len(seen_urls)} existing URLs.")
-    except FileNotFoundError:
-        pass
+    # Load existing URLs (sidecar index, rebuilt from the CSV only when out of date)
+    seen_urls = UrlIndex(OUTPUT_FILE)
+    print(f"Loaded {len(seen_urls)} existing URLs.")
 
     with open(OUTPUT_FILE, "a", newline="", encoding="utf-8-sig") as f:
         writer = csv.DictWriter(
@@ -204,56 +233,16 @@ def main():
         if len(seen_urls) == 0:
             writer.writeheader()
 
-        for topic_name, start_url in CATEGORIES.items():
-            print(f"\n=== Processing Topic: {topic_name} ===")
-            
-            current_url = start_url
-            for page in range(1, MAX_PAGES_PER_TOPIC + 1):
-                print(f"  -> Crawling Page {page}: {current_url}")
-                
-                try:
-                    resp = session.get(current_url, timeout=30)
-                    if resp.status_code != 200:
-                        print(f"    Failed to load page {page}")
-                        break
-                        
-                    soup = BeautifulSoup(resp.text, "html.parser")
-                    links = extract_article_links(soup, seen_urls)
-                    
-                    if not links:
-                        print("    No new links found.")
-                        # Check if there's still a next page to be sure
-                        next_url = get_next_page_url(soup, page)
-                        if not next_url:
-                            break
-                        current_url = next_url
-                        continue
-                    
-                    print(f"    Found {len(links)} new articles.")
-                    
-                    count_saved = 0
-                    for link in links:
-                        seen_urls.add(link)
-                        data = parse_article(link, topic_name)
-                        if data:
-                            writer.writerow(data)
-                            count_saved += 1
-                        time.sleep(SLEEP)
-                    
-                    print(f"    Saved {count_saved}/{len(links)} articles.")
-                    
-                    # Get next page URL
-                    next_url = get_next_page_url(soup, page)
-                    if not next_url:
-                        print("    No more pages.")
-                        break
-                    current_url = next_url
-                    
-                except Exception as e:
-                    print(f"    Error on page {page}: {e}")
-                    break
-                    
-                time.sleep(1)
+        def save(data):
+            writer.writerow(data)
+            seen_urls.record(data["url"])
+            return True
+
+        # Discovery, detail fetching and writing run as separate stages
+        stats = run_pipeline(discover_articles(seen_urls), parse_article, save, workers=CONCURRENCY)
+        print(f"\nDone. Discovered {stats['discovered']}, saved {stats['saved']} articles.")
+
+    seen_urls.close()
 
 if __name__ == "__main__":
     main()
@@ -1,14 +1,21 @@
-import requests
 import re
-from bs4 import BeautifulSoup
+from html_backend import make_soup
 import csv
 import os
-import time
 from urllib.parse import urljoin
+from transport import make_session
+from url_index import UrlIndex
+from paginators import PageUrlPaginator, ProbeError
+import sitemap_discovery
 
 # Configuration
 BASE_URL = "https://hatinh.gov.vn"
 OUTPUT_FILE = "hatinh_data_final.csv"
+DISCOVERY = "list"  # "sitemap": take article URLs from sitemap.xml/RSS feeds; topics they miss walk ?page=N
+# Topic -> RSS feed URL. Sitemap entries are matched to a topic by category path prefix, and the
+# articles here live under /bai-viet/, not /vi/chuyen-muc/..., so only topics listed here are covered
+FEEDS = {}
+LIST_WORKERS = 4  # List pages in flight at once once the last page is known
 
 # Category URLs and their corresponding topics
 CATEGORIES = {
@@ -22,18 +29,40 @@ CATEGORIES = {
     "Công dân": "https://hatinh.gov.vn/vi/chuyen-muc/cong-dan"
 }
 
+session = make_session()
+
 # CSV Headers
 HEADERS = ["topic", "title", "summary", "url", "keywords", "public_time", "content"]
 
 def get_soup(url):
     try:
-        response = requests.get(url, timeout=10)
+        response = session.get(url, timeout=10)
         response.raise_for_status()
-        return BeautifulSoup(response.content, 'html.parser')
+        return make_soup(response.content)
     except Exception as e:
         print(f"Error fetching {url}: {e}")
         return None
 
+def fetch_list(url):
+    # Errors propagate so PageUrlPaginator can tell a failed page from the end of the list
+    response = session.get(url, timeout=10)
+    if response.status_code == 404:
+        return None  # Past the last page
+    response.raise_for_status()
+    return make_soup(response.content)
+
+def list_links(soup):
+    # The analyzed article URL was: https://hatinh.gov.vn/bai-viet/...
+    # so every link under /bai-viet/ on a list page is an article
+    article_links = []
+    for link in soup.find_all('a', href=True):
+        href = link['href']
+        if '/bai-viet/' in href:
+            full_url = urljoin(BASE_URL, href)
+            if full_url not in article_links:
+                article_links.append(full_url)
+    return article_links
+
 def extract_article_data(url, topic):
     soup = get_soup(url)
     if not soup:
@@ -107,77 +136,68 @@ def extract_article_data(url, topic):
         print(f"Error extracting data from {url}: {e}")
         return None
 
+def save_article(article_url, topic, writer, f, existing_urls):
+    print(f"    Processing: {article_url}")
+    data = extract_article_data(article_url, topic)
+    if data:
+        writer.writerow(data)
+        f.flush() # Ensure data is written immediately
+        existing_urls.record(article_url) # Also avoids dups in same run
+        print(f"    Saved: {article_url}")
+    else:
+        print(f"    Failed to extract data: {article_url}")
+
 def get_existing_urls(file_path):
-    urls = set()
-    if os.path.exists(file_path):
-        with open(file_path, 'r', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if 'url' in row and row['url']:
-                    urls.add(row['url'].strip())
-    return urls
+    # Sidecar URL index; only re-reads the CSV when the index is out of date
+    return UrlIndex(file_path)
 
 def crawl():
     # Initialize CSV file
-    existing_urls = set()
     if not os.path.exists(OUTPUT_FILE):
         with open(OUTPUT_FILE, 'w', newline='', encoding='utf-8-sig') as f:
             writer = csv.DictWriter(f, fieldnames=HEADERS)
             writer.writeheader()
+    existing_urls = get_existing_urls(OUTPUT_FILE)
+    print(f"Loaded {len(existing_urls)} existing URLs.")
+
+    if DISCOVERY == "sitemap":
+        topics = sitemap_discovery.discover(
+            BASE_URL, CATEGORIES, feeds=FEEDS, url_filter=lambda u: '/bai-viet/' in u
+        )
     else:
-        existing_urls = get_existing_urls(OUTPUT_FILE)
-        print(f"Loaded {len(existing_urls)} existing URLs.")
+        topics = ((topic, None) for topic in CATEGORIES)
 
     with open(OUTPUT_FILE, 'a', newline='', encoding='utf-8-sig') as f:
         writer = csv.DictWriter(f, fieldnames=HEADERS)
         
-        for topic, cat_url in CATEGORIES.items():
-            print(f"Crawling category: {topic} - {cat_url}")
+        for topic, entries in topics:
+            cat_url = CATEGORIES[topic]
             print(f"Crawling category: {topic} - {cat_url}")
-            page = 1
-            while True:
-                page_url = f"{cat_url}?page={page}"
-                print(f"  Fetching page {page}: {page_url}")
-                
-                soup = get_soup(page_url)
-                if not soup:
-                    break
-
-                # Find article links
-                # Adjust selector based on actual list structure. 
-                # Usually .news-item a or similar. Inspecting...
-                # Based on analysis, let's look for common patterns in news lists
-                # Often in .list-news or similar containers.
-                # Let's try a generic approach if specific list class wasn't in analysis
-                # But wait, I need to know the list item selector. 
-                # I'll try to find links that look like article links.
-                
-                # Analyzing list page structure safely:
-                # Usually links are in h3 or h2 titles.
-                article_links = []
-                # Try finding links within a likely news container
-                # Often 'item-news', 'news-item', 'post-item'
-                
-                # Let's try getting all links in the main content area, avoiding specific classes if unsure,
-                # but filtering by having 'bai-viet' in URL might be a safe bet for this site if it follows that pattern
-                # The analyzed article URL was: https://hatinh.gov.vn/bai-viet/...
-                
-                links = soup.find_all('a', href=True)
-                for link in links:
-                    href = link['href']
-                    if '/bai-viet/' in href:
-                        full_url = urljoin(BASE_URL, href)
-                        if full_url not in article_links:
-                            article_links.append(full_url)
-                
-                # Deduplicate and filter
-                article_links = list(set(article_links))
-                
+            if entries:
+                new_urls = sitemap_discovery.unseen(entries, existing_urls)
+                print(f"  Sitemap lists {len(entries)} articles, {len(new_urls)} new.")
+                for article_url in new_urls:
+                    save_article(article_url, topic, writer, f, existing_urls)
+                continue
+            # First crawl: last page found by probing, then list pages LIST_WORKERS at a time, in page order.
+            # Later runs stop at the first run of already-crawled articles, so they walk page by page.
+            pager = PageUrlPaginator(f"{cat_url}?page={{page}}", fetch_list, list_links, workers=LIST_WORKERS,
+                                     probe=len(existing_urls) == 0)
+            if pager.probe:
+                try:
+                    print(f"  {pager.last_page()} pages ({pager.requests} requests to find the end)")
+                except ProbeError as e:
+                    print(f"  Skipping category: {e}")
+                    continue
+            for page, article_links in pager:
+                if article_links is None:
+                    print(f"  Failed to load page {page}.")
+                    continue
                 if not article_links:
                     print(f"  No articles found on page {page}. Stopping category.")
                     break
                 
-                print(f"  Found {len(article_links)} articles.")
+                print(f"  Found {len(article_links)} articles on page {page}.")
                 
                 consecutive_duplicates = 0
                 max_consecutive_duplicates = 50 
@@ -192,22 +212,12 @@ def crawl():
                         continue
                         
                     consecutive_duplicates = 0 # Reset counter if new article found
-                    print(f"    Processing: {article_url}")
-                    data = extract_article_data(article_url, topic)
-                    if data:
-                        writer.writerow(data)
-                        f.flush() # Ensure data is written immediately
-                        existing_urls.add(article_url) # Add to set to avoid dups in same run
-                        print(f"    Saved: {article_url}")
-                    else:
-                        print(f"    Failed to extract data: {article_url}")
-                    time.sleep(0.1) # Reduce delay to speed up
+                    save_article(article_url, topic, writer, f, existing_urls)
 
                 if consecutive_duplicates >= max_consecutive_duplicates:
                     break
 
-                page += 1
-                time.sleep(1)
+    existing_urls.close()
 
 if __name__ == "__main__":
     crawl()
@@ -1,10 +1,11 @@
-import requests
 import csv
-import time
 import re
-from bs4 import BeautifulSoup
+from html_backend import make_soup
 import urllib3
-import ssl
+from fetch_engine import FetchEngine
+from paginators import PageUrlPaginator, ProbeError
+from transport import make_session
+from url_index import UrlIndex
 
 urllib3.disable_warnings()
 
@@ -12,6 +13,8 @@ urllib3.disable_warnings()
 OUTPUT_FILE = "hungyen_data_final.csv"
 MAX_ITEMS_PER_TOPIC = 2000
 MAX_PAGES_PER_TOPIC = 100 # Increased limit
+CONCURRENCY = 8 # Detail pages in flight at once
+LIST_WORKERS = 4 # List pages in flight at once once the last page is known
 
 # Topics from user
 # Format: Name -> First Page URL
@@ -27,18 +30,7 @@ TOPIC_URLS = [
     ("Văn bản chính sách mới", "https://hungyen.gov.vn/chuyen-muc-vb-chinh-sach-moi-c223-1.html")
 ]
 
-class CustomHttpAdapter(requests.adapters.HTTPAdapter):
-    def init_poolmanager(self, connections, maxsize, block=False):
-        ctx = ssl.create_default_context()
-        ctx.set_ciphers('DEFAULT@SECLEVEL=1')
-        ctx.check_hostname = False
-        self.poolmanager = urllib3.poolmanager.PoolManager(
-            num_pools=connections, maxsize=maxsize, block=block,
-            ssl_version=ssl.PROTOCOL_TLSv1_2, ssl_context=ctx
-        )
-
-session = requests.Session()
-session.mount('https://', CustomHttpAdapter())
+session = make_session(legacy_tls=True)
 session.headers.update({
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36'
 })
@@ -51,9 +43,9 @@ def get_detail_content(url):
     try:
         resp = session.get(url, verify=False, timeout=20)
         if resp.status_code != 200:
-            return "", "", ""
+            return "", "", "", ""
             
-        soup = BeautifulSoup(resp.content, 'html.parser')
+        soup = make_soup(resp.content)
         
         # Content container
         # Browser inspection: .article-content #container or .new-detail-layout-type-2
@@ -120,20 +112,59 @@ def get_detail_content(url):
         print(f"    Error fetching detail {url}: {e}")
         return "", "", ""
 
-def crawl():
-    seen_urls = set()
+def fetch_list(page_url):
+    print(f"  Fetching {page_url}")
+    resp = session.get(page_url, verify=False, timeout=20)
+    if resp.status_code in (404, 410):
+        return None  # Past the last page
+    resp.raise_for_status()  # Anything else is a failed page, not the end of the list
+    return make_soup(resp.content)
+
+def list_entries(soup):
+    """(link, title, summary, list date) for every article on a list page."""
+    # Selector from browser inspection: div.article-right.show-left (container?)
+    # Found "article-title common-title"
+    articles = soup.select('div.item-new') # Common structure?
+    if not articles:
+        # Try finding titles directly and getting parent
+        titles = soup.select('a.article-title')
+        articles = [t.find_parent('div') for t in titles] # Heuristic
     
-    # Check existing
-    try:
-        with open(OUTPUT_FILE, "r", encoding="utf-8-sig") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if "url" in row: seen_urls.add(row["url"])
-        print(f"Loaded {len(seen_urls)} existing articles.")
-    except: pass
+    entries = []
+    for art in articles:
+        if art is None: continue
+        # Title
+        title_tag = art.select_one('a.article-title')
+        if not title_tag: continue
+        
+        title = clean_text(title_tag.get_text())
+        link = title_tag.get('href')
+        if not link: continue
+        
+        # Absolutize link
+        if not link.startswith('http'):
+            link = "https://hungyen.gov.vn" + link
+        
+        # Summary
+        summary_tag = art.select_one('div.article-brief')
+        summary = clean_text(summary_tag.get_text()) if summary_tag else ""
+        
+        # Date
+        date_tag = art.select_one('span.article-date')
+        # Sometimes date is text node
+        public_time = clean_text(date_tag.get_text()) if date_tag else ""
+        
+        entries.append((link, title, summary, public_time))
+    return entries
+
+def crawl():
+    # Check existing (sidecar index, rebuilt from the CSV only when out of date)
+    seen_urls = UrlIndex(OUTPUT_FILE)
+    print(f"Loaded {len(seen_urls)} existing articles.")
     
-    mode = 'a' if seen_urls else 'w'
-    with open(OUTPUT_FILE, mode, encoding="utf-8-sig", newline="") as f:
+    mode = 'a' if len(seen_urls) else 'w'
+    with open(OUTPUT_FILE, mode, encoding="utf-8-sig", newline="") as f, \
+         FetchEngine(per_host=CONCURRENCY) as engine:
         fieldnames = ["topic", "title", "summary", "url", "keywords", "public_time", "content"]
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         if mode == 'w': writer.writeheader()
@@ -150,67 +181,38 @@ def crawl():
                 
             base_url = match.group(1)
             
-            page = 1
+            # Last page found by probing, then list pages LIST_WORKERS at a time, in page order
+            pager = PageUrlPaginator(f"{base_url}-{{page}}.html", fetch_list, list_entries,
+                                     max_pages=MAX_PAGES_PER_TOPIC, workers=LIST_WORKERS)
+            try:
+                print(f"  {pager.last_page()} pages ({pager.requests} requests to find the end)")
+            except ProbeError as e:
+                print(f"  Skipping {topic_name}: {e}")
+                continue
             items_fetched = 0
             
-            while page <= MAX_PAGES_PER_TOPIC and items_fetched < MAX_ITEMS_PER_TOPIC:
-                visit_url = f"{base_url}-{page}.html"
-                print(f"  Fetching {visit_url}")
-                
-                try:
-                    resp = session.get(visit_url, verify=False, timeout=20)
-                    if resp.status_code != 200:
-                        print(f"    Page {page} failed or ended (Status {resp.status_code})")
-                        break
-                        
-                    soup = BeautifulSoup(resp.content, 'html.parser')
-                    
-                    # Find articles
-                    # Selector from browser inspection: div.article-right.show-left (container?)
-                    # Let's try to find the list items. Usually class "news-item" or similar.
-                    # Re-inspecting provided output:
-                    # Found "article-title common-title"
-                    
-                    articles = soup.select('div.item-new') # Common structure?
-                    if not articles:
-                        # Try finding titles directly and getting parent
-                        titles = soup.select('a.article-title')
-                        if not titles:
-                            print("    No articles found on page.")
-                            break
-                        articles = [t.find_parent('div') for t in titles] # Heuristic
+            for page, entries in pager:
+                if items_fetched >= MAX_ITEMS_PER_TOPIC:
+                    break
+                if entries is None:
+                    print(f"    Page {page} failed to load.")
+                    continue
+                if not entries:
+                    print(f"    Page {page} has no articles.")
+                    break
                     
-                    if not articles:
-                        print("    No article containers found.")
-                        break
-                        
+                try:
                     new_items_on_page = 0
-                    for art in articles:
-                        # Title
-                        title_tag = art.select_one('a.article-title')
-                        if not title_tag: continue
-                        
-                        title = clean_text(title_tag.get_text())
-                        link = title_tag.get('href')
-                        if not link: continue
-                        
-                        # Absolutize link
-                        if not link.startswith('http'):
-                            link = "https://hungyen.gov.vn" + link
-                            
+                    pending = []
+                    for link, title, summary, public_time in entries:
                         if link in seen_urls: continue
-                        
-                        # Summary
-                        summary_tag = art.select_one('div.article-brief')
-                        summary = clean_text(summary_tag.get_text()) if summary_tag else ""
-                        
-                        # Date
-                        date_tag = art.select_one('span.article-date')
-                        # Sometimes date is text node
-                        public_time = clean_text(date_tag.get_text()) if date_tag else ""
-                        
-                        # Detail Page
-                        content, keywords, detailed_time, detail_summary = get_detail_content(link)
+                        seen_urls.add(link)
+                        pending.append((link, title, summary, public_time))
+                    
+                    # Detail Pages (fetched concurrently)
+                    details = engine.map(get_detail_content, [p[0] for p in pending])
+                    for (link, title, summary, public_time), detail in zip(pending, details):
+                        content, keywords, detailed_time, detail_summary = detail or ("", "", "", "")
                         
                         # Use detailed time if available
                         final_time = detailed_time if detailed_time else public_time
@@ -231,26 +233,18 @@ def crawl():
                         }
                         
                         writer.writerow(row)
-                        seen_urls.add(link)
+                        seen_urls.record(link)
                         new_items_on_page += 1
                         items_fetched += 1
                     
                     f.flush()
                     print(f"    Saved {new_items_on_page} items on page {page}.")
                     
-                    if new_items_on_page == 0:
-                        print("    No new items found on page, likely duplicate or empty.")
-                        # Check if we should stop? Maybe just continue if it's overlap
-                        # If page has 0 articles extracted, we break
-                        if not soup.select('a.article-title'):
-                            break
-                    
-                    page += 1
-                    time.sleep(1)
-                    
                 except Exception as e:
                     print(f"    Error on page {page}: {e}")
                     break
 
+    seen_urls.close()
+
 if __name__ == "__main__":
     crawl()
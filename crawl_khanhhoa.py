@@ -1,22 +1,29 @@
 
-import requests
-from bs4 import BeautifulSoup
+from html_backend import make_soup
 import csv
 import urllib3
 import re
 from urllib.parse import urljoin
-import time
 import os
 import html
+import threading
+from transport import make_session
+from frontier import Frontier
+from webforms import paginate_topics
 
 urllib3.disable_warnings()
 
+write_lock = threading.Lock() # Topics save from parallel threads into one CSV
+
 # Configuration
 OUTPUT_FILE = 'khanhhoa_data_final.csv'
 BASE_URL = 'https://khanhhoa.gov.vn'
 MAX_PAGES = 5 # Adjust as needed, usually user cleans afterwards? Or unlimited?
 # Let's set a safe limit or loop until end. User didn't specify limit. 50 is common.
 MAX_PAGES = 20 
+PAGE_WINDOW = 4 # List pages posted at once from one cached viewstate
+TOPIC_WORKERS = 3 # Topics paginating in parallel sessions
+RESUME = True # Continue each topic after its last completed page (False re-walks from page 1, done URLs are still skipped)
 
 TOPICS = [
     ("Lanh Dao Tinh", "https://khanhhoa.gov.vn/vi/tin-hoat-dong-cua-lanh-dao-tinh"),
@@ -58,13 +65,28 @@ def clean_text(text):
     text = re.sub(r'\s+', ' ', text).strip()
     return text
 
+# Detail pages share one keep-alive session (and land in the raw-HTML archive)
+detail_session = make_session(headers=HEADERS)
+
 def get_detail(url):
     try:
-        resp = requests.get(url, verify=False, headers=HEADERS, timeout=20)
+        resp = detail_session.get(url, verify=False, timeout=20)
         if resp.status_code != 200:
             return None
+        return extract_article(resp.content, url)
         
-        soup = BeautifulSoup(resp.content, 'html.parser')
+    except Exception as e:
+        print(f"Error extracting detail {url}: {e}")
+        return None
+
+def extract_article(page, url, topic=""):
+    """
+    Builds the row from a detail page; `page` is the raw bytes (bs4 sniffs the
+    charset) or already decoded text. No network access, used by reextract.py too.
+    """
+    page_text = page if isinstance(page, str) else page.decode("utf-8", errors="replace")
+    try:
+        soup = make_soup(page)
         
         # 1. Title: .title-article, h1, or <title>
         title = ""
@@ -77,7 +99,7 @@ def get_detail(url):
 
         if not title:
             # Fallback: Extract from script tag using regex
-            match = re.search(r"['\"]og:title['\"]\s*[:=]\s*['\"](.*?)['\"]", resp.text)
+            match = re.search(r"['\"]og:title['\"]\s*[:=]\s*['\"](.*?)['\"]", page_text)
             if match:
                 title = clean_text(match.group(1))
             
@@ -106,7 +128,7 @@ def get_detail(url):
         if not summary:
             # Fallback: Extract from script tag using regex
             # matches 'og:description': '...' or "description": "..."
-            match = re.search(r"['\"](?:og:)?description['\"]\s*[:=]\s*['\"](.*?)['\"]", resp.text)
+            match = re.search(r"['\"](?:og:)?description['\"]\s*[:=]\s*['\"](.*?)['\"]", page_text)
             if match:
                 summary = clean_text(match.group(1))
             
@@ -162,6 +184,7 @@ def get_detail(url):
             content = clean_text(content_div.get_text(separator=' ', strip=True))
             
         return {
+            "topic": topic,
             "title": title,
             "summary": summary,
             "url": canonical,
@@ -174,155 +197,162 @@ def get_detail(url):
         print(f"Error extracting detail {url}: {e}")
         return None
 
-def crawl():
-    # Init file
-    with open(OUTPUT_FILE, 'w', encoding='utf-8-sig', newline='') as f:
+def save_articles(links, topic_name, frontier):
+    """Fetches and appends articles one by one; each URL is marked in the frontier after its row is flushed."""
+    count_saved = 0
+    with open(OUTPUT_FILE, 'a', encoding='utf-8-sig', newline='') as f:
         writer = csv.DictWriter(f, fieldnames=["topic", "title", "summary", "url", "keywords", "public_time", "content"])
-        writer.writeheader()
-
-    seen_urls = set()
+        for link in links:
+            frontier.start([link])
+            written = False
+            # We only crawl if it looks like an article
+            data = get_detail(link)
+            if data and data['content']:
+                # Title is important
+                if not data['title']:
+                    # Try fallback if still empty
+                    pass
+                
+                # Filter: Must have title, content AND summary
+                if data['title'] and data['summary']:
+                    data['topic'] = topic_name
+                    with write_lock:
+                        writer.writerow(data)
+                        f.flush()
+                    written = True
+                    count_saved += 1
+                    # Print more info to verify quality
+                    print(f"      Saved: {data['title'][:40]}... (Summ len: {len(data['summary'])})")
+                else:
+                    if not data['summary']:
+                        print(f"      Skipped (No summary): {data['title'][:40]}...")
+                    elif not data['title']:
+                        print(f"      Skipped (No title): {link}")
+            else:
+                # Might be a category link or irrelevant
+                pass
+            frontier.finish([link], [written])
+    return count_saved
 
-    for topic_name, topic_url in TOPICS:
-        print(f"--- Crawling Topic: {topic_name} ---")
+def crawl_topic(pager, topic_name, topic_url, frontier, seen_urls):
+    last_page, cursor, finished = frontier.resume(topic_name)
+    if finished:
+        print(f"  [{topic_name}] Finished in a previous run. Skipping.")
+        return
+    
+    # Articles discovered before a crash but never written
+    leftover = frontier.unfinished(topic_name)
+    if leftover:
+        print(f"  [{topic_name}] Resuming {len(leftover)} unfinished articles.")
+        save_articles(leftover, topic_name, frontier)
+    
+    def save_page(soup, current_page):
+        """Saves one list page's new articles; False when the topic has run out of pages."""
+        print(f"  [{topic_name}] Processing Page {current_page}...")
         
-        session = requests.Session()
-        session.headers.update(HEADERS)
+        # Extract Links
+        # Selector inference: usually generic link in main container. 
+        # Let's target links that look like article links (have IDs or .html) or are within a list structure.
+        # Assuming generic list or based on observation 'tin-hoat-dong-cua-lanh-dao-tinh' path segments
         
-        # Initial Request
-        try:
-            resp = session.get(topic_url, verify=False, timeout=20)
-            soup = BeautifulSoup(resp.content, 'html.parser')
+        # Inspect soup for article links. 
+        # We can filter by URL pattern: typically /vi/.../something-article-slug
+        # Avoiding pagination links (javascript:...) and category links
+        
+        anchors = soup.find_all("a", href=True)
+        page_links = []
+        for a in anchors:
+            href = a['href']
+            full_url = urljoin(topic_url, href)
             
-            current_page = 1
+            if "javascript:" in href: continue
             
-            while current_page <= MAX_PAGES:
-                print(f"  Processing Page {current_page}...")
-                
-                # Extract Links
-                # Selector inference: usually generic link in main container. 
-                # Let's target links that look like article links (have IDs or .html) or are within a list structure.
-                # Assuming generic list or based on observation 'tin-hoat-dong-cua-lanh-dao-tinh' path segments
-                
-                links_found = 0
-                # Inspect soup for article links. 
-                # We can filter by URL pattern: typically /vi/.../something-article-slug
-                # Avoiding pagination links (javascript:...) and category links
-                
-                anchors = soup.find_all("a", href=True)
-                page_links = []
-                for a in anchors:
-                    href = a['href']
-                    full_url = urljoin(resp.url, href)
-                    
-                    if "javascript:" in href: continue
-                    
-                    # Basic check for article URLs (deep path or .html)
-                    # And match topic path if possible
-                    is_valid = Topic_Url_Base_Check(full_url, topic_url)
-                    
-                    if is_valid: 
-                        if full_url not in seen_urls and len(href) > 20:
-                            page_links.append(full_url)
-                
-                # Filter unique on page
-                unique_page_links = []
-                for link in page_links:
-                     if link not in unique_page_links:
-                         unique_page_links.append(link)
-                
-                print(f"    Found {len(unique_page_links)} new articles.")
-                
-                count_saved = 0
-                with open(OUTPUT_FILE, 'a', encoding='utf-8-sig', newline='') as f:
-                    writer = csv.DictWriter(f, fieldnames=["topic", "title", "summary", "url", "keywords", "public_time", "content"])
-                    for link in unique_page_links:
-                        if link in seen_urls: continue
-                        
-                        seen_urls.add(link)
-                        # We only crawl if it looks like an article
-                        data = get_detail(link)
-                        if data and data['content']:
-                            # Title is important
-                            if not data['title']:
-                                # Try fallback if still empty
-                                pass
-                            
-                            # Filter: Must have title, content AND summary
-                            if data['title'] and data['summary']:
-                                data['topic'] = topic_name
-                                writer.writerow(data)
-                                count_saved += 1
-                                # Print more info to verify quality
-                                print(f"      Saved: {data['title'][:40]}... (Summ len: {len(data['summary'])})")
-                            else:
-                                if not data['summary']:
-                                    print(f"      Skipped (No summary): {data['title'][:40]}...")
-                                elif not data['title']:
-                                    print(f"      Skipped (No title): {link}")
-                        else:
-                            # Might be a category link or irrelevant
-                            pass
-                            
-                if count_saved == 0 and len(unique_page_links) == 0:
-                     print("    No links found. Stopping topic.")
-                     break
-                
-                # Pagination Logic (PostBack)
-                # Find Link for Next Page (Current + 1)
-                next_page_num = current_page + 1
-                
-                # Look for <a> with text == str(next_page_num) or title="Next" etc.
-                # Note: The visible text might be "2", "3", etc.
-                target_link = None
-                
-                # Find by exact text
-                pager_link = soup.find('a', string=str(next_page_num))
-                if not pager_link:
-                    # Maybe it's "..." or "Next" or ">"
-                    # But reliable way is number. If not found, maybe we reached end of visible range?
-                    pass
-                
-                if pager_link and 'javascript:__doPostBack' in pager_link.get('href', ''):
-                    target_link = pager_link
-                
-                if not target_link:
-                    print(f"    Pagination link for page {next_page_num} not found. Stopping.")
-                    break
-                    
-                # Extract PostBack params
-                href = target_link['href']
-                # format: javascript:__doPostBack('TARGET','ARGUMENT')
-                match = re.search(r"__doPostBack\('([^']+)','([^']*)'\)", href)
-                if not match:
-                    break
-                    
-                event_target = match.group(1)
-                event_argument = match.group(2)
-                
-                viewstate = soup.find(id="__VIEWSTATE")['value']
-                viewstategenerator = soup.find(id="__VIEWSTATEGENERATOR")
-                eventvalidation = soup.find(id="__EVENTVALIDATION")
-                
-                payload = {
-                    '__EVENTTARGET': event_target,
-                    '__EVENTARGUMENT': event_argument,
-                    '__VIEWSTATE': viewstate,
-                    '__VIEWSTATEGENERATOR': viewstategenerator['value'] if viewstategenerator else '',
-                    '__EVENTVALIDATION': eventvalidation['value'] if eventvalidation else ''
-                }
-                
-                # Post
-                try:
-                    p_resp = session.post(topic_url, data=payload, verify=False, timeout=20)
-                    soup = BeautifulSoup(p_resp.content, 'html.parser')
-                    current_page += 1
-                    time.sleep(1)
-                except Exception as e:
-                    print(f"    Pagination Error: {e}")
-                    break
+            # Basic check for article URLs (deep path or .html)
+            # And match topic path if possible
+            is_valid = Topic_Url_Base_Check(full_url, topic_url)
+            
+            if is_valid: 
+                if full_url not in seen_urls and len(href) > 20:
+                    page_links.append(full_url)
+        
+        # Filter unique on page
+        unique_page_links = []
+        for link in page_links:
+             if link not in unique_page_links:
+                 unique_page_links.append(link)
+        
+        print(f"    [{topic_name}] Found {len(unique_page_links)} new articles.")
+        
+        new_links = [link for link in unique_page_links if link not in seen_urls]
+        seen_urls.update(new_links)
+        frontier.add(new_links, topic_name)
+        count_saved = save_articles(new_links, topic_name, frontier)
                     
+        # The page interrupted by a crash only holds the leftover articles
+        if count_saved == 0 and len(unique_page_links) == 0 and not (leftover and current_page == last_page + 1):
+             print(f"    [{topic_name}] No links found. Stopping topic.")
+             return False
+        return True
+    
+    # Initial Request
+    soup = None
+    current_page = 1
+    if cursor:
+        # cursor is the postback that opens the page after the last completed one
+        try:
+            soup = pager.open(cursor, last_page + 1)
+            current_page = last_page + 1
+            print(f"  [{topic_name}] Resuming at page {current_page}.")
         except Exception as e:
-            print(f"  Error on topic {topic_name}: {e}")
+            print(f"  [{topic_name}] Could not resume at page {last_page + 1} ({e}). Starting over.")
+    if soup is None:
+        soup = pager.open()
+    
+    # Pages come in windows: every page the current pager links to is posted
+    # at once from the same cached viewstate, instead of one postback at a time
+    completed = False
+    failed_posts = pager.failed_posts  # A failed resume postback above does not count
+    for current_page, soup in pager.walk(soup, MAX_PAGES, PAGE_WINDOW):
+        if not save_page(soup, current_page):
+            completed = True
+            break
+        frontier.page_done(topic_name, current_page, pager.cursor(current_page + 1))
+    else:
+        if pager.failed_posts > failed_posts:
+            # Not the end of the list: the saved cursor resumes after the last completed page next run
+            print(f"    [{topic_name}] Postback for page {current_page + 1} failed. Will resume there next run.")
+        elif current_page < MAX_PAGES:
+            print(f"    [{topic_name}] Pagination link for page {current_page + 1} not found. Stopping.")
+            completed = True
+        else:
+            completed = True  # MAX_PAGES reached
+    
+    if completed:
+        frontier.topic_done(topic_name)
+
+def crawl():
+    frontier = Frontier("khanhhoa")
+    if not RESUME:
+        frontier.reset_topics()
+
+    # Init file (header only once: earlier runs are kept and resumed)
+    if not os.path.exists(OUTPUT_FILE):
+        with open(OUTPUT_FILE, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=["topic", "title", "summary", "url", "keywords", "public_time", "content"])
+            writer.writeheader()
+
+    seen_urls = frontier.known_urls()
+    print(f"Frontier: {len(seen_urls)} known URLs.")
+
+    # Several topics paginate at once, each on its own session and viewstate cache
+    paginate_topics(
+        TOPICS,
+        lambda pager, topic_name, topic_url: crawl_topic(pager, topic_name, topic_url, frontier, seen_urls),
+        workers=TOPIC_WORKERS, headers=HEADERS,
+    )
+
+    print(f"Frontier: {frontier.counts()}")
+    frontier.close()
 
 def Topic_Url_Base_Check(full_url, topic_url):
     # Determine if link belongs to sub-path of website, roughly
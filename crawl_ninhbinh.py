@@ -1,17 +1,18 @@
 import csv
-import time
 import os
 import re
-import requests
-from bs4 import BeautifulSoup
+from html_backend import make_soup
 import urllib3
 from urllib.parse import urljoin, urlparse
+from transport import make_session
+from frontier import Frontier
 
 urllib3.disable_warnings()
 
 # --- Configuration ---
 OUTPUT_FILE = "ninhbinh_data_final.csv"
 MAX_PAGES_PER_TOPIC = 50
+RESUME = True # Continue each topic after its last completed page (False re-walks from page 1, done URLs are still skipped)
 
 
 # Topics
@@ -30,6 +31,7 @@ TOPICS = [
 headers = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36'
 }
+session = make_session(headers=headers)
 
 def clean_text(text):
     if not text: return ""
@@ -39,11 +41,11 @@ def clean_text(text):
 
 def get_detail_content(url):
     try:
-        resp = requests.get(url, verify=False, timeout=20, headers=headers)
+        resp = session.get(url, verify=False, timeout=20)
         if resp.status_code != 200:
             return "", "", "", "", ""
             
-        soup = BeautifulSoup(resp.content, 'html.parser')
+        soup = make_soup(resp.content)
         
         # Detail Selectors
         # Title: .ArticleHeader
@@ -123,149 +125,186 @@ def get_detail_content(url):
         print(f"    Error detail {url}: {e}")
         return "", "", "", "", ""
 
+FIELDNAMES = ["topic", "title", "summary", "url", "keywords", "public_time", "content"]
+
+def save_articles(links, topic_name, frontier, global_seen):
+    """Fetches and appends each unseen article, recording it in the frontier right after the row is flushed."""
+    saved = 0
+    new_links = [link for link in links if link not in global_seen]
+    frontier.add(new_links, topic_name)
+    with open(OUTPUT_FILE, "a", encoding="utf-8-sig", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+        for link in new_links:
+            frontier.start([link])
+            title, summary, keywords, public_time, content = get_detail_content(link)
+            if title and content:
+                writer.writerow({
+                    "topic": topic_name, "title": title, "summary": summary,
+                    "url": link, "keywords": keywords, "public_time": public_time, "content": content
+                })
+                f.flush()
+                global_seen.add(link)
+                saved += 1
+            frontier.finish([link], [title and content])
+    return saved
+
 def crawl():
-    seen_urls = set()
+    frontier = Frontier("ninhbinh")
+    if not RESUME:
+        frontier.reset_topics()
     
-    # Init file (overwrite)
-    with open(OUTPUT_FILE, "w", encoding="utf-8-sig", newline="") as f:
-        fieldnames = ["topic", "title", "summary", "url", "keywords", "public_time", "content"]
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
+    # Init file (header only once: earlier runs are kept and resumed)
+    if not os.path.exists(OUTPUT_FILE):
+        with open(OUTPUT_FILE, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+            writer.writeheader()
         
-    global_seen = set()
+    global_seen = frontier.known_urls()
+    print(f"Frontier: {len(global_seen)} known URLs.")
     
     for topic_name, topic_url in TOPICS:
         print(f"--- Processing {topic_name} ---")
+        last_page, cursor, finished = frontier.resume(topic_name)
+        if finished:
+            print("  Finished in a previous run. Skipping.")
+            continue
+        
+        # Articles discovered before a crash but never written
+        leftover = frontier.unfinished(topic_name)
+        if leftover:
+            print(f"  Resuming {len(leftover)} unfinished articles.")
+            global_seen.difference_update(leftover)
+            save_articles(leftover, topic_name, frontier, global_seen)
+        
         try:
-            # 1. Fetch First Page (GET) & Extract IDs
-            resp = requests.get(topic_url, verify=False, timeout=20, headers=headers)
-            if resp.status_code != 200:
-                print(f"  Failed to load list page {topic_url}")
-                continue
+            if cursor:
+                article_category_id, site_id, base_domain = cursor["article_category_id"], cursor["site_id"], cursor["base_domain"]
+                print(f"  Resuming after page {last_page} - Category: {article_category_id}, Site: {site_id}")
+            else:
+                # 1. Fetch First Page (GET) & Extract IDs
+                resp = session.get(topic_url, verify=False, timeout=20)
+                if resp.status_code != 200:
+                    print(f"  Failed to load list page {topic_url}")
+                    continue
+                    
+                content_text = resp.text
+                soup = make_soup(content_text)
                 
-            content_text = resp.text
-            soup = BeautifulSoup(content_text, 'html.parser')
-            
-            # Extract IDs for pagination
-            # Look for regex patterns for article_category_id and site_id
-            cat_id_match = re.search(r'article_category_id\s*[:=]\s*["\']?(\d+)["\']?', content_text, re.IGNORECASE)
-            site_id_match = re.search(r'site_id\s*[:=]\s*["\']?(\d+)["\']?', content_text, re.IGNORECASE)
-            
-            article_category_id = cat_id_match.group(1) if cat_id_match else None
-            site_id = site_id_match.group(1) if site_id_match else None
-            
-            print(f"  Detected IDs - Category: {article_category_id}, Site: {site_id}")
-            
-            # Process Page 1 Articles (from static HTML)
-            current_page_urls = []
-            parsed_topic_url = urlparse(topic_url)
-            base_domain = f"{parsed_topic_url.scheme}://{parsed_topic_url.netloc}"
-            
-            # Selectors
-            containers = soup.select(".UIListNews_Default .item a") + soup.select(".list-news .item a")
-            if not containers: containers = soup.find_all("a")
-            
-            for a in containers:
-                href = a.get('href')
-                if not href: continue
-                full_url = urljoin(base_domain, href)
-                 # Filter: match article ID pattern or html
-                if re.search(r'(-\d+|\.html)$', full_url.split('?')[0]) and len(full_url) > 30 and full_url not in global_seen:
-                    if full_url not in current_page_urls:
-                        current_page_urls.append(full_url)
+                # Extract IDs for pagination
+                # Look for regex patterns for article_category_id and site_id
+                cat_id_match = re.search(r'article_category_id\s*[:=]\s*["\']?(\d+)["\']?', content_text, re.IGNORECASE)
+                site_id_match = re.search(r'site_id\s*[:=]\s*["\']?(\d+)["\']?', content_text, re.IGNORECASE)
+                
+                article_category_id = cat_id_match.group(1) if cat_id_match else None
+                site_id = site_id_match.group(1) if site_id_match else None
+                
+                print(f"  Detected IDs - Category: {article_category_id}, Site: {site_id}")
+                
+                # Process Page 1 Articles (from static HTML)
+                current_page_urls = []
+                parsed_topic_url = urlparse(topic_url)
+                base_domain = f"{parsed_topic_url.scheme}://{parsed_topic_url.netloc}"
+                
+                # Selectors
+                containers = soup.select(".UIListNews_Default .item a") + soup.select(".list-news .item a")
+                if not containers: containers = soup.find_all("a")
+                
+                for a in containers:
+                    href = a.get('href')
+                    if not href: continue
+                    full_url = urljoin(base_domain, href)
+                     # Filter: match article ID pattern or html
+                    if re.search(r'(-\d+|\.html)$', full_url.split('?')[0]) and len(full_url) > 30 and full_url not in global_seen:
+                        if full_url not in current_page_urls:
+                            current_page_urls.append(full_url)
+                
+                print(f"  Page 1: Found {len(current_page_urls)} articles.")
+                
+                # Save Page 1
+                save_articles(current_page_urls, topic_name, frontier, global_seen)
+                last_page = 1
+                frontier.page_done(topic_name, 1, {
+                    "article_category_id": article_category_id, "site_id": site_id, "base_domain": base_domain
+                })
             
-            print(f"  Page 1: Found {len(current_page_urls)} articles.")
+            # 2. Pagination Loop (POST)
+            if not (article_category_id and site_id):
+                frontier.topic_done(topic_name)
+                continue
             
-            # Save Page 1
-            with open(OUTPUT_FILE, "a", encoding="utf-8-sig", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                for link in current_page_urls:
-                    if link in global_seen: continue
-                    title, summary, keywords, public_time, content = get_detail_content(link)
-                    if title and content:
-                        writer.writerow({
-                            "topic": topic_name, "title": title, "summary": summary,
-                            "url": link, "keywords": keywords, "public_time": public_time, "content": content
-                        })
-                        global_seen.add(link)
+            api_url = f"{base_domain}/DesktopModule/UIArticleInMenu/ArticleInMenuPagination.aspx/LoadArticle"
+            completed = True
             
-            # 2. Pagination Loop (POST)
-            if article_category_id and site_id:
-                api_url = f"{base_domain}/DesktopModule/UIArticleInMenu/ArticleInMenuPagination.aspx/LoadArticle"
+            # Pages after the last completed one, up to MAX
+            for page in range(last_page + 1, MAX_PAGES_PER_TOPIC + 1):
+                print(f"  Fetching Page {page} via API...")
+                # Payload
+                payload = {
+                    "article_category_id": article_category_id,
+                    "site_id": site_id,
+                    "page": page,
+                    "page_size": 15, # Default usually 10-15
+                    "keyword": "", "date_begin": "", "date_end": "",
+                    "show_no": "False", "show_post_date": "False", "num_of_text": 0,
+                    "show_view_count": "False", "filter_order_in_list": "False",
+                    "is_default": "False", "new": "False", "number_of_day": 3, "no": -5,
+                    "lang": "vi-VN"
+                }
                 
-                # Pages 2 to MAX
-                for page in range(2, MAX_PAGES_PER_TOPIC + 1):
-                    print(f"  Fetching Page {page} via API...")
-                    # Payload
-                    payload = {
-                        "article_category_id": article_category_id,
-                        "site_id": site_id,
-                        "page": page,
-                        "page_size": 15, # Default usually 10-15
-                        "keyword": "", "date_begin": "", "date_end": "",
-                        "show_no": "False", "show_post_date": "False", "num_of_text": 0,
-                        "show_view_count": "False", "filter_order_in_list": "False",
-                        "is_default": "False", "new": "False", "number_of_day": 3, "no": -5,
-                        "lang": "vi-VN"
-                    }
-                    
-                    try:
-                        p_resp = requests.post(api_url, data=payload, verify=False, headers=headers, timeout=20)
-                        if p_resp.status_code != 200:
-                            print(f"    API Error {p_resp.status_code}")
-                            break
-                            
-                        # Response is HTML fragment
-                        p_soup = BeautifulSoup(p_resp.content, 'html.parser')
-                        p_links = []
-                        
-                        # Extract links from fragment
-                        # Fragment usually contains just list items
-                        p_containers = p_soup.find_all("a")
-                        
-                        for a in p_containers:
-                            href = a.get('href')
-                            if not href: continue
-                            full_url = urljoin(base_domain, href)
-                            if re.search(r'(-\d+|\.html)$', full_url.split('?')[0]) and len(full_url) > 30:
-                                if full_url not in p_links:
-                                    p_links.append(full_url)
-                        
-                        if not p_links:
-                            print("    No articles found on this page. End of topic.")
-                            break
-                            
-                        print(f"    Found {len(p_links)} new articles.")
-                        
-                        # Save
-                        new_on_page = 0
-                        with open(OUTPUT_FILE, "a", encoding="utf-8-sig", newline="") as f:
-                            writer = csv.DictWriter(f, fieldnames=fieldnames)
-                            for link in p_links:
-                                if link in global_seen: continue
-                                title, summary, keywords, public_time, content = get_detail_content(link)
-                                if title and content:
-                                    writer.writerow({
-                                        "topic": topic_name, "title": title, "summary": summary,
-                                        "url": link, "keywords": keywords, "public_time": public_time, "content": content
-                                    })
-                                    global_seen.add(link)
-                                    new_on_page += 1
-                        
-                        print(f"    Saved {new_on_page} items.")
-                        if new_on_page == 0:
-                             # If we found links but all were seen, probably overlapping or done
-                             # But let's check duplicates
-                             pass
-                            
-                        time.sleep(1)
+                try:
+                    p_resp = session.post(api_url, data=payload, verify=False, timeout=20)
+                    if p_resp.status_code != 200:
+                        print(f"    API Error {p_resp.status_code}")
+                        completed = False
+                        break
                         
-                    except Exception as e:
-                        print(f"    Error on page {page}: {e}")
+                    # Response is HTML fragment
+                    p_soup = make_soup(p_resp.content)
+                    p_links = []
+                    
+                    # Extract links from fragment
+                    # Fragment usually contains just list items
+                    p_containers = p_soup.find_all("a")
+                    
+                    for a in p_containers:
+                        href = a.get('href')
+                        if not href: continue
+                        full_url = urljoin(base_domain, href)
+                        if re.search(r'(-\d+|\.html)$', full_url.split('?')[0]) and len(full_url) > 30:
+                            if full_url not in p_links:
+                                p_links.append(full_url)
+                    
+                    if not p_links:
+                        print("    No articles found on this page. End of topic.")
                         break
+                        
+                    print(f"    Found {len(p_links)} new articles.")
+                    
+                    # Save
+                    new_on_page = save_articles(p_links, topic_name, frontier, global_seen)
+                    
+                    print(f"    Saved {new_on_page} items.")
+                    frontier.page_done(topic_name, page, {
+                        "article_category_id": article_category_id, "site_id": site_id, "base_domain": base_domain
+                    })
+                    if new_on_page == 0:
+                         # If we found links but all were seen, probably overlapping or done
+                         # But let's check duplicates
+                         pass
+                    
+                except Exception as e:
+                    print(f"    Error on page {page}: {e}")
+                    completed = False
+                    break
+            
+            if completed:
+                frontier.topic_done(topic_name)
 
         except Exception as e:
             print(f"  Error processing topic {topic_name}: {e}")
 
+    print(f"Frontier: {frontier.counts()}")
+    frontier.close()
+
 if __name__ == "__main__":
     crawl()
@@ -1,11 +1,13 @@
-import requests
+import os
 import csv
 import re
-import time
 import html
 import urllib3
-from bs4 import BeautifulSoup
+from html_backend import make_soup
 from urllib.parse import urljoin
+from fetch_engine import FetchEngine
+from frontier import Frontier
+from transport import make_session
 
 # Tắt cảnh báo SSL
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -14,7 +16,8 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 BASE_URL = "https://sonla.gov.vn"
 OUTPUT_FILE = "sonla_data_final.csv"
 MAX_PAGES_PER_TOPIC = 5000 
-SLEEP = 0.5
+CONCURRENCY = 8 # Detail pages in flight at once (pacing comes from rate_limiter.PORTAL_LIMITS)
+RESUME = True # Tiếp tục mỗi mục từ trang cuối đã hoàn thành (False: đi lại từ trang 1, URL đã xong vẫn được bỏ qua)
 
 CATEGORIES = {
     "Chính trị": "https://sonla.gov.vn/tin-chinh-tri",
@@ -31,7 +34,7 @@ CATEGORIES = {
     "Đối ngoại": "https://sonla.gov.vn/doi-ngoai-nhan-dan"
 }
 
-session = requests.Session()
+session = make_session()
 session.headers.update({
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
 })
@@ -58,7 +61,7 @@ def parse_article(url, topic):
     try:
         resp = session.get(url, timeout=20, verify=False)
         if resp.status_code != 200: return None
-        soup = BeautifulSoup(resp.text, "html.parser")
+        soup = make_soup(resp.text)
         
         # 1. Tiêu đề - Prioritize .ArticleHeader
         title_tag = soup.select_one(".ArticleHeader, .title-news, h1")
@@ -140,43 +143,74 @@ def extract_article_links(soup, seen_urls):
 
 # ================= HÀM MAIN VỚI CƠ CHẾ PHÂN TRANG =================
 def main():
-    seen_urls = set()
+    frontier = Frontier("sonla")
+    seen_urls = frontier.known_urls()
     print("--- BẮT ĐẦU CÀO SƠN LA ---")
+    print(f"Đã có {len(seen_urls)} URL trong frontier.")
+    if not RESUME:
+        frontier.reset_topics()
 
-    with open(OUTPUT_FILE, "w", newline="", encoding="utf-8-sig") as f:
+    # Ghi nối tiếp: tiến độ lần chạy trước được giữ lại
+    write_header = not os.path.exists(OUTPUT_FILE)
+    with open(OUTPUT_FILE, "a", newline="", encoding="utf-8-sig") as f, \
+         FetchEngine(per_host=CONCURRENCY) as engine:
         writer = csv.DictWriter(f, fieldnames=["topic", "title", "summary", "url", "keywords", "public_time", "content"])
-        writer.writeheader()
+        if write_header:
+            writer.writeheader()
+
+        def crawl_links(links, topic):
+            # Ghi và flush CSV trước, rồi mới đánh dấu done trong frontier
+            frontier.start(links)
+            results = engine.map(parse_article, links, topic)
+            written = []
+            for data in results:
+                keep = bool(data and data["title"]) # Basic validation
+                if keep:
+                    writer.writerow(data)
+                written.append(keep)
+            f.flush()
+            frontier.finish(links, written)  # Chỉ URL đã ghi mới là done
+            return sum(written)
 
         for topic, start_url in CATEGORIES.items():
             print(f"\n[MỤC]: {topic}")
-            current_page = 1
-            target_url = start_url
+            last_page, cursor, finished = frontier.resume(topic)
+            if finished:
+                print("  Đã hoàn thành ở lần chạy trước. Bỏ qua.")
+                continue
+
+            # Bài đã phát hiện nhưng chưa ghi trước khi bị dừng
+            leftover = frontier.unfinished(topic)
+            if leftover:
+                print(f"  Tiếp tục {len(leftover)} bài dang dở.")
+                crawl_links(leftover, topic)
+
+            current_page = last_page + 1
+            target_url = cursor or start_url
+            if cursor:
+                print(f"  Tiếp tục từ trang {current_page}: {target_url}")
+            completed = False
             
             while current_page <= MAX_PAGES_PER_TOPIC:
                 print(f"  > Đang xử lý Trang {current_page}: {target_url}", end="\r")
                 
                 try:
                     resp = session.get(target_url, timeout=30, verify=False)
-                    soup = BeautifulSoup(resp.text, "html.parser")
+                    soup = make_soup(resp.text)
                     
                     # 1. Lấy link bài viết
                     links = extract_article_links(soup, seen_urls)
                     
                     if not links:
                         print(f"\n  ! Không thấy bài viết mới ở trang {current_page}. Thử tìm trang tiếp...", flush=True)
-                        with open("debug_empty_page_v2.html", "w", encoding="utf-8") as f:
-                            f.write(resp.text)
+                        with open("debug_empty_page_v2.html", "w", encoding="utf-8") as dbg:
+                            dbg.write(resp.text)
                         print(f"    DEBUG: Saved HTML of empty page to debug_empty_page_v2.html", flush=True)
                     
                     # 2. Cào từng bài
-                    count_in_page = 0
-                    for link in links:
-                        seen_urls.add(link)
-                        data = parse_article(link, topic)
-                        if data and data["title"]: # Basic validation
-                            writer.writerow(data)
-                            count_in_page += 1
-                        time.sleep(SLEEP)
+                    seen_urls.update(links)
+                    frontier.add(links, topic)
+                    count_in_page = crawl_links(links, topic)
                     
                     print(f"\n  v Hoàn thành trang {current_page} (Lấy được {count_in_page} bài).")
 
@@ -214,10 +248,12 @@ def main():
                              print(f"  x Link trang tiếp trùng trang hiện tại hoặc đã cào. Dừng.", flush=True)
                              break
                         
+                        frontier.page_done(topic, current_page, target_url)
                         current_page += 1
                         # print(f"    DEBUG: Next URL: {target_url}", flush=True)
                     else:
                         print(f"  x Không thấy nút trang tiếp hoặc link js. Kết thúc mục {topic}.\n", flush=True)
+                        completed = True
                         break
                         
                 except Exception as e:
@@ -226,6 +262,11 @@ def main():
                     traceback.print_exc()
                     break
 
+            if completed:
+                frontier.topic_done(topic)
+
+    print(f"\nFrontier: {frontier.counts()}")
+    frontier.close()
     print(f"\n--- HOÀN THÀNH! Dữ liệu tại: {OUTPUT_FILE} ---")
 
 if __name__ == "__main__":
@@ -1,21 +1,22 @@
 import csv
-import time
 import os
 import html
 import re
-import requests
-from bs4 import BeautifulSoup
-from selenium import webdriver
+from transport import make_session
+from html_backend import make_soup
+import threading
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from browser_pool import DriverPool, wait_for, click_and_wait
+from url_index import UrlIndex
 
 # --- Configuration ---
 BASE_URL = "https://sonla.gov.vn"
 OUTPUT_FILE = "sonla_data_final.csv"
 MAX_PAGES_PER_CATEGORY = 100  # Crawl deep
-SLEEP_TIME = 2
+LIST_LINKS = ".Title a, h2 a, h3 a, .title-news a, .ArticleInMenu a, .ArticleList a"
+
+# Categories are walked in parallel on the browser pool; rows are appended under this lock
+write_lock = threading.Lock()
 
 CATEGORIES = {
     "Chính trị": "https://sonla.gov.vn/tin-chinh-tri",
@@ -40,96 +41,71 @@ def clean_text(s):
     s = re.sub(r"[\x00-\x1f\x7f]", "", s)
     return re.sub(r"\s+", " ", s).strip()
 
-def init_driver():
-    chrome_options = Options()
-    chrome_options.add_argument("--headless") 
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    # Masking automation
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    chrome_options.add_experimental_option('useAutomationExtension', False)
-    
-    driver = webdriver.Chrome(options=chrome_options)
-    driver.set_page_load_timeout(60)
-    return driver
-
 def load_seen_urls(filepath):
-    seen = set()
-    if os.path.exists(filepath):
-        try:
-            with open(filepath, mode="r", encoding="utf-8-sig") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if "url" in row:
-                        seen.add(row["url"])
-        except Exception as e:
-            print(f"Error reading existing data: {e}")
-    return seen
+    # Sidecar URL index; only re-reads the CSV when the index is out of date
+    return UrlIndex(filepath)
 
-def extract_article_content(url, topic, retries=1):
-    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"}
-    for i in range(retries + 1):
-        try:
-            resp = requests.get(url, headers=headers, timeout=20, verify=False)
-            if resp.status_code != 200:
-                print(f"    Failed: {url} (Status: {resp.status_code})")
-                continue
-                
-            soup = BeautifulSoup(resp.text, "html.parser")
-            
-            result = {
-                "topic": topic, "title": "", "summary": "", "url": url,
-                "keywords": "", "public_time": "", "content": ""
-            }
+# Detail pages are plain HTML: one pooled keep-alive session, with retries and backoff from PoliteSession
+session = make_session(headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"})
 
-            # 1. Tiêu đề
-            title_tag = soup.select_one(".ArticleHeader, .title-news, h1")
-            if title_tag:
-                 result["title"] = clean_text(title_tag.get_text())
-            elif soup.find("meta", attrs={"name": "title"}):
-                 result["title"] = clean_text(soup.find("meta", attrs={"name": "title"}).get("content"))
+def extract_article_content(url, topic):
+    try:
+        resp = session.get(url, timeout=20, verify=False)
+        if resp.status_code != 200:
+            print(f"    Failed: {url} (Status: {resp.status_code})")
+            return None
             
-            # 2. Thời gian
-            time_tag = soup.select_one(".PostDate, .date, .time, .cms-date")
-            if time_tag: result["public_time"] = clean_text(time_tag.get_text())
+        soup = make_soup(resp.text)
+        
+        result = {
+            "topic": topic, "title": "", "summary": "", "url": url,
+            "keywords": "", "public_time": "", "content": ""
+        }
 
-            # 3. TÓM TẮT
-            summary_tag = soup.select_one(".ArticleSummary, .summary, .sapo")
-            if summary_tag: 
-                result["summary"] = clean_text(summary_tag.get_text())
-            if not result["summary"]:
-                meta_desc = soup.find("meta", attrs={"name": "description"})
-                if meta_desc: 
-                    desc = clean_text(meta_desc.get("content"))
-                    if "Cổng thông tin điện tử" not in desc:
-                        result["summary"] = desc
+        # 1. Tiêu đề
+        title_tag = soup.select_one(".ArticleHeader, .title-news, h1")
+        if title_tag:
+             result["title"] = clean_text(title_tag.get_text())
+        elif soup.find("meta", attrs={"name": "title"}):
+             result["title"] = clean_text(soup.find("meta", attrs={"name": "title"}).get("content"))
+        
+        # 2. Thời gian
+        time_tag = soup.select_one(".PostDate, .date, .time, .cms-date")
+        if time_tag: result["public_time"] = clean_text(time_tag.get_text())
 
-            # 4. KEYWORDS
-            meta_kw = soup.find("meta", attrs={"name": "keywords"})
-            if meta_kw: result["keywords"] = clean_text(meta_kw.get("content"))
+        # 3. TÓM TẮT
+        summary_tag = soup.select_one(".ArticleSummary, .summary, .sapo")
+        if summary_tag: 
+            result["summary"] = clean_text(summary_tag.get_text())
+        if not result["summary"]:
+            meta_desc = soup.find("meta", attrs={"name": "description"})
+            if meta_desc: 
+                desc = clean_text(meta_desc.get("content"))
+                if "Cổng thông tin điện tử" not in desc:
+                    result["summary"] = desc
 
-            # 5. Nội dung
-            content_div = soup.select_one(".ArticleContent, .journal-content-article, #content")
-            if content_div:
-                # Remove trash
-                for trash in content_div.select("script, style, .social-share, .tags, .rating, .tool, .related-news"):
-                    trash.decompose()
-                result["content"] = clean_text(content_div.get_text())
-            
-            return result
-        except Exception as e:
-            print(f"    Error extracting {url} (attempt {i+1}): {e}")
-            if i < retries: time.sleep(2)
-            else: return None
+        # 4. KEYWORDS
+        meta_kw = soup.find("meta", attrs={"name": "keywords"})
+        if meta_kw: result["keywords"] = clean_text(meta_kw.get("content"))
+
+        # 5. Nội dung
+        content_div = soup.select_one(".ArticleContent, .journal-content-article, #content")
+        if content_div:
+            # Remove trash
+            for trash in content_div.select("script, style, .social-share, .tags, .rating, .tool, .related-news"):
+                trash.decompose()
+            result["content"] = clean_text(content_div.get_text())
+        
+        return result
+    except Exception as e:
+        print(f"    Error extracting {url}: {e}")
+        return None
 
 def process_category(driver, category_name, category_url, global_seen_urls):
     print(f"  Collecting links from: {category_url}")
     try:
         driver.get(category_url)
-        time.sleep(5)
+        wait_for(driver, LIST_LINKS)
     except Exception as e:
         print(f"    Error loading list page: {e}")
         return
@@ -142,9 +118,9 @@ def process_category(driver, category_name, category_url, global_seen_urls):
         print(f"    Scanning Page {page_num}...", end="\r")
         page_links = []
         try:
-            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, "a")))
+            wait_for(driver, "a", timeout=10)
             
-            elements = driver.find_elements(By.CSS_SELECTOR, ".Title a, h2 a, h3 a, .title-news a, .ArticleInMenu a, .ArticleList a")
+            elements = driver.find_elements(By.CSS_SELECTOR, LIST_LINKS)
             for a in elements:
                 try:
                     href = a.get_attribute("href")
@@ -174,17 +150,17 @@ def process_category(driver, category_name, category_url, global_seen_urls):
                  print(f"    Scanning Page {page_num}: Found {new_count} new articles. Extracting...")
                  
                  # IMMEDIATE EXTRACTION & SAVING
-                 with open(OUTPUT_FILE, "a", encoding="utf-8-sig", newline="") as f:
+                 extracted = [(url, extract_article_content(url, category_name)) for url in links_to_extract]
+                 with write_lock, open(OUTPUT_FILE, "a", encoding="utf-8-sig", newline="") as f:
                     fieldnames = ["topic", "title", "summary", "url", "keywords", "public_time", "content"]
                     writer = csv.DictWriter(f, fieldnames=fieldnames)
                     if os.path.exists(OUTPUT_FILE) and os.path.getsize(OUTPUT_FILE) == 0:
                          writer.writeheader()
                     
-                    for url in links_to_extract:
-                        details = extract_article_content(url, category_name)
-                        if details and details["title"]:
+                    for url, details in extracted:
+                        if details and details["title"] and url not in global_seen_urls:
                             writer.writerow(details)
-                            global_seen_urls.add(url)
+                            global_seen_urls.record(url)
                  print(f"      > Saved {new_count} articles from page {page_num}.")
             else:
                  print(f"    Scanning Page {page_num}: No new articles found (All {len(page_links)} seen).")
@@ -193,12 +169,13 @@ def process_category(driver, category_name, category_url, global_seen_urls):
             # Pagination Logic
             try:
                 driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(1)
 
                 # Strategy: Find active page using data-page, then click next data-page
                 # This bypasses text issues and works with the specific JS implementation seen in debug.
                 
                 next_created = False
+                changed = False
+                first_link = elements[0] if elements else None
                 try:
                     # Find active item
                     active_items = driver.find_elements(By.CSS_SELECTOR, "li.page-item.active")
@@ -228,7 +205,7 @@ def process_category(driver, category_name, category_url, global_seen_urls):
                         if next_li:
                             print(f"      [DEBUG] Found direct link for page {next_page_idx}. Clicking.")
                             btn = next_li[0]
-                            driver.execute_script("arguments[0].click();", btn)
+                            changed = click_and_wait(driver, btn, first_link)
                             next_created = True
                         else:
                             # If direct number not found, maybe look for "Next" button if it exists
@@ -246,15 +223,15 @@ def process_category(driver, category_name, category_url, global_seen_urls):
                         # Look for > or Next
                         if text in [">", "Next", "Tiếp", "Trang sau"]:
                              print(f"      [DEBUG] Clicking text-based Next button: '{text}'")
-                             driver.execute_script("arguments[0].click();", btn)
+                             changed = click_and_wait(driver, btn, first_link)
                              next_created = True
                              break
                 
                 if next_created:
-                    # Wait for ArticleList to update
-                    # Simple sleep is okay, but we can verify url or content change?
-                    # Since it is AJAX, URL might NOT change.
-                    time.sleep(5) 
+                    # click_and_wait returns once the old ArticleList links are gone (AJAX, URL does not change)
+                    if not changed:
+                        print(f"      Page {page_num} did not change after clicking next. Stopping category.")
+                        break
                 else:
                     print(f"      No next button/link found at page {page_num}. Stopping category.")
                     break
@@ -267,6 +244,18 @@ def process_category(driver, category_name, category_url, global_seen_urls):
             print(f"    Error processing page {page_num}: {e}")
             break
 
+def crawl_category(driver, category, global_seen_urls):
+    category_name, category_url = category
+    print(f"\n--- Processing Category: {category_name} ---")
+    try:
+        process_category(driver, category_name, category_url, global_seen_urls)
+    except Exception as e:
+        # Caught here so pool.map still collects the other categories; the driver is replaced
+        print(f"  Error in category {category_name}: {e}")
+        driver.broken = True
+        return
+    print(f"  Finished {category_name}.")
+
 def main():
     import urllib3
     urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -274,7 +263,7 @@ def main():
     global_seen_urls = load_seen_urls(OUTPUT_FILE)
     print(f"Loaded {len(global_seen_urls)} existing URLs.")
     
-    driver = init_driver()
+    pool = DriverPool()
     
     try:
         # Create file with header if not exists
@@ -284,18 +273,16 @@ def main():
                 writer = csv.DictWriter(f, fieldnames=fieldnames)
                 writer.writeheader()
 
-        for category_name, category_url in CATEGORIES.items():
-            print(f"\n--- Processing Category: {category_name} ---")
-            process_category(driver, category_name, category_url, global_seen_urls)
-            print(f"  Finished {category_name}.")
+        pool.map(crawl_category, list(CATEGORIES.items()), global_seen_urls)
             
     except KeyboardInterrupt:
         print("\nCrawler stopped by user.")
     except Exception as e:
         print(f"\nCritical Error: {e}")
     finally:
-        driver.quit()
-        print("\nDriver closed.")
+        pool.close()
+        global_seen_urls.close()
+        print("\nDrivers closed.")
 
 if __name__ == "__main__":
     main()
@@ -1,17 +1,18 @@
-import requests
 import csv
 import re
-import time
 import html
 import os
-from bs4 import BeautifulSoup
+from html_backend import make_soup
 from urllib.parse import urljoin, urlparse, parse_qs
+from transport import make_session
+from pipeline import run_pipeline
+from url_index import UrlIndex
 
 # ================= CONFIG =================
 BASE_URL = "https://thainguyen.gov.vn"
 OUTPUT_FILE = "thainguyen_data_final.csv"
 MAX_PAGES_PER_TOPIC = 50   # Adjust as needed (user has many categories)
-SLEEP = 1
+CONCURRENCY = 4            # Detail workers
 
 # List provided by user (normalized to full URLs if needed)
 CATEGORIES = {
@@ -33,7 +34,7 @@ CATEGORIES = {
     "Tin quốc tế": "https://thainguyen.gov.vn/vi_VN/tin-quoc-te"
 }
 
-session = requests.Session()
+session = make_session()
 session.headers.update({
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
@@ -110,7 +111,7 @@ def parse_article(url, topic):
         if resp.status_code != 200:
             return None
         
-        soup = BeautifulSoup(resp.text, "html.parser")
+        soup = make_soup(resp.text)
         
         # TITLE
         # Try finding generic title classes often used in Liferay or this site
@@ -229,24 +230,78 @@ def parse_article(url, topic):
         print(f"Error parsing {url}: {e}")
         return None
 
+# ================= DISCOVERY =================
+def extract_article_links(soup, seen_urls):
+    # Main content area assumption: Liferay generic
+    main_area = soup.find("div", class_="portlet-asset-publisher") or soup.body
+    links = []
+    for a in main_area.find_all("a", href=True):
+        href = a["href"]
+        # Usually articles have /-/asset_publisher/ or contain document ID
+        if "/-/asset_publisher/" in href or "content" in href:
+            full_link = normalize_url(href)
+            if full_link and full_link not in seen_urls:
+                links.append(full_link)
+    return list(dict.fromkeys(links))
+
+def discover_articles(seen_urls):
+    """Pages through CATEGORIES and yields (article_url, topic) for every new article."""
+    for topic, category_url in CATEGORIES.items():
+        category_url = normalize_url(category_url)
+        print(f"\n=== Processing: {topic} ===")
+        
+        # 1. Get first page and pagination info
+        try:
+            resp = session.get(category_url, timeout=30)
+            soup = make_soup(resp.text)
+            current_page_links = extract_article_links(soup, seen_urls)
+            base_url, base_params, cur_key = get_pagination_info(soup, category_url)
+        except Exception as e:
+            print(f"  Error category {category_url}: {e}")
+            continue
+        
+        print(f"  Page 1: Found {len(current_page_links)} new articles.")
+        for link in current_page_links:
+            seen_urls.add(link)
+            yield link, topic
+            
+        if not base_url or not cur_key:
+            print("  No pagination detected or single page.")
+            continue
+            
+        print(f"  Pagination: {base_url} | Param: {cur_key}")
+        
+        # Iterate
+        for page in range(2, MAX_PAGES_PER_TOPIC + 1):
+            base_params[cur_key] = str(page)
+            print(f"  -> Page {page}...")
+            
+            try:
+                p_resp = session.get(base_url, params=base_params, timeout=30)
+                p_soup = make_soup(p_resp.text)
+                page_links = extract_article_links(p_soup, seen_urls)
+            except Exception as e:
+                print(f"    Error page {page}: {e}")
+                continue
+                
+            if not page_links:
+                print("    No new links. Stopping category.")
+                break
+                
+            print(f"    Found {len(page_links)} new articles.")
+            for link in page_links:
+                seen_urls.add(link)
+                yield link, topic
+
 # ================= MAIN =================
 def main():
-    seen_urls = set()
-    
     # Always start fresh? NO, now we want RESUME capability
+    # (sidecar index, rebuilt from the CSV only when out of date)
     mode = "w"
+    seen_urls = UrlIndex(OUTPUT_FILE)
     if os.path.exists(OUTPUT_FILE):
-        try:
-            with open(OUTPUT_FILE, "r", encoding="utf-8-sig") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row.get("url"):
-                        seen_urls.add(row["url"])
-            print(f"RESUMING: Loaded {len(seen_urls)} existing articles.")
-            mode = "a"
-        except Exception as e:
-            print(f"Error reading existing file: {e}. Starting fresh.")
-            mode = "w"
+        print(f"RESUMING: Loaded {len(seen_urls)} existing articles.")
+        mode = "a"
 
     # Setup file
     with open(OUTPUT_FILE, mode, newline="", encoding="utf-8-sig") as f:
@@ -258,94 +313,21 @@ def main():
         # Only write header if starting fresh
         if mode == "w":
             writer.writeheader()
-            
-        for topic, category_url in CATEGORIES.items():
-            category_url = normalize_url(category_url)
-            print(f"\n=== Processing: {topic} ===")
-            
-            # 1. Get first page and pagination info
-            try:
-                resp = session.get(category_url, timeout=30)
-                soup = BeautifulSoup(resp.text, "html.parser")
-                
-                # Extract links from page 1
-                links_found = 0
-                
-                # Main content area assumption: Liferay generic
-                main_area = soup.find("div", class_="portlet-asset-publisher") or soup.body
-                
-                # Find asset links
-                current_page_links = []
-                for a in main_area.find_all("a", href=True):
-                    href = a["href"]
-                    # Usually articles have /-/asset_publisher/ or contain document ID
-                    if "/-/asset_publisher/" in href or "content" in href:
-                        full_link = normalize_url(href)
-                        if full_link and full_link not in seen_urls:
-                             current_page_links.append(full_link)
-                
-                # Dedupe
-                current_page_links = list(dict.fromkeys(current_page_links))
-                print(f"  Page 1: Found {len(current_page_links)} new articles.")
-                
-                for link in current_page_links:
-                    seen_urls.add(link)
-                    data = parse_article(link, topic)  # Passed topic name
-                    if data and data["title"]:
-                        writer.writerow(data)
-                        links_found += 1
-                        print(f"    Saved: {data['title'][:40]}...")
-                        f.flush()
-                    time.sleep(SLEEP)
-                    
-                # Setup pagination
-                base_url, base_params, cur_key = get_pagination_info(soup, category_url)
-                
-                if not base_url or not cur_key:
-                    print("  No pagination detected or single page.")
-                    continue
-                    
-                print(f"  Pagination: {base_url} | Param: {cur_key}")
-                
-                # Iterate
-                for page in range(2, MAX_PAGES_PER_TOPIC + 1):
-                    base_params[cur_key] = str(page)
-                    print(f"  -> Page {page}...")
-                    
-                    try:
-                        p_resp = session.get(base_url, params=base_params, timeout=30)
-                        p_soup = BeautifulSoup(p_resp.text, "html.parser")
-                        
-                        # Extract links
-                        main_area = p_soup.find("div", class_="portlet-asset-publisher") or p_soup.body
-                        page_links = []
-                        for a in main_area.find_all("a", href=True):
-                            href = a["href"]
-                            if "/-/asset_publisher/" in href or "content" in href:
-                                full_link = normalize_url(href)
-                                if full_link and full_link not in seen_urls:
-                                     page_links.append(full_link)
-                                     
-                        page_links = list(dict.fromkeys(page_links))
-                        if not page_links:
-                            print("    No new links. Stopping category.")
-                            break
-                            
-                        print(f"    Found {len(page_links)} new articles.")
-                        for link in page_links:
-                            seen_urls.add(link)
-                            data = parse_article(link, topic)  # Passed topic name
-                            if data and data["title"]:
-                                writer.writerow(data)
-                                print(f"      Saved: {data['title'][:40]}...")
-                                f.flush()
-                            time.sleep(SLEEP)
-                            
-                    except Exception as e:
-                        print(f"    Error page {page}: {e}")
-            
-            except Exception as e:
-                print(f"  Error category {category_url}: {e}")
+        
+        def save(data):
+            if data and data["title"]:
+                writer.writerow(data)
+                print(f"    Saved: {data['title'][:40]}...")
+                f.flush()
+                seen_urls.record(data["url"])
+                return True
+            return False
+        
+        # Discovery, detail fetching and writing run as separate stages
+        stats = run_pipeline(discover_articles(seen_urls), parse_article, save, workers=CONCURRENCY)
+        print(f"\nDone. Discovered {stats['discovered']}, saved {stats['saved']} articles.")
+
+    seen_urls.close()
 
 if __name__ == "__main__":
     main()
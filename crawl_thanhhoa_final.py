@@ -1,16 +1,16 @@
 import csv
-import time
 import os
 import html
 import re
 import requests
 from bs4 import BeautifulSoup
-from selenium import webdriver
+from html_backend import make_soup
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from urllib3.exceptions import InsecureRequestWarning
+from frontier import Frontier
+from transport import make_session
+from browser_pool import new_driver, wait_for, click_and_wait
+from xhr_discovery import XhrTemplate
 
 # Suppress SSL warnings
 requests.packages.urllib3.disable_warnings(category=InsecureRequestWarning)
@@ -20,6 +20,8 @@ BASE_URL = "https://conganthanhhoa.gov.vn"
 OUTPUT_FILE = "thanhhoa_data_final.csv"
 MAX_PAGES_PER_TOPIC = 100 
 PAGE_SIZE = 12
+PAGING_MODE = "xhr" # "xhr": replay the recorded pager call (xhr_templates/thanhhoa.json) over HTTP; "browser": click the pager in Chrome
+RESUME = True # Continue each topic after its last completed page (False re-walks from page 1, done URLs are still skipped)
 
 # Topic Configuration (Vietnamese Names)
 TOPIC_CONFIG = {
@@ -57,20 +59,9 @@ HEADERS = {
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8"
 }
 
-session = requests.Session()
+session = make_session()
 session.headers.update(HEADERS)
 
-def init_driver():
-    chrome_options = Options()
-    # chrome_options.add_argument("--headless") # Optional: run visible to debug if needed
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    driver = webdriver.Chrome(options=chrome_options)
-    return driver
-
 def clean_text(text):
     if not text:
         return ""
@@ -148,9 +139,9 @@ def fetch_detail(url):
     try:
         resp = session.get(url, verify=False, timeout=10)
         if resp.status_code != 200:
-            return None, None, None, None
+            return None, None, None, None, None
         
-        soup = BeautifulSoup(resp.text, 'html.parser')
+        soup = make_soup(resp.text)
         
         # Content
         # VHV: .detail-content, .content-detail, #content-detail, .noidung, .post-content, .article-content
@@ -169,6 +160,12 @@ def fetch_detail(url):
         meta_kw = soup.find("meta", attrs={"name": "keywords"})
         if meta_kw:
             keywords = meta_kw.get("content", "")
+        
+        # Meta description (candidate summary)
+        meta_summary = ""
+        meta_desc = soup.find("meta", attrs={"name": "description"})
+        if meta_desc:
+            meta_summary = clean_text(meta_desc.get("content", ""))
             
         # Public Time from Detail
         public_time = ""
@@ -182,173 +179,246 @@ def fetch_detail(url):
         if h1:
              title = clean_text(h1.get_text())
 
-        return content, keywords, public_time, title
+        return content, keywords, public_time, title, meta_summary
         
     except Exception as e:
         print(f"      Error detail {url}: {e}")
-        return None, None, None, None
+        return None, None, None, None, None
+
+def build_row(topic_name, href, list_title="", list_summary="", list_time=""):
+    """Fetches the detail page and merges it with what the list page showed."""
+    # Fetch Detail (Request)
+    content, keywords, detail_time, detail_title, meta_summary = fetch_detail(href)
+    
+    # FINAL FIELD SELECTION
+    # Title
+    title = detail_title if detail_title else list_title
+    if not title: title = "No Title" # Should not happen often
+    
+    # Time
+    public_time = detail_time if detail_time else list_time
+    
+    # Summary Strategy
+    summary = ""
+    # 1. Try meta description first if it's long and doesn't look like a truncated title
+    if meta_summary and len(meta_summary) > 100 and not meta_summary.endswith("..."):
+        summary = meta_summary
+    
+    # 2. Check list summary
+    if not summary:
+        if len(list_summary) > 250 and not list_summary.endswith("..."):
+            summary = list_summary
+            
+    # 3. Generate from content (Aggressive)
+    if not summary or len(summary) < 150 or summary.endswith("..."):
+        if content:
+            content_snippet = content[:550]
+            last_dot = max(content_snippet.rfind('.'), content_snippet.rfind('!'), content_snippet.rfind('?'))
+            if last_dot > 150:
+                summary = content_snippet[:last_dot + 1]
+            else:
+                summary = content_snippet[:500].strip()
+            
+            if len(content) > 550 and not summary.endswith("..."):
+                 if not summary.endswith(('.', '!', '?')):
+                     summary += "..."
+        else:
+            summary = list_summary # Fallback if no content
+    
+    return [topic_name, title, summary, href, keywords, public_time, content]
+
+def next_page_link(driver, target):
+    # 1. Page number directly (most reliable for VHV), 2. 'Next' or 'Tiếp'
+    next_btn = driver.find_elements(By.XPATH, f"//a[normalize-space()='{target}']")
+    if not next_btn:
+        next_btn = driver.find_elements(By.CSS_SELECTOR, ".next, a[title='Next'], a[title='Tiếp']")
+    return next_btn[0] if next_btn else None
+
+def goto_page(driver, target):
+    """Clicks the AJAX pager to `target` and waits until the article list is replaced."""
+    link = next_page_link(driver, target)
+    if link is None:
+        return False
+    items = driver.find_elements(By.CSS_SELECTOR, "div.item")
+    return click_and_wait(driver, link, items[0] if items else None)
+
+def skip_to_page(driver, page):
+    """Clicks the pager forward to `page` without parsing the pages in between."""
+    for target in range(2, page + 1):
+        if not goto_page(driver, target):
+            return False
+    return True
+
+def list_entries(soup):
+    """(href, list title, list summary, list time) for each article item of a list page or fragment."""
+    # Identify items (VHV usually .item inside #section...)
+    items = soup.select("div.item")
+    if not items:
+         items = soup.select(".post-item")
+         
+    for item in items:
+        link = item.find("a")
+        if not link: continue
+        
+        href = link.get('href')
+        if not href: continue
+        
+        if href.startswith("/"):
+            href = BASE_URL + href
+            
+        # Filter bad links
+        if "conganthanhhoa.gov.vn" not in href or ".html" not in href:
+             continue
+            
+        # Extract Summary/Title from List
+        list_title = clean_text(link.get_text())
+        # Try other title tags if link text is empty (image link)
+        if not list_title:
+            h_tag = item.find(["h2", "h3", "h4"])
+            if h_tag: list_title = clean_text(h_tag.get_text())
+            
+        summary_tag = item.select_one(".desc, .summary, .sapo")
+        list_summary = clean_text(summary_tag.get_text()) if summary_tag else ""
+        
+        time_tag = item.select_one(".time, .date")
+        list_time = parse_date(time_tag.get_text()) if time_tag else ""
+        yield href, list_title, list_summary, list_time
+
+def xhr_entries(template, url, page):
+    """list_entries() of a page fetched through the recorded pager XHR, or None if the call failed."""
+    resp = template.fetch_list(session, url, page)
+    if resp is None:
+        return None
+    if template.list["format"] == "html":
+        return list(list_entries(make_soup(resp.text)))
+    links = template.links_from(resp)
+    return [(href, "", "", "") for href in links if "conganthanhhoa.gov.vn" in href and ".html" in href]
 
 def main():
-    write_header = True
-    seen_urls = set()
+    frontier = Frontier("thanhhoa")
+    if not RESUME:
+        frontier.reset_topics()
+    seen_urls = frontier.known_urls()
     
-    # Check if we should resume or start over
-    # User requested "đúng tên topic" which implies old data is bad.
-    # We will OVERWRITE the file to be safe and ensure clean data.
-    print(f"Starting fresh crawl to {OUTPUT_FILE}...")
+    # Resume: rows from earlier runs are kept, the frontier knows what is done
+    write_header = not os.path.exists(OUTPUT_FILE)
+    print(f"Crawling to {OUTPUT_FILE} ({len(seen_urls)} URLs already in frontier)...")
     
-    driver = init_driver()
+    template = XhrTemplate.load("thanhhoa") if PAGING_MODE == "xhr" else None
+    if PAGING_MODE == "xhr" and template is None:
+        print("No XHR template recorded (run: python xhr_discovery.py thanhhoa). Clicking the pager.")
+    driver = None  # Only started for topics the template does not cover
     
-    with open(OUTPUT_FILE, 'w', encoding='utf-8-sig', newline='') as f:
+    with open(OUTPUT_FILE, 'a', encoding='utf-8-sig', newline='') as f:
         writer = csv.writer(f)
-        writer.writerow(["topic", "title", "summary", "url", "keywords", "public_time", "content"])
+        if write_header:
+            writer.writerow(["topic", "title", "summary", "url", "keywords", "public_time", "content"])
             
         for topic_name, config in TOPIC_CONFIG.items():
             print(f"Processing Topic: {topic_name}")
             url = config["url"]
-            
-            try:
-                driver.get(url)
-            except:
-                print(f"  Error loading {url}")
+            last_page, _, finished = frontier.resume(topic_name)
+            if finished:
+                print("  Finished in a previous run. Skipping.")
                 continue
             
-            consecutive_seen = 0
+            # Articles discovered before a crash but never written
+            for href in frontier.unfinished(topic_name):
+                frontier.start([href])
+                writer.writerow(build_row(topic_name, href))
+                f.flush()
+                frontier.finish([href], [True])
             
-            for page in range(1, MAX_PAGES_PER_TOPIC + 1):
-                print(f"    Page {page}...", end="\r")
-                
-                # Check for articles
+            # With a recorded pager call, any page is one HTTP request away
+            use_xhr = template is not None and template.covers(url)
+            if not use_xhr:
                 try:
-                    WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "div.item, div.post-item, div.col-md-9"))
-                    )
+                    driver = driver or new_driver()
+                    driver.get(url)
                 except:
-                    print(f"    Timeout - no articles on page {page}. Stopping topic.")
-                    break
-                    
-                # Parsing HTML from Selenium
-                soup = BeautifulSoup(driver.page_source, 'html.parser')
+                    print(f"  Error loading {url}")
+                    continue
                 
-                # Identify items (VHV usually .item inside #section...)
-                items = soup.select("div.item")
-                if not items:
-                     items = soup.select(".post-item")
+                # The pager is click-only, so resuming still clicks through the
+                # completed pages, but without reading them or fetching articles
+                if last_page and not skip_to_page(driver, last_page + 1):
+                    print(f"  Could not reach page {last_page + 1}. Skipping topic.")
+                    continue
+            
+            consecutive_seen = 0
+            completed = False
+            
+            for page in range(last_page + 1, MAX_PAGES_PER_TOPIC + 1):
+                print(f"    Page {page}...", end="\r")
+                
+                if use_xhr:
+                    entries = xhr_entries(template, url, page)
+                    if entries is None:
+                        print(f"    Pager call failed on page {page}. Stopping topic.")
+                        break
+                    if not entries:
+                        print(f"    No articles on page {page}. End of topic.")
+                        completed = True
+                        break
+                else:
+                    # Check for articles
+                    if not wait_for(driver, "div.item, div.post-item, div.col-md-9", timeout=10):
+                        print(f"    Timeout - no articles on page {page}. Stopping topic.")
+                        completed = True
+                        break
+                        
+                    # Parsing HTML from Selenium
+                    entries = list_entries(make_soup(driver.page_source))
                      
                 new_count = 0
-                for item in items:
-                    link = item.find("a")
-                    if not link: continue
-                    
-                    href = link.get('href')
-                    if not href: continue
-                    
-                    if href.startswith("/"):
-                        href = BASE_URL + href
-                        
-                    # Filter bad links
-                    if "conganthanhhoa.gov.vn" not in href or ".html" not in href:
-                         continue
-                        
+                for href, list_title, list_summary, list_time in entries:
                     if href in seen_urls:
                         consecutive_seen += 1
                         continue
-                        
-                    # Extract Summary/Title from List
-                    list_title = clean_text(link.get_text())
-                    # Try other title tags if link text is empty (image link)
-                    if not list_title:
-                        h_tag = item.find(["h2", "h3", "h4"])
-                        if h_tag: list_title = clean_text(h_tag.get_text())
-                        
-                    summary_tag = item.select_one(".desc, .summary, .sapo")
-                    list_summary = clean_text(summary_tag.get_text()) if summary_tag else ""
-                    
-                    time_tag = item.select_one(".time, .date")
-                    list_time = parse_date(time_tag.get_text()) if time_tag else ""
-                    
-                    # Fetch Detail (Request)
-                    content, keywords, detail_time, detail_title = fetch_detail(href)
-                    
-                    # FINAL FIELD SELECTION
-                    # Title
-                    title = detail_title if detail_title else list_title
-                    if not title: title = "No Title" # Should not happen often
-                    
-                    # Time
-                    public_time = detail_time if detail_time else list_time
                     
-                    # Summary Strategy
-                    summary = ""
-                    # 1. Try meta description first if it's long and doesn't look like a truncated title
-                    if meta_summary and len(meta_summary) > 100 and not meta_summary.endswith("..."):
-                        summary = meta_summary
-                    
-                    # 2. Check list summary
-                    if not summary:
-                        if len(list_summary) > 250 and not list_summary.endswith("..."):
-                            summary = list_summary
-                            
-                    # 3. Generate from content (Aggressive)
-                    if not summary or len(summary) < 150 or summary.endswith("..."):
-                        if content:
-                            content_snippet = content[:550]
-                            last_dot = max(content_snippet.rfind('.'), content_snippet.rfind('!'), content_snippet.rfind('?'))
-                            if last_dot > 150:
-                                summary = content_snippet[:last_dot + 1]
-                            else:
-                                summary = content_snippet[:500].strip()
-                            
-                            if len(content) > 550 and not summary.endswith("..."):
-                                 if not summary.endswith(('.', '!', '?')):
-                                     summary += "..."
-                        else:
-                            summary = list_summary # Fallback if no content
+                    # Fetch Detail (Request) + field selection
+                    frontier.add([href], topic_name)
+                    frontier.start([href])
+                    row = build_row(topic_name, href, list_title, list_summary, list_time)
                     
                     # Write to CSV
-                    writer.writerow([topic_name, title, summary, href, keywords, public_time, content])
+                    writer.writerow(row)
                     f.flush()
+                    frontier.finish([href], [True])
                     seen_urls.add(href)
                     new_count += 1
                     consecutive_seen = 0
                     
                 print(f"    Page {page}: Scraped {new_count} articles.")
+                frontier.page_done(topic_name, page)
                 
                 if new_count == 0 and consecutive_seen > 15:
                     print("    Stopping topic due to duplicates.")
                     break
                 
+                if use_xhr:
+                    continue
+                
                 # Pagination - Click NEXT
                 try:
-                    next_page_idx = page + 1
-                    
-                    # 1. Try clicking number directly (most reliable for VHV)
-                    next_btn = driver.find_elements(By.XPATH, f"//a[normalize-space()='{next_page_idx}']")
-                    clicked = False
-                    if next_btn:
-                        driver.execute_script("arguments[0].click();", next_btn[0])
-                        clicked = True
-                    else:
-                        # 2. Try 'Next' or '>>' or 'Tiếp'
-                        next_arrow = driver.find_elements(By.CSS_SELECTOR, ".next, a[title='Next'], a[title='Tiếp']")
-                        if next_arrow:
-                            try:
-                                driver.execute_script("arguments[0].click();", next_arrow[0])
-                                clicked = True
-                            except:
-                                pass
-                            
-                    if not clicked:
+                    if next_page_link(driver, page + 1) is None:
                         print("    No next page button found. End of topic.")
+                        completed = True
+                        break
+                    if not goto_page(driver, page + 1):
+                        print(f"    Page {page + 1} did not load. Stopping topic.")
                         break
-                        
-                    time.sleep(3) # Wait for AJAX
                     
                 except Exception as e:
                     print(f"    Pagination Error: {e}")
                     break
+            
+            if completed:
+                frontier.topic_done(topic_name)
                     
-    driver.quit()
+    if driver:
+        driver.quit()
+    frontier.close()
     print("Done.")
 
 if __name__ == "__main__":
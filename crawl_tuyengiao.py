@@ -1,20 +1,30 @@
-import requests
 from bs4 import BeautifulSoup
+from html_backend import make_soup
+import html_archive
 import csv
 import time
 import re
 from urllib.parse import urlparse, parse_qs, urljoin
 from datetime import datetime
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
+from browser_pool import DriverPool, PooledChrome, chrome_options, block_resources, wait_for
+from fetch_engine import FetchEngine
+from transport import make_session
+from xhr_discovery import XhrTemplate
 
 # Configuration
 BASE_URL = "https://tuyengiaodanvan.vn/"
 OUTPUT_FILE = "tuyengiao_data.csv"
 MAX_PAGES_PER_TOPIC = 50 
+LIST_MODE = "xhr" # "xhr": replay the recorded API (xhr_templates/tuyengiao.json) over HTTP; "browser": render every page in Chrome
+DETAIL_MODE = "http" # "http": fetch articles over plain HTTP (pooled tabs only for pages that need JS); "browser": render them in pooled tabs
+DETAIL_WORKERS = 4 # Articles fetched at once (HTTP requests or detail tabs)
+
+session = make_session(headers={
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+})
 
 # Topic Mapping - Comprehensive list from research
 TOPICS = {
@@ -60,21 +70,19 @@ TOPICS = {
 }
 
 def init_driver():
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--window-size=1920,1080")
+    options = chrome_options()
     options.page_load_strategy = 'eager' # Faster
-    return webdriver.Chrome(options=options)
+    driver = PooledChrome(options=options)
+    block_resources(driver)
+    return driver
 
 def resolve_topic_urls(driver):
     """Visit homepage and map topic names to real URLs with categoryId"""
     print("Resolving real topic URLs from homepage...")
     try:
         driver.get(BASE_URL)
-        time.sleep(5)
-        soup = BeautifulSoup(driver.page_source, "html.parser")
+        wait_for(driver, "a[href*='/blogs/']")
+        soup = make_soup(driver.page_source)
         links = soup.select("a")
         
         # Normalize helper
@@ -212,168 +220,252 @@ def process_detail(driver, url):
         WebDriverWait(driver, 10).until(
             EC.presence_of_element_located((By.TAG_NAME, "h1"))
         )
-        time.sleep(1)
-        
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
         
-        title_tag = soup.find("h1")
-        title = clean_text(title_tag.get_text()) if title_tag else ""
+        page_source = driver.page_source
+        if html_archive.ENABLED:
+            html_archive.record(url, 200, {}, page_source)
+        return extract_detail(page_source)
         
-        # Date extraction - Look for regex pattern in body first
-        public_time = ""
-        date_pattern = r'(thứ \w+,\s*)?(\d{2}/\d{2}/\d{4})'
-        body_text = soup.get_text()
-        date_match = re.search(date_pattern, body_text, re.I)
-        if date_match:
-            public_time = date_match.group(2)
+    except Exception as e:
+        print(f"Error crawling detail {url}: {e}")
+        return None, None, None, None, None
 
-        # Summary - Often in <i> tag or first bold paragraph
-        summary = ""
-        summary_candidates = soup.find_all(["i", "p"])
-        for cand in summary_candidates:
-            txt = clean_text(cand.get_text())
-            if not txt: continue
-            # Skip if it's just a date
-            if re.search(r'^\w+,\s*\d{2}/\d{2}/\d{4}', txt, re.I):
-                continue
-            if len(txt) > 30:
-                summary = txt
-                break
+def extract_detail(html_text):
+    """(title, summary, public_time, content, keywords) from a rendered article page."""
+    soup = make_soup(html_text)
+    
+    title_tag = soup.find("h1")
+    title = clean_text(title_tag.get_text()) if title_tag else ""
+    
+    # Date extraction - Look for regex pattern in body first
+    public_time = ""
+    date_pattern = r'(thứ \w+,\s*)?(\d{2}/\d{2}/\d{4})'
+    body_text = soup.get_text()
+    date_match = re.search(date_pattern, body_text, re.I)
+    if date_match:
+        public_time = date_match.group(2)
+
+    # Summary - Often in <i> tag or first bold paragraph
+    summary = ""
+    summary_candidates = soup.find_all(["i", "p"])
+    for cand in summary_candidates:
+        txt = clean_text(cand.get_text())
+        if not txt: continue
+        # Skip if it's just a date
+        if re.search(r'^\w+,\s*\d{2}/\d{2}/\d{4}', txt, re.I):
+            continue
+        if len(txt) > 30:
+            summary = txt
+            break
+    
+    # Content - Filter out common boilerplate
+    content = ""
+    all_ps = soup.find_all("p")
+    content_lines = []
+    boilerplate = [
+        "6C Hoàng Diệu, Ba Đình, Hà Nội",
+        "Bản quyền thuộc về Ban Tuyên giáo",
+        "Ghi rõ nguồn",
+        "phát hành lại thông tin từ trang web này",
+        "Xem toàn văn Kế hoạch",
+        "Xem nội dung Hướng dẫn"
+    ]
+    
+    for p in all_ps:
+        txt = clean_text(p.get_text())
+        if not txt: continue
         
-        # Content - Filter out common boilerplate
-        content = ""
-        all_ps = soup.find_all("p")
-        content_lines = []
-        boilerplate = [
-            "6C Hoàng Diệu, Ba Đình, Hà Nội",
-            "Bản quyền thuộc về Ban Tuyên giáo",
-            "Ghi rõ nguồn",
-            "phát hành lại thông tin từ trang web này",
-            "Xem toàn văn Kế hoạch",
-            "Xem nội dung Hướng dẫn"
-        ]
+        # Skip summary repeat
+        if summary and summary in txt:
+            continue
         
-        for p in all_ps:
-            txt = clean_text(p.get_text())
-            if not txt: continue
+        # Skip date lines
+        if re.search(r'^\w+,\s*\d{2}/\d{2}/\d{4}', txt, re.I):
+            continue
             
-            # Skip summary repeat
-            if summary and summary in txt:
-                continue
+        # Skip boilerplate
+        is_boilerplate = False
+        for bp in boilerplate:
+            if bp.lower() in txt.lower():
+                is_boilerplate = True
+                break
+        if is_boilerplate:
+            continue
             
-            # Skip date lines
-            if re.search(r'^\w+,\s*\d{2}/\d{2}/\d{4}', txt, re.I):
-                continue
-                
-            # Skip boilerplate
-            is_boilerplate = False
-            for bp in boilerplate:
-                if bp.lower() in txt.lower():
-                    is_boilerplate = True
-                    break
-            if is_boilerplate:
-                continue
-                
-            if len(txt) > 20:
-                content_lines.append(txt)
-        
-        content = " ".join(content_lines)
-        
-        # Meta Keywords
-        keywords = ""
-        meta_kw = soup.find("meta", attrs={"name": "keywords"})
-        if meta_kw:
-            keywords = clean_text(meta_kw.get("content", ""))
-        
-        return title, summary, public_time, content, keywords
-        
-    except Exception as e:
-        print(f"Error crawling detail {url}: {e}")
-        return None, None, None, None, None
+        if len(txt) > 20:
+            content_lines.append(txt)
+    
+    content = " ".join(content_lines)
+    
+    # Meta Keywords
+    keywords = ""
+    meta_kw = soup.find("meta", attrs={"name": "keywords"})
+    if meta_kw:
+        keywords = clean_text(meta_kw.get("content", ""))
+    
+    return title, summary, public_time, content, keywords
+
+def extract_article(html_text, url, topic):
+    """CSV row for reextract.py, which replays archived page sources without a browser."""
+    title, summary, public_time, content, keywords = extract_detail(html_text)
+    return {
+        "topic": topic,
+        "title": title,
+        "summary": summary,
+        "url": url,
+        "keywords": keywords,
+        "public_time": public_time,
+        "content": content
+    }
 
 def build_page_url(base_url, page_num):
     # React site uses page and size parameters
     sep = "&" if "?" in base_url else "?"
     return f"{base_url}{sep}page={page_num}&size=10"
 
+def browser_page_links(driver, page_url):
+    """Article URLs on a rendered list page, or None when no article link appeared."""
+    driver.get(page_url)
+    if not wait_for(driver, "a[href*='/blogs/']", timeout=15):
+        return None
+    # More specific link selector for React site
+    all_links = driver.find_elements(By.CSS_SELECTOR, "a[class*='link_link'][href*='/blogs/']")
+    if not all_links:
+        all_links = driver.find_elements(By.CSS_SELECTOR, "a[href*='/blogs/']")
+    return [a.get_attribute('href') for a in all_links]
+
+def detail_from_api(template, url):
+    """process_detail() result from the recorded detail XHR, without a browser."""
+    fields = template.detail_fields(session, url)
+    if not fields or not fields.get("title"):
+        return None
+    title = clean_text(fields["title"])
+    summary = clean_text(make_soup(fields.get("summary") or "").get_text())
+    public_time = fields.get("public_time") or ""
+    iso = re.match(r'(\d{4})-(\d{2})-(\d{2})', public_time)
+    public_time = f"{iso.group(3)}/{iso.group(2)}/{iso.group(1)}" if iso else parse_date(public_time)
+    content = clean_content(fields.get("content"), title)
+    return title, summary, public_time, content, ""
+
+def fetch_detail_http(url, template=None):
+    """process_detail() without a browser: the recorded detail API, then the server-rendered page.
+    None when the article only appears after JavaScript runs."""
+    if template is not None and template.detail:
+        detail = detail_from_api(template, url)
+        if detail:
+            return detail
+    try:
+        resp = session.get(url, timeout=20)
+    except Exception as e:
+        print(f"Error fetching detail {url}: {e}")
+        return None
+    if resp.status_code != 200:
+        return None
+    detail = extract_detail(resp.text)
+    return detail if detail[0] and detail[3] else None
+
+def fetch_details(urls, template, engine, tabs):
+    """Details of one list page's articles, in order. The list page itself is never revisited."""
+    if DETAIL_MODE == "http":
+        details = engine.map(fetch_detail_http, urls, template)
+    else:
+        details = [None] * len(urls)
+    # Client-rendered pages (and DETAIL_MODE="browser") go to the pooled detail tabs
+    missing = [i for i, d in enumerate(details) if d is None]
+    if missing:
+        rendered = tabs.map(process_detail, [urls[i] for i in missing])
+        for i, detail in zip(missing, rendered):
+            details[i] = detail
+    return details
+
+def crawl_topic(config_name, topic_url, writer, f, template, engine, lists, tabs):
+    """Walks one topic's list pages and writes its articles. Returns the number saved."""
+    use_xhr = template is not None and template.covers(topic_url)
+    print(f"Processing Topic: {config_name} ({'xhr' if use_xhr else 'browser'} list, {DETAIL_MODE} detail)")
+    seen_urls = set()
+    saved = 0
+    
+    for page in range(1, MAX_PAGES_PER_TOPIC + 1):
+        page_url = build_page_url(topic_url, page)
+        print(f"  Page {page}: {page_url}")
+        
+        try:
+            if use_xhr:
+                all_links = template.list_links(session, topic_url, page)
+            else:
+                with lists.lease() as driver:
+                    all_links = browser_page_links(driver, page_url)
+            if all_links is None:
+                print("    No articles found or timeout.")
+                if page > 1: break
+                continue # Try next page or topic
+
+            page_urls = []
+            for href in all_links:
+                if not href: continue
+                # Exclude category list links
+                if '/blogs/' in href and '/category/' not in href:
+                     if href not in seen_urls:
+                         seen_urls.add(href)
+                         page_urls.append(href)
+            
+            print(f"    Found {len(page_urls)} unique articles.")
+            
+            if len(page_urls) == 0 and page > 1:
+                print("    End of topic.")
+                break
+            
+            if len(page_urls) == 0:
+                continue # Retry next page? OR break? let's continue for page 1
+
+            details = fetch_details(page_urls, template, engine, tabs)
+            for i, (url, detail) in enumerate(zip(page_urls, details)):
+                title, summary, time_str, content, keywords = detail or (None,) * 5
+                if title and content:
+                    writer.writerow([config_name, title, summary, url, keywords, time_str, content])
+                    saved += 1
+                    print(f"      {i+1}/{len(page_urls)}: {title[:60]}")
+                else:
+                    print(f"      {i+1}/{len(page_urls)}: no content at {url[:60]}")
+            f.flush()
+                
+        except Exception as e:
+            print(f"  Error on page {page}: {e}")
+            break
+    return saved
+
 def crawl():
-    driver = init_driver()
+    template = XhrTemplate.load("tuyengiao") if LIST_MODE == "xhr" else None
+    if LIST_MODE == "xhr" and template is None:
+        print("No XHR template recorded (run: python xhr_discovery.py tuyengiao). Rendering list pages.")
+    # Chrome only starts for what plain HTTP cannot serve: one list tab, DETAIL_WORKERS detail tabs
+    lists = DriverPool(size=1, factory=init_driver)
+    tabs = DriverPool(size=DETAIL_WORKERS, factory=init_driver)
+    engine = FetchEngine(per_host=DETAIL_WORKERS)
     
     # 1. Resolve URLs (Disabled - using hardcoded real URLs)
     # resolve_topic_urls(driver)
     
     # 2. Crawl
-    with open(OUTPUT_FILE, 'w', encoding='utf-8-sig', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(["topic", "title", "summary", "url", "keywords", "public_time", "content"])
-        
-        for config_name, topic_url in TOPICS.items():
-            if ".aspx" in topic_url and "category" not in topic_url:
-                 print(f"Skipping unresolved topic: {config_name}")
-                 continue
-                 
-            print(f"Processing Topic: {config_name}")
-            seen_urls = set()
+    try:
+        with open(OUTPUT_FILE, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["topic", "title", "summary", "url", "keywords", "public_time", "content"])
             
-            for page in range(1, MAX_PAGES_PER_TOPIC + 1):
-                page_url = build_page_url(topic_url, page)
-                print(f"  Page {page}: {page_url}")
+            for config_name, topic_url in TOPICS.items():
+                if ".aspx" in topic_url and "category" not in topic_url:
+                     print(f"Skipping unresolved topic: {config_name}")
+                     continue
                 
-                try:
-                    driver.get(page_url)
-                    time.sleep(3)
-                    
-                    # Try to get topic name from page if possible
-                    # but fallback to config_name
-                    
-                    try:
-                        WebDriverWait(driver, 15).until(
-                            EC.presence_of_element_located((By.CSS_SELECTOR, "a[href*='/blogs/']"))
-                        )
-                    except:
-                        print("    No articles found or timeout.")
-                        if page > 1: break
-                        continue # Try next page or topic
-                        
-                    # More specific link selector for React site
-                    all_links = driver.find_elements(By.CSS_SELECTOR, "a[class*='link_link'][href*='/blogs/']")
-                    if not all_links:
-                        all_links = driver.find_elements(By.CSS_SELECTOR, "a[href*='/blogs/']")
-
-                    page_urls = []
-                    for a in all_links:
-                        href = a.get_attribute('href')
-                        if not href: continue
-                        # Exclude category list links
-                        if '/blogs/' in href and '/category/' not in href:
-                             if href not in seen_urls:
-                                 seen_urls.add(href)
-                                 page_urls.append(href)
-                    
-                    print(f"    Found {len(page_urls)} unique articles.")
-                    
-                    if len(page_urls) == 0 and page > 1:
-                        print("    End of topic.")
-                        break
-                    
-                    if len(page_urls) == 0:
-                        continue # Retry next page? OR break? let's continue for page 1
-
-                    for i, url in enumerate(page_urls):
-                        print(f"      Fetching {i+1}/{len(page_urls)}: {url[:60]}...")
-                        title, summary, time_str, content, keywords = process_detail(driver, url)
-                        if title and content:
-                            writer.writerow([config_name, title, summary, url, keywords, time_str, content])
-                            f.flush()
-                        
-                        # Return to list page
-                        driver.get(page_url)
-                        time.sleep(1) # Quick wait
-                        
-                except Exception as e:
-                    print(f"  Error on page {page}: {e}")
-                    break     
-    driver.quit()
+                start = time.perf_counter()
+                navigations = lists.navigations + tabs.navigations
+                saved = crawl_topic(config_name, topic_url, writer, f, template, engine, lists, tabs)
+                print(f"  {config_name}: {saved} articles in {time.perf_counter() - start:.1f}s, "
+                      f"{lists.navigations + tabs.navigations - navigations} browser navigations")
+    finally:
+        engine.close()
+        lists.close()
+        tabs.close()
     print("Crawling complete.")
 
 if __name__ == "__main__":
@@ -0,0 +1,545 @@
+import os
+import csv
+import sys
+import time
+import uuid
+import socket
+import sqlite3
+import importlib
+import threading
+from collections import Counter, deque
+
+from fetch_engine import FetchEngine, MAX_PER_HOST
+from frontier import FRONTIER_DB, MAX_ATTEMPTS, PENDING, INFLIGHT, DONE, FAILED, _SCHEMA
+from rate_limiter import TokenBucket, limiter
+from url_index import UrlIndex
+
+# ================= CONFIG =================
+STORE = os.environ.get("CRAWL_STORE", FRONTIER_DB)  # "redis://host:6379/0" (several machines), "memory", or a local SQLite path
+LEASE_SECONDS = 300         # A batch not reported back by then goes back to pending
+BATCH = 20                  # URLs leased at a time
+WORKER_CONCURRENCY = MAX_PER_HOST
+IDLE_POLL = 5.0             # Seconds between lease attempts while the queue is empty (--forever)
+OUTPUT_DIR = "worker_output"    # Each worker appends to its own <portal>.<worker>.csv shard
+FIELDNAMES = ["topic", "title", "summary", "url", "keywords", "public_time", "content"]
+
+# Portal -> (module, function(url, topic) -> row dict or None). "profile:<name>" uses
+# profile_crawler's compiled site profile instead of a crawler module.
+HANDLERS = {
+    "bacgiang": ("crawl_bacgiang", "parse_article"),
+    "cantho": ("crawl_cantho", "parse_article"),
+    "danang": ("crawl_danang", "parse_article"),
+    "dienbien": ("crawl_dienbien", "parse_article"),
+    "gialai": ("crawl_gialai", "parse_article"),
+    "hatinh": ("crawl_hatinh", "extract_article_data"),
+    "sonla": ("crawl_sonla", "parse_article"),
+    "thainguyen": ("crawl_thainguyen", "parse_article"),
+}
+
+_LEASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    portal  TEXT NOT NULL,
+    url     TEXT NOT NULL,
+    owner   TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (portal, url)
+);
+CREATE INDEX IF NOT EXISTS leases_expires ON leases (portal, expires);
+CREATE TABLE IF NOT EXISTS host_tokens (
+    host    TEXT PRIMARY KEY,
+    tokens  REAL NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+def bucket_wait(tokens, updated, now, rate, burst):
+    """TokenBucket.reserve() on stored state: returns (tokens left, seconds the caller must wait)."""
+    tokens = min(burst, tokens + max(now - updated, 0) * rate) - 1
+    return tokens, (0.0 if tokens >= 0 else -tokens / rate)
+
+
+class SqliteStore:
+    """
+    Leases on the frontier's own `urls` table, so URLs a crawler queued with
+    Frontier.add() are what the workers pick up. Every change runs in a
+    BEGIN IMMEDIATE transaction, which serializes the worker processes of one
+    machine. The database is in WAL mode, which needs memory shared between
+    those processes: it does not work on a network filesystem, so workers on
+    several machines use RedisStore instead.
+    """
+
+    def __init__(self, path=FRONTIER_DB, clock=time.time):
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(_SCHEMA + _LEASE_SCHEMA)
+
+    def _write(self, work):
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(self.db)
+                self.db.execute("COMMIT")
+                return result
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+
+    def add(self, portal, urls, topic):
+        now = self.clock()
+
+        def work(db):
+            return [url for url in urls if db.execute(
+                "INSERT OR IGNORE INTO urls (portal, url, topic, state, updated) VALUES (?, ?, ?, ?, ?)",
+                (portal, url, topic, PENDING, now)).rowcount]
+        return self._write(work)
+
+    def lease(self, portal, owner, n=BATCH, seconds=LEASE_SECONDS):
+        """Up to n pending [(url, topic)], inflight for `owner` until the lease expires. Re-queues expired leases first."""
+        now = self.clock()
+
+        def work(db):
+            db.execute(
+                "UPDATE urls SET state = ?, updated = ? WHERE portal = ? AND state = ? AND url IN "
+                "(SELECT url FROM leases WHERE portal = ? AND expires < ?)",
+                (PENDING, now, portal, INFLIGHT, portal, now))
+            db.execute("DELETE FROM leases WHERE portal = ? AND expires < ?", (portal, now))
+            rows = db.execute(
+                "SELECT url, topic FROM urls WHERE portal = ? AND state = ? ORDER BY updated LIMIT ?",
+                (portal, PENDING, n)).fetchall()
+            db.executemany(
+                "UPDATE urls SET state = ?, attempts = attempts + 1, updated = ? WHERE portal = ? AND url = ?",
+                [(INFLIGHT, now, portal, url) for url, _ in rows])
+            db.executemany(
+                "INSERT OR REPLACE INTO leases (portal, url, owner, expires) VALUES (?, ?, ?, ?)",
+                [(portal, url, owner, now + seconds) for url, _ in rows])
+            return rows
+        return self._write(work)
+
+    def renew(self, portal, owner, urls, seconds=LEASE_SECONDS):
+        """Extends `owner`'s leases on urls. Returns the ones it still holds (not re-queued to another worker)."""
+        now = self.clock()
+
+        def work(db):
+            return [url for url in urls if db.execute(
+                "UPDATE leases SET expires = ? WHERE portal = ? AND url = ? AND owner = ?",
+                (now + seconds, portal, url, owner)).rowcount]
+        return self._write(work)
+
+    def complete(self, portal, owner, done, failed):
+        """
+        Reports a leased batch: done URLs are finished, failed ones go back to
+        pending until MAX_ATTEMPTS. URLs `owner` no longer holds are ignored.
+        Returns the number of URLs accepted.
+        """
+        now = self.clock()
+
+        def held(db, url):
+            return db.execute("DELETE FROM leases WHERE portal = ? AND url = ? AND owner = ?",
+                              (portal, url, owner)).rowcount
+
+        def work(db):
+            finished = [url for url in done if held(db, url)]
+            retried = [url for url in failed if held(db, url)]
+            db.executemany("UPDATE urls SET state = ?, updated = ? WHERE portal = ? AND url = ?",
+                           [(DONE, now, portal, u) for u in finished])
+            db.executemany(
+                "UPDATE urls SET state = CASE WHEN attempts < ? THEN ? ELSE ? END, updated = ? "
+                "WHERE portal = ? AND url = ?",
+                [(MAX_ATTEMPTS, PENDING, FAILED, now, portal, u) for u in retried])
+            return len(finished) + len(retried)
+        return self._write(work)
+
+    def reserve(self, host, rate, burst):
+        now = self.clock()
+
+        def work(db):
+            row = db.execute("SELECT tokens, updated FROM host_tokens WHERE host = ?", (host,)).fetchone()
+            tokens, wait = bucket_wait(*(row or (burst, now)), now, rate, burst)
+            db.execute("INSERT OR REPLACE INTO host_tokens (host, tokens, updated) VALUES (?, ?, ?)",
+                       (host, tokens, now))
+            return wait
+        return self._write(work)
+
+    def counts(self, portal):
+        with self.lock:
+            rows = self.db.execute("SELECT state, COUNT(*) FROM urls WHERE portal = ? GROUP BY state", (portal,))
+            return dict(rows.fetchall())
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class MemoryStore:
+    """In-process stand-in with the same semantics, for tests and single-process runs (workers as threads)."""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.urls = {}          # (portal, url) -> [topic, state, attempts]
+        self.pending = {}       # portal -> deque of urls
+        self.leases = {}        # (portal, url) -> (owner, expires)
+        self.buckets = {}
+
+    def add(self, portal, urls, topic):
+        new = []
+        with self.lock:
+            for url in urls:
+                if (portal, url) not in self.urls:
+                    self.urls[portal, url] = [topic, PENDING, 0]
+                    self.pending.setdefault(portal, deque()).append(url)
+                    new.append(url)
+        return new
+
+    def lease(self, portal, owner, n=BATCH, seconds=LEASE_SECONDS):
+        now = self.clock()
+        with self.lock:
+            queue = self.pending.setdefault(portal, deque())
+            for key, (_, expires) in list(self.leases.items()):
+                if key[0] == portal and expires < now:
+                    del self.leases[key]
+                    self.urls[key][1] = PENDING
+                    queue.append(key[1])
+            rows = []
+            while queue and len(rows) < n:
+                url = queue.popleft()
+                entry = self.urls[portal, url]
+                if entry[1] != PENDING:
+                    continue
+                entry[1] = INFLIGHT
+                entry[2] += 1
+                self.leases[portal, url] = (owner, now + seconds)
+                rows.append((url, entry[0]))
+            return rows
+
+    def _held(self, portal, owner, url):
+        lease = self.leases.get((portal, url))
+        return lease is not None and lease[0] == owner
+
+    def renew(self, portal, owner, urls, seconds=LEASE_SECONDS):
+        expires = self.clock() + seconds
+        with self.lock:
+            held = [url for url in urls if self._held(portal, owner, url)]
+            for url in held:
+                self.leases[portal, url] = (owner, expires)
+            return held
+
+    def complete(self, portal, owner, done, failed):
+        with self.lock:
+            done = [url for url in done if self._held(portal, owner, url)]
+            failed = [url for url in failed if self._held(portal, owner, url)]
+            for url in done + failed:
+                del self.leases[portal, url]
+            for url in done:
+                self.urls[portal, url][1] = DONE
+            for url in failed:
+                entry = self.urls[portal, url]
+                entry[1] = PENDING if entry[2] < MAX_ATTEMPTS else FAILED
+                if entry[1] == PENDING:
+                    self.pending.setdefault(portal, deque()).append(url)
+            return len(done) + len(failed)
+
+    def reserve(self, host, rate, burst):
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(rate, burst)
+            bucket = self.buckets[host]
+        return bucket.reserve()
+
+    def counts(self, portal):
+        with self.lock:
+            return dict(Counter(state for (p, _), (_, state, _) in self.urls.items() if p == portal))
+
+    def close(self):
+        pass
+
+
+_LEASE_LUA = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1e6
+for _, url in ipairs(redis.call('ZRANGEBYSCORE', KEYS[4], '-inf', now)) do
+    redis.call('ZREM', KEYS[4], url)
+    redis.call('HDEL', KEYS[5], url)
+    redis.call('HSET', KEYS[2], url, ARGV[3])
+    redis.call('RPUSH', KEYS[1], url)
+end
+local out = {}
+while #out < tonumber(ARGV[1]) do
+    local url = redis.call('LPOP', KEYS[1])
+    if not url then break end
+    if redis.call('HGET', KEYS[2], url) == ARGV[3] then
+        redis.call('HSET', KEYS[2], url, ARGV[4])
+        redis.call('HINCRBY', KEYS[3], url, 1)
+        redis.call('ZADD', KEYS[4], now + tonumber(ARGV[2]), url)
+        redis.call('HSET', KEYS[5], url, ARGV[5])
+        table.insert(out, url)
+    end
+end
+return out
+"""
+
+_RENEW_LUA = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1e6
+local out = {}
+for i = 3, #ARGV do
+    if redis.call('HGET', KEYS[2], ARGV[i]) == ARGV[1] then
+        redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[i])
+        table.insert(out, ARGV[i])
+    end
+end
+return out
+"""
+
+_COMPLETE_LUA = """
+local accepted = 0
+for i = 7, #ARGV do
+    local url = ARGV[i]
+    if redis.call('HGET', KEYS[5], url) == ARGV[1] then
+        redis.call('HDEL', KEYS[5], url)
+        redis.call('ZREM', KEYS[4], url)
+        if i - 6 <= tonumber(ARGV[6]) then
+            redis.call('HSET', KEYS[2], url, ARGV[4])
+        elseif tonumber(redis.call('HGET', KEYS[3], url) or 0) < tonumber(ARGV[2]) then
+            redis.call('HSET', KEYS[2], url, ARGV[3])
+            redis.call('RPUSH', KEYS[1], url)
+        else
+            redis.call('HSET', KEYS[2], url, ARGV[5])
+        end
+        accepted = accepted + 1
+    end
+end
+return accepted
+"""
+
+_RESERVE_LUA = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1e6
+local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(now - updated, 0) * rate) - 1
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], 3600)
+if tokens >= 0 then return '0' end
+return tostring(-tokens / rate)
+"""
+
+
+class RedisStore:
+    """
+    Same protocol on a Redis-compatible server (needs the `redis` package).
+    Leasing and token buckets run as Lua scripts on the server's clock, so they
+    are atomic across machines and immune to worker clock skew.
+    """
+
+    def __init__(self, url, client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("RedisStore needs the redis package: pip install redis")
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.db = client  # Any client with decode_responses=True and Lua support
+        self._lease = self.db.register_script(_LEASE_LUA)
+        self._renew = self.db.register_script(_RENEW_LUA)
+        self._complete = self.db.register_script(_COMPLETE_LUA)
+        self._reserve = self.db.register_script(_RESERVE_LUA)
+
+    def _keys(self, portal):
+        prefix = f"crawl:{portal}"
+        return [f"{prefix}:pending", f"{prefix}:state", f"{prefix}:attempts", f"{prefix}:leases",
+                f"{prefix}:owner", f"{prefix}:topic"]
+
+    def add(self, portal, urls, topic):
+        pending, state, _, _, _, topics = self._keys(portal)
+        new = []
+        for url in urls:
+            if self.db.hsetnx(state, url, PENDING):
+                pipe = self.db.pipeline()
+                pipe.hset(topics, url, topic)
+                pipe.rpush(pending, url)
+                pipe.execute()
+                new.append(url)
+        return new
+
+    def lease(self, portal, owner, n=BATCH, seconds=LEASE_SECONDS):
+        keys = self._keys(portal)
+        urls = self._lease(keys=keys[:5], args=[n, seconds, PENDING, INFLIGHT, owner])
+        if not urls:
+            return []
+        return list(zip(urls, self.db.hmget(keys[5], urls)))
+
+    def renew(self, portal, owner, urls, seconds=LEASE_SECONDS):
+        keys = self._keys(portal)
+        return self._renew(keys=[keys[3], keys[4]], args=[owner, seconds, *urls]) if urls else []
+
+    def complete(self, portal, owner, done, failed):
+        done, failed = list(done), list(failed)
+        return int(self._complete(keys=self._keys(portal)[:5],
+                                  args=[owner, MAX_ATTEMPTS, PENDING, DONE, FAILED, len(done), *done, *failed]))
+
+    def reserve(self, host, rate, burst):
+        return float(self._reserve(keys=[f"crawl:bucket:{host}"], args=[rate, burst]))
+
+    def counts(self, portal):
+        return dict(Counter(self.db.hvals(self._keys(portal)[1])))
+
+    def close(self):
+        self.db.close()
+
+
+def open_store(spec=STORE):
+    if spec.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStore(spec)
+    if spec == "memory":
+        return MemoryStore()
+    return SqliteStore(spec)
+
+
+def load_handler(portal):
+    if portal.startswith("profile:"):
+        import profile_crawler
+        return profile_crawler.load(portal[len("profile:"):]).fetch_article
+    module, name = HANDLERS[portal]
+    return getattr(importlib.import_module(module), name)
+
+
+class Worker:
+    """
+    Leases batches of a portal's URLs from the store, fetches them with the
+    crawler's own parse function, appends the rows to this worker's CSV shard
+    (merge() folds the shards back into the portal's CSV), flushes, and only
+    then reports the batch back. A worker that dies holding a
+    lease loses nothing: the URLs return to pending when the lease expires.
+    Before writing, the worker renews its leases and drops the rows of any URL
+    that was re-leased meanwhile, so each URL lands in exactly one shard.
+
+    Host budgets are shared through the store (limiter.share), so N workers on M
+    machines together stay within rate_limiter.PORTAL_LIMITS.
+    """
+
+    def __init__(self, store, portal, handler=None, owner=None, batch=BATCH, lease_seconds=LEASE_SECONDS,
+                 concurrency=WORKER_CONCURRENCY, output_dir=OUTPUT_DIR, share_limits=True):
+        self.store = store
+        self.portal = portal
+        self.handler = handler or load_handler(portal)
+        self.owner = owner or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.batch = batch
+        self.lease_seconds = lease_seconds
+        self.concurrency = concurrency
+        self.output_file = os.path.join(output_dir, f"{portal.replace(':', '_')}.{self.owner}.csv")
+        self.stats = Counter()
+        os.makedirs(output_dir, exist_ok=True)
+        if share_limits:
+            limiter.share(store)
+
+    def run_batch(self, f, writer, engine):
+        leased = self.store.lease(self.portal, self.owner, self.batch, self.lease_seconds)
+        if not leased:
+            return 0
+        topics = dict(leased)
+        urls = [url for url, _ in leased]
+        rows = engine.map(lambda url: self.handler(url, topics[url]), urls)
+        # A lease that expired while fetching may belong to another worker by now: its row is theirs to write
+        held = set(self.store.renew(self.portal, self.owner, urls, self.lease_seconds))
+        done, failed = [], []
+        for url, row in zip(urls, rows):
+            if url not in held:
+                continue
+            if row and row.get("title"):
+                writer.writerow({k: row.get(k, "") for k in FIELDNAMES})
+                done.append(url)
+            else:
+                failed.append(url)
+        f.flush()
+        self.store.complete(self.portal, self.owner, done, failed)
+        self.stats.update(leased=len(urls), saved=len(done), failed=len(failed), lost=len(urls) - len(held))
+        return len(urls)
+
+    def run(self, forever=False, idle_poll=IDLE_POLL):
+        """Works until the queue is empty (or, with forever, until interrupted). Returns the counters."""
+        with open(self.output_file, "a", encoding="utf-8-sig", newline="") as f, \
+             FetchEngine(per_host=self.concurrency) as engine:
+            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+            if f.tell() == 0:
+                writer.writeheader()
+            while True:
+                if self.run_batch(f, writer, engine):
+                    continue
+                if not forever:
+                    break
+                time.sleep(idle_poll)
+        return self.stats
+
+
+def output_file_for(portal):
+    """The CSV the portal's own crawler (or site profile) writes."""
+    if portal.startswith("profile:"):
+        import profile_crawler
+        return profile_crawler.load(portal[len("profile:"):]).output_file
+    return importlib.import_module(HANDLERS[portal][0]).OUTPUT_FILE
+
+
+def merge(portal, output_file=None, output_dir=OUTPUT_DIR):
+    """
+    Appends the rows of every worker shard of `portal` to the portal's CSV,
+    skipping URLs it already has, so the crawler and reextract see one file
+    again. Safe to run repeatedly and while workers are still writing (a
+    later merge picks up what they add). Returns the number of rows appended.
+    """
+    output_file = output_file or output_file_for(portal)
+    prefix = portal.replace(":", "_") + "."
+    shards = sorted(os.path.join(output_dir, name) for name in os.listdir(output_dir)
+                    if name.startswith(prefix) and name.endswith(".csv")) if os.path.isdir(output_dir) else []
+    fieldnames = FIELDNAMES
+    if os.path.exists(output_file) and os.path.getsize(output_file):
+        with open(output_file, "r", encoding="utf-8-sig", newline="") as f:
+            fieldnames = next(csv.reader(f), None) or FIELDNAMES
+    added = 0
+    with UrlIndex(output_file) as seen, open(output_file, "a", encoding="utf-8-sig", newline="") as out:
+        writer = csv.DictWriter(out, fieldnames=fieldnames, extrasaction="ignore")
+        if out.tell() == 0:
+            writer.writeheader()
+        for shard in shards:
+            with open(shard, "r", encoding="utf-8-sig", newline="") as f:
+                for row in csv.DictReader(f):
+                    if not row.get("url") or row["url"] in seen:
+                        continue
+                    writer.writerow(row)
+                    seen.record(row["url"])
+                    added += 1
+        out.flush()
+    print(f"Merged {len(shards)} shards of {portal} into {output_file}: {added} new rows.")
+    return added
+
+
+if __name__ == "__main__":
+    # python distributed.py worker <portal> [--forever]    lease and crawl until the queue is empty
+    # python distributed.py add <portal> <topic> < urls    queue URLs (one per line)
+    # python distributed.py status <portal>
+    # python distributed.py merge <portal> [output.csv]  append the workers' shards to the portal's CSV
+    # The store comes from CRAWL_STORE (default: the local frontier database).
+    if len(sys.argv) < 3 or sys.argv[1] not in ("worker", "add", "status", "merge"):
+        sys.exit("Usage: python distributed.py worker|add|status|merge <portal> [topic | --forever | output.csv]")
+    command, portal = sys.argv[1], sys.argv[2]
+    if command == "merge":
+        merge(portal, sys.argv[3] if len(sys.argv) > 3 else None)
+        sys.exit()
+    store = open_store()
+    try:
+        if command == "worker":
+            worker = Worker(store, portal)
+            print(f"Worker {worker.owner} on {portal}, writing {worker.output_file}")
+            print(dict(worker.run(forever="--forever" in sys.argv)))
+        elif command == "add":
+            topic = sys.argv[3] if len(sys.argv) > 3 else None
+            urls = [line.strip() for line in sys.stdin if line.strip()]
+            print(f"{len(store.add(portal, urls, topic))} of {len(urls)} URLs queued")
+        print(store.counts(portal))
+    finally:
+        store.close()
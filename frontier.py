@@ -0,0 +1,277 @@
+import re
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# ================= CONFIG =================
+FRONTIER_DB = "crawl_frontier.db"   # Shared by all crawlers, rows are keyed by portal
+MAX_ATTEMPTS = 3                    # Failed URLs are retried on later runs up to this many times
+
+PENDING = "pending"
+INFLIGHT = "inflight"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    portal   TEXT NOT NULL,
+    url      TEXT NOT NULL,
+    topic    TEXT,
+    state    TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated  REAL NOT NULL,
+    PRIMARY KEY (portal, url)
+);
+CREATE INDEX IF NOT EXISTS urls_topic_state ON urls (portal, topic, state);
+CREATE TABLE IF NOT EXISTS topics (
+    portal    TEXT NOT NULL,
+    topic     TEXT NOT NULL,
+    last_page INTEGER NOT NULL DEFAULT 0,
+    cursor    TEXT,
+    finished  INTEGER NOT NULL DEFAULT 0,
+    updated   REAL NOT NULL,
+    PRIMARY KEY (portal, topic)
+);
+CREATE TABLE IF NOT EXISTS watermarks (
+    portal    TEXT NOT NULL,
+    topic     TEXT NOT NULL,
+    url       TEXT,
+    published TEXT,
+    updated   REAL NOT NULL,
+    PRIMARY KEY (portal, topic)
+);
+"""
+
+_ISO_TIME = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})(?:[T ](\d{1,2}):(\d{2})(?::(\d{2}))?)?")
+_VN_TIME = re.compile(r"(\d{1,2})[/-](\d{1,2})[/-](\d{4})(?:\D{0,3}(\d{1,2})[:hg](\d{2}))?")
+
+
+def parse_time(text):
+    """
+    Finds a publish time in a portal's date text ("12/03/2025 08:30", "Cập nhật 12-03-2025",
+    "2025-03-12T08:30:00Z") and returns a naive datetime, or None.
+    """
+    if not text:
+        return None
+    if isinstance(text, datetime):
+        return text.replace(tzinfo=None)
+    try:
+        m = _ISO_TIME.search(text)
+        if m:
+            y, mo, d, h, mi, sec = m.groups()
+        else:
+            m = _VN_TIME.search(text)
+            if not m:
+                return None
+            d, mo, y, h, mi = m.groups()
+            sec = None
+        return datetime(int(y), int(mo), int(d), int(h or 0), int(mi or 0), int(sec or 0))
+    except ValueError:
+        return None
+
+
+class Watermark:
+    """
+    The newest article of a topic as of the last completed walk (`url`, `published`),
+    plus the newest one saved during the current walk. The stored mark only moves
+    forward when the walk completes (Frontier.topic_done), so an interrupted
+    incremental run never hides the pages it did not reach.
+    """
+
+    def __init__(self, url=None, published=None):
+        self.url = url
+        self.published = published
+        self.newest_url = None
+        self.newest = None
+
+    def see(self, url, published):
+        published = parse_time(published)
+        if published and (self.newest is None or published > self.newest):
+            self.newest_url, self.newest = url, published
+
+    def is_below(self, entries, known=()):
+        """
+        True when a list page holds nothing newer than the mark: every (url, published)
+        entry is the mark itself, already in `known`, or published no later than the mark.
+        """
+        if self.published is None and self.url is None:
+            return False
+        entries = list(entries)
+        if not entries:
+            return False
+        for url, published in entries:
+            if url == self.url or url in known:
+                continue
+            published = parse_time(published)
+            if published is None or self.published is None or published > self.published:
+                return False
+        return True
+
+
+class Frontier:
+    """
+    Durable crawl state for one portal: the state of every article URL
+    (pending -> inflight -> done / failed) and, per topic, the last list page whose
+    articles were all written plus an opaque cursor to reach the next one.
+
+    Resume protocol used by the crawlers:
+      1. frontier.unfinished(topic) -> URLs discovered before the crash but never written
+      2. frontier.resume(topic)     -> (last_page, cursor) to continue listing from
+      3. per page: add(links) -> fetch -> write rows + flush -> finish(links, rows) -> page_done(...)
+    A page is only recorded after its rows are flushed, so a crash costs no requests
+    beyond the page that was in progress.
+
+    Incremental runs (daily refresh) use the per-topic Watermark instead: once a
+    topic has been walked to the end, listing restarts at page 1 and stops at the
+    first page that is entirely below the newest article of the previous walk.
+    """
+
+    def __init__(self, portal, path=FRONTIER_DB):
+        self.portal = portal
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+        self.db.commit()
+
+    # ---------- URLs ----------
+    def known_urls(self):
+        """Every URL already recorded for this portal, in any state."""
+        with self.lock:
+            rows = self.db.execute("SELECT url FROM urls WHERE portal = ?", (self.portal,))
+            return {url for (url,) in rows}
+
+    def seed(self, urls):
+        """Records URLs already present in an output CSV as done (first run after adopting the frontier)."""
+        now = time.time()
+        with self.lock, self.db:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO urls (portal, url, state, updated) VALUES (?, ?, ?, ?)",
+                [(self.portal, url, DONE, now) for url in urls],
+            )
+
+    def add(self, urls, topic):
+        """Records newly discovered URLs as pending. Returns the ones that were not known yet."""
+        now = time.time()
+        new = []
+        with self.lock, self.db:
+            for url in urls:
+                cur = self.db.execute(
+                    "INSERT OR IGNORE INTO urls (portal, url, topic, state, updated) VALUES (?, ?, ?, ?, ?)",
+                    (self.portal, url, topic, PENDING, now),
+                )
+                if cur.rowcount:
+                    new.append(url)
+        return new
+
+    def start(self, urls):
+        self._set_state(urls, INFLIGHT, attempt=True)
+
+    def finish(self, urls, results):
+        """
+        Marks each URL done when its result is truthy, failed otherwise. Pass
+        whether each URL's row was written (not just parsed), after the rows are flushed.
+        """
+        urls = list(urls)
+        done = [u for u, r in zip(urls, results) if r]
+        failed = [u for u, r in zip(urls, results) if not r]
+        self._set_state(done, DONE)
+        self._set_state(failed, FAILED)
+
+    def unfinished(self, topic):
+        """URLs of `topic` that a previous run discovered but never completed."""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT url FROM urls WHERE portal = ? AND topic = ? "
+                "AND (state IN (?, ?) OR (state = ? AND attempts < ?)) ORDER BY updated",
+                (self.portal, topic, PENDING, INFLIGHT, FAILED, MAX_ATTEMPTS),
+            )
+            return [url for (url,) in rows]
+
+    def _set_state(self, urls, state, attempt=False):
+        now = time.time()
+        bump = 1 if attempt else 0
+        with self.lock, self.db:
+            self.db.executemany(
+                "UPDATE urls SET state = ?, attempts = attempts + ?, updated = ? WHERE portal = ? AND url = ?",
+                [(state, bump, now, self.portal, url) for url in urls],
+            )
+
+    # ---------- Topics / pages ----------
+    def resume(self, topic):
+        """Returns (last_page, cursor, finished) for a topic; (0, None, False) if it was never started."""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT last_page, cursor, finished FROM topics WHERE portal = ? AND topic = ?",
+                (self.portal, topic),
+            ).fetchone()
+        if not row:
+            return 0, None, False
+        last_page, cursor, finished = row
+        return last_page, (json.loads(cursor) if cursor else None), bool(finished)
+
+    def page_done(self, topic, page, cursor=None):
+        """Records that list page `page` is fully written; `cursor` is whatever the crawler needs to open page + 1."""
+        self._save_topic(topic, page, cursor, finished=False)
+
+    def topic_done(self, topic, watermark=None):
+        """Marks a full walk of the topic complete and moves its watermark up to the newest article saved."""
+        last_page, cursor, _ = self.resume(topic)
+        self._save_topic(topic, last_page, cursor, finished=True)
+        if watermark is not None and watermark.newest is not None:
+            if watermark.published is None or watermark.newest > watermark.published:
+                with self.lock, self.db:
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO watermarks (portal, topic, url, published, updated) VALUES (?, ?, ?, ?, ?)",
+                        (self.portal, topic, watermark.newest_url, watermark.newest.isoformat(), time.time()),
+                    )
+
+    def watermark(self, topic):
+        """The topic's Watermark; empty (never below) until a walk of the topic has completed."""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT url, published FROM watermarks WHERE portal = ? AND topic = ?", (self.portal, topic)
+            ).fetchone()
+        if not row:
+            return Watermark()
+        url, published = row
+        return Watermark(url, datetime.fromisoformat(published) if published else None)
+
+    def reset_topics(self):
+        """Forgets paging progress (URL states are kept, so nothing is downloaded twice)."""
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM topics WHERE portal = ?", (self.portal,))
+
+    def _save_topic(self, topic, page, cursor, finished):
+        # `finished` is sticky: once a topic has been walked to the end, later
+        # (incremental) walks only move its page cursor
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT INTO topics (portal, topic, last_page, cursor, finished, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (portal, topic) DO UPDATE SET last_page = excluded.last_page, "
+                "cursor = excluded.cursor, finished = MAX(finished, excluded.finished), updated = excluded.updated",
+                (self.portal, topic, page, json.dumps(cursor) if cursor is not None else None,
+                 int(finished), time.time()),
+            )
+
+    # ---------- Reporting ----------
+    def counts(self):
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT state, COUNT(*) FROM urls WHERE portal = ? GROUP BY state", (self.portal,)
+            )
+            return dict(rows.fetchall())
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
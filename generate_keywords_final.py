@@ -5,6 +5,7 @@ import google.generativeai as genai
 import sys
 import io
 import glob
+from url_index import UrlIndex
 
 # Force UTF-8 for print statements in Windows console
 if sys.stdout.encoding != 'utf-8':
@@ -76,13 +77,27 @@ def generate_for_row(content, key_idx):
         print(f"  [ERROR] Key ...{key[-5:]}: {e}")
     return None
 
-def write_output_file(output_path, successful_rows):
-    """Rewrites the output file with only the successful data."""
-    with open(output_path, 'w', encoding='utf-8-sig', newline='') as f_out:
+def is_successful(row):
+    kw = row.get('keywords') or ""
+    # Keep if valid and not an error marker
+    return bool(row.get('url') and kw and len(kw) > 3 and "Lỗi" not in kw)
+
+def clean_output_file(output_path):
+    """Rewrites the output file with only the successful data, one row at a time. Returns (kept, dropped)."""
+    kept = dropped = 0
+    tmp_path = output_path + ".tmp"
+    with open(output_path, 'r', encoding='utf-8-sig', newline='') as f_in, \
+         open(tmp_path, 'w', encoding='utf-8-sig', newline='') as f_out:
         writer = csv.DictWriter(f_out, fieldnames=FIELDNAMES, quoting=csv.QUOTE_MINIMAL)
         writer.writeheader()
-        for row in successful_rows:
-            writer.writerow({k: row.get(k, '') for k in FIELDNAMES})
+        for row in csv.DictReader(f_in):
+            if is_successful(row):
+                writer.writerow({k: row.get(k, '') for k in FIELDNAMES})
+                kept += 1
+            else:
+                dropped += 1
+    os.replace(tmp_path, output_path)
+    return kept, dropped
 
 def main():
     if not os.path.exists(OUTPUT_DIR): os.makedirs(OUTPUT_DIR)
@@ -98,39 +113,33 @@ def main():
         
         print(f"\n--- CLEAN START: {file_name} ---")
         
-        # 1. Load successful rows
-        successful_rows = []
-        successful_urls = set()
-        if os.path.exists(output_path):
-            with open(output_path, 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    kw = row.get('keywords') or ""
-                    # Keep if valid and not an error marker
-                    if row.get('url') and kw and len(kw) > 3 and "Lỗi" not in kw:
-                        successful_rows.append(row)
-                        successful_urls.add(row['url'])
+        # 1. Clean the file immediately (removes old errors); the shared URL index then covers what is left
+        cleaned, dropped = clean_output_file(output_path) if os.path.exists(output_path) else (0, 0)
+        done_urls = UrlIndex(output_path)
+        if dropped:
+            done_urls.rebuild()  # The dropped URLs may still be in an index written moments ago
         
-        # Clean the file immediately (removes old errors)
-        write_output_file(output_path, successful_rows)
-        
-        # 2. Get all input rows
-        all_input_rows = []
+        # 2. Input rows not done yet
         with open(file_path, 'r', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                all_input_rows.append(row)
-                
-        to_process = [r for r in all_input_rows if r.get('url') not in successful_urls]
-        print(f"  Already cleaned: {len(successful_rows)}. To process: {len(to_process)}")
+            to_process = [r for r in csv.DictReader(f) if r.get('url') not in done_urls]
+        print(f"  Already cleaned: {cleaned}. To process: {len(to_process)}")
+        
+        f_out = open(output_path, 'a', encoding='utf-8-sig', newline='')
+        writer = csv.DictWriter(f_out, fieldnames=FIELDNAMES, quoting=csv.QUOTE_MINIMAL)
+        if f_out.tell() == 0:
+            writer.writeheader()
+
+        def save(row):
+            writer.writerow({k: row.get(k, '') for k in FIELDNAMES})
+            f_out.flush()
+            done_urls.record(row.get('url'))
         
         for i, row in enumerate(to_process):
             content = (row.get('content') or row.get('summary') or "").strip()
             
             if len(content) < 50:
                 row['keywords'] = "Nội dung quá ngắn"
-                successful_rows.append(row)
-                write_output_file(output_path, successful_rows)
+                save(row)
             else:
                 success = False
                 while not success:
@@ -155,13 +164,15 @@ def main():
                         time.sleep(1)
                     
                     if success:
-                        successful_rows.append(row)
-                        write_output_file(output_path, successful_rows)
+                        save(row)
                     else:
                         print(f"  [{i+1}/{len(to_process)}] ALL KEYS EXHAUSTED. Sleeping 5 mins to recover...")
                         time.sleep(300)
             
             time.sleep(DELAY_BETWEEN_CALLS)
 
+        f_out.close()
+        done_urls.close()
+
 if __name__ == "__main__":
     main()
@@ -7,6 +7,7 @@ import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import sys
 import io
+from url_index import UrlIndex
 
 # Force UTF-8 for print statements in Windows console
 if sys.stdout.encoding != 'utf-8':
@@ -177,13 +178,8 @@ def main():
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
 
-    existing_urls = set()
-    if os.path.exists(OUTPUT_FILE):
-        with open(OUTPUT_FILE, 'r', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row.get('url'):
-                    existing_urls.add(row['url'])
+    # Sidecar URL index of the output; only re-reads the CSV when the index is out of date
+    existing_urls = UrlIndex(OUTPUT_FILE)
     print(f"Found {len(existing_urls)} already processed rows.")
 
     rows_to_process = []
@@ -201,7 +197,7 @@ def main():
 
     print(f"Processing {len(rows_to_process)} rows with {MAX_WORKERS} threads...")
 
-    mode = 'a' if existing_urls else 'w'
+    mode = 'a' if len(existing_urls) else 'w'
     with open(OUTPUT_FILE, mode, encoding='utf-8-sig', newline='') as f:
         writer = csv.DictWriter(f, fieldnames=fieldnames, quoting=csv.QUOTE_MINIMAL)
         if mode == 'w':
@@ -219,9 +215,11 @@ def main():
                         with open(OUTPUT_FILE, 'a', encoding='utf-8-sig', newline='') as f_out:
                             writer = csv.DictWriter(f_out, fieldnames=fieldnames, quoting=csv.QUOTE_MINIMAL)
                             writer.writerow(result_row)
+                        existing_urls.record(result_row.get('url'))
             except Exception as e:
                 print(f"  [Exception] Row {idx}: {e}")
 
+    existing_urls.close()
     print("\nProcessing Complete.")
 
 if __name__ == "__main__":
@@ -6,6 +6,7 @@ import glob
 import google.generativeai as genai
 import sys
 import io
+from url_index import UrlIndex
 
 # Force UTF-8 for print statements in Windows console
 if sys.stdout.encoding != 'utf-8':
@@ -129,18 +130,10 @@ def process_all_files():
         
         print(f"\n--- Processing: {file_name} ---")
         
-        # Load existing progress if any
-        existing_urls = set()
-        if os.path.exists(output_path):
-            try:
-                with open(output_path, 'r', encoding='utf-8-sig') as f_exist:
-                    reader = csv.DictReader(f_exist)
-                    for row in reader:
-                        if row.get('url') and row.get('keywords') and len(row['keywords'].strip()) > 5:
-                            existing_urls.add(row['url'])
-                print(f"Resuming from existing file. {len(existing_urls)} rows already done.")
-            except Exception as e:
-                print(f"Error reading existing file: {e}")
+        # Load existing progress if any (sidecar URL index, rebuilt from the CSV only when out of date)
+        existing_urls = UrlIndex(output_path)
+        if len(existing_urls):
+            print(f"Resuming from existing file. {len(existing_urls)} rows already done.")
 
         # Read input file
         rows = []
@@ -157,7 +150,7 @@ def process_all_files():
         FIELDNAMES = ['topic', 'title', 'summary', 'url', 'keywords', 'public_time', 'content']
 
         # Open output file in append/write mode
-        mode = 'a' if existing_urls and os.path.exists(output_path) else 'w'
+        mode = 'a' if len(existing_urls) and os.path.exists(output_path) else 'w'
         write_header = (mode == 'w')
         
         with open(output_path, mode, encoding='utf-8-sig', newline='') as f_out:
@@ -187,11 +180,13 @@ def process_all_files():
                 
                 writer.writerow(output_row)
                 f_out.flush() 
+                existing_urls.record(url)
                 
                 # Mandated delay for 2.0 Flash Exp (very strict)
                 print(f"  [Sleep] Waiting 15s for rate limit...")
                 time.sleep(15.0)
 
+        existing_urls.close()
         print(f"Finished {file_name}. Generated {processed_in_this_run} new entries.")
 
 if __name__ == "__main__":
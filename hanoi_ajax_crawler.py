@@ -1,14 +1,17 @@
-import requests
 import re
 import csv
-import time
 import html
 from bs4 import BeautifulSoup
-from typing import Optional, Dict, List
-from urllib.parse import urljoin
+from html_backend import make_soup
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Tuple
+from urllib.parse import urljoin, urlencode
+from transport import make_session
+from url_index import UrlIndex
 
 # --- CONFIGURATION ---
-session = requests.Session()
+session = make_session()
 session.headers.update({
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
     'Accept': 'text/html, */*; q=0.01',
@@ -23,7 +26,13 @@ ARTICLE_URL_RE = re.compile(r'.*\d+\.htm$', re.IGNORECASE)
 
 API_ENDPOINT = 'https://hanoi.gov.vn/api/NewsZone/NewsZone'
 MAX_PAGES = 400
-SLEEP_BETWEEN_REQUESTS = 0.5
+# NewsZone drops the DataIds[] articles from the list first and then applies PageIndex, so PageIndex
+# only counts the shown pages that are not excluded.
+# 'window': DataIds[] carries only the last EXCLUDE_PAGES pages' IDs, so every request has the same size.
+# 'full': every ID seen in the topic so far (old behaviour; the payload grows by one page per request).
+PAGING_MODE = 'window'
+EXCLUDE_PAGES = 1
+PREFETCH = True  # Request page N+1 while page N's articles are being parsed
 OUTPUT_FILE = 'hanoi_data_final.csv'
 
 CATEGORIES = {
@@ -78,9 +87,12 @@ def fetch_articles_ajax(catname: str, pageSize: str, page_index: int, data_ids:
     except:
         return None
 
+def article_id(link: str) -> str:
+    return link.split('/')[-1].replace('.htm', '')
+
 def extract_article_links_from_ajax(ajax_data: Dict) -> List[str]:
     links = []
-    soup = BeautifulSoup(ajax_data.get('data', ''), 'html.parser')
+    soup = make_soup(ajax_data.get('data', ''))
     for a in soup.find_all('a', href=True):
         full_url = normalize_href(a['href'])
         if full_url and ARTICLE_URL_RE.search(full_url) and DOMAIN in full_url:
@@ -103,7 +115,7 @@ def parse_article(url: str) -> Dict[str, str]:
         if resp.status_code != 200:
             return result
 
-        soup = BeautifulSoup(resp.text, 'html.parser')
+        soup = make_soup(resp.text)
 
         if not check_copyright(soup):
             return result
@@ -185,55 +197,79 @@ def parse_article(url: str) -> Dict[str, str]:
     except:
         return result
 
+# --- TOPIC LOOP ---
+def crawl_topic(topic: str, cfg: Dict, writer: csv.DictWriter, seen_global: UrlIndex,
+                mode: str = PAGING_MODE, prefetch: bool = PREFETCH) -> Tuple[int, int, int]:
+    """Pages through one category; returns (pages, articles written, bytes of DataIds[] posted)."""
+    recent = deque(maxlen=EXCLUDE_PAGES)  # IDs of the last pages, one list per page
+    seen_ids = []
+    pages = saved = posted = 0
+
+    def fetch(page_index, ids):
+        return fetch_articles_ajax(cfg['catname'], cfg['pageSize'], page_index, ids)
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch') as executor:
+        pending = executor.submit(fetch, 0, [])
+        for page_index in range(MAX_PAGES):
+            ajax = pending.result()
+            if not ajax:
+                break
+
+            links = extract_article_links_from_ajax(ajax)
+            if not links:
+                break
+            pages += 1
+
+            ids = [article_id(l) for l in links]
+            seen_ids.extend(ids)
+            recent.append(ids)
+            next_ids = list(seen_ids) if mode == 'full' else [i for page in recent for i in page]
+            posted += len(urlencode({'DataIds[]': next_ids}, doseq=True))
+            # Excluded pages are gone from the server's list, so the next page starts after the others
+            next_index = pages - (pages if mode == 'full' else len(recent))
+
+            # The next request only needs this page's IDs, so it can run while the articles are parsed
+            if page_index + 1 < MAX_PAGES:
+                pending = executor.submit(fetch, next_index, next_ids)
+                if not prefetch:
+                    pending.result()
+
+            for link in links:
+                if link in seen_global:
+                    continue
+                seen_global.add(link)
+
+                data = parse_article(link)
+                if data['title'] and data['content']:
+                    writer.writerow({
+                        'topic': topic,
+                        'title': data['title'],
+                        'summary': data['summary'],
+                        'url': data['url'],
+                        'keywords': data['keywords'],
+                        'public_time': data['publish_time'],
+                        'content': data['content']
+                    })
+                    seen_global.record(link)
+                    saved += 1
+    return pages, saved, posted
+
 # --- MAIN ---
 def main():
-    seen_global = set()
+    # Sidecar URL index of the output, rebuilt from the CSV only when out of date
+    seen_global = UrlIndex(OUTPUT_FILE)
     fieldnames = ['topic', 'title', 'summary', 'url', 'keywords', 'public_time', 'content']
 
-    try:
-        with open(OUTPUT_FILE, 'r', encoding='utf-8-sig') as f:
-            for row in csv.DictReader(f):
-                if row.get('url'):
-                    seen_global.add(row['url'])
-    except FileNotFoundError:
-        pass
-
     with open(OUTPUT_FILE, 'a', newline='', encoding='utf-8-sig') as f:
         writer = csv.DictWriter(f, fieldnames=fieldnames)
-        if not seen_global:
+        if f.tell() == 0:
             writer.writeheader()
 
         for topic, cfg in CATEGORIES.items():
-            data_ids = []
-            for page_index in range(MAX_PAGES):
-                ajax = fetch_articles_ajax(cfg['catname'], cfg['pageSize'], page_index, data_ids)
-                if not ajax:
-                    break
-
-                links = extract_article_links_from_ajax(ajax)
-                if not links:
-                    break
-
-                for link in links:
-                    if link in seen_global:
-                        continue
-                    seen_global.add(link)
-
-                    data = parse_article(link)
-                    if data['title'] and data['content']:
-                        writer.writerow({
-                            'topic': topic,
-                            'title': data['title'],
-                            'summary': data['summary'],
-                            'url': data['url'],
-                            'keywords': data['keywords'],
-                            'public_time': data['publish_time'],
-                            'content': data['content']
-                        })
-
-                data_ids.extend([l.split('/')[-1].replace('.htm', '') for l in links])
-                time.sleep(SLEEP_BETWEEN_REQUESTS)
+            pages, saved, posted = crawl_topic(topic, cfg, writer, seen_global)
+            print(f"{topic}: {pages} pages, {saved} articles, {posted / 1024:.1f} KB of DataIds[] posted ({PAGING_MODE})")
 
+    seen_global.close()
     print("✔ Crawling completed")
 
 if __name__ == "__main__":
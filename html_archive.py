@@ -0,0 +1,158 @@
+import os
+import gzip
+import json
+import time
+import atexit
+import threading
+from urllib.parse import urlparse
+
+# ================= CONFIG =================
+ENABLED = False                 # Opt-in: every PoliteSession response is archived (see reextract.py)
+ARCHIVE_DIR = "html_archive"    # <host>.<seq>.arc.gz segments per portal, appended across runs
+COMPRESS_LEVEL = 6
+SEGMENT_BYTES = 64 * 1024 ** 2  # A host moves on to a new segment file past this size
+MAX_BYTES = 2 * 1024 ** 3       # Oldest segments are deleted once the archive exceeds this
+EVICT_TO = 0.9                  # ... down to this fraction of MAX_BYTES
+
+# Each record is its own gzip member: a JSON header line, then `length` body bytes.
+# Concatenated members are still one valid .gz stream, and a crash can only cut
+# the last record short.
+_files = {}
+_lock = threading.Lock()
+_checked = False  # Size cap enforced once per process before the first write
+
+
+def archive_path(host, seq=1):
+    return os.path.join(ARCHIVE_DIR, f"{host}.{seq:06d}.arc.gz")
+
+
+def segments():
+    """(host, seq, path) of every archive file, oldest segment of each host first."""
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+    found = []
+    for name in os.listdir(ARCHIVE_DIR):
+        if not name.endswith(".arc.gz"):
+            continue
+        host, _, seq = name[:-len(".arc.gz")].rpartition(".")
+        if not (seq.isdigit() and len(seq) == 6):
+            host, seq = name[:-len(".arc.gz")], "0"  # <host>.arc.gz from before segments
+        found.append((host, int(seq), os.path.join(ARCHIVE_DIR, name)))
+    return sorted(found)
+
+
+def _evict():
+    # Called with the lock held: drop whole segments, oldest first, down to EVICT_TO
+    open_paths = {f.name for f in _files.values()}
+    files = []
+    for _, _, path in segments():
+        try:
+            files.append((os.path.getmtime(path), os.path.getsize(path), path))
+        except OSError:
+            pass
+    total = sum(size for _, size, _ in files)
+    if total <= MAX_BYTES:
+        return
+    target = MAX_BYTES * EVICT_TO
+    dropped = 0
+    for _, size, path in sorted(files):
+        if total <= target:
+            break
+        if path in open_paths:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        dropped += 1
+    print(f"  HTML archive over {MAX_BYTES / 1024 ** 3:.1f} GB: {dropped} oldest segments deleted.")
+
+
+def _open(host):
+    global _checked
+    f = _files.get(host)
+    if f is None:
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        if not _checked:
+            _checked = True
+            _evict()
+        seqs = [seq for h, seq, _ in segments() if h == host]
+        seq = max(seqs + [1])
+        path = archive_path(host, seq)
+        if os.path.exists(path) and os.path.getsize(path) >= SEGMENT_BYTES:
+            path = archive_path(host, seq + 1)
+        f = _files[host] = open(path, "ab")
+    return f
+
+
+def record(url, status, headers, body, method="GET", encoding=None, requested=None):
+    """
+    Appends one response. `body` is bytes, or str for Selenium page_source (stored as utf-8).
+    `url` is where the body came from; `requested` the URL asked for, when a redirect changed it.
+    """
+    if isinstance(body, str):
+        body, encoding = body.encode("utf-8"), "utf-8"
+    header = {
+        "url": url,
+        "requested": requested or url,  # What the crawler wrote to its CSV; reextract matches on this
+        "method": method,
+        "status": status,
+        "headers": dict(headers),
+        "encoding": encoding,
+        "fetched": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "length": len(body),
+    }
+    data = gzip.compress(json.dumps(header, ensure_ascii=False).encode("utf-8") + b"\n" + body, COMPRESS_LEVEL)
+    host = urlparse(url).netloc.lower()
+    with _lock:
+        f = _open(host)
+        f.write(data)
+        f.flush()
+        if f.tell() >= SEGMENT_BYTES:
+            # The next record starts a new segment; full segments are what eviction removes
+            f.close()
+            del _files[host]
+            _evict()
+
+
+def hook(resp, *args, **kwargs):
+    """requests response hook; PoliteSession installs it when ENABLED."""
+    # Streamed bodies belong to the caller, and cache hits were archived when first fetched
+    if kwargs.get("stream") or getattr(resp, "from_cache", False):
+        return resp
+    try:
+        requested = resp.history[0].url if resp.history else (resp.request.url if resp.request else resp.url)
+        record(resp.url, resp.status_code, resp.headers, resp.content,
+               method=resp.request.method if resp.request else "GET", encoding=resp.encoding, requested=requested)
+    except Exception as e:
+        print(f"  Archive write failed for {resp.url}: {e}")
+    return resp
+
+
+def close():
+    with _lock:
+        for f in _files.values():
+            f.close()
+        _files.clear()
+
+
+atexit.register(close)
+
+
+def iter_records(path):
+    """Yields (header dict, body bytes) for every complete record in an archive file."""
+    with gzip.open(path, "rb") as f:
+        while True:
+            try:
+                line = f.readline()
+                if not line:
+                    return
+                header = json.loads(line)
+                body = f.read(header["length"])
+            except (EOFError, gzip.BadGzipFile, ValueError):
+                print(f"  {path}: truncated last record ignored.")
+                return
+            if len(body) < header["length"]:
+                return
+            yield header, body
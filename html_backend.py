@@ -0,0 +1,53 @@
+import importlib.util
+
+from bs4 import BeautifulSoup
+
+# ================= CONFIG =================
+# lxml's tree builder is several times faster than html.parser, but it builds a
+# different tree from some broken markup. Crawlers use PARSER unless they ask for
+# another builder themselves (crawl_bacninh has always preferred lxml); before a
+# portal switches, `python bench_parser.py <portal>` must show identical rows on
+# its recorded pages.
+PARSER = "html.parser"
+FORCE_PARSER = None         # Overrides every caller's choice (bench_parser.py timing runs)
+
+FALLBACK_PARSER = "html.parser"
+HAVE_LXML = importlib.util.find_spec("lxml") is not None
+
+stats = {"fast": 0, "fallback": 0}
+
+
+def _is_malformed(markup):
+    # libxml2 stops reading at a NUL byte, silently dropping the rest of the page
+    if isinstance(markup, bytes):
+        return b"\x00" in markup
+    return "\x00" in markup
+
+
+def _lost_body(soup, markup):
+    """lxml can hand back an empty <body> for pages with a broken <head> (unclosed comments, stray </html>)."""
+    if soup.body is None or soup.body.find(True) is None:
+        probe = markup[:200000].lower()
+        return (b"<body" in probe) if isinstance(probe, bytes) else ("<body" in probe)
+    return False
+
+
+def make_soup(markup, parser=None):
+    """
+    Drop-in for BeautifulSoup(markup, "html.parser") on list and article pages.
+    A faster builder (parser="lxml") is only used when it is installed, and
+    html.parser takes over when the page is malformed in a way lxml handles differently.
+    """
+    parser = FORCE_PARSER or parser or PARSER
+    if parser == "lxml" and not HAVE_LXML:
+        parser = FALLBACK_PARSER
+    if parser != FALLBACK_PARSER and not _is_malformed(markup):
+        try:
+            soup = BeautifulSoup(markup, parser)
+            if not _lost_body(soup, markup):
+                stats["fast"] += 1
+                return soup
+        except Exception:
+            pass
+        stats["fallback"] += 1
+    return BeautifulSoup(markup, FALLBACK_PARSER)
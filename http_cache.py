@@ -0,0 +1,267 @@
+import os
+import re
+import json
+import time
+import atexit
+import hashlib
+import sqlite3
+import threading
+from urllib.parse import urlparse
+
+from requests.adapters import BaseAdapter
+from requests.models import Response
+from requests.utils import get_encoding_from_headers
+from requests.structures import CaseInsensitiveDict
+
+# ================= CONFIG =================
+ENABLED = True                  # Mounted under every PoliteSession
+CACHE_DIR = "http_cache"        # Bodies in <dir>/<aa>/<key>, index in <dir>/index.db
+MAX_BYTES = 2 * 1024 ** 3       # LRU eviction once the stored bodies exceed this
+EVICT_TO = 0.9                  # ... down to this fraction of MAX_BYTES
+
+# Headers that describe the stored (already decoded) body, not the wire response
+_SKIP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "set-cookie"}
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key           TEXT PRIMARY KEY,
+    url           TEXT NOT NULL,
+    host          TEXT NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    headers       TEXT NOT NULL,
+    size          INTEGER NOT NULL,
+    fresh_until   REAL NOT NULL DEFAULT 0,
+    accessed      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+
+def cache_key(url):
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+def _fresh_until(headers, now):
+    control = headers.get("Cache-Control", "").lower()
+    if "no-cache" in control or "no-store" in control:
+        return 0.0
+    m = _MAX_AGE.search(control)
+    return now + int(m.group(1)) if m else 0.0
+
+
+class HttpCache:
+    """
+    Disk store of GET response bodies plus their validators (ETag, Last-Modified).
+    One instance is shared by all sessions in the process; SQLite access is
+    serialized by a lock, body files are written with an atomic rename.
+
+    Per-host counters, reported at exit:
+      hit  - served from disk without a request (still fresh per Cache-Control max-age)
+      304  - revalidated, the server answered Not Modified and the body came from disk
+      miss - full download (no entry, or the page changed)
+    """
+
+    def __init__(self, path=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(path, "index.db"), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+        self.db.commit()
+        self.total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        self.stats = {}
+        self.saved_bytes = 0
+
+    def _body_path(self, key):
+        return os.path.join(self.path, key[:2], key)
+
+    # ---------- Lookup ----------
+    def lookup(self, url):
+        """Returns (key, etag, last_modified, headers dict, fresh_until) or None."""
+        key = cache_key(url)
+        with self.lock:
+            row = self.db.execute(
+                "SELECT etag, last_modified, headers, fresh_until FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if not row or not os.path.exists(self._body_path(key)):
+            return None
+        etag, last_modified, headers, fresh_until = row
+        return key, etag, last_modified, json.loads(headers), fresh_until
+
+    def body(self, key):
+        try:
+            with open(self._body_path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        with self.lock, self.db:
+            self.db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+        self.saved_bytes += len(data)
+        return data
+
+    # ---------- Store ----------
+    def store(self, url, headers, content):
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        now = time.time()
+        fresh_until = _fresh_until(headers, now)
+        if "no-store" in headers.get("Cache-Control", "").lower():
+            return
+        if not (etag or last_modified or fresh_until):
+            return  # Nothing to revalidate with
+        key = cache_key(url)
+        path = self._body_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(content)
+        os.replace(tmp, path)
+        kept = {k: v for k, v in headers.items() if k.lower() not in _SKIP_HEADERS}
+        with self.lock, self.db:
+            old = self.db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries (key, url, host, etag, last_modified, headers, size, fresh_until, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, urlparse(url).netloc.lower(), etag, last_modified, json.dumps(kept),
+                 len(content), fresh_until, now),
+            )
+            self.total += len(content) - (old[0] if old else 0)
+            if self.total > self.max_bytes:
+                self._evict()
+
+    def refresh(self, key, headers):
+        """A 304 may carry updated validators or freshness."""
+        now = time.time()
+        with self.lock, self.db:
+            self.db.execute(
+                "UPDATE entries SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified), "
+                "fresh_until = ?, accessed = ? WHERE key = ?",
+                (headers.get("ETag"), headers.get("Last-Modified"), _fresh_until(headers, now), now, key),
+            )
+
+    def _evict(self):
+        # Called with the lock held: drop least recently used bodies down to EVICT_TO
+        target = self.max_bytes * EVICT_TO
+        rows = self.db.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall()
+        dropped = []
+        for key, size in rows:
+            if self.total <= target:
+                break
+            try:
+                os.remove(self._body_path(key))
+            except OSError:
+                pass
+            self.total -= size
+            dropped.append((key,))
+        self.db.executemany("DELETE FROM entries WHERE key = ?", dropped)
+
+    # ---------- Reporting ----------
+    def count(self, url, outcome):
+        host = urlparse(url).netloc.lower()
+        with self.lock:
+            counts = self.stats.setdefault(host, {"hit": 0, "304": 0, "miss": 0})
+            counts[outcome] += 1
+
+    def report(self):
+        if not self.stats:
+            return
+        print(f"\nHTTP cache ({self.total / 1024 ** 2:.1f} MB stored, "
+              f"{self.saved_bytes / 1024 ** 2:.1f} MB served from disk):")
+        for host, c in sorted(self.stats.items()):
+            total = c["hit"] + c["304"] + c["miss"]
+            print(f"  {host:<28} {total:>6} GET  hit {c['hit'] / total:6.1%}  "
+                  f"304 {c['304'] / total:6.1%}  miss {c['miss'] / total:6.1%}")
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class CachingAdapter(BaseAdapter):
+    """
+    Wraps the transport adapter a session would otherwise use (including the
+    portals' legacy-TLS adapters) and adds conditional GETs on top of it.
+    Streamed responses are passed through untouched.
+    """
+
+    def __init__(self, inner, cache):
+        super().__init__()
+        self.inner = inner
+        self.cache = cache
+
+    def send(self, request, stream=False, **kwargs):
+        if request.method != "GET" or stream:
+            return self.inner.send(request, stream=stream, **kwargs)
+
+        url = request.url
+        entry = self.cache.lookup(url)
+        if entry:
+            key, etag, last_modified, headers, fresh_until = entry
+            if fresh_until > time.time():
+                content = self.cache.body(key)
+                if content is not None:
+                    self.cache.count(url, "hit")
+                    return self._from_cache(request, headers, content, 200)
+            if etag:
+                request.headers["If-None-Match"] = etag
+            if last_modified:
+                request.headers["If-Modified-Since"] = last_modified
+
+        resp = self.inner.send(request, stream=stream, **kwargs)
+
+        if resp.status_code == 304 and entry:
+            content = self.cache.body(key)
+            if content is not None:
+                self.cache.refresh(key, resp.headers)
+                self.cache.count(url, "304")
+                headers.update({k: v for k, v in resp.headers.items() if k.lower() not in _SKIP_HEADERS})
+                return self._from_cache(request, headers, content, 200, resp)
+            # Body evicted under us: ask again without validators
+            request.headers.pop("If-None-Match", None)
+            request.headers.pop("If-Modified-Since", None)
+            resp = self.inner.send(request, stream=stream, **kwargs)
+
+        self.cache.count(url, "miss")
+        if resp.status_code == 200:
+            self.cache.store(url, resp.headers, resp.content)
+        return resp
+
+    def _from_cache(self, request, headers, content, status, wire=None):
+        resp = Response()
+        resp.status_code = status
+        resp.headers = CaseInsensitiveDict(headers)
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp._content = content
+        resp.url = request.url
+        resp.request = request
+        resp.reason = "OK"
+        resp.from_cache = True
+        if wire is not None:
+            resp.elapsed = wire.elapsed
+            resp.connection = wire.connection
+            wire.close()
+        else:
+            resp.connection = self
+        return resp
+
+    def close(self):
+        self.inner.close()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache():
+    """The process-wide cache, opened on first use and reported at exit."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = HttpCache()
+            atexit.register(_shared.report)
+        return _shared
@@ -0,0 +1,277 @@
+import itertools
+import math
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from fetch_engine import MAX_PER_HOST
+
+# ================= CONFIG =================
+WINDOW_WORKERS = MAX_PER_HOST   # List windows in flight per category (the session's rate limiter still paces them)
+TOTAL_KEYS = ("recordsTotal", "recordsFiltered", "totalRecord", "totalRecords", "TotalRecord",
+              "totalCount", "TotalCount", "total", "Total")       # Item counts (DataTables, SharePoint APIs)
+PAGE_COUNT_KEYS = ("totalPageNum", "totalPages", "TotalPage", "pageCount")   # Page counts (Liferay loadPage)
+PROBE_ATTEMPTS = 3          # Tries per list page while looking for the last one, before giving up on the topic
+
+
+class ProbeError(RuntimeError):
+    """A list page kept failing while PageUrlPaginator looked for the end, so the end is unknown."""
+
+
+def read_ahead(func, keys, workers=WINDOW_WORKERS):
+    """
+    Yields (key, func(key)) in the order of `keys` (which may be endless), with
+    up to `workers` calls in flight. Closing the generator cancels the calls
+    that have not started.
+    """
+    keys = iter(keys)
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="page")
+    try:
+        while True:
+            for key in itertools.islice(keys, workers - len(pending)):
+                pending.append((key, executor.submit(func, key)))
+            if not pending:
+                return
+            key, future = pending.popleft()
+            yield key, future.result()
+    finally:
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def window_count(data, page_size):
+    """Number of windows the list has, from the first response's total, or None if it does not say."""
+    if not isinstance(data, dict):
+        return None
+    for key in PAGE_COUNT_KEYS:
+        value = data.get(key)
+        if isinstance(value, (int, str)) and str(value).isdigit():
+            return int(value)
+    for key in TOTAL_KEYS:
+        value = data.get(key)
+        if isinstance(value, (int, str)) and str(value).isdigit():
+            return math.ceil(int(value) / page_size)
+    return None
+
+
+class OffsetPaginator:
+    """
+    Concurrent window fetching for JSON list APIs that page by offset or page
+    number (vinhphuc QUERYDATA start/length, bacninh loadPage pageNum).
+
+    fetch(index) returns the decoded response of window `index` (0, 1, 2, ...;
+    the caller turns it into start=index*pager.stride or pageNum=index+1) and
+    items(data) the rows in it. The first window is fetched alone to learn the
+    total; the rest are kept `workers` in flight and yielded in window order as
+    soon as each one and all before it have arrived:
+
+        pager = OffsetPaginator(fetch, lambda data: data.get("data", []), PAGE_SIZE, limit=2000)
+        for index, rows in pager:
+            ...
+
+    A window that fails (after the session's own retries) is logged, skipped and
+    its index kept in `missed`, so the caller can tell the list was not read whole.
+
+    Without a total, windows are requested ahead until one comes back short,
+    which costs at most `workers` - 1 empty windows. Stopping the loop early
+    cancels the windows not yet sent.
+
+    A server that caps the window size serves fewer rows than page_size from a
+    list that has more. stride is then the row count the first window actually
+    held, so offsets advance by what the server returns and no rows fall
+    between windows. If the total is unknown, a short first window is not
+    trusted as the end: the list is read one window at a time until one
+    comes back empty.
+    """
+
+    def __init__(self, fetch, items, page_size, limit=None, workers=WINDOW_WORKERS):
+        self.fetch = fetch
+        self.items = items
+        self.page_size = page_size
+        self.limit = limit      # Max items listed per category
+        self.workers = workers
+        self.windows = None     # Window count, once the first response told us
+        self.stride = page_size  # Rows per window the server actually serves
+        self.requests = 0
+        self.failed = 0
+        self.missed = []        # Indexes of the windows that failed
+        self.lock = threading.Lock()
+
+    def _get(self, index):
+        with self.lock:
+            self.requests += 1
+        try:
+            return self.items(self.fetch(index)) or []
+        except Exception as e:
+            with self.lock:
+                self.failed += 1
+                self.missed.append(index)
+            print(f"    Error fetching window {index}: {e}")
+            return None
+
+    def __iter__(self):
+        self.requests += 1
+        try:
+            data = self.fetch(0)
+        except Exception as e:
+            self.failed += 1
+            self.missed.append(0)
+            print(f"    Error fetching window 0: {e}")
+            return
+        rows = self.items(data) or []
+        if not rows:
+            return
+        self.windows = window_count(data, self.page_size)
+        capped = len(rows) < self.page_size and (self.windows is None or window_count(data, len(rows)) > 1)
+        if capped:
+            self.stride = len(rows)
+            self.windows = window_count(data, self.stride)
+            if self.windows is not None:
+                print(f"    Server caps windows at {self.stride} of {self.page_size} rows; using that as the stride")
+        last = self.windows
+        if self.limit is not None:
+            cap = math.ceil(self.limit / self.stride)
+            last = cap if last is None else min(last, cap)
+        yield 0, rows
+
+        following = range(1, last) if last is not None else itertools.count(1)
+        # Unknown total and a short first window: only an empty window proves the end, so read serially
+        workers = 1 if capped and self.windows is None else self.workers
+        for index, rows in read_ahead(self._get, following, workers):
+            if rows is None:
+                continue  # Failed window: logged, the rest of the list is still worth having
+            if rows:
+                yield index, rows
+            if len(rows) < self.stride and self.windows is None:
+                return  # Past the end of a list that never said how long it is
+
+
+class PageUrlPaginator:
+    """
+    List pages whose URL is built from the page number (cantho/hatinh "?page=N",
+    hungyen "-N.html", dienbien "?PageIndex=N").
+
+    last_page() finds where the list ends without walking it: page 1, 2, 4, 8,
+    ... until one is missing, then a binary search between the last page found
+    and the first one missing, about 2*log2(N) requests. Iterating then fetches
+    the pages `workers` at a time and yields (page, entries) in page order,
+    entries being None for a page that failed to load:
+
+        pager = PageUrlPaginator(f"{start_url}?page={{page}}", fetch_soup, list_links, max_pages=500)
+        for page, links in pager:
+            ...
+
+    fetch(url) returns the page's soup, or None for a missing page (404, error
+    page); entries(soup) returns the page's articles, empty past the end. Some
+    portals answer a page past the end with the last page again, so a page that
+    repeats the entries of a later probe counts as missing too. Probed pages are
+    not fetched twice. A page that fails to load during the search is retried,
+    then ProbeError is raised: a timeout is never taken for the end of the list.
+
+    With probe=False (a refresh that will stop at the first page of known
+    articles) there is no search: pages are fetched one at a time, in order,
+    until one is empty, repeats the page before it, or max_pages.
+    """
+
+    def __init__(self, page_url, fetch, entries, max_pages=None, first=1, workers=WINDOW_WORKERS, probe=True):
+        self.page_url = page_url if callable(page_url) else page_url.format
+        self.fetch = fetch
+        self.entries = entries
+        self.max_pages = max_pages
+        self.first = first
+        self.workers = workers
+        self.probe = probe
+        self.last = None
+        self.found = {}         # page -> entries, for pages already fetched
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def _load(self, page):
+        with self.lock:
+            if page in self.found:
+                return self.found[page]
+            self.requests += 1
+        url = self.page_url(page=page)
+        try:
+            soup = self.fetch(url)
+            entries = list(self.entries(soup)) if soup is not None else []
+        except Exception as e:
+            print(f"    Error fetching list page {url}: {e}")
+            return None
+        with self.lock:
+            self.found[page] = entries
+        return entries
+
+    def _probe(self, page):
+        """_load() for the end search: retries a failed page, and raises ProbeError rather than guessing."""
+        for _ in range(PROBE_ATTEMPTS):
+            entries = self._load(page)
+            if entries is not None:
+                return entries
+        raise ProbeError(f"list page {page} failed {PROBE_ATTEMPTS} times, last page unknown")
+
+    def last_page(self):
+        """Number of the last list page (first - 1 if even the first is empty). Cached."""
+        if self.last is not None:
+            return self.last
+        entries = self._probe(self.first)
+        if not entries:
+            self.last = self.first - 1
+            return self.last
+        # Exponential probes until a page is empty, or repeats the page before it
+        below, found, step, beyond = self.first - 1, self.first, 1, None
+        while True:
+            probe = self.first + step
+            if self.max_pages is not None:
+                probe = min(probe, self.max_pages)
+            if probe == found:
+                # Reached max_pages: it is the last page unless the one before it shows the same list
+                if found - 1 <= below or self._probe(found - 1) != entries:
+                    self.last = found
+                    return found
+                beyond, missing = entries, found
+                found = below
+                break
+            previous, entries = entries, self._probe(probe)
+            if not entries:
+                missing = probe
+                break
+            if entries == previous:
+                # Clamped: everything from the last page on shows the same list, `found` included
+                beyond, missing = entries, found
+                found = below
+                break
+            below, found, step = found, probe, step * 2
+
+        # Smallest page that is past the end (empty, or the clamped repeat) in (found, missing]
+        while missing - found > 1:
+            middle = (found + missing) // 2
+            entries = self._probe(middle)
+            if not entries or entries == beyond:
+                missing = middle
+            else:
+                found = middle
+        # With clamping, the first page showing the repeated list is the real last page
+        self.last = missing if beyond is not None and self._probe(missing) == beyond else found
+        return self.last
+
+    def _walk(self):
+        page, previous = self.first, None
+        while self.max_pages is None or page <= self.max_pages:
+            entries = self._load(page)
+            if entries is not None:
+                if not entries or entries == previous:
+                    return
+                previous = entries
+            yield page, entries
+            page += 1
+
+    def __iter__(self):
+        if not self.probe:
+            yield from self._walk()
+            return
+        last = self.last_page()
+        for page, entries in read_ahead(self._load, range(self.first, last + 1), self.workers):
+            yield page, entries
@@ -0,0 +1,75 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# ================= CONFIG =================
+PARSE_PROCESSES = int(os.environ.get("CRAWL_PARSE_PROCESSES", 0)) or os.cpu_count() or 2  # crawl_all.py sets each portal's share
+
+_WARMUP_HTML = b"<html><head><title>warmup</title></head><body><h1>warmup</h1><p>warmup</p></body></html>"
+
+
+def response_encoding(resp):
+    """The encoding requests would use for resp.text, so workers decode the same way."""
+    return resp.encoding or resp.apparent_encoding or "utf-8"
+
+
+def _warm(extract):
+    # Pays the bs4/soupsieve import and regex compilation once per worker,
+    # instead of on the first real page
+    try:
+        extract(_WARMUP_HTML.decode("utf-8"), "warmup", "warmup")
+    except Exception:
+        pass
+
+
+def _run(extract, content, encoding, url, topic):
+    # encoding=None hands the raw bytes to extractors that let bs4 sniff the charset
+    html_text = content if encoding is None else str(content, encoding, errors="replace")
+    return extract(html_text, url, topic)
+
+
+class ParsePool:
+    """
+    Ships raw article HTML (bytes) to a pool of warm worker processes and returns
+    the row dicts built by `extract(html_text, url, topic)`.
+
+    `extract` must be a module-level function (e.g. crawl_danang.extract_article)
+    so it can be pickled by reference. Fetching stays on the caller's threads;
+    only the BeautifulSoup work moves to other cores.
+    """
+
+    def __init__(self, extract, processes=PARSE_PROCESSES):
+        self.extract = extract
+        # spawn, not fork: the crawlers already have fetch threads running when parsing starts
+        self.executor = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm,
+            initargs=(extract,),
+        )
+
+    def submit(self, content, encoding, url, topic):
+        return self.executor.submit(_run, self.extract, content, encoding, url, topic)
+
+    def parse(self, content, encoding, url, topic):
+        """Blocking version of submit(), for use from fetch threads."""
+        return self.submit(content, encoding, url, topic).result()
+
+    def map(self, pages, chunksize=4):
+        """Parses (content, encoding, url, topic) tuples and returns the rows in order."""
+        pages = list(pages)
+        if not pages:
+            return []
+        contents, encodings, urls, topics = zip(*pages)
+        return list(self.executor.map(
+            _run, [self.extract] * len(pages), contents, encodings, urls, topics, chunksize=chunksize
+        ))
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,75 @@
+import queue
+import threading
+
+# ================= CONFIG =================
+DETAIL_WORKERS = 8
+QUEUE_SIZE = 50     # Max discovered-but-unparsed URLs (and parsed-but-unwritten rows)
+
+_DONE = object()
+
+
+def run_pipeline(discovered, parse, write, workers=DETAIL_WORKERS, queue_size=QUEUE_SIZE):
+    """
+    Three-stage crawl: discovery -> N detail workers -> one writer.
+
+    - `discovered` is an iterable (usually a generator paging through CATEGORIES)
+      yielding (url, topic). It is consumed on its own thread, so list paging keeps
+      going while articles are being fetched.
+    - `parse(url, topic)` is the crawler's existing parse_article; it runs on
+      `workers` threads and returns a row dict or None.
+    - `write(row)` runs on the calling thread only, so the csv writer needs no lock.
+      It returns True when the row was saved.
+
+    Both queues are bounded: when workers fall behind, discovery blocks instead of
+    piling URLs up in memory, and when the writer falls behind, workers block.
+    Returns a dict of counters.
+    """
+    url_queue = queue.Queue(maxsize=queue_size)
+    row_queue = queue.Queue(maxsize=queue_size)
+    stats = {"discovered": 0, "parsed": 0, "saved": 0}
+
+    def discovery_stage():
+        try:
+            for url, topic in discovered:
+                url_queue.put((url, topic))
+                stats["discovered"] += 1
+        except Exception as e:
+            print(f"  Discovery stopped: {e}")
+        finally:
+            for _ in range(workers):
+                url_queue.put(_DONE)
+
+    def detail_stage():
+        while True:
+            item = url_queue.get()
+            if item is _DONE:
+                row_queue.put(_DONE)
+                return
+            url, topic = item
+            try:
+                row = parse(url, topic)
+            except Exception as e:
+                print(f"    Error parsing {url}: {e}")
+                row = None
+            if row:
+                row_queue.put(row)
+
+    threads = [threading.Thread(target=discovery_stage, name="discovery", daemon=True)]
+    threads += [threading.Thread(target=detail_stage, name=f"detail-{i}", daemon=True) for i in range(workers)]
+    for t in threads:
+        t.start()
+
+    # Writer stage
+    finished = 0
+    while finished < workers:
+        row = row_queue.get()
+        if row is _DONE:
+            finished += 1
+            continue
+        stats["parsed"] += 1
+        if write(row):
+            stats["saved"] += 1
+
+    for t in threads:
+        t.join()
+    return stats
@@ -0,0 +1,379 @@
+import re
+import csv
+import sys
+import html
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse, parse_qsl, urlencode
+
+import soupsieve
+from html_backend import make_soup
+from fetch_engine import FetchEngine, MAX_PER_HOST
+from frontier import Frontier
+from paginators import OffsetPaginator, PageUrlPaginator, WINDOW_WORKERS
+from site_profiles import PROFILES, FIELDNAMES, DEFAULT_STRIP, DEFAULT_FIELDS
+from transport import make_session
+from url_index import UrlIndex
+from webforms import WebFormsPager, pager_links
+
+# ================= CONFIG =================
+PROFILE_WORKERS = 4     # Portals crawled at once (each has its own host budget in rate_limiter.PORTAL_LIMITS)
+MAX_PAGES = 200         # List pages per category when a profile does not say
+TIMEOUT = 20
+STOP_AT_SEEN = True     # Stop a category at the first list page with nothing new (resume after a finished run)
+NEXT_TEXT_RE = re.compile(r"^(Trang sau|Sau|Tiếp|Tiếp theo|Next|>|»)$", re.I)
+
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+def clean_text(s):
+    if not s:
+        return ""
+    s = html.unescape(str(s))
+    s = re.sub(r"[\x00-\x1f\x7f]", " ", s)
+    return re.sub(r"\s+", " ", s).strip()
+
+
+def clean_html(raw_html):
+    """Text of an HTML fragment from a JSON API (ContentNews, ...)."""
+    if not raw_html:
+        return ""
+    return clean_text(make_soup(html.unescape(raw_html)).get_text(separator=" "))
+
+
+def _compile_source(source):
+    if source == "title":
+        return ("title", None)
+    if source.startswith("meta:"):
+        return ("meta", source[len("meta:"):])
+    if source.startswith("all:"):
+        return ("all", soupsieve.compile(source[len("all:"):]))
+    return ("css", soupsieve.compile(source))
+
+
+class SiteProfile:
+    """
+    A site_profiles.PROFILES entry compiled once: selectors go through soupsieve
+    and cleanup patterns through re up front, so the per-page work is only
+    matching. Holds the portal's session; extract() is pure (HTML in, row out).
+    """
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.spec = spec
+        self.base_url = spec["base_url"]
+        self.categories = spec["categories"]
+        self.output_file = spec.get("output_file", f"{name}_data_final.csv")
+        self.frontier = spec.get("frontier")
+        self.listing = spec["listing"]
+        self.max_pages = self.listing.get("max_pages", MAX_PAGES)
+        self.workers = self.listing.get("workers", WINDOW_WORKERS)
+        self.verify = spec.get("verify", True)
+        self.timeout = spec.get("timeout", TIMEOUT)
+
+        links = spec.get("links", {})
+        self.link_scope = soupsieve.compile(links["scope"]) if links.get("scope") else None
+        self.link_css = soupsieve.compile(links.get("css", "a[href]"))
+        self.link_include = re.compile(links["include"]) if links.get("include") else None
+        self.link_exclude = tuple(links.get("exclude", ()))
+        self.min_href = links.get("min_href", 0)
+
+        fields = dict(DEFAULT_FIELDS, **spec.get("fields", {}))
+        self.fields = {field: [_compile_source(s) for s in sources] for field, sources in fields.items()}
+        self.strip = soupsieve.compile(spec.get("strip", DEFAULT_STRIP))
+        self.cleanup = {
+            field: [re.compile(p, re.I | re.S) for p in patterns]
+            for field, patterns in spec.get("cleanup", {}).items()
+        }
+        self.require = spec.get("require", ["title", "content"])
+        self.next_css = soupsieve.compile(self.listing["next"]) if self.listing.get("next") else None
+
+        self.session = self.new_session()
+
+    def new_session(self):
+        return make_session(legacy_tls=self.spec.get("legacy_tls", False), headers=self.spec.get("headers"))
+
+    # ---------- Extraction ----------
+    def _value(self, soup, field, kind, arg):
+        if kind == "title":
+            return soup.title.get_text() if soup.title else ""
+        if kind == "meta":
+            tag = (soup.find("meta", attrs={"name": arg}) or soup.find("meta", attrs={"property": arg})
+                   or soup.find("meta", id=arg))
+            return tag.get("content", "") if tag else ""
+        if kind == "all":
+            return ", ".join(filter(None, (clean_text(t.get_text()) for t in arg.select(soup))))
+        tag = arg.select_one(soup)
+        if tag is None:
+            return ""
+        if field == "content":
+            for junk in self.strip.select(tag):
+                junk.decompose()
+        return tag.get_text(separator=" ")
+
+    def clean(self, field, text):
+        text = clean_text(text)
+        for pattern in self.cleanup.get(field, ()):
+            text = pattern.sub("", text)
+        return clean_text(text)
+
+    def extract(self, html_text, url, topic):
+        """Builds the CSV row from an article page's HTML. No network access."""
+        soup = make_soup(html_text)
+        row = {"topic": topic, "url": url}
+        for field in FIELDNAMES:
+            if field in row:
+                continue
+            row[field] = ""
+            for kind, arg in self.fields.get(field, ()):
+                text = self.clean(field, self._value(soup, field, kind, arg))
+                if text:
+                    row[field] = text
+                    break
+        return row if all(row.get(field) for field in self.require) else None
+
+    def fetch_article(self, url, topic):
+        resp = self.session.get(url, timeout=self.timeout, verify=self.verify)
+        if resp.status_code != 200:
+            return None
+        return self.extract(resp.text, url, topic)
+
+    # ---------- List pages ----------
+    def get_soup(self, url):
+        resp = self.session.get(url, timeout=self.timeout, verify=self.verify)
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        return make_soup(resp.text)
+
+    def links(self, soup, page_url=None):
+        """Article URLs on a list page, in page order (already-crawled ones included)."""
+        scopes = self.link_scope.select(soup) if self.link_scope else []
+        found = []
+        for scope in scopes or [soup]:
+            for a in self.link_css.select(scope):
+                href = (a.get("href") or "").strip()
+                if not href or href.startswith(("javascript", "#", "mailto:", "tel:")) or len(href) < self.min_href:
+                    continue
+                if any(x in href for x in self.link_exclude):
+                    continue
+                url = urljoin(page_url or self.base_url, href)
+                if self.link_include and not self.link_include.search(url):
+                    continue
+                found.append(url)
+        return list(dict.fromkeys(found))
+
+    def list_pages(self, topic_url):
+        """Yields (page, entries) for a category: article URLs, or whole rows for JSON listings."""
+        kind = self.listing["type"]
+        return getattr(self, f"_list_{kind}")(topic_url)
+
+    def _list_page_param(self, topic_url):
+        sep = "&" if "?" in topic_url else "?"
+        param = self.listing.get("param", "page")
+        yield from PageUrlPaginator(f"{topic_url}{sep}{param}={{page}}", self.get_soup, self.links,
+                                    max_pages=self.max_pages, workers=self.workers)
+
+    def _list_page_path(self, topic_url):
+        match = re.search(self.listing["pattern"], topic_url)
+        if not match:
+            print(f"  [{self.name}] {topic_url} does not match {self.listing['pattern']}")
+            return
+        template = lambda page: self.listing["format"].format(*match.groups(), page=page)
+        yield from PageUrlPaginator(template, self.get_soup, self.links, max_pages=self.max_pages, workers=self.workers)
+
+    def _list_next_link(self, topic_url):
+        url, visited = topic_url, set()
+        for page in range(1, self.max_pages + 1):
+            visited.add(url)
+            soup = self.get_soup(url)
+            if soup is None:
+                return
+            yield page, self.links(soup, url)
+            next_a = self.next_css.select_one(soup) if self.next_css else None
+            if next_a is None:
+                next_a = next((a for a in soup.find_all("a", href=True)
+                               if NEXT_TEXT_RE.match(clean_text(a.get_text()))), None)
+            href = next_a.get("href") if next_a is not None else None
+            if not href or href.startswith("javascript"):
+                return
+            url = urljoin(url, href)
+            if url in visited:
+                return
+
+    def _list_liferay_cur(self, topic_url):
+        soup = self.get_soup(topic_url)
+        if soup is None:
+            return
+        first = self.links(soup, topic_url)
+        next_a = soup.find("a", string=NEXT_TEXT_RE) or soup.select_one("li.next a")
+        params = dict(parse_qsl(urlparse(next_a["href"]).query)) if next_a and next_a.get("href") else {}
+        cur_key = next((k for k in params if k.endswith("_cur")), None)
+        if not cur_key:
+            yield 1, first  # No asset-publisher pager: the category is one page
+            return
+        base = urljoin(topic_url, next_a["href"]).split("?")[0]
+        pages = PageUrlPaginator(lambda page: f"{base}?{urlencode(dict(params, **{cur_key: page}))}",
+                                 self.get_soup, self.links, max_pages=self.max_pages, workers=self.workers)
+        pages.found[1] = first
+        yield from pages
+
+    def _list_postback(self, topic_url):
+        # A pager per category, on its own session: viewstate is tied to the session cookie
+        pager = WebFormsPager(self.new_session(), topic_url, timeout=self.timeout, verify=self.verify)
+        soup = pager.open()
+        if soup is None:
+            return
+        if pager_links(soup):
+            for page, soup in pager.walk(soup, self.max_pages, self.workers):
+                yield page, self.links(soup, topic_url)
+            return
+        fallback = self.listing.get("fallback_param")
+        if not fallback:
+            yield 1, self.links(soup, topic_url)
+            return
+        pages = PageUrlPaginator(f"{topic_url}?{fallback}={{page}}", self.get_soup,
+                                 lambda s: self.links(s, topic_url), max_pages=self.max_pages, workers=self.workers)
+        pages.found[1] = self.links(soup, topic_url)
+        yield from pages
+
+    def _request_body(self, category):
+        body = dict(self.listing.get("body", {}))
+        if isinstance(category, dict):
+            body.update(category)
+        elif self.listing.get("category_key"):
+            body[self.listing["category_key"]] = category
+        return body
+
+    def _send(self, body):
+        if self.listing.get("method", "POST").upper() == "GET":
+            resp = self.session.get(self.listing["api"], params=body, timeout=self.timeout, verify=self.verify)
+        else:
+            resp = self.session.post(self.listing["api"], data=body, timeout=self.timeout, verify=self.verify)
+        resp.raise_for_status()
+        return resp
+
+    def _list_json_offset(self, category):
+        listing = self.listing
+        size = listing.get("page_size", 50)
+        body = self._request_body(category)
+
+        def fetch_window(index):
+            window = dict(body)
+            if listing.get("page_key"):
+                window[listing["page_key"]] = index + listing.get("first", 1)
+            else:
+                window[listing.get("offset_key", "start")] = index * size
+            window[listing.get("size_key", "length")] = size
+            return self._send(window).json()
+
+        pager = OffsetPaginator(fetch_window, lambda data: data.get(listing.get("items", "data"), []), size,
+                                limit=listing.get("max_items"), workers=self.workers)
+        for index, items in pager:
+            yield index + 1, [row for row in (self._json_row(item, category) for item in items) if row]
+
+    def _json_row(self, item, category):
+        try:
+            url = self.listing["url_format"].format(category=category, **item)
+        except (KeyError, IndexError):
+            return None
+        row = {"url": url}
+        for field, key in self.listing.get("row", {}).items():
+            value = item.get(key) or ""
+            row[field] = self.clean(field, clean_html(value) if field == "content" else value)
+        return row
+
+    def _list_ajax_post(self, category):
+        body = self._request_body(category)
+        page_key = self.listing.get("page_key", "PageIndex")
+
+        def fetch_page(page):
+            return make_soup(self._send(dict(body, **{page_key: page})).text)
+
+        first = self.listing.get("first", 1)
+        # The "URL" of an AJAX page is its page number; PageUrlPaginator only hands it to fetch_page
+        yield from PageUrlPaginator(lambda page: page, fetch_page, self.links, first=first,
+                                    max_pages=first + self.max_pages - 1, workers=self.workers)
+
+
+def load(name):
+    """The compiled profile for a portal, compiled on first use."""
+    with _compiled_lock:
+        if name not in _compiled:
+            _compiled[name] = SiteProfile(name, PROFILES[name])
+        return _compiled[name]
+
+
+def crawl_profile(name, engine):
+    """Crawls every category of one portal into its CSV. Returns the number of rows saved."""
+    profile = load(name)
+    seen = UrlIndex(profile.output_file)
+    # The portal's crawler skips every URL its frontier knows, so the profile must both consult and record it
+    frontier = Frontier(profile.frontier) if profile.frontier else None
+    saved = 0
+    with open(profile.output_file, "a", encoding="utf-8-sig", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+        if len(seen) == 0 and f.tell() == 0:
+            writer.writeheader()
+        for topic, category in profile.categories.items():
+            print(f"[{name}] {topic}")
+            topic_saved = 0
+            try:
+                for page, entries in profile.list_pages(category):
+                    if entries is None:
+                        print(f"  [{name}] {topic}: page {page} failed")
+                        continue
+                    rows = [dict(e, topic=topic) for e in entries if isinstance(e, dict) and e["url"] not in seen]
+                    urls = [e for e in entries if isinstance(e, str) and e not in seen]
+                    if frontier is not None:
+                        fresh = set(frontier.add([r["url"] for r in rows] + urls, topic))
+                        rows = [r for r in rows if r["url"] in fresh]
+                        urls = [u for u in urls if u in fresh]
+                    if STOP_AT_SEEN and page > 1 and not rows and not urls:
+                        break
+                    if frontier is not None:
+                        frontier.start([r["url"] for r in rows] + urls)
+                    fetched = engine.map(profile.fetch_article, urls, topic)
+                    written = set()
+                    for row in rows + fetched:
+                        if row and all(row.get(field) for field in profile.require) and row["url"] not in seen:
+                            writer.writerow(row)
+                            seen.record(row["url"])
+                            written.add(row["url"])
+                            topic_saved += 1
+                    f.flush()
+                    if frontier is not None:
+                        attempted = [r["url"] for r in rows] + urls
+                        frontier.finish(attempted, [url in written for url in attempted])
+            except Exception as e:
+                print(f"  [{name}] {topic}: stopped ({e})")
+            print(f"  [{name}] {topic}: {topic_saved} saved")
+            saved += topic_saved
+    seen.close()
+    if frontier is not None:
+        frontier.close()
+    return saved
+
+
+def run_profiles(names, workers=PROFILE_WORKERS, per_host=MAX_PER_HOST):
+    """Crawls several portals at once in one process, sharing one FetchEngine. Returns {name: saved}."""
+    with FetchEngine(per_host=per_host) as engine, ThreadPoolExecutor(max_workers=workers, thread_name_prefix="profile") as pool:
+        futures = {name: pool.submit(crawl_profile, name, engine) for name in names}
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                print(f"[{name}] failed: {e}")
+                results[name] = None
+    return results
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(PROFILES)
+    unknown = [n for n in names if n not in PROFILES]
+    if unknown:
+        sys.exit(f"Unknown profile(s): {', '.join(unknown)}. Known: {', '.join(PROFILES)}")
+    for name, saved in run_profiles(names).items():
+        print(f"{name}: {saved} articles saved")
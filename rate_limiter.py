@@ -0,0 +1,252 @@
+import os
+import time
+import asyncio
+import threading
+import requests
+import http_cache
+import html_archive
+import retry
+import adaptive_concurrency
+from urllib.parse import urlparse
+
+# ================= CONFIG =================
+DEFAULT_RATE = 2.0   # Requests per second for hosts not listed below
+DEFAULT_BURST = 4
+# Requests in flight from this process, all hosts together (0: no cap). crawl_all.py hands
+# every portal process its share of the run's global connection cap through the environment.
+MAX_CONNECTIONS = int(os.environ.get("CRAWL_MAX_CONNECTIONS", "0"))
+
+# Politeness budget per portal domain: (requests per second, burst size).
+# Subdomains inherit their parent's budget but get their own bucket.
+PORTAL_LIMITS = {
+    "danang.gov.vn": (2.0, 4),
+    "cantho.gov.vn": (2.0, 4),
+    "gialai.gov.vn": (2.0, 4),
+    "thainguyen.gov.vn": (1.0, 2),
+    "sonla.gov.vn": (2.0, 4),
+    "bacgiang.gov.vn": (2.0, 4),
+    "hatinh.gov.vn": (5.0, 5),
+    "hungyen.gov.vn": (2.0, 4),
+    "dienbien.gov.vn": (1.0, 2),
+    "caobang.gov.vn": (2.0, 4),
+    "vinhphuc.gov.vn": (1.0, 2),
+    "bacninh.gov.vn": (2.0, 4),
+    "khanhhoa.gov.vn": (1.0, 2),
+    "ninhbinh.gov.vn": (1.0, 2),
+    "congan.hanoi.gov.vn": (3.0, 6),
+    "hanoi.gov.vn": (2.0, 4),
+    "conganthanhhoa.gov.vn": (2.0, 4),
+    "tuyengiaodanvan.vn": (1.0, 2),
+}
+
+
+def host_of(url):
+    return urlparse(url).netloc.lower()
+
+
+def limits_for(host, limits=PORTAL_LIMITS):
+    """Looks up (rate, burst) for a host, walking up its parent domains."""
+    host = host.split(":")[0]
+    if host.startswith("www."):
+        host = host[4:]
+    parts = host.split(".")
+    for i in range(len(parts) - 1):
+        candidate = ".".join(parts[i:])
+        if candidate in limits:
+            return limits[candidate]
+    return DEFAULT_RATE, DEFAULT_BURST
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. A caller reserves a token up front (the balance may
+    go negative) and then sleeps off its own debt outside the lock, so concurrent
+    callers are served in arrival order at exactly `rate` per second.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Takes one token and returns how long the caller must wait before using it."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class HostRateLimiter:
+    """
+    One token bucket per host, sized from PORTAL_LIMITS. After share(store) the
+    buckets live in a store every worker process sees (distributed.py), so a
+    host's budget holds across processes and machines instead of per process.
+    """
+
+    def __init__(self, limits=None):
+        self.limits = dict(PORTAL_LIMITS if limits is None else limits)
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.store = None
+
+    def share(self, store):
+        """Takes every host's tokens from `store` (an object with reserve(host, rate, burst) -> wait)."""
+        self.store = store
+
+    def configure(self, domain, rate, burst):
+        with self.lock:
+            self.limits[domain] = (rate, burst)
+            # Drop existing buckets so the new budget applies immediately
+            for host in [h for h in self.buckets if h == domain or h.endswith("." + domain)]:
+                del self.buckets[host]
+
+    def bucket(self, url):
+        host = host_of(url)
+        with self.lock:
+            if host not in self.buckets:
+                rate, burst = limits_for(host, self.limits)
+                self.buckets[host] = TokenBucket(rate, burst)
+            return self.buckets[host]
+
+    def _reserve_shared(self, url):
+        host = host_of(url)
+        rate, burst = limits_for(host, self.limits)
+        return self.store.reserve(host, rate, burst)
+
+    def acquire(self, url):
+        """Blocks until the host's budget allows one more request. Returns seconds waited."""
+        if self.store is not None:
+            wait = self._reserve_shared(url)
+            if wait > 0:
+                time.sleep(wait)
+            return wait
+        return self.bucket(url).acquire()
+
+    async def acquire_async(self, url):
+        if self.store is not None:
+            wait = self._reserve_shared(url)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            return wait
+        return await self.bucket(url).acquire_async()
+
+
+# Shared by every crawler in the process, so budgets hold across threads and scripts
+limiter = HostRateLimiter()
+
+
+_connections = threading.BoundedSemaphore(MAX_CONNECTIONS) if MAX_CONNECTIONS > 0 else None
+
+
+def wait(url):
+    """For fetch paths that call requests.get directly."""
+    return limiter.acquire(url)
+
+
+class PoliteSession(requests.Session):
+    """
+    requests.Session that asks the host rate limiter before every request and,
+    when http_cache.ENABLED, revalidates GETs against the shared disk cache.
+    Responses are appended to the raw-HTML archive when html_archive.ENABLED.
+    Timeouts, connection errors and 429/5xx answers are retried with jittered
+    backoff (retry.RetryPolicy); a host that keeps failing is parked by its
+    circuit breaker and requests to it raise retry.CircuitOpen until it recovers.
+    When adaptive_concurrency.ENABLED, each attempt also waits for a slot of its
+    host's adaptive limit and reports back its latency or overload.
+    """
+
+    def __init__(self, rate_limiter=None, cache=None, retry_policy=None):
+        self.cache = cache or (http_cache.shared_cache() if http_cache.ENABLED else None)
+        super().__init__()
+        self.rate_limiter = rate_limiter or limiter
+        self.retry_policy = retry_policy or retry.RetryPolicy()
+        if html_archive.ENABLED:
+            self.hooks["response"].append(html_archive.hook)
+
+    def mount(self, prefix, adapter):
+        # Also wraps adapters mounted later (the legacy-TLS adapters of some portals)
+        if self.cache is not None and not isinstance(adapter, http_cache.CachingAdapter):
+            adapter = http_cache.CachingAdapter(adapter, self.cache)
+        super().mount(prefix, adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        host = host_of(url)
+        breaker = retry.health.breaker(host)
+        attempt = 0
+        while True:
+            try:
+                probe = breaker.allow(host)
+            except retry.CircuitOpen:
+                retry.health.count(host, "rejected")
+                raise
+            # Slot first, then the rate token: a thread waiting on the gate has not spent a token yet,
+            # so opening slots cannot release a burst of requests whose tokens were taken long ago
+            gate = adaptive_concurrency.controller if adaptive_concurrency.ENABLED else None
+            ticket = gate.acquire(host) if gate is not None else None
+            try:
+                self.rate_limiter.acquire(url)
+            except BaseException:
+                if gate is not None:
+                    gate.release(host, ticket)
+                raise
+            start = time.monotonic()
+            error, resp = None, None
+            try:
+                if _connections is not None:
+                    with _connections:
+                        resp = super().request(method, url, *args, **kwargs)
+                else:
+                    resp = super().request(method, url, *args, **kwargs)
+            except requests.RequestException as e:
+                # Any failed exchange (reset, timeout, cut-off body, TLS, redirect loop) settles a probe
+                error = e
+            except BaseException:
+                if probe:
+                    breaker.abandon()
+                raise
+            finally:
+                if gate is not None:
+                    overload = error is not None or (resp is not None and resp.status_code in self.retry_policy.statuses)
+                    latency = time.monotonic() - start if resp is not None else None
+                    gate.release(host, ticket, latency, overload)
+            if error is None:
+                if resp.status_code not in self.retry_policy.statuses:
+                    breaker.success()
+                    return resp
+
+            retry.health.count(host, "failures")
+            retry.health.count(host, "failed_s", time.monotonic() - start)
+            if breaker.failure():
+                retry.health.count(host, "trips")
+                print(f"  [{host}] parked for {breaker.cooldown:.0f}s after {breaker.failures} consecutive failures")
+            if not self.retry_policy.can_retry(method, attempt, error):
+                if error is not None:
+                    raise error
+                return resp
+
+            wait = self.retry_policy.delay(attempt, resp)
+            retry.health.count(host, "retries")
+            retry.health.count(host, "backoff_s", wait)
+            if resp is not None:
+                resp.close()
+            time.sleep(wait)
+            attempt += 1
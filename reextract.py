@@ -0,0 +1,127 @@
+import os
+import csv
+import sys
+import time
+import sqlite3
+import importlib
+
+import html_archive
+from frontier import FRONTIER_DB
+from parse_pool import ParsePool, PARSE_PROCESSES
+
+# ================= CONFIG =================
+BATCH = 256         # Pages handed to the process pool at a time
+FIELDNAMES = ["topic", "title", "summary", "url", "keywords", "public_time", "content"]
+
+# Portal -> (crawler module, archive domain, input). The module must expose a pure
+# extract_article(html, url, topic). "text" decodes the body the way resp.text did
+# during the crawl; "bytes" hands the raw body to extractors that let bs4 sniff the charset.
+PORTALS = {
+    "danang": ("crawl_danang", "danang.gov.vn", "text"),
+    "cantho": ("crawl_cantho", "cantho.gov.vn", "text"),
+    "khanhhoa": ("crawl_khanhhoa", "khanhhoa.gov.vn", "bytes"),
+    "tuyengiao": ("crawl_tuyengiao", "tuyengiaodanvan.vn", "text"),
+}
+
+
+def archive_files(domain):
+    return [path for host, _, path in html_archive.segments()
+            if host == domain or host.endswith("." + domain)]
+
+
+def load_topics(portal, output_file):
+    """URL -> topic for every article the crawler saved (output CSV) or queued (frontier)."""
+    topics = {}
+    if os.path.exists(output_file):
+        with open(output_file, "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                if row.get("url"):
+                    topics[row["url"]] = row.get("topic", "")
+    if os.path.exists(FRONTIER_DB):
+        db = sqlite3.connect(FRONTIER_DB)
+        try:
+            rows = db.execute("SELECT url, topic FROM urls WHERE portal = ? AND topic IS NOT NULL", (portal,))
+            for url, topic in rows:
+                topics.setdefault(url, topic)
+        except sqlite3.OperationalError:
+            pass
+        finally:
+            db.close()
+    return topics
+
+
+def requested_url(header):
+    """The URL the crawler asked for (and wrote to its CSV), not where a redirect ended up."""
+    return header.get("requested") or header["url"]
+
+
+def latest_records(files, topics):
+    """Replays the archive twice: first to find the newest capture of each article, then to yield it."""
+    last = {}
+    for path in files:
+        for i, (header, _) in enumerate(html_archive.iter_records(path)):
+            if header["status"] == 200 and header["method"] == "GET" and requested_url(header) in topics:
+                last[requested_url(header)] = (path, i)
+    for path in files:
+        for i, (header, body) in enumerate(html_archive.iter_records(path)):
+            if last.get(requested_url(header)) == (path, i):
+                yield header, body
+
+
+def batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def reextract(portal, processes=PARSE_PROCESSES):
+    module_name, domain, mode = PORTALS[portal]
+    crawler = importlib.import_module(module_name)
+    files = archive_files(domain)
+    if not files:
+        print(f"No archive for {domain} in {html_archive.ARCHIVE_DIR}/. Crawl with html_archive.ENABLED first.")
+        return
+    topics = load_topics(portal, crawler.OUTPUT_FILE)
+    out_file = os.path.splitext(crawler.OUTPUT_FILE)[0] + "_reextract.csv"
+    print(f"Re-extracting {portal}: {len(files)} archive files, {len(topics)} known article URLs -> {out_file}")
+
+    def pages():
+        for header, body in latest_records(files, topics):
+            encoding = None if mode == "bytes" else (header.get("encoding") or "utf-8")
+            yield body, encoding, requested_url(header), topics[requested_url(header)]
+
+    start = time.perf_counter()
+    parsed = saved = 0
+    with open(out_file, "w", encoding="utf-8-sig", newline="") as f, \
+         ParsePool(crawler.extract_article, processes) as pool:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES, extrasaction="ignore")
+        writer.writeheader()
+        for batch in batches(pages(), BATCH):
+            for row in pool.map(batch):
+                parsed += 1
+                if row and row.get("title") and row.get("content"):
+                    writer.writerow(row)
+                    saved += 1
+            print(f"  {parsed} pages parsed, {saved} rows written")
+
+    elapsed = time.perf_counter() - start
+    print(f"Done in {elapsed:.1f}s ({parsed / elapsed if elapsed else 0:.1f} pages/s, {processes} processes, "
+          f"no network requests). {len(topics) - parsed} known URLs had no archived copy.")
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or any(a not in PORTALS for a in args):
+        print(f"Usage: python reextract.py <portal>...  (portals: {', '.join(PORTALS)})")
+        return
+    for portal in args:
+        reextract(portal)
+
+
+if __name__ == "__main__":
+    main()
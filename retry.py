@@ -0,0 +1,154 @@
+import time
+import atexit
+import random
+import threading
+from email.utils import parsedate_to_datetime
+
+import requests
+
+# ================= CONFIG =================
+MAX_RETRIES = 3                              # Extra attempts after the first one
+BACKOFF_BASE = 1.0                           # Seconds; attempt n waits up to BACKOFF_BASE * 2**n
+BACKOFF_MAX = 60.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_METHODS = {"GET", "HEAD", "OPTIONS"}   # WebForms postbacks (POST) are not replayed
+# Transport errors worth another attempt; other request errors (bad URL, redirect loop) fail at once
+RETRY_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+BREAKER_THRESHOLD = 5                        # Consecutive failures that park a host
+BREAKER_COOLDOWN = 60.0                      # Seconds parked before one probe request is let through
+BREAKER_COOLDOWN_MAX = 900.0                 # Cooldown doubles on each failed probe, up to this
+
+
+class CircuitOpen(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request to a parked host. The crawlers' existing
+    `except Exception` handling treats it like any other failed request."""
+
+
+def retry_after(resp):
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), or None."""
+    value = resp.headers.get("Retry-After") if resp is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    def __init__(self, max_retries=MAX_RETRIES, base=BACKOFF_BASE, cap=BACKOFF_MAX,
+                 statuses=RETRY_STATUSES, methods=RETRY_METHODS):
+        self.max_retries = max_retries
+        self.base = base
+        self.cap = cap
+        self.statuses = statuses
+        self.methods = methods
+
+    def can_retry(self, method, attempt, error=None):
+        if error is not None and not isinstance(error, RETRY_ERRORS):
+            return False
+        return method.upper() in self.methods and attempt < self.max_retries
+
+    def delay(self, attempt, resp=None):
+        """Full-jitter exponential backoff; a server's Retry-After wins when it asks for longer."""
+        wait = random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+        asked = retry_after(resp)
+        if asked is not None:
+            wait = max(wait, min(asked, BREAKER_COOLDOWN_MAX))
+        return wait
+
+
+class CircuitBreaker:
+    """
+    Per-host breaker. After BREAKER_THRESHOLD consecutive failures the host is
+    parked: requests to it fail immediately with CircuitOpen until the cooldown
+    has passed, then a single probe is let through (half-open). A successful probe
+    closes the breaker, a failed one parks the host again for twice as long.
+    Other hosts are unaffected.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def allow(self, host):
+        """Raises CircuitOpen while parked; returns True when this request is the half-open probe."""
+        with self.lock:
+            if self.opened_at is None:
+                return False
+            if self.probing or time.monotonic() - self.opened_at < self.cooldown:
+                raise CircuitOpen(f"{host} is parked after {self.failures} consecutive failures")
+            self.probing = True
+            return True
+
+    def abandon(self):
+        """The probe ended without an answer (interrupted, a local bug): the next request probes again."""
+        with self.lock:
+            self.probing = False
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+            self.cooldown = self.base_cooldown
+
+    def failure(self):
+        """Returns True when this failure parks the host."""
+        with self.lock:
+            self.failures += 1
+            if self.probing:
+                self.probing = False
+                self.cooldown = min(self.cooldown * 2, BREAKER_COOLDOWN_MAX)
+                self.opened_at = time.monotonic()
+                return True
+            if self.opened_at is None and self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+
+class HostHealth:
+    """Breakers and run stats for every host a process talks to."""
+
+    def __init__(self):
+        self.breakers = {}
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def breaker(self, host):
+        with self.lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker()
+            return self.breakers[host]
+
+    def count(self, host, key, amount=1):
+        with self.lock:
+            stats = self.stats.setdefault(
+                host, {"retries": 0, "failures": 0, "trips": 0, "rejected": 0, "failed_s": 0.0, "backoff_s": 0.0}
+            )
+            stats[key] += amount
+
+    def report(self):
+        troubled = {h: s for h, s in self.stats.items() if s["failures"] or s["rejected"]}
+        if not troubled:
+            return
+        print("\nHost health (time lost = failed attempts + backoff sleeps):")
+        for host, s in sorted(troubled.items()):
+            print(f"  {host:<28} failures {s['failures']:>5}  retries {s['retries']:>5}  "
+                  f"parked {s['trips']:>3}x  rejected {s['rejected']:>5}  "
+                  f"lost {s['failed_s'] + s['backoff_s']:8.1f}s")
+
+
+# Shared by every session in the process, like rate_limiter.limiter
+health = HostHealth()
+atexit.register(health.report)
@@ -0,0 +1,268 @@
+# ================= CONFIG =================
+FIELDNAMES = ["topic", "title", "summary", "url", "keywords", "public_time", "content"]
+DEFAULT_STRIP = "script, style, iframe, .social-share, .tags, .rating, .tool, .related-news"
+DEFAULT_FIELDS = {
+    "summary": ["meta:description", "meta:og:description"],
+    "keywords": ["meta:keywords", "meta:news_keywords"],
+}
+
+# One entry per portal, read by profile_crawler.py. Keys:
+#   base_url, categories     topic -> list URL (ajax/json listings: topic -> value posted as `category_key`,
+#                            or a dict merged into the request body)
+#   output_file              same CSV the portal's own crawl_*.py writes, so either can resume the other
+#   frontier                 portal name in frontier.Frontier, for crawlers that dedupe through the frontier
+#                            (known_urls) instead of the CSV's UrlIndex; the profile then records into both
+#   listing                  how a category's list pages are reached; "type" is one of
+#       page_param   {url}?{param}=N                       (paginators.PageUrlPaginator: last page probed first)
+#       page_path    first page URL matched by `pattern`, page N = `format` filled with the groups and N
+#       next_link    follow the `next` selector page by page
+#       liferay_cur  read the "next" link's query once, then set its ..._cur param to N (danang asset publishers)
+#       postback     ASP.NET/SharePoint __doPostBack pager (webforms.WebFormsPager); without one,
+#                    ?{fallback_param}=N when set
+#       json_offset  JSON list API with whole articles in it (paginators.OffsetPaginator); `row` maps CSV
+#                    fields to JSON keys, `url_format` builds the article URL from the item
+#       ajax_post    POST returning an HTML fragment of links, page number (from `first`) in `page_key`
+#     plus max_pages (default profile_crawler.MAX_PAGES) and workers (list pages in flight)
+#   links                    css (article anchors), scope (containers to search, default whole page),
+#                            include (regex the absolute URL must match), exclude (substrings), min_href
+#   fields                   field -> sources tried in order: a CSS selector (first match), "all:<selector>"
+#                            (every match, comma-joined), "meta:<name, property or id>" or "title" (<title>).
+#                            summary/keywords default to DEFAULT_FIELDS
+#   strip                    removed from the content element before its text is taken (default DEFAULT_STRIP)
+#   cleanup                  field -> regexes deleted from the extracted text
+#   require                  fields a row needs to be saved (default title and content)
+#   legacy_tls, verify, headers, timeout   session and request options
+PROFILES = {
+    "sonla": {
+        "base_url": "https://sonla.gov.vn",
+        "output_file": "sonla_data_final.csv",
+        "frontier": "sonla",
+        "verify": False,
+        "categories": {
+            "Chính trị": "https://sonla.gov.vn/tin-chinh-tri",
+            "Kinh tế": "https://sonla.gov.vn/tin-kinh-te",
+            "Văn hóa - Xã hội": "https://sonla.gov.vn/tin-van-hoa-xa-hoi",
+            "An ninh - Quốc phòng": "https://sonla.gov.vn/an-ninh-quoc-phong",
+        },
+        "listing": {
+            "type": "next_link",
+            "next": ".pagination .next a, .pagination a.next, .pagination a[rel='next'], "
+                    ".lfr-pagination-buttons .next a, .taglib-page-iterator .next a, a.next, a[rel='next']",
+            "max_pages": 5000,
+        },
+        "links": {
+            "scope": ".ArticleInMenu, .ArticleList, .portlet-asset-publisher, .list-news, #main-content, .Content-Body, "
+                     ".ModuleContent, .news-list, .post-list, .item-list, .content-list, .view-content, .category-view",
+            "css": ".Title a, h2 a, h3 a, .title-news a",
+            "include": r"sonla\.gov\.vn",
+            "exclude": ["/admin/", "/login", "/search", "mailto:", "tel:", "format=pdf", "Default.aspx", "pageid="],
+        },
+        "fields": {
+            "title": [".ArticleHeader, .title-news, h1", "meta:title"],
+            "public_time": [".PostDate, .date, .time, .cms-date"],
+            "summary": [".ArticleSummary, .summary, .sapo", "meta:description"],
+            "content": [".ArticleContent, .journal-content-article, #content"],
+        },
+        "require": ["title"],
+    },
+    "danang": {
+        "base_url": "https://danang.gov.vn",
+        "output_file": "danang_data_final.csv",
+        "frontier": "danang",
+        "categories": {
+            "Tin tức - Sự kiện": "https://danang.gov.vn/tin-tuc-su-kien",
+            "Chính quyền": "https://danang.gov.vn/vi/chinh-quyen",
+            "Công dân": "https://danang.gov.vn/vi/cong-dan",
+            "Doanh nghiệp": "https://danang.gov.vn/vi/doanh-nghiep",
+            "Du khách": "https://danang.gov.vn/vi/du-khach",
+        },
+        "listing": {"type": "liferay_cur", "max_pages": 100},
+        "links": {
+            "scope": ".portlet-asset-publisher, #main-content",
+            "css": "a[href*='/web/dng/-/']",
+            "include": r"danang\.gov\.vn",
+        },
+        "fields": {
+            "title": [".title-detail", "h1.title-art", "h1", ".news-title", "title"],
+            "public_time": [".date, .time, .ngay-dang, .publish-date, .created-date, .ngay_xb"],
+            "summary": ["meta:description", ".sapo, .summary"],
+            "content": [".journal-content-article", ".content-detail", ".view-content", "#main-content"],
+        },
+        "strip": "script, style, iframe, form, nav, header, footer, [class*='portlet'], [class*='metadata'], "
+                 "[class*='tag-lib'], [class*='social'], [class*='rating'], [class*='comment'], [class*='related']",
+        "cleanup": {
+            "title": [r"\s*-\s*Cổng thông tin.*$"],
+            "content": [r"Đánh giá bài viết.*$"],
+        },
+    },
+    "cantho": {
+        "base_url": "https://www.cantho.gov.vn",
+        "output_file": "cantho_data_final.csv",
+        "categories": {
+            "Hoạt động Lãnh đạo thành phố": "https://www.cantho.gov.vn/hoat-dong-lanh-dao-thanh-pho",
+            "Tuyên truyền - Phổ biến pháp luật": "https://www.cantho.gov.vn/tuyen-truyen-pho-bien-phap-luat",
+            "Tin tức - Sự kiện nổi bật": "https://www.cantho.gov.vn/tin-tuc-va-su-kien",
+            "Thông tin cần biết": "https://www.cantho.gov.vn/thong-tin-can-biet",
+        },
+        "listing": {"type": "page_param", "param": "page", "max_pages": 50},
+        "links": {
+            "css": ".ArticleHeader a, .PostTitle a, h2 a, .title-news a, .news-title a",
+            "include": r"^https://www\.cantho\.gov\.vn/",
+            "exclude": ["/so-do-cong", "javascript:", "#", "mailto:", "signin", "login"],
+        },
+        "fields": {
+            "title": [".ArticleHeader", ".PostTitle", "h1"],
+            "public_time": [".PostDate", ".ArticleDate", ".date"],
+            "summary": ["meta:description", "meta:og:description", ".ArticleSummary", ".summary"],
+            "keywords": ["meta:keywords", "meta:news_keywords"],
+            "content": [".ArticleContent", ".PostContent", ".ArticleBody", "#content"],
+        },
+        "strip": "script, style, iframe, [class*='relate'], [class*='comment'], [class*='share']",
+    },
+    "hatinh": {
+        "base_url": "https://hatinh.gov.vn",
+        "output_file": "hatinh_data_final.csv",
+        "categories": {
+            "Công dân": "https://hatinh.gov.vn/vi/chuyen-muc/cong-dan",
+        },
+        "listing": {"type": "page_param", "param": "page"},
+        "links": {"css": "a[href*='/bai-viet/']"},
+        "fields": {
+            "title": [".detail-title"],
+            "public_time": [".time"],
+            "summary": [".detail-content-lead"],
+            "content": [".detail-content"],
+        },
+        "strip": "script, style",
+        "cleanup": {
+            "public_time": [r"Đăng tải:"],
+            "content": [r"Tệp đính kèm:.*?(?=Lượt xem:|Tác giả:|$)", r"Lượt xem:\s*\d+", r"Tác giả:.*$",
+                        r"\(?Ảnh minh ho[ạa].*?\)?\.?", r"Ảnh:.*?(?=\.|$)"],
+        },
+    },
+    "hungyen": {
+        "base_url": "https://hungyen.gov.vn",
+        "output_file": "hungyen_data_final.csv",
+        "verify": False,
+        "categories": {
+            "Tin tức - Sự kiện": "https://hungyen.gov.vn/tin-tuc-su-kien-c21072-1.html",
+        },
+        "listing": {"type": "page_path", "pattern": r"(.+-\w+)-1\.html$", "format": "{0}-{page}.html", "max_pages": 100},
+        "links": {"scope": "div.item-new", "css": "a.article-title"},
+        "fields": {
+            "title": ["h1", "meta:og:title", "title"],
+            "public_time": [".post-date"],
+            "summary": [".article-content p > strong", ".article-content strong", "meta:description"],
+            "content": [".article-content", "#container", ".new-detail-layout-type-2"],
+        },
+        "strip": "script, style, iframe, div.relate-news",
+        "cleanup": {
+            "public_time": [r"\|.*$", r"lượt xem.*$"],
+            "content": [r"Tác giả:.*$"],
+        },
+    },
+    "khanhhoa": {
+        "base_url": "https://khanhhoa.gov.vn",
+        "output_file": "khanhhoa_data_final.csv",
+        "frontier": "khanhhoa",
+        "verify": False,
+        "categories": {
+            "Lanh Dao Tinh": "https://khanhhoa.gov.vn/vi/tin-hoat-dong-cua-lanh-dao-tinh",
+            "So Nganh Dia Phuong": "https://khanhhoa.gov.vn/vi/tin-hoat-dong-so-nganh-dia-phuong",
+            "Chinh Sach": "https://khanhhoa.gov.vn/vi/chinh-sach-va-cuoc-song",
+        },
+        "listing": {"type": "postback", "max_pages": 20},
+        "links": {"include": r"^https://khanhhoa\.gov\.vn/vi/[^?#]+/[^?#]+", "exclude": ["javascript:"], "min_href": 20},
+        "fields": {
+            "title": [".title-article", "h1", "meta:og:title"],
+            "public_time": ["#datearticle", ".detail-time", ".date", ".time", ".ngaythang"],
+            "summary": ["meta:ogdescription", "meta:og:description", "meta:description"],
+            "content": [".chitietbaiviet", ".detail-content.afcbc-body.clearfix", ".tinmoii", ".detail-content", "#box_t"],
+        },
+        "cleanup": {
+            "content": [r"\(?Ảnh minh họa[^)]*\)?", r"\(Ảnh:[^)]*\)"],
+        },
+    },
+    "dienbien": {
+        "base_url": "https://www.dienbien.gov.vn",
+        "output_file": "dienbien_data_final.csv",
+        "verify": False,
+        "categories": {
+            "Hoạt động lãnh đạo UBND": "https://www.dienbien.gov.vn/portal/Pages/Hoat-dong-lanh-dao-UBND-tinh.aspx",
+            "Cơ chế chính sách": "https://dienbien.gov.vn/portal/Pages/co_che_chinh_sach.aspx",
+        },
+        "listing": {"type": "postback", "fallback_param": "PageIndex", "max_pages": 500},
+        "links": {
+            "css": "a[href*='/portal/Pages/'][href*='.aspx']",
+            "exclude": ["default.aspx", "login.aspx", "/home-new/", "lich-tiep-cong-dan"],
+        },
+        "fields": {
+            "title": [".tandan-p-article-news-title", "title"],
+            "summary": [".tandan-p-article-news-summary", "meta:description"],
+            "keywords": ["all:.td-tags a", "meta:keywords"],
+            "public_time": [".tandan-span-date-publish, .date, .time, .publish-date"],
+            "content": [".tandan-p-article-main, .ms-rtestate-field, .tandan-p-article-news-content, #content",
+                        "#main-content, .ms-webpart-zone, .ms-rtestate-write"],
+        },
+        "strip": "script, style, .social-share, .tandan-div-article-other, #ctl00_PlaceHolderMain_ctl08_label",
+        "cleanup": {
+            "title": [r"\s*-\s*CỔNG THÔNG TIN.*$"],
+            "keywords": [r"Tags,?\s*"],
+            "public_time": [r"Đăng ngày"],
+        },
+    },
+    "vinhphuc": {
+        "base_url": "https://vinhphuc.gov.vn",
+        "output_file": "vinhphuc_data_final.csv",
+        "legacy_tls": True,
+        "verify": False,
+        "categories": {
+            "Thời sự chính trị": "/ct/cms/tintuc/Lists/ThoiSuChinhTri",
+            "Kinh tế": "/ct/cms/tintuc/Lists/KinhTe",
+            "Văn hóa xã hội": "/ct/cms/tintuc/Lists/VanHoaXaHoi",
+        },
+        "listing": {
+            "type": "json_offset",
+            "api": "https://vinhphuc.gov.vn/APIVP/api/DSTinTuc/QUERYDATA",
+            "method": "POST",
+            "body": {"do": "QUERYDATA", "fieldOrder": "CreatedDate", "ascending": "desc"},
+            "category_key": "UrlList",
+            "offset_key": "start",
+            "size_key": "length",
+            "page_size": 50,
+            "items": "data",
+            "max_items": 2000,
+            "url_format": "https://vinhphuc.gov.vn{category}/View_Detail.aspx?ItemID={ID}",
+            "row": {"title": "Title", "summary": "DescriptionNews", "public_time": "CreatedDate", "content": "ContentNews"},
+        },
+        "cleanup": {"title": [r"##"]},
+    },
+    "hanoi": {
+        "base_url": "https://hanoi.gov.vn",
+        "output_file": "hanoi_data_final.csv",
+        "headers": {
+            "X-Requested-With": "XMLHttpRequest",
+            "Origin": "https://hanoi.gov.vn",
+            "Referer": "https://hanoi.gov.vn/tin-tuc-su-kien-noi-bat",
+        },
+        "categories": {
+            "Tin nổi bật": {"Catname": "nMSbbZ2pR0/XHR7JMRKsFGiPETTBu6V1", "PageSize": "TwNsaMrfVrU="},
+        },
+        "listing": {
+            "type": "ajax_post",
+            "api": "https://hanoi.gov.vn/api/NewsZone/NewsZone",
+            "body": {"LanguageId": "jM2HDDVEz40=", "Site": "/CP0MQRJUt0="},
+            "page_key": "PageIndex",
+            "first": 0,
+            "max_pages": 400,
+        },
+        "links": {"include": r"^https://hanoi\.gov\.vn/.*\d+\.htm$"},
+        "fields": {
+            "title": ["title"],
+            "summary": ["meta:og:description", "meta:description"],
+            "public_time": [".news-info .time", ".detail-time"],
+            "content": [".detail-content.afcbc-body.clearfix"],
+        },
+        "strip": "h2, img, figure, figcaption, script, style",
+    },
+}
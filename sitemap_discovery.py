@@ -0,0 +1,218 @@
+import gzip
+import xml.etree.ElementTree as ET
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin, urlparse
+
+from frontier import parse_time
+from rate_limiter import PoliteSession
+
+# ================= CONFIG =================
+# Tried after the Sitemap: lines of robots.txt
+SITEMAP_PATHS = ["/sitemap.xml", "/sitemap_index.xml", "/rss", "/rss.xml", "/feed"]
+MAX_DEPTH = 3        # sitemapindex -> sitemap nesting followed at most this deep
+TIMEOUT = 30
+
+# Elements that close one record in each format
+_RECORDS = {"url", "sitemap", "item", "entry"}
+# Child elements holding the date, in order of preference
+_DATES = ("lastmod", "pubDate", "updated", "published", "date")
+
+stats = {"requests": 0, "bytes": 0, "entries": 0}
+
+
+def _local(tag):
+    # "{http://www.sitemaps.org/schemas/sitemap/0.9}loc" -> "loc"
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_date(text):
+    """lastmod (W3C datetime) or RSS pubDate (RFC 822), as a naive datetime."""
+    if not text:
+        return None
+    text = text.strip()
+    found = parse_time(text)
+    if found:
+        return found
+    try:
+        return parsedate_to_datetime(text).replace(tzinfo=None)
+    except (TypeError, ValueError):
+        return None
+
+
+class _Counted:
+    """File wrapper counting the bytes iterparse pulls off the socket."""
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        stats["bytes"] += len(data)
+        return data
+
+
+def iter_entries(url, session):
+    """
+    Streams one sitemap, sitemap index, RSS or Atom document and yields
+    (kind, loc, lastmod) per record; kind is "sitemap" for index entries and
+    "page" otherwise. Records are cleared as they are read, so a 50k-URL sitemap
+    never sits in memory.
+    """
+    resp = session.get(url, timeout=TIMEOUT, stream=True)
+    stats["requests"] += 1
+    try:
+        if resp.status_code != 200:
+            return
+        resp.raw.decode_content = True
+        source = _Counted(resp.raw)
+        if urlparse(url).path.endswith(".gz"):
+            source = gzip.GzipFile(fileobj=source)
+
+        for _, elem in ET.iterparse(source, events=("end",)):
+            tag = _local(elem.tag)
+            if tag not in _RECORDS:
+                continue
+            fields = {}
+            for child in elem:
+                name = _local(child.tag)
+                # Atom puts the URL in <link href="...">
+                value = (child.text or "").strip() or child.get("href", "")
+                if value and (name != "link" or child.get("rel", "alternate") == "alternate"):
+                    fields.setdefault(name, value)
+            loc = fields.get("loc") or fields.get("link") or fields.get("guid", "")
+            if loc.startswith("http"):
+                lastmod = next((parse_date(fields[d]) for d in _DATES if d in fields), None)
+                stats["entries"] += 1
+                yield ("sitemap" if tag == "sitemap" else "page"), loc, lastmod
+            elem.clear()
+    except ET.ParseError as e:
+        # Portals answer unknown paths with an HTML page and status 200
+        print(f"  Not a sitemap/feed: {url} ({e})")
+    finally:
+        resp.close()
+
+
+def robots_sitemaps(base_url, session):
+    """Sitemap: lines from robots.txt."""
+    try:
+        resp = session.get(urljoin(base_url, "/robots.txt"), timeout=TIMEOUT)
+        stats["requests"] += 1
+    except Exception as e:
+        print(f"  robots.txt unavailable: {e}")
+        return []
+    if resp.status_code != 200:
+        return []
+    found = []
+    for line in resp.text.splitlines():
+        key, _, value = line.partition(":")
+        if key.strip().lower() == "sitemap" and value.strip():
+            found.append(value.strip())
+    return found
+
+
+def walk(sources, session, since=None):
+    """
+    Follows sitemap indexes from `sources` and yields (url, lastmod) for every page
+    entry, once. Index entries and pages whose lastmod is before `since` are skipped
+    without being fetched; entries without a lastmod are always kept.
+    """
+    seen_docs, seen_urls = set(), set()
+    stack = [(src, 0) for src in reversed(sources)]
+    while stack:
+        doc, depth = stack.pop()
+        if doc in seen_docs:
+            continue
+        seen_docs.add(doc)
+        # Pages are passed on as they stream in; only the (few) index entries are held
+        children = []
+        entries = iter_entries(doc, session)
+        try:
+            for kind, loc, lastmod in entries:
+                if since and lastmod and lastmod < since:
+                    continue
+                if kind == "sitemap":
+                    if depth < MAX_DEPTH:
+                        children.append((loc, depth + 1))
+                elif loc not in seen_urls:
+                    seen_urls.add(loc)
+                    yield loc, lastmod
+        except Exception as e:
+            # Entries read before the error have been yielded already
+            print(f"  Error reading {doc}: {e}")
+        finally:
+            entries.close()
+        stack.extend(reversed(children))
+
+
+def topic_for(url, categories):
+    """
+    The topic whose category URL path is the longest prefix of `url`'s path, or None.
+    Only works on portals that nest articles under their category path; many keep them
+    elsewhere (hatinh: /bai-viet/...), and those need a feed per topic instead.
+    """
+    path = urlparse(url).path.rstrip("/")
+    best, best_len = None, 0
+    for topic, cat_url in categories.items():
+        prefix = urlparse(cat_url).path.rstrip("/")
+        if prefix and (path == prefix or path.startswith(prefix + "/")) and len(prefix) > best_len:
+            best, best_len = topic, len(prefix)
+    return best
+
+
+def discover(base_url, categories, session=None, since=None, feeds=None, url_filter=None):
+    """
+    Sitemap/RSS discovery for a portal. Yields (topic, [(url, lastmod), ...]) for each
+    topic of `categories`, in order, so only one topic's entries are held at a time.
+    The list is None for topics the sitemaps/feeds do not cover; those have to be
+    walked through their list pages as before.
+
+    - feeds: {topic: feed_url} for portals publishing one RSS feed per category;
+      those entries belong to the topic directly.
+    - Other topics are matched against the site's sitemaps (robots.txt, then
+      SITEMAP_PATHS) by category path prefix (see topic_for), one streamed pass per
+      topic. Once a pass finds no pages at all the sitemaps are not tried again.
+    - since: drop entries whose lastmod is older than this datetime.
+    - url_filter: callable rejecting non-article URLs (documents, tag pages...).
+    """
+    session = session or PoliteSession()
+    since = parse_time(since)
+    feeds = feeds or {}
+    sources = None
+    total = covered = 0
+
+    def keep(url):
+        return url_filter is None or url_filter(url)
+
+    for topic in categories:
+        entries = []
+        if topic in feeds:
+            entries = [(u, m) for u, m in walk([feeds[topic]], session, since) if keep(u)]
+        elif sources is None or sources:
+            if sources is None:
+                sources = robots_sitemaps(base_url, session) or [urljoin(base_url, p) for p in SITEMAP_PATHS]
+            pages = 0
+            for url, lastmod in walk(sources, session, since):
+                pages += 1
+                if topic_for(url, categories) == topic and keep(url):
+                    entries.append((url, lastmod))
+            if not pages:
+                sources = []
+        if entries:
+            total += len(entries)
+            covered += 1
+        yield topic, entries or None
+
+    print(f"Sitemap discovery: {total} URLs for {covered}/{len(categories)} topics "
+          f"({stats['requests']} requests, {stats['bytes'] // 1024} KB).")
+
+
+def unseen(entries, seen, watermark=None):
+    """URLs not written yet and, for incremental runs, modified after the topic's watermark."""
+    urls = []
+    for url, lastmod in entries:
+        if url in seen:
+            continue
+        if watermark is not None and watermark.published and lastmod and lastmod <= watermark.published:
+            continue
+        urls.append(url)
+    return urls
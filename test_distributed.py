@@ -0,0 +1,201 @@
+import csv
+
+import pytest
+
+from distributed import MemoryStore, RedisStore, SqliteStore, merge
+from frontier import DONE, FAILED, INFLIGHT, MAX_ATTEMPTS, PENDING
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_store(urls=("u1", "u2", "u3")):
+    clock = Clock()
+    store = MemoryStore(clock=clock)
+    store.add("p", list(urls), "Topic")
+    return store, clock
+
+
+def test_lease_hands_out_each_url_once():
+    store, _ = make_store()
+    first = store.lease("p", "a", n=2, seconds=60)
+    second = store.lease("p", "b", n=2, seconds=60)
+    assert [url for url, _ in first] == ["u1", "u2"]
+    assert second == [("u3", "Topic")]
+    assert store.lease("p", "c", n=2, seconds=60) == []
+    assert store.counts("p") == {INFLIGHT: 3}
+
+
+def test_expired_lease_is_requeued():
+    store, clock = make_store(["u1"])
+    assert store.lease("p", "a", n=1, seconds=60) == [("u1", "Topic")]
+    clock.now += 30
+    assert store.lease("p", "b", n=1, seconds=60) == []
+    clock.now += 31
+    assert store.lease("p", "b", n=1, seconds=60) == [("u1", "Topic")]
+    assert store.counts("p") == {INFLIGHT: 1}
+
+
+def test_stale_complete_is_ignored():
+    store, clock = make_store(["u1"])
+    store.lease("p", "a", n=1, seconds=60)
+    clock.now += 61
+    store.lease("p", "b", n=1, seconds=60)
+
+    # a's lease expired and u1 went to b: a's late reports change nothing
+    assert store.renew("p", "a", ["u1"]) == []
+    assert store.complete("p", "a", ["u1"], []) == 0
+    assert store.complete("p", "a", [], ["u1"]) == 0
+    assert store.counts("p") == {INFLIGHT: 1}
+    assert list(store.pending["p"]) == []
+
+    assert store.renew("p", "b", ["u1"]) == ["u1"]
+    assert store.complete("p", "b", ["u1"], []) == 1
+    assert store.counts("p") == {DONE: 1}
+
+
+def test_completion_is_exactly_once():
+    store, _ = make_store(["u1"])
+    store.lease("p", "a", n=1, seconds=60)
+    assert store.complete("p", "a", ["u1"], []) == 1
+    assert store.complete("p", "a", ["u1"], []) == 0
+    assert store.complete("p", "a", [], ["u1"]) == 0
+    assert store.counts("p") == {DONE: 1}
+    assert store.lease("p", "b", n=1, seconds=60) == []
+
+
+def test_failed_urls_retry_until_max_attempts():
+    store, _ = make_store(["u1"])
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        assert store.lease("p", "a", n=1, seconds=60) == [("u1", "Topic")]
+        store.complete("p", "a", [], ["u1"])
+        assert store.counts("p") == {PENDING if attempt < MAX_ATTEMPTS else FAILED: 1}
+    assert store.lease("p", "a", n=1, seconds=60) == []
+
+
+# ---------- SqliteStore (the default store) ----------
+def make_sqlite(tmp_path, urls=("u1", "u2", "u3")):
+    clock = Clock()
+    store = SqliteStore(str(tmp_path / "frontier.db"), clock=clock)
+    store.add("p", list(urls), "Topic")
+    return store, clock
+
+
+def test_sqlite_lease_and_expiry(tmp_path):
+    store, clock = make_sqlite(tmp_path)
+    assert store.lease("p", "a", n=2, seconds=60) == [("u1", "Topic"), ("u2", "Topic")]
+    assert store.lease("p", "b", n=2, seconds=60) == [("u3", "Topic")]
+    assert store.lease("p", "c", n=2, seconds=60) == []
+    clock.now += 61
+    assert sorted(url for url, _ in store.lease("p", "c", n=5, seconds=60)) == ["u1", "u2", "u3"]
+    assert store.counts("p") == {INFLIGHT: 3}
+    store.close()
+
+
+def test_sqlite_renew_keeps_lease_and_rejects_stale_owner(tmp_path):
+    store, clock = make_sqlite(tmp_path, ["u1"])
+    store.lease("p", "a", n=1, seconds=60)
+    clock.now += 50
+    assert store.renew("p", "a", ["u1"], seconds=60) == ["u1"]
+    clock.now += 50
+    assert store.lease("p", "b", n=1, seconds=60) == []   # Renewed lease has not expired
+    clock.now += 11
+    assert store.lease("p", "b", n=1, seconds=60) == [("u1", "Topic")]
+    assert store.renew("p", "a", ["u1"]) == []
+    assert store.complete("p", "a", ["u1"], []) == 0
+    assert store.complete("p", "b", ["u1"], []) == 1
+    assert store.complete("p", "b", ["u1"], []) == 0
+    assert store.counts("p") == {DONE: 1}
+    store.close()
+
+
+def test_sqlite_failed_urls_retry_until_max_attempts(tmp_path):
+    store, _ = make_sqlite(tmp_path, ["u1"])
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        assert store.lease("p", "a", n=1, seconds=60) == [("u1", "Topic")]
+        assert store.complete("p", "a", [], ["u1"]) == 1
+        assert store.counts("p") == {PENDING if attempt < MAX_ATTEMPTS else FAILED: 1}
+    assert store.lease("p", "a", n=1, seconds=60) == []
+    store.close()
+
+
+def test_sqlite_reserve_shares_one_bucket(tmp_path):
+    store, clock = make_sqlite(tmp_path, [])
+    other = SqliteStore(str(tmp_path / "frontier.db"), clock=clock)
+    # Burst of 2 at 1 token/s, drawn from two connections (two workers)
+    assert store.reserve("h", 1.0, 2) == 0
+    assert other.reserve("h", 1.0, 2) == 0
+    assert store.reserve("h", 1.0, 2) == pytest.approx(1.0)
+    assert other.reserve("h", 1.0, 2) == pytest.approx(2.0)
+    clock.now += 10
+    assert store.reserve("h", 1.0, 2) == 0
+    assert store.reserve("other-host", 1.0, 2) == 0
+    other.close()
+    store.close()
+
+
+# ---------- RedisStore: the Lua scripts, against fakeredis when it is installed ----------
+@pytest.fixture
+def redis_store():
+    fakeredis = pytest.importorskip("fakeredis", reason="RedisStore tests need fakeredis[lua]")
+    pytest.importorskip("lupa", reason="RedisStore tests need fakeredis[lua]")
+    store = RedisStore(None, client=fakeredis.FakeRedis(decode_responses=True))
+    store.add("p", ["u1", "u2"], "Topic")
+    return store
+
+
+def test_redis_lease_renew_complete(redis_store):
+    store = redis_store
+    assert store.lease("p", "a", n=1, seconds=60) == [("u1", "Topic")]
+    assert store.lease("p", "b", n=5, seconds=60) == [("u2", "Topic")]
+    assert store.renew("p", "a", ["u1", "u2"]) == ["u1"]
+    assert store.complete("p", "b", ["u1"], []) == 0
+    assert store.complete("p", "a", ["u1"], []) == 1
+    assert store.complete("p", "b", [], ["u2"]) == 1
+    assert store.counts("p") == {DONE: 1, PENDING: 1}
+    assert store.lease("p", "c", n=5, seconds=60) == [("u2", "Topic")]
+
+
+def test_redis_expired_lease_is_requeued(redis_store):
+    store = redis_store
+    assert len(store.lease("p", "a", n=2, seconds=-1)) == 2   # Already expired
+    assert sorted(url for url, _ in store.lease("p", "b", n=5, seconds=60)) == ["u1", "u2"]
+    assert store.complete("p", "a", ["u1"], []) == 0
+
+
+def test_redis_failed_urls_retry_until_max_attempts(redis_store):
+    store = redis_store
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        assert ("u1", "Topic") in store.lease("p", "a", n=2, seconds=60)
+        store.complete("p", "a", ["u2"] if attempt == 1 else [], ["u1"])
+    assert store.counts("p") == {FAILED: 1, DONE: 1}
+
+
+def test_redis_reserve(redis_store):
+    store = redis_store
+    assert store.reserve("h", 1.0, 2) == 0
+    assert store.reserve("h", 1.0, 2) == 0
+    assert 0.9 < store.reserve("h", 1.0, 2) <= 1.0
+
+
+# ---------- Shards ----------
+def test_merge_appends_new_shard_rows_once(tmp_path):
+    shards = tmp_path / "shards"
+    shards.mkdir()
+    out = tmp_path / "portal.csv"
+    out.write_text("topic,title,summary,url,keywords,public_time,content\nT,old,,u1,,,x\n", encoding="utf-8-sig")
+    (shards / "p.w1.csv").write_text(
+        "topic,title,summary,url,keywords,public_time,content\nT,dup,,u1,,,x\nT,new,,u2,,,y\n", encoding="utf-8-sig")
+    (shards / "p.w2.csv").write_text(
+        "topic,title,summary,url,keywords,public_time,content\nT,new,,u3,,,z\n", encoding="utf-8-sig")
+    (shards / "other.w1.csv").write_text(
+        "topic,title,summary,url,keywords,public_time,content\nT,x,,u9,,,z\n", encoding="utf-8-sig")
+    assert merge("p", str(out), str(shards)) == 2
+    assert merge("p", str(out), str(shards)) == 0
+    with open(out, encoding="utf-8-sig", newline="") as f:
+        assert [row["url"] for row in csv.DictReader(f)] == ["u1", "u2", "u3"]
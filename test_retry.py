@@ -0,0 +1,109 @@
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+import adaptive_concurrency
+import html_archive
+import http_cache
+import retry
+from rate_limiter import PoliteSession
+
+HOST = "probe.test"
+URL = f"http://{HOST}/page"
+
+
+class NoLimit:
+    def acquire(self, url):
+        return 0.0
+
+
+class Scripted(BaseAdapter):
+    """Answers each request with the next outcome: an exception to raise or a status code."""
+
+    def __init__(self, outcomes):
+        super().__init__()
+        self.outcomes = list(outcomes)
+
+    def send(self, request, **kwargs):
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        resp = requests.Response()
+        resp.status_code = outcome
+        resp.url = request.url
+        resp.request = request
+        return resp
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(http_cache, "ENABLED", False)
+    monkeypatch.setattr(html_archive, "ENABLED", False)
+    monkeypatch.setattr(adaptive_concurrency, "ENABLED", False)
+    breaker = retry.CircuitBreaker(threshold=1, cooldown=0)
+    monkeypatch.setitem(retry.health.breakers, HOST, breaker)
+
+    def make(outcomes):
+        s = PoliteSession(rate_limiter=NoLimit(), retry_policy=retry.RetryPolicy(max_retries=0))
+        s.mount("http://", Scripted(outcomes))
+        return s
+
+    return make, breaker
+
+
+def park(make, breaker):
+    with pytest.raises(requests.ConnectionError):
+        make([requests.ConnectionError("reset")]).get(URL)
+    assert breaker.opened_at is not None and not breaker.probing
+
+
+@pytest.mark.parametrize("error", [
+    requests.exceptions.ChunkedEncodingError("cut off"),
+    requests.exceptions.ContentDecodingError("bad gzip"),
+    requests.exceptions.TooManyRedirects("loop"),
+    requests.exceptions.SSLError("handshake"),
+])
+def test_probe_raising_any_request_error_parks_again(session, error):
+    make, breaker = session
+    park(make, breaker)
+    with pytest.raises(type(error)):
+        make([error]).get(URL)
+    assert breaker.opened_at is not None and not breaker.probing
+    # The next probe goes out and its success closes the breaker
+    assert make([200]).get(URL).status_code == 200
+    assert breaker.opened_at is None
+
+
+def test_probe_interrupted_lets_next_request_probe(session):
+    make, breaker = session
+    park(make, breaker)
+    with pytest.raises(RuntimeError):
+        make([RuntimeError("bug")]).get(URL)
+    assert not breaker.probing
+    assert make([200]).get(URL).status_code == 200
+    assert breaker.opened_at is None
+
+
+def test_post_is_retried_only_when_the_policy_allows_it(session):
+    make, breaker = session
+    breaker.threshold = 10
+    s = make([requests.ConnectionError("reset"), 200])
+    s.retry_policy = retry.RetryPolicy(max_retries=3, base=0)
+    with pytest.raises(requests.ConnectionError):
+        s.post(URL, data={"start": 0})
+
+    s = make([requests.ConnectionError("reset"), 200])
+    s.retry_policy = retry.RetryPolicy(max_retries=3, base=0, methods=retry.RETRY_METHODS | {"POST"})
+    assert s.post(URL, data={"start": 0}).status_code == 200
+
+
+def test_non_transient_error_is_not_retried(session):
+    make, breaker = session
+    breaker.threshold = 10
+    s = make([requests.exceptions.TooManyRedirects("loop"), 200])
+    s.retry_policy = retry.RetryPolicy(max_retries=3, base=0)
+    with pytest.raises(requests.exceptions.TooManyRedirects):
+        s.get(URL)
@@ -0,0 +1,84 @@
+import ssl
+import time
+import socket
+import threading
+
+import urllib3
+from requests.adapters import HTTPAdapter
+
+from fetch_engine import MAX_PER_HOST
+from rate_limiter import PoliteSession
+
+# ================= CONFIG =================
+POOL_CONNECTIONS = 16           # Hosts with a kept-alive pool per session (portal + its subdomains/CDN)
+POOL_MAXSIZE = MAX_PER_HOST     # Connections kept per host: one per detail request FetchEngine runs at once
+DNS_TTL = 300.0                 # Seconds a resolved address is reused
+
+_legacy_ctx = None
+_ctx_lock = threading.Lock()
+
+
+def legacy_ssl_context():
+    """
+    One SSL context for every portal still on old TLS setups (weak DH params,
+    SHA-1 chains, missing intermediates). Sharing it keeps the cipher setup and
+    loaded CA store to a single copy per process.
+    """
+    global _legacy_ctx
+    with _ctx_lock:
+        if _legacy_ctx is None:
+            ctx = ssl.create_default_context()
+            ctx.set_ciphers("DEFAULT@SECLEVEL=1")
+            ctx.check_hostname = False
+            _legacy_ctx = ctx
+        return _legacy_ctx
+
+
+class LegacyTLSAdapter(HTTPAdapter):
+    """HTTPAdapter on the shared legacy SSL context (replaces the per-script CustomHttpAdapter)."""
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        self.poolmanager = urllib3.poolmanager.PoolManager(
+            num_pools=connections, maxsize=maxsize, block=block,
+            ssl_context=legacy_ssl_context(), **pool_kwargs
+        )
+
+
+# ---------- DNS cache ----------
+_dns = {}
+_dns_lock = threading.Lock()
+_real_getaddrinfo = socket.getaddrinfo
+
+
+def _cached_getaddrinfo(host, port, *args, **kwargs):
+    key = (host, port, args, tuple(sorted(kwargs.items())))
+    now = time.monotonic()
+    with _dns_lock:
+        hit = _dns.get(key)
+        if hit and hit[0] > now:
+            return hit[1]
+    result = _real_getaddrinfo(host, port, *args, **kwargs)
+    with _dns_lock:
+        _dns[key] = (now + DNS_TTL, result)
+    return result
+
+
+def enable_dns_cache():
+    """Process-wide: each portal hostname is resolved once per DNS_TTL instead of once per connection."""
+    socket.getaddrinfo = _cached_getaddrinfo
+
+
+def make_session(legacy_tls=False, pool_maxsize=POOL_MAXSIZE, headers=None):
+    """
+    PoliteSession with kept-alive connection pools sized for the crawl
+    concurrency, so articles reuse open TCP+TLS connections instead of doing a
+    handshake each. legacy_tls=True mounts LegacyTLSAdapter for https.
+    """
+    enable_dns_cache()
+    session = PoliteSession()
+    adapter = LegacyTLSAdapter if legacy_tls else HTTPAdapter
+    session.mount("https://", adapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=pool_maxsize))
+    session.mount("http://", HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=pool_maxsize))
+    if headers:
+        session.headers.update(headers)
+    return session
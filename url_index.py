@@ -0,0 +1,154 @@
+import os
+import csv
+import bisect
+import hashlib
+from array import array
+
+# ================= CONFIG =================
+URL_FIELD = "url"
+INDEX_SUFFIX = ".urlidx"    # <output csv>.urlidx: sorted 64-bit URL hashes
+LOG_SUFFIX = ".log"         # <output csv>.urlidx.log: hashes recorded since the last compaction
+MTIME_SLACK = 5.0           # Seconds a CSV may be newer than its index before the index is rebuilt
+
+
+def url_hash(url):
+    """64-bit blake2b of the URL: ~1e-9 collision odds at a million articles per file."""
+    return int.from_bytes(hashlib.blake2b(url.strip().encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class UrlIndex:
+    """
+    Set-like view of the URLs already written to an output CSV, kept in a sidecar
+    file next to it instead of being rebuilt by reading the whole CSV.
+
+    - `url in index` checks the CSV's URLs plus anything add()-ed during this run.
+    - add()/update() only dedupe within the run (URLs queued but not written yet).
+    - record(url) is called after a row is written; it appends 8 bytes to the log.
+    - close() folds the log into the sorted index file.
+
+    Loading is one read of 8 bytes per URL. If the CSV was written by something that
+    does not record into the index (its mtime is newer), the index is rebuilt from
+    the CSV's url column once.
+    """
+
+    def __init__(self, csv_path, field=URL_FIELD):
+        self.csv_path = csv_path
+        self.field = field
+        self.path = csv_path + INDEX_SUFFIX
+        self.log_path = self.path + LOG_SUFFIX
+        self.hashes = array("Q")     # sorted, from the index file
+        self.recorded = set()        # written since the last compaction (also in the log)
+        self.session = set()         # seen this run, not necessarily written
+        self._log = None
+        self.load()
+
+    # ---------- Loading ----------
+    def _is_stale(self):
+        if not os.path.exists(self.csv_path):
+            return os.path.exists(self.path) or os.path.exists(self.log_path)
+        if not os.path.exists(self.path):
+            return True
+        index_mtime = os.path.getmtime(self.path)
+        if os.path.exists(self.log_path):
+            index_mtime = max(index_mtime, os.path.getmtime(self.log_path))
+        return os.path.getmtime(self.csv_path) > index_mtime + MTIME_SLACK
+
+    def load(self):
+        if self._is_stale():
+            self.rebuild()
+            return
+        self.hashes = array("Q")
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                self.hashes.frombytes(f.read())
+        self.recorded = set()
+        if os.path.exists(self.log_path):
+            log = array("Q")
+            with open(self.log_path, "rb") as f:
+                data = f.read()
+            # A crash mid-append can leave a partial entry at the end
+            log.frombytes(data[:len(data) - len(data) % 8])
+            self.recorded.update(log)
+
+    def rebuild(self):
+        """Re-reads the url column of the CSV. Only needed once, or after an untracked write."""
+        self.recorded = set()
+        if not os.path.exists(self.csv_path):
+            self.hashes = array("Q")
+            for path in (self.path, self.log_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            return
+        found = set()
+        with open(self.csv_path, "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                if row.get(self.field):
+                    found.add(url_hash(row[self.field]))
+        self.hashes = array("Q", sorted(found))
+        self._write_index()
+        print(f"  Rebuilt URL index for {self.csv_path}: {len(self.hashes)} URLs.")
+
+    # ---------- Set interface ----------
+    def _in_file(self, h):
+        i = bisect.bisect_left(self.hashes, h)
+        return i < len(self.hashes) and self.hashes[i] == h
+
+    def __contains__(self, url):
+        if not url:
+            return False
+        h = url_hash(url)
+        return h in self.session or h in self.recorded or self._in_file(h)
+
+    def __len__(self):
+        return len(self.hashes) + len(self.recorded)
+
+    def add(self, url):
+        if url:
+            self.session.add(url_hash(url))
+
+    def update(self, urls):
+        for url in urls:
+            self.add(url)
+
+    def record(self, url):
+        """Marks url as written to the CSV (persists across runs)."""
+        if not url:
+            return
+        h = url_hash(url)
+        self.session.add(h)
+        if h in self.recorded or self._in_file(h):
+            return
+        if self._log is None:
+            self._log = open(self.log_path, "ab")
+        self._log.write(array("Q", [h]).tobytes())
+        self._log.flush()
+        self.recorded.add(h)
+
+    # ---------- Persistence ----------
+    def _write_index(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            self.hashes.tofile(f)
+        os.replace(tmp, self.path)
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+
+    def compact(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if not os.path.exists(self.csv_path):
+            return
+        if self.recorded:
+            self.hashes = array("Q", sorted(set(self.hashes) | self.recorded))
+            self.recorded = set()
+        self._write_index()
+
+    def close(self):
+        self.compact()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,263 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from html_backend import make_soup
+from transport import make_session
+
+# ================= CONFIG =================
+TOPIC_WORKERS = 3           # Topics paginating at once, each on its own session
+PAGE_WORKERS = 4            # Pages posted at once from one cached viewstate
+SYNTHESIZE_JUMPS = True     # Try "Page$N"-style arguments for pages the pager does not show (needs event validation off)
+POSTBACK_RE = re.compile(r"__doPostBack\(\s*['\"]([^'\"]+)['\"]\s*,\s*['\"]([^'\"]*)['\"]\s*\)")
+NUMBER_RE = re.compile(r"\d+")
+ARGUMENT_PAGE_RE = re.compile(r"(?:^|\$)(\d+)$")   # "Page$11", "11": the "..." link names the page it opens
+SKIP_INPUTS = {"submit", "button", "image", "reset", "file"}
+
+
+def form_state(soup):
+    """Every field a browser would post back with the form: __VIEWSTATE, __EVENTVALIDATION, SharePoint digest, ..."""
+    scope = soup.find("form", id="aspnetForm") or soup.find("form") or soup
+    state = {}
+    for field in scope.find_all("input"):
+        name = field.get("name")
+        kind = (field.get("type") or "text").lower()
+        if not name or kind in SKIP_INPUTS:
+            continue
+        if kind in ("checkbox", "radio") and not field.has_attr("checked"):
+            continue
+        state[name] = field.get("value", "")
+    for select in scope.find_all("select"):
+        option = select.find("option", selected=True) or select.find("option")
+        if select.get("name") and option:
+            state[select["name"]] = option.get("value", option.get_text())
+    return state
+
+
+def pager_links(soup):
+    """{page number: (__EVENTTARGET, __EVENTARGUMENT)} for the numbered postback links on a page."""
+    links, jumps = {}, {}
+    for a in soup.find_all("a", href=True):
+        match = POSTBACK_RE.search(a["href"])
+        if not match:
+            continue
+        text = a.get_text(strip=True)
+        if text.isdigit():
+            links.setdefault(int(text), (match.group(1), match.group(2)))
+        else:
+            # "...", ">>": the next/previous window, when the argument says which page
+            number = ARGUMENT_PAGE_RE.search(match.group(2))
+            if number:
+                jumps.setdefault(int(number.group(1)), (match.group(1), match.group(2)))
+    for page, postback in jumps.items():
+        links.setdefault(page, postback)
+    return links
+
+
+def synthesize(links, page):
+    """
+    The postback for a page the pager does not list, built from a listed one:
+    GridView/DataPager arguments and most portal pagers carry the page number
+    ("Page$7", "7"), sometimes in the target instead ("...$rptPager$ctl07$lnkPage").
+    """
+    for shown, (target, argument) in sorted(links.items()):
+        for field in ("argument", "target"):
+            value = argument if field == "argument" else target
+            numbers = NUMBER_RE.findall(value)
+            if numbers and int(numbers[-1]) == shown:
+                head, _, tail = value.rpartition(numbers[-1])
+                value = f"{head}{page}{tail}"
+                return (target, value) if field == "argument" else (value, argument)
+    return None
+
+
+class WebFormsPager:
+    """
+    Postback pagination for one ASP.NET/SharePoint list page (khanhhoa, dienbien .aspx).
+
+    Each page's hidden form state is kept per page number, so the pager can:
+      - goto(n): post from whichever cached page links to n (a jump back or a
+        resume needs no walk), otherwise try a synthesized "Page$n" postback,
+        otherwise hop to the farthest page each pager window shows;
+      - window(pages): post several pages at once from the same cached state,
+        since a postback only depends on the state it is sent with.
+
+        pager = WebFormsPager(session, topic_url)
+        soup = pager.open()
+        while soup is not None:
+            ...
+            soup = pager.goto(pager.current + 1)
+    """
+
+    def __init__(self, session, url, timeout=20, verify=False):
+        self.session = session
+        self.url = url
+        self.timeout = timeout
+        self.verify = verify
+        self.states = {}        # page -> (form state, pager links)
+        self.current = None
+        self.lock = threading.Lock()
+        self.posts = 0
+        self.bytes_posted = 0
+        self.failed_posts = 0   # Postbacks answered with an error: a walk that ended after one is not the list end
+
+    def _remember(self, page, soup):
+        with self.lock:
+            self.states[page] = (form_state(soup), pager_links(soup))
+
+    def _post(self, state, target, argument):
+        payload = dict(state, __EVENTTARGET=target, __EVENTARGUMENT=argument)
+        with self.lock:
+            self.posts += 1
+            self.bytes_posted += sum(len(k) + len(str(v)) for k, v in payload.items())
+        resp = self.session.post(self.url, data=payload, verify=self.verify, timeout=self.timeout)
+        if resp.status_code != 200:
+            with self.lock:
+                self.failed_posts += 1
+            return None
+        return make_soup(resp.content)
+
+    def open(self, cursor=None, page=1):
+        """Loads the first page (GET), or `page` from a cursor saved by an earlier run."""
+        if cursor and "state" not in cursor:
+            # Raw postback payload, as crawlers stored it before this pager
+            state = {k: v for k, v in cursor.items() if k not in ("__EVENTTARGET", "__EVENTARGUMENT")}
+            cursor = {"state": state, "target": cursor["__EVENTTARGET"], "argument": cursor["__EVENTARGUMENT"]}
+        if cursor:
+            soup = self._post(cursor["state"], cursor["target"], cursor["argument"])
+        else:
+            resp = self.session.get(self.url, verify=self.verify, timeout=self.timeout)
+            soup = make_soup(resp.content)
+        if soup is not None:
+            self._remember(page, soup)
+            self.current = page
+        return soup
+
+    def route(self, page):
+        """(state, target, argument) of a cached page that links straight to `page`, or None."""
+        with self.lock:
+            for state, links in self.states.values():
+                if page in links:
+                    return (state,) + links[page]
+        return None
+
+    def cursor(self, page):
+        """JSON-able postback for `page` (for Frontier.page_done), or None."""
+        route = self.route(page)
+        return {"state": route[0], "target": route[1], "argument": route[2]} if route else None
+
+    def _landed(self, page, soup):
+        # The page we asked for is the one number the new pager no longer links to
+        if soup is None:
+            return False
+        links = pager_links(soup)
+        return page not in links and (page - 1 in links or page + 1 in links or not links)
+
+    def goto(self, page):
+        """Soup of `page`, or None once the pager has no way to reach it."""
+        synthesized = not SYNTHESIZE_JUMPS
+        while True:
+            route = self.route(page)
+            if route:
+                soup = self._post(*route)
+                if soup is None:
+                    return None
+                self._remember(page, soup)
+                self.current = page
+                return soup
+
+            with self.lock:
+                known = {n: s for n, s in self.states.items()}
+            if not known:
+                return None
+            if not synthesized:
+                synthesized = True  # One try: if the server validates events, it fails the same way again
+                start = min(known, key=lambda n: abs(n - page))
+                state, links = known[start]
+                guess = synthesize(links, page)
+                if guess:
+                    soup = self._post(state, *guess)
+                    if self._landed(page, soup):
+                        self._remember(page, soup)
+                        self.current = page
+                        return soup
+
+            # Hop to the reachable page closest to the target and look again
+            reachable = {n for _, links in known.values() for n in links} - set(known)
+            if not reachable:
+                return None
+            hop = min(reachable, key=lambda n: abs(n - page))
+            if abs(hop - page) >= min(abs(n - page) for n in known):
+                return None  # No window gets closer
+            route = self.route(hop)
+            soup = self._post(*route)
+            if soup is None:
+                return None
+            self._remember(hop, soup)
+
+    def window(self, pages, workers=PAGE_WORKERS):
+        """[(page, soup)] for the requested pages; those a cached pager links to are posted concurrently."""
+        remaining = list(pages)
+        results = {}
+
+        def fetch(page):
+            return page, self._post(*self.route(page))
+
+        while remaining:
+            direct = [p for p in remaining if self.route(p)]
+            if direct:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    fetched = list(executor.map(fetch, direct))
+                for page, soup in fetched:
+                    remaining.remove(page)
+                    if soup is not None:
+                        self._remember(page, soup)
+                        results[page] = soup
+                if not any(soup is not None for _, soup in fetched):
+                    break
+            else:
+                # Outside every cached window: walk/jump there, which also caches its pager
+                page = remaining.pop(0)
+                soup = self.goto(page)
+                if soup is None:
+                    break
+                results[page] = soup
+        if results:
+            self.current = max(results)
+        return [(p, results[p]) for p in pages if p in results]
+
+    def walk(self, soup, last, window=PAGE_WORKERS):
+        """
+        Yields (page, soup) from the page open() returned up to page `last`, the
+        following pages fetched `window` at a time. Ends early when the pager
+        links no further, or when a postback fails (failed_posts goes up).
+        """
+        page = self.current
+        yield page, soup
+        while page < last:
+            batch = self.window(range(page + 1, min(page + 1 + window, last + 1)), window)
+            if not batch:
+                return
+            for page, soup in batch:
+                yield page, soup
+
+
+def paginate_topics(topics, crawl_topic, workers=TOPIC_WORKERS, **session_kwargs):
+    """
+    Runs crawl_topic(pager, name, url) for every (name, url), `workers` topics at
+    once. Each topic gets its own session (ASP.NET ties viewstate to the session
+    cookie) and its own WebFormsPager. Returns the results in topic order.
+    """
+    def run(topic):
+        name, url = topic
+        pager = WebFormsPager(make_session(**session_kwargs), url)
+        try:
+            return crawl_topic(pager, name, url)
+        except Exception as e:
+            print(f"  Error on topic {name}: {e}")
+            return None
+        finally:
+            print(f"  {name}: {pager.posts} postbacks, {pager.bytes_posted / 1024:.0f} KB of form state posted")
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="topic") as executor:
+        return list(executor.map(run, topics))
@@ -0,0 +1,535 @@
+import os
+import re
+import sys
+import json
+import time
+import base64
+import importlib
+from urllib.parse import urlparse, parse_qsl, urlunparse, urljoin
+
+from html_backend import make_soup
+
+# ================= CONFIG =================
+TEMPLATE_DIR = "xhr_templates"      # <portal>.json, written once by `python xhr_discovery.py <portal>`
+XHR_TYPES = {"XHR", "Fetch"}
+QUIET = 2.0                         # Seconds without a new XHR before a page counts as settled
+SETTLE_TIMEOUT = 20.0
+KEEP_HEADERS = {"accept", "content-type", "x-requested-with", "referer", "origin"}  # Plus any x-* header
+PAGE_KEY_RE = re.compile(r"^(page(index|number|num|no)?|p|pg|offset|skip|start|from)$", re.I)
+OFFSET_KEY_RE = re.compile(r"^(offset|skip|start|from)$", re.I)
+
+# Portal -> how to drive it once. "topics" names the crawler's topic dict, "links"
+# selects article links on a rendered list page, and page 2 is reached either by
+# URL ("page_url": crawler function (topic_url, page) -> url) or by clicking the
+# pager ("pager": crawler function (driver, page) -> bool).
+PORTALS = {
+    "tuyengiao": {
+        "module": "crawl_tuyengiao",
+        "topics": "TOPICS",
+        "links": "a[href*='/blogs/']:not([href*='/category/'])",
+        "page_url": "build_page_url",
+    },
+    "thanhhoa": {
+        "module": "crawl_thanhhoa_final",
+        "topics": "TOPIC_CONFIG",
+        "links": "div.item a[href], .post-item a[href]",
+        "pager": "goto_page",
+    },
+}
+
+
+def template_path(portal):
+    return os.path.join(TEMPLATE_DIR, f"{portal}.json")
+
+
+# ---------- Request shape helpers (shared by recording and replay) ----------
+def flatten(obj, prefix=""):
+    """Scalar leaves of a JSON body as {"a.b": value}; lists are left alone."""
+    flat = {}
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            path = f"{prefix}.{key}" if prefix else str(key)
+            if isinstance(value, dict):
+                flat.update(flatten(value, path))
+            elif not isinstance(value, list):
+                flat[path] = value
+    return flat
+
+
+def set_path(obj, path, value):
+    keys = path.split(".")
+    for key in keys[:-1]:
+        obj = obj.setdefault(key, {})
+    obj[keys[-1]] = value
+
+
+def split_request(method, url, headers, body):
+    """A captured request as {method, url, query, body_kind, body, headers}, parameters broken out."""
+    parts = urlparse(url)
+    ctype = next((v for k, v in headers.items() if k.lower() == "content-type"), "")
+    kind, data = None, None
+    if body:
+        if "json" in ctype:
+            try:
+                data, kind = json.loads(body), "json"
+            except ValueError:
+                pass
+        if kind is None and "=" in body:
+            data, kind = dict(parse_qsl(body, keep_blank_values=True)), "form"
+        if kind is None:
+            data, kind = body, "raw"
+    return {
+        "method": method,
+        "url": urlunparse(parts._replace(query="", fragment="")),
+        "query": dict(parse_qsl(parts.query, keep_blank_values=True)),
+        "body_kind": kind,
+        "body": data,
+        "headers": {k: v for k, v in headers.items() if k.lower() in KEEP_HEADERS or k.lower().startswith("x-")},
+    }
+
+
+def params(req):
+    """{"query:page": "2", "json:filter.categoryId": "..."} for every parameter of a split request."""
+    found = {f"query:{k}": v for k, v in req["query"].items()}
+    if req["body_kind"] == "form":
+        found.update({f"form:{k}": v for k, v in req["body"].items()})
+    elif req["body_kind"] == "json":
+        found.update({f"json:{k}": v for k, v in flatten(req["body"]).items()})
+    return found
+
+
+def as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def topic_values(topic_url):
+    """{"query:categoryId": "...", "path:3": "..."} for the parts of a topic URL a list API may echo."""
+    parts = urlparse(topic_url)
+    values = {f"query:{k}": v for k, v in parse_qsl(parts.query)}
+    values.update({f"path:{i}": seg for i, seg in enumerate(parts.path.split("/")) if seg})
+    return values
+
+
+def string_leaves(obj):
+    """(key, value) for every string in a JSON document, at any depth."""
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            if isinstance(value, str):
+                yield key, value
+            else:
+                yield from string_leaves(value)
+    elif isinstance(obj, list):
+        for value in obj:
+            yield from string_leaves(value)
+
+
+def link_token(href):
+    path = urlparse(href).path.rstrip("/")
+    return path.rsplit("/", 1)[-1]
+
+
+# ---------- Replay ----------
+class XhrTemplate:
+    """
+    A recorded list (and optionally detail) endpoint of one portal, replayed
+    over a plain requests session:
+
+        template = XhrTemplate.load("tuyengiao")
+        links = template.list_links(session, topic_url, page)
+        fields = template.detail_fields(session, article_url)
+
+    Everything returns None when the template does not cover the topic or the
+    call fails, so crawlers keep their browser path as the fallback.
+    """
+
+    def __init__(self, data):
+        self.portal = data["portal"]
+        self.list = data["list"]
+        self.detail = data.get("detail")
+
+    @classmethod
+    def load(cls, portal):
+        path = template_path(portal)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def _apply(req, values):
+        query = dict(req["query"])
+        body = json.loads(json.dumps(req["body"])) if req["body"] is not None else None
+        for name, value in values.items():
+            where, key = name.split(":", 1)
+            if where == "query":
+                query[key] = str(value)
+            elif where == "form":
+                body[key] = str(value)
+            elif where == "json":
+                set_path(body, key, value)
+        kwargs = {"params": query, "headers": req["headers"]}
+        if req["body_kind"] == "json":
+            kwargs["json"] = body
+        elif req["body_kind"] is not None:
+            kwargs["data"] = body
+        return req["method"], req["url"], kwargs
+
+    def covers(self, topic_url):
+        if topic_url in self.list.get("topics", {}):
+            return True
+        values = topic_values(topic_url)
+        return bool(self.list["topic_params"]) and all(src in values for src in self.list["topic_params"].values())
+
+    def list_request(self, topic_url, page):
+        """(method, url, requests kwargs) for `page` (1-based) of a topic, or None."""
+        spec = self.list
+        req = spec.get("topics", {}).get(topic_url)
+        values = {}
+        if req is None:
+            if not self.covers(topic_url):
+                return None
+            req = spec["request"]
+            source = topic_values(topic_url)
+            values = {param: source[src] for param, src in spec["topic_params"].items()}
+        value = spec["page_start"] + (page - 1) * spec["page_step"]
+        values[spec["page_param"]] = value if spec["page_param"].startswith("json:") else str(value)
+        return self._apply(req, values)
+
+    def fetch_list(self, session, topic_url, page, timeout=20):
+        call = self.list_request(topic_url, page)
+        if call is None:
+            return None
+        method, url, kwargs = call
+        try:
+            resp = session.request(method, url, timeout=timeout, **kwargs)
+        except Exception as e:
+            print(f"  XHR list call failed ({url}): {e}")
+            return None
+        return resp if resp.status_code == 200 else None
+
+    def links_from(self, resp):
+        """Article URLs in a list response, in page order."""
+        spec = self.list
+        links = []
+        if spec["format"] == "json":
+            try:
+                doc = resp.json()
+            except ValueError:
+                return []
+            for key, value in string_leaves(doc):
+                if key == spec["link_key"] and value:
+                    links.append(urljoin(spec["referer"], spec["link_format"].format(value)))
+        else:
+            for a in make_soup(resp.text).select(spec["link_css"]):
+                if a.get("href"):
+                    links.append(urljoin(spec["referer"], a["href"]))
+        return list(dict.fromkeys(links))
+
+    def list_links(self, session, topic_url, page):
+        resp = self.fetch_list(session, topic_url, page)
+        return self.links_from(resp) if resp is not None else None
+
+    def article_id(self, article_url):
+        """Inverse of link_format: the API's value for an article URL."""
+        prefix, _, suffix = self.list.get("link_format", "").partition("{}")
+        if prefix and article_url.startswith(prefix) and article_url.endswith(suffix):
+            return article_url[len(prefix):len(article_url) - len(suffix)]
+        return None
+
+    def detail_fields(self, session, article_url, timeout=20):
+        """{"title", "summary", "public_time", "content"} straight from the detail API, or None."""
+        spec = self.detail
+        ident = self.article_id(article_url) if spec else None
+        if ident is None:
+            return None
+        req = dict(spec["request"])
+        values = {}
+        if spec["id_param"] == "url":
+            req["url"] = req["url"].replace("{}", ident)
+        else:
+            values[spec["id_param"]] = ident
+        method, url, kwargs = self._apply(req, values)
+        try:
+            resp = session.request(method, url, timeout=timeout, **kwargs)
+            doc = resp.json() if resp.status_code == 200 else None
+        except Exception as e:
+            print(f"  XHR detail call failed ({url}): {e}")
+            return None
+        if doc is None:
+            return None
+        leaves = {}
+        for key, value in string_leaves(doc):
+            leaves.setdefault(key, value)
+        return {name: leaves.get(key, "") for name, key in spec["fields"].items()}
+
+
+# ---------- Recording ----------
+def recording_driver():
+    from browser_pool import PooledChrome, chrome_options, block_resources, PAGE_LOAD_TIMEOUT
+
+    options = chrome_options()
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    driver = PooledChrome(options=options)
+    driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+    block_resources(driver)
+    return driver
+
+
+def drain(driver):
+    """XHR/fetch exchanges completed since the last call, with their response text."""
+    pending, finished = {}, []
+    for entry in driver.get_log("performance"):
+        msg = json.loads(entry["message"])["message"]
+        p = msg.get("params", {})
+        rid = p.get("requestId")
+        if msg["method"] == "Network.requestWillBeSent" and p.get("type") in XHR_TYPES:
+            r = p["request"]
+            pending[rid] = split_request(r["method"], r["url"], r.get("headers", {}), r.get("postData"))
+        elif msg["method"] == "Network.responseReceived" and rid in pending:
+            pending[rid]["status"] = p["response"]["status"]
+            pending[rid]["mime"] = p["response"].get("mimeType", "")
+        elif msg["method"] == "Network.loadingFinished" and rid in pending:
+            finished.append(rid)
+
+    exchanges = []
+    for rid in finished:
+        ex = pending[rid]
+        if ex.get("status") != 200:
+            continue
+        try:
+            body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": rid})
+        except Exception:
+            continue
+        text = body.get("body", "")
+        if body.get("base64Encoded"):
+            text = base64.b64decode(text).decode("utf-8", "replace")
+        ex["text"] = text
+        exchanges.append(ex)
+    return exchanges
+
+
+def settle(driver):
+    """Collects XHRs until none has completed for QUIET seconds."""
+    exchanges = []
+    last = start = time.monotonic()
+    while time.monotonic() - last < QUIET and time.monotonic() - start < SETTLE_TIMEOUT:
+        time.sleep(0.25)
+        new = drain(driver)
+        if new:
+            exchanges.extend(new)
+            last = time.monotonic()
+    return exchanges
+
+
+def page_links(driver, css, base):
+    hrefs = [a.get_attribute("href") for a in driver.find_elements("css selector", css)]
+    return list(dict.fromkeys(urljoin(base, h) for h in hrefs if h))
+
+
+def best_list_exchange(exchanges, links):
+    """The response that mentions most of the links rendered on the page."""
+    tokens = [link_token(h) for h in links if link_token(h)]
+    best, best_score = None, 0
+    for ex in exchanges:
+        text = ex["text"].replace("\\/", "/")
+        score = sum(1 for t in tokens if t in text)
+        if score > best_score:
+            best, best_score = ex, score
+    return best if best_score >= max(1, len(tokens) // 2) else None
+
+
+def same_endpoint(a, b):
+    return a["method"] == b["method"] and a["url"] == b["url"]
+
+
+def page_parameter(ex1, ex2, per_page):
+    """(param, start, step) from the page-1 and page-2 calls of one endpoint."""
+    p2 = params(ex2)
+    if ex1 is not None:
+        p1 = params(ex1)
+        for name, value in p2.items():
+            v1, v2 = as_int(p1.get(name)), as_int(value)
+            if v1 is not None and v2 is not None and v1 != v2:
+                return name, v1, v2 - v1
+    # Page 1 came server-rendered: guess from the parameter name
+    for name, value in p2.items():
+        v2, key = as_int(value), name.rsplit(":", 1)[1].rsplit(".", 1)[-1]
+        if v2 is not None and PAGE_KEY_RE.match(key):
+            step = per_page if OFFSET_KEY_RE.match(key) else 1
+            return name, v2 - step, step
+    return None
+
+
+def link_field(doc, links):
+    """(key, format) such that format.format(value of key) rebuilds the article links."""
+    hits = {}
+    for key, value in string_leaves(doc):
+        if not value or "{" in value:
+            continue
+        for href in links:
+            if href.endswith(value) or link_token(href) == value:
+                idx = href.rfind(value)
+                fmt = href[:idx] + "{}" + href[idx + len(value):]
+                hits.setdefault(key, {}).setdefault(fmt, 0)
+                hits[key][fmt] += 1
+                break
+    if not hits:
+        return None
+    key = max(hits, key=lambda k: sum(hits[k].values()))
+    fmt = max(hits[key], key=hits[key].get)
+    return key, fmt
+
+
+def detail_template(driver, article_url, article_id):
+    """Finds the call that returned the article body, or None when the page is server-rendered."""
+    from browser_pool import wait_for
+
+    drain(driver)
+    driver.get(article_url)
+    wait_for(driver, "h1")
+    exchanges = settle(driver)
+    h1 = driver.find_elements("tag name", "h1")
+    title = re.sub(r"\s+", " ", h1[0].text).strip() if h1 else ""
+    if not title:
+        return None
+    for ex in exchanges:
+        try:
+            doc = json.loads(ex["text"])
+        except ValueError:
+            continue
+        leaves = list(string_leaves(doc))
+        title_key = next((k for k, v in leaves if re.sub(r"\s+", " ", v).strip() == title), None)
+        if title_key is None:
+            continue
+        fields = {"title": title_key}
+        fields["content"] = max(leaves, key=lambda kv: len(kv[1]))[0]
+        for name, pattern in (("summary", r"summary|description|sapo|lead|excerpt|short"),
+                              ("public_time", r"publish|date|time|created")):
+            key = next((k for k, v in leaves if re.search(pattern, k, re.I) and k not in fields.values()), None)
+            if key:
+                fields[name] = key
+        if article_id and article_id in ex["url"]:
+            req, id_param = dict(ex, url=ex["url"].replace(article_id, "{}")), "url"
+        else:
+            id_param = next((n for n, v in params(ex).items() if str(v) == article_id), None)
+            if id_param is None:
+                continue
+            req = ex
+        req = {k: req[k] for k in ("method", "url", "query", "body_kind", "body", "headers")}
+        return {"request": req, "id_param": id_param, "fields": fields}
+    return None
+
+
+def topic_url_of(value):
+    return value["url"] if isinstance(value, dict) else value
+
+
+def open_pages(driver, crawler, spec, topic_url):
+    """Loads page 1 then page 2 of a topic; returns (page-1 XHRs, page-2 XHRs, page-2 links)."""
+    from browser_pool import wait_for
+
+    drain(driver)
+    if "page_url" in spec:
+        driver.get(getattr(crawler, spec["page_url"])(topic_url, 1))
+    else:
+        driver.get(topic_url)
+    wait_for(driver, spec["links"])
+    first = settle(driver)
+    if "page_url" in spec:
+        driver.get(getattr(crawler, spec["page_url"])(topic_url, 2))
+        wait_for(driver, spec["links"])
+    elif not getattr(crawler, spec["pager"])(driver, 2):
+        return first, [], []
+    second = settle(driver)
+    return first, second, page_links(driver, spec["links"], topic_url)
+
+
+def record(portal):
+    spec = PORTALS[portal]
+    crawler = importlib.import_module(spec["module"])
+    topics = [topic_url_of(v) for v in getattr(crawler, spec["topics"]).values()]
+    driver = recording_driver()
+    try:
+        list_spec = None
+        for topic_url in topics:
+            first, second, links = open_pages(driver, crawler, spec, topic_url)
+            ex2 = best_list_exchange(second, links)
+            if ex2 is None:
+                print(f"  {topic_url}: no XHR carried the page-2 links.")
+                continue
+            ex1 = next((ex for ex in first if same_endpoint(ex, ex2)), None)
+            paging = page_parameter(ex1, ex2, len(links))
+            if paging is None:
+                print(f"  {ex2['method']} {ex2['url']}: no page parameter found.")
+                continue
+            list_spec = {
+                "request": {k: ex2[k] for k in ("method", "url", "query", "body_kind", "body", "headers")},
+                "page_param": paging[0], "page_start": paging[1], "page_step": paging[2],
+                "referer": topic_url,
+            }
+            try:
+                doc = json.loads(ex2["text"])
+                found = link_field(doc, links)
+            except ValueError:
+                doc, found = None, None
+            if found:
+                list_spec.update(format="json", link_key=found[0], link_format=found[1])
+            else:
+                list_spec.update(format="html", link_css=spec["links"])
+            # Parameters that echo the topic URL let one recording serve every topic
+            source = topic_values(topic_url)
+            list_spec["topic_params"] = {
+                name: src for name, value in params(ex2).items()
+                for src, seen in source.items() if len(str(value)) >= 3 and str(value) == seen
+            }
+            break
+        if list_spec is None:
+            print(f"{portal}: no replayable list endpoint found; the crawler keeps rendering.")
+            return None
+
+        print(f"{portal}: list endpoint {list_spec['request']['method']} {list_spec['request']['url']} "
+              f"(page via {list_spec['page_param']}, {list_spec['format']})")
+        if not list_spec["topic_params"]:
+            # Nothing in the topic URL identifies the list: record each topic's own call
+            print("  No topic parameter; recording every topic's call.")
+            list_spec["topics"] = {list_spec["referer"]: list_spec["request"]}
+            for topic_url in topics:
+                if topic_url in list_spec["topics"]:
+                    continue
+                _, second, _ = open_pages(driver, crawler, spec, topic_url)
+                ex = next((e for e in second if same_endpoint(e, list_spec["request"])), None)
+                if ex is not None:
+                    list_spec["topics"][topic_url] = {k: ex[k] for k in list_spec["request"]}
+                print(f"  {'ok  ' if ex else 'miss'} {topic_url}")
+
+        detail = None
+        sample = page_links(driver, spec["links"], list_spec["referer"])[:1]
+        if sample and list_spec["format"] == "json":
+            template = XhrTemplate({"portal": portal, "list": list_spec})
+            detail = detail_template(driver, sample[0], template.article_id(sample[0]))
+        print(f"  detail endpoint: {detail['request']['url'] if detail else 'none (article pages are server-rendered or not JSON)'}")
+    finally:
+        driver.quit()
+
+    data = {"portal": portal, "recorded": time.strftime("%Y-%m-%dT%H:%M:%S"), "list": list_spec, "detail": detail}
+    os.makedirs(TEMPLATE_DIR, exist_ok=True)
+    with open(template_path(portal), "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    print(f"Template written to {template_path(portal)}")
+    return data
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or any(a not in PORTALS for a in args):
+        print(f"Usage: python xhr_discovery.py <portal>...  (portals: {', '.join(PORTALS)})")
+        return
+    for portal in args:
+        record(portal)
+
+
+if __name__ == "__main__":
+    main()